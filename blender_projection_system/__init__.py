@@ -10,22 +10,63 @@ bl_info = {
     "category": "3D View",
 }
 
-import bpy
+try:
+    import bpy
+except ImportError:
+    # Running outside Blender (e.g. unit tests of the bpy-free core package)
+    bpy = None
 
-# Import modules
-from . import properties
-from . import ui
-from . import operators
-from . import visualization
-# from . import utils # Will be added later
+if bpy is not None:
+    # Import modules
+    from . import properties
+    from . import ui
+    from . import operators
+    from . import visualization
+    from . import catalog
+    from . import optimizer
+    from . import analysis
+    from . import blending
+    from . import warp
+    from . import cornerpin
+    from . import preview
+    from . import shading
+    from . import heatmap
+    from . import proxy
+    from . import stats
+    from . import probe
+    from . import pointcloud
+    from . import timeline
+    from . import tolerance
+    from . import audience
+    from . import sightlines
+    from . import clearance
+    # from . import utils # Will be added later
 
-modules = [
-    properties,
-    ui,
-    operators,
-    visualization,
-    # utils,
-]
+    modules = [
+        properties,
+        ui,
+        operators,
+        visualization,
+        catalog,
+        optimizer,
+        analysis,
+        blending,
+        warp,
+        cornerpin,
+        preview,
+        shading,
+        heatmap,
+        proxy,
+        stats,
+        probe,
+        pointcloud,
+        timeline,
+        tolerance,
+        audience,
+        sightlines,
+        clearance,
+        # utils,
+    ]
 
 def register():
     for mod in modules:
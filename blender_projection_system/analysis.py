@@ -0,0 +1,222 @@
+import bpy
+from bpy.types import Operator
+
+import numpy as np
+
+from .core.photometry import solve_illuminance
+from .core.surface_metrics import analyze_surface_metrics
+from .heatmap import refresh_heatmap
+from .proxy import report_stale_proxies
+from .scene_arrays import (
+    analysis_samples,
+    environment_objects,
+    environment_visibility,
+    point_cloud_objects,
+    projector_arrays,
+    scene_mirrors,
+    scene_projectors,
+    surface_object,
+)
+
+# Sampling options shared by the analysis operators
+SAMPLING_ITEMS = [
+    ('FACES', "Per Face", "One sample per triangle; results map exactly onto faces"),
+    ('RANDOM', "Random", "Area-uniform random samples, averaged per face"),
+    ('ADAPTIVE', "Adaptive", "Coarse cells refined only near image, blend and shadow edges, averaged per face"),
+]
+
+class PJ_OT_analyze_pixel_density(Operator):
+    """Compute pixel density, keystone and incidence angle on the environment surfaces"""
+    bl_idname = "projection.analyze_pixel_density"
+    bl_label = "Analyze Pixel Density"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    sampling: bpy.props.EnumProperty(
+        name="Sampling",
+        description="How the environment surfaces are sampled",
+        items=SAMPLING_ITEMS,
+        default='FACES'
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Samples",
+        description="Number of random samples, or the most adaptive samples",
+        default=1000000,
+        min=1000
+    )
+
+    tolerance: bpy.props.FloatProperty(
+        name="Tolerance",
+        description="Adaptive sampling: cells crossing an image, blend or shadow edge are refined to this size",
+        default=0.05,
+        min=0.001,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    cell_size: bpy.props.FloatProperty(
+        name="Cell Size",
+        description="Adaptive sampling: size of the coarse starting cells",
+        default=1.0,
+        min=0.01,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    def execute(self, context):
+        scene = context.scene
+        projectors = scene_projectors(context)
+        environment = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
+        clouds = point_cloud_objects(context)
+
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+        if not environment and not clouds:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+
+        arrays = projector_arrays(projectors, scene_mirrors(context))
+        blend = [proj.pj_edge_blend_amount for proj in projectors]
+        # Point clouds join the mesh samples point by point
+        analysis = analysis_samples(
+            context, environment, clouds, self.sampling, self.sample_count, projectors=arrays,
+            tolerance=self.tolerance, cell_size=self.cell_size, blend=blend)
+        samples = analysis.samples
+
+        visibility = environment_visibility(context, arrays, samples.points, environment,
+                                            clouds=analysis.clouds)
+        metrics = analyze_surface_metrics(arrays, samples, scene.pj_min_pixel_density, visibility)
+
+        # Mesh attributes, averaged per face; point cloud attributes per point
+        skipped = []
+        for name, values in (("pj_pixels_per_meter", metrics.pixels_per_meter),
+                             ("pj_keystone", metrics.keystone),
+                             ("pj_incidence", metrics.incidence_deg),
+                             ("pj_projector_count", metrics.coverage_count.astype(np.float64))):
+            skipped.extend(obj for obj in analysis.write(name, values) if obj not in skipped)
+
+        # Per projector summaries
+        for index, proj in enumerate(projectors):
+            proj["pj_surface_metrics"] = metrics.summary(index)
+        if scene.pj_heatmap_show:
+            refresh_heatmap(context)
+
+        lit = metrics.projector >= 0
+        below = lit & (metrics.pixels_per_meter < scene.pj_min_pixel_density)
+        lit_area = samples.weights[lit].sum()
+        below_area = samples.weights[below].sum()
+        if skipped:
+            self.report({'WARNING'}, f"Could not store attributes on {', '.join(skipped)} "
+                                     "(modifiers change the face count)")
+        self.report({'INFO'}, f"Analyzed {len(samples)} samples: {lit_area:.1f} m² lit, "
+                              f"{below_area:.1f} m² below {scene.pj_min_pixel_density:.0f} px/m"
+                              + (f", min {metrics.pixels_per_meter[lit].min():.0f} px/m" if lit.any() else ""))
+
+        return {'FINISHED'}
+
+class PJ_OT_analyze_brightness(Operator):
+    """Simulate illuminance and luminance from all projectors on the environment surfaces"""
+    bl_idname = "projection.analyze_brightness"
+    bl_label = "Analyze Brightness"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    sampling: bpy.props.EnumProperty(
+        name="Sampling",
+        description="How the environment surfaces are sampled",
+        items=SAMPLING_ITEMS,
+        default='FACES'
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Samples",
+        description="Number of random samples, or the most adaptive samples",
+        default=1000000,
+        min=1000
+    )
+
+    tolerance: bpy.props.FloatProperty(
+        name="Tolerance",
+        description="Adaptive sampling: cells crossing an image, blend or shadow edge are refined to this size",
+        default=0.05,
+        min=0.001,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    cell_size: bpy.props.FloatProperty(
+        name="Cell Size",
+        description="Adaptive sampling: size of the coarse starting cells",
+        default=1.0,
+        min=0.01,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    def execute(self, context):
+        scene = context.scene
+        projectors = scene_projectors(context)
+        environment = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
+        clouds = point_cloud_objects(context)
+
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+        if not environment and not clouds:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+
+        arrays = projector_arrays(projectors, scene_mirrors(context))
+        blend = [proj.pj_edge_blend_amount for proj in projectors]
+        # Point clouds join the mesh samples point by point
+        analysis = analysis_samples(
+            context, environment, clouds, self.sampling, self.sample_count, projectors=arrays,
+            tolerance=self.tolerance, cell_size=self.cell_size, blend=blend)
+        samples = analysis.samples
+
+        # Screen gain is set per environment object
+        gain = analysis.object_values(lambda obj: surface_object(obj).pj_screen_gain)
+
+        visibility = environment_visibility(context, arrays, samples.points, environment,
+                                            clouds=analysis.clouds)
+        result = solve_illuminance(arrays, samples, gain, visibility)
+
+        skipped = []
+        for name, values in (("pj_illuminance", result.illuminance),
+                             ("pj_luminance", result.luminance),
+                             ("pj_projector_count", result.contributors.astype(np.float64))):
+            skipped.extend(obj for obj in analysis.write(name, values) if obj not in skipped)
+
+        for index, proj in enumerate(projectors):
+            proj["pj_photometry"] = {"flux": float(result.flux[index]),
+                                     "lit_area": float(result.lit_area[index])}
+
+        lux = result.statistics()
+        nits = result.statistics(result.luminance)
+        scene["pj_brightness_summary"] = {
+            "lux_min": lux["min"], "lux_max": lux["max"], "lux_mean": lux["mean"],
+            "nits_min": nits["min"], "nits_max": nits["max"], "nits_mean": nits["mean"],
+            "uniformity": lux["uniformity"], "min_max_ratio": lux["min_max_ratio"],
+            "lit_area": lux["lit_area"], "stacked_area": lux["stacked_area"],
+        }
+        if scene.pj_heatmap_show:
+            refresh_heatmap(context)
+
+        if skipped:
+            self.report({'WARNING'}, f"Could not store attributes on {', '.join(skipped)} "
+                                     "(modifiers change the face count)")
+        self.report({'INFO'}, f"Illuminance {lux['min']:.0f}-{lux['max']:.0f} lx "
+                              f"(mean {lux['mean']:.0f}, uniformity {lux['uniformity']:.2f}), "
+                              f"luminance {nits['min']:.0f}-{nits['max']:.0f} cd/m²")
+
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_analyze_pixel_density)
+    bpy.utils.register_class(PJ_OT_analyze_brightness)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_analyze_brightness)
+    bpy.utils.unregister_class(PJ_OT_analyze_pixel_density)
@@ -0,0 +1,123 @@
+import bpy
+from bpy.types import Operator
+
+import numpy as np
+
+from .analysis import SAMPLING_ITEMS
+from .core.audience import Audience, AudienceShadows, analyze_audience, sample_audience
+from .heatmap import refresh_heatmap
+from .proxy import report_stale_proxies
+from .scene_arrays import (
+    analysis_samples,
+    audience_objects,
+    environment_geometry,
+    environment_objects,
+    environment_visibility,
+    gather_triangles,
+    point_cloud_objects,
+    projector_arrays,
+    projector_query,
+    scene_projectors,
+)
+
+# Scene ID property holding the totals of the last audience analysis
+AUDIENCE_PROPERTY = "pj_audience_summary"
+
+# Face attribute with the share of each face's projectors the audience blocks
+SHADOW_ATTRIBUTE = "pj_audience_shadow"
+
+def scene_audience(context, objects, seed=0):
+    """Audience of standing people on the upward faces of the audience area meshes"""
+    depsgraph = context.evaluated_depsgraph_get()
+    feet, height, radius = [], [], []
+    for index, obj in enumerate(objects):
+        vertices, triangles, _, _ = gather_triangles([obj], depsgraph)
+        points = sample_audience(vertices, triangles, obj.pj_audience_density, seed + index)
+        feet.append(points)
+        height.append(np.full(len(points), obj.pj_person_height))
+        radius.append(np.full(len(points), obj.pj_person_radius))
+    if not feet:
+        return Audience(np.zeros((0, 3)))
+    return Audience(np.concatenate(feet), np.concatenate(height), np.concatenate(radius))
+
+class PJ_OT_analyze_audience_shadows(Operator):
+    """Find the projector beams a standing audience interrupts and how much of each surface it shadows"""
+    bl_idname = "projection.analyze_audience_shadows"
+    bl_label = "Analyze Audience Shadows"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    sampling: bpy.props.EnumProperty(
+        name="Sampling",
+        description="How the environment surfaces are sampled",
+        items=SAMPLING_ITEMS,
+        default='FACES'
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Samples",
+        description="Number of random samples, or the most adaptive samples",
+        default=200000,
+        min=1000
+    )
+
+    seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Random seed of where the people stand; the same seed gives the same crowd",
+        default=0
+    )
+
+    def execute(self, context):
+        scene = context.scene
+        projectors = scene_projectors(context)
+        environment = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
+        clouds = point_cloud_objects(context)
+        areas = audience_objects(context)
+
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+        if not environment and not clouds:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+        if not areas:
+            self.report({'ERROR'}, "No audience areas; mark a floor mesh as an audience area first")
+            return {'CANCELLED'}
+
+        audience = scene_audience(context, areas, self.seed)
+        if len(audience) == 0:
+            self.report({'ERROR'}, "The audience areas have no upward faces to stand on")
+            return {'CANCELLED'}
+
+        arrays = projector_arrays(projectors)
+        analysis = analysis_samples(context, environment, clouds, self.sampling, self.sample_count, self.seed,
+                                    projectors=arrays)
+        samples = analysis.samples
+        visibility = environment_visibility(context, arrays, samples.points, environment,
+                                            clouds=analysis.clouds)
+        query = projector_query(arrays, environment_geometry(context, environment + areas))
+        result = analyze_audience(arrays, samples, AudienceShadows(arrays, audience, query), visibility)
+
+        skipped = analysis.write(SHADOW_ATTRIBUTE, result.shadow_fraction)
+        for index, proj in enumerate(projectors):
+            proj["pj_audience"] = result.summary(index)
+        lit_area = float(samples.weights[result.lit_count > 0].sum())
+        scene[AUDIENCE_PROPERTY] = {"people": len(audience), "lit_area": lit_area,
+                                    "shadowed_area": result.shadowed_area, "dark_area": result.dark_area}
+        if scene.pj_heatmap_show:
+            refresh_heatmap(context)
+
+        if skipped:
+            self.report({'WARNING'}, f"Could not store attributes on {', '.join(skipped)} "
+                                     "(modifiers change the face count)")
+        blocking = sum(1 for index in range(len(projectors)) if result.shadow_area[index] > 0)
+        self.report({'INFO'}, f"{len(audience)} people: {blocking} of {len(projectors)} projectors blocked, "
+                              f"{result.shadowed_area:.1f} of {lit_area:.1f} m² shadowed, "
+                              f"{result.dark_area:.1f} m² left dark")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_analyze_audience_shadows)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_analyze_audience_shadows)
@@ -0,0 +1,131 @@
+import os
+from functools import partial
+
+import bpy
+from bpy.types import Operator
+import numpy as np
+
+from .core.blending import blend_mask, raycast_surface, throw_plane_surface
+from .core.image_io import ImageWriter
+from .overlaps import neighbor_indices, overlap_signature
+from .scene_arrays import (
+    camera_projector_arrays,
+    environment_geometry,
+    environment_objects,
+    point_visibility,
+    scene_projectors,
+)
+from .visualization import sync_projector_camera
+
+def mask_path(directory, proj, file_format):
+    """File path of a projector's blend mask"""
+    extension = ".exr" if file_format == 'EXR' else ".png"
+    return os.path.join(directory, bpy.path.clean_name(proj.name) + "_blend" + extension)
+
+class PJ_OT_export_blend_masks(Operator):
+    """Compute edge-blend masks in every projector's native resolution and write them to disk"""
+    bl_idname = "projection.export_blend_masks"
+    bl_label = "Export Blend Masks"
+    bl_options = {'REGISTER'}
+
+    surface: bpy.props.EnumProperty(
+        name="Surface",
+        description="Where the projector pixels land when overlaps are computed",
+        items=[
+            ('GEOMETRY', "Environment", "Ray cast the pixels onto the environment meshes"),
+            ('THROW_PLANE', "Throw Plane", "Use each projector's focus plane at its throw distance"),
+        ],
+        default='GEOMETRY'
+    )
+
+    workers: bpy.props.IntProperty(
+        name="Threads",
+        description="Background threads computing and writing masks (0 = automatic)",
+        default=0,
+        min=0
+    )
+
+    _timer = None
+    _writer = None
+    _total = 0
+
+    def execute(self, context):
+        scene = context.scene
+        projectors = scene_projectors(context)
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+
+        directory = bpy.path.abspath(scene.pj_output_directory)
+        if not directory:
+            self.report({'ERROR'}, "Set an output directory first")
+            return {'CANCELLED'}
+
+        for proj in projectors:
+            sync_projector_camera(proj)
+        context.view_layer.update()
+        arrays = camera_projector_arrays(projectors)
+
+        environment = environment_objects(context)
+        candidates = [None] * len(projectors)
+        visible = None
+        if self.surface == 'GEOMETRY' and environment:
+            geometry = environment_geometry(context, environment)
+            surface = raycast_surface(arrays, geometry.bvh)
+            # Shadowed neighbours don't share the blend; ray cast, as the masks render on worker threads
+            visible = point_visibility(context, arrays, geometry, 'RAY_CAST')
+            # Neighbours in the overlap graph spare tracing every projector's footprint, as long as it was
+            # detected for the current rig; the masks ignore mirrors, so graphs with folded throws never match
+            signature = overlap_signature(context, projectors, mirrors=False)
+            candidates = neighbor_indices(scene, [proj.name for proj in projectors], signature) or candidates
+        else:
+            if self.surface == 'GEOMETRY':
+                self.report({'WARNING'}, "No environment meshes; blending on the throw planes")
+            surface = throw_plane_surface(arrays, [proj.pj_throw_distance for proj in projectors])
+        blend = np.array([proj.pj_edge_blend_amount for proj in projectors])
+
+        # Masks are computed and written on the thread pool; the timer only polls
+        self._writer = ImageWriter(self.workers or None)
+        for index, proj in enumerate(projectors):
+            render = partial(blend_mask, arrays, index, surface, blend,
+                             scene.pj_blend_gamma, scene.pj_blend_step, candidates=candidates[index], visible=visible)
+            self._writer.submit(mask_path(directory, proj, scene.pj_blend_format), render,
+                                scene.pj_blend_format)
+        self._total = len(projectors)
+
+        wm = context.window_manager
+        wm.progress_begin(0, self._total)
+        self._timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        completed = self._writer.completed
+        context.window_manager.progress_update(completed)
+        if context.area:
+            context.area.header_text_set(f"Writing blend masks {completed}/{self._total}")
+        if completed < self._total:
+            return {'RUNNING_MODAL'}
+
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        if context.area:
+            context.area.header_text_set(None)
+
+        paths, errors = self._writer.results()
+        self._writer.shutdown(wait=False)
+        if errors:
+            self.report({'ERROR'}, f"{len(errors)} blend masks failed: {errors[0]}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Wrote {len(paths)} blend masks to {os.path.dirname(paths[0])}")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_export_blend_masks)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_export_blend_masks)
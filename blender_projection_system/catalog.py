@@ -0,0 +1,169 @@
+import bpy
+from bpy.types import Operator
+
+from .core.calculations import aspect_from_resolution
+from .core.catalog import load_catalog
+
+def apply_catalog_entry(obj, entry, throw_ratio=None):
+    """
+    Drive a projector's pj_* parameters from a catalog entry.
+
+    Args:
+        obj: The projector empty
+        entry: Dictionary returned by ProjectorCatalog.entry()
+        throw_ratio: Throw ratio to set; by default the current ratio is
+            clamped into the lens zoom range
+    """
+    obj.pj_catalog_entry = entry["key"]
+    obj.pj_throw_ratio_min = entry["throw_ratio_min"]
+    obj.pj_throw_ratio_max = entry["throw_ratio_max"]
+    obj.pj_resolution_x = entry["resolution_x"]
+    obj.pj_resolution_y = entry["resolution_y"]
+    obj.pj_lumens = entry["lumens"]
+    obj.pj_lens_shift_v_max = entry["shift_v"]
+    obj.pj_lens_shift_h_max = entry["shift_h"]
+    obj.pj_weight = entry["weight_kg"]
+
+    # Keep any existing lens shift inside what the new lens allows
+    obj.pj_lens_shift_v = max(-entry["shift_v"],
+                              min(entry["shift_v"], obj.pj_lens_shift_v))
+    obj.pj_lens_shift_h = max(-entry["shift_h"],
+                              min(entry["shift_h"], obj.pj_lens_shift_h))
+
+    aspect_w, aspect_h = aspect_from_resolution(entry["resolution_x"],
+                                                entry["resolution_y"])
+    obj.pj_aspect_ratio_w = aspect_w
+    obj.pj_aspect_ratio_h = aspect_h
+
+    if throw_ratio is None:
+        throw_ratio = min(max(obj.pj_throw_ratio, entry["throw_ratio_min"]),
+                          entry["throw_ratio_max"])
+
+    # Setting the throw ratio updates the image width through the
+    # bidirectional parameter linking
+    obj.pj_throw_ratio = throw_ratio
+
+class PJ_OT_search_catalog(Operator):
+    """Find projector bodies and lenses that fit the requested throw"""
+    bl_idname = "projection.search_catalog"
+    bl_label = "Search Projector Catalog"
+    bl_options = {'REGISTER'}
+
+    max_results: bpy.props.IntProperty(
+        name="Max Results",
+        description="Maximum number of matches to list",
+        default=200,
+        min=1
+    )
+
+    def execute(self, context):
+        scene = context.scene
+
+        try:
+            catalog = load_catalog()
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Could not load projector catalog: {e}")
+            return {'CANCELLED'}
+
+        matches = catalog.query(
+            image_width=scene.pj_catalog_image_width,
+            distance_min=scene.pj_catalog_distance_min,
+            distance_max=scene.pj_catalog_distance_max,
+            min_lumens=scene.pj_catalog_min_lumens)
+
+        # Brightest first is what users scan for
+        matches = matches[catalog.lumens[matches].argsort(kind='stable')[::-1]]
+
+        scene.pj_catalog_results.clear()
+        for index in matches[:self.max_results]:
+            entry = catalog.entry(index)
+            item = scene.pj_catalog_results.add()
+            item.name = f"{entry['body_name']} + {entry['lens_name']}"
+            item.key = entry["key"]
+            item.throw_ratio_min = entry["throw_ratio_min"]
+            item.throw_ratio_max = entry["throw_ratio_max"]
+            item.lumens = entry["lumens"]
+        scene.pj_catalog_results_index = 0
+
+        self.report({'INFO'}, f"Found {len(matches)} matching body/lens combinations")
+
+        return {'FINISHED'}
+
+class PJ_OT_assign_catalog_entry(Operator):
+    """Assign a catalog body/lens combination to the selected projectors"""
+    bl_idname = "projection.assign_catalog_entry"
+    bl_label = "Assign Catalog Entry"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    key: bpy.props.StringProperty(
+        name="Catalog Key",
+        description="Catalog identifier (BODY/LENS); defaults to the selected search result",
+        default=""
+    )
+
+    use_search_distance: bpy.props.BoolProperty(
+        name="Fit Search Throw",
+        description="Pick the throw ratio that fits the catalog search width and distance",
+        default=True
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return any(obj.pj_is_projector for obj in context.selected_objects)
+
+    def execute(self, context):
+        scene = context.scene
+
+        try:
+            catalog = load_catalog()
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Could not load projector catalog: {e}")
+            return {'CANCELLED'}
+
+        key = self.key
+        if not key and scene.pj_catalog_results_index < len(scene.pj_catalog_results):
+            key = scene.pj_catalog_results[scene.pj_catalog_results_index].key
+
+        index = catalog.find(key)
+        if index is None:
+            self.report({'ERROR'}, f"Unknown catalog entry '{key}'")
+            return {'CANCELLED'}
+
+        throw_ratio = None
+        if self.use_search_distance:
+            throw_ratio = catalog.throw_ratio_for(
+                index,
+                image_width=scene.pj_catalog_image_width,
+                distance_min=scene.pj_catalog_distance_min,
+                distance_max=scene.pj_catalog_distance_max)
+
+        entry = catalog.entry(index)
+        assigned_count = 0
+        for obj in context.selected_objects:
+            if obj.pj_is_projector:
+                apply_catalog_entry(obj, entry, throw_ratio)
+                assigned_count += 1
+
+        self.report({'INFO'}, f"Assigned {entry['key']} to {assigned_count} projectors")
+
+        return {'FINISHED'}
+
+class PJ_UL_catalog_results(bpy.types.UIList):
+    """List of catalog search results"""
+
+    def draw_item(self, context, layout, data, item, icon, active_data,
+                  active_propname, index):
+        row = layout.row(align=True)
+        row.label(text=item.name, icon='CAMERA_DATA')
+        row.label(text=f"TR {item.throw_ratio_min:.2f}-{item.throw_ratio_max:.2f}")
+        row.label(text=f"{item.lumens:.0f} lm")
+
+def register():
+    bpy.utils.register_class(PJ_UL_catalog_results)
+    bpy.utils.register_class(PJ_OT_search_catalog)
+    bpy.utils.register_class(PJ_OT_assign_catalog_entry)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_assign_catalog_entry)
+    bpy.utils.unregister_class(PJ_OT_search_catalog)
+    bpy.utils.unregister_class(PJ_UL_catalog_results)
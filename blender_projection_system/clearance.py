@@ -0,0 +1,197 @@
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Operator
+
+import numpy as np
+
+from .core.clearance import BEAM, CLEARANCE, COLLISION, RigClearance
+from .core.query import ProjectorQuery
+from .scene_arrays import (
+    camera_projector_arrays,
+    environment_objects,
+    gather_triangles,
+    matrix_to_numpy,
+    read_mesh_triangles,
+    rigging_objects,
+    scene_projectors,
+)
+
+# Name of the body mesh PJ_OT_add_projector parents to every projector (duplicates get a suffix)
+BODY_NAME = "Projector_Body"
+
+# Share of the throw distance the beams are checked over; the screen itself sits at the throw distance
+BEAM_REACH = 0.9
+
+# Clearance checks of every scene by name; kept out of the scene itself, as writing
+# properties from a depsgraph handler would trigger another update
+_rig_clearance = {}
+
+# Inputs each projector of a scene was last checked with
+_projector_signatures = {}
+
+# Local-space body triangles by object name, dropped when the body mesh is edited
+_body_meshes = {}
+
+def clearance_obstacles(context):
+    """Environment meshes and rigging the projector bodies and beams must clear"""
+    obstacles = environment_objects(context)
+    return obstacles + [obj for obj in rigging_objects(context) if obj not in obstacles]
+
+def body_objects(projector):
+    """The projector's body meshes"""
+    return [child for child in projector.children if child.type == 'MESH' and child.name.startswith(BODY_NAME)]
+
+def projector_body(projector, depsgraph):
+    """(B, 3, 3) world triangles of the projector's body, or None without one"""
+    bodies = []
+    for child in body_objects(projector):
+        local = _body_meshes.get(child.name)
+        if local is None:
+            vertices, triangles, _ = read_mesh_triangles(child, depsgraph)
+            local = vertices[triangles]
+            _body_meshes[child.name] = local
+        matrix = matrix_to_numpy(child.matrix_world)
+        bodies.append(local @ matrix[:3, :3].T + matrix[:3, 3])
+    if not bodies or not sum(len(body) for body in bodies):
+        return None
+    return np.concatenate(bodies)
+
+def projector_signature(obj):
+    """Everything a projector's clearance depends on, for change detection"""
+    matrices = [obj.matrix_world] + [child.matrix_world for child in body_objects(obj)]
+    return (tuple(value for matrix in matrices for row in matrix for value in row),
+            obj.pj_is_active_projector, obj.pj_throw_ratio, obj.pj_throw_distance,
+            obj.pj_aspect_ratio_w, obj.pj_aspect_ratio_h, obj.pj_lens_shift_h, obj.pj_lens_shift_v)
+
+def update_clearance(context, depsgraph, edited=()):
+    """
+    Re-check the projectors that changed since their last check.
+
+    The obstacle tree is rebuilt when an obstacle is among the edited objects,
+    the obstacles change or the minimum clearance does.
+
+    Returns:
+        Tuple (RigClearance, number of projectors checked)
+    """
+    scene = context.scene
+    obstacles = clearance_obstacles(context)
+    names = [obj.name for obj in obstacles]
+    rig = _rig_clearance.get(scene.name)
+    if (rig is None or rig.object_names != names or rig.clearance != scene.pj_min_clearance
+            or not set(edited).isdisjoint(names)):
+        vertices, triangles, triangle_object, _ = gather_triangles(obstacles, depsgraph)
+        rig = RigClearance(vertices, triangles, triangle_object, names,
+                           [obj.pj_is_rigging for obj in obstacles], scene.pj_min_clearance)
+        _rig_clearance[scene.name] = rig
+        _projector_signatures[scene.name] = {}
+    signatures = _projector_signatures[scene.name]
+
+    projectors = scene_projectors(context, active_only=False)
+    present = {obj.name for obj in projectors}
+    for name in [name for name in rig.bodies if name not in present]:
+        rig.remove_projector(name)
+        signatures.pop(name, None)
+
+    changed = [obj for obj in projectors if signatures.get(obj.name) != projector_signature(obj)]
+    if changed:
+        arrays = camera_projector_arrays(changed)
+        far = np.array([BEAM_REACH * obj.pj_throw_distance for obj in changed])
+        beams = ProjectorQuery(arrays, far).frustum_corners()
+        for obj, beam in zip(changed, beams):
+            rig.set_projector(obj.name, projector_body(obj, depsgraph),
+                              beam if obj.pj_is_active_projector else None)
+            signatures[obj.name] = projector_signature(obj)
+        rig.check([obj.name for obj in changed])
+    return rig, len(changed)
+
+def clearance_issues(scene, name=None):
+    """Issues of one projector, or of every projector by name; cheap enough for draw()"""
+    rig = _rig_clearance.get(scene.name)
+    if rig is None:
+        return [] if name is not None else {}
+    return rig.issues(name) if name is not None else rig.all_issues()
+
+def issue_text(issue):
+    """One line describing a clearance issue"""
+    if issue["kind"] == COLLISION:
+        return f"Body intersects {issue['other']}"
+    if issue["kind"] == CLEARANCE:
+        return f"{issue['distance'] * 100:.0f} cm from {issue['other']}"
+    return f"Beam blocked by {issue['other']}"
+
+def clear_clearance():
+    _rig_clearance.clear()
+    _projector_signatures.clear()
+    _body_meshes.clear()
+
+@persistent
+def clearance_depsgraph_update(scene, depsgraph):
+    """Re-check the projectors as they, their bodies or the obstacles change"""
+    if not scene.pj_live_clearance:
+        # Edits made meanwhile aren't tracked, so start over when switched back on
+        _rig_clearance.pop(scene.name, None)
+        _projector_signatures.pop(scene.name, None)
+        return
+    context = bpy.context
+    if context.scene != scene:
+        return
+
+    edited = set()
+    signatures = _projector_signatures.get(scene.name, {})
+    for update in depsgraph.updates:
+        if not isinstance(update.id, bpy.types.Object):
+            continue
+        obj = update.id.original
+        if update.is_updated_geometry and obj.name in _body_meshes:
+            # An edited body mesh is read again, and its projector re-checked
+            del _body_meshes[obj.name]
+            if obj.parent is not None:
+                signatures.pop(obj.parent.name, None)
+        if update.is_updated_geometry or update.is_updated_transform:
+            edited.add(obj.name)
+    update_clearance(context, depsgraph, edited)
+
+@persistent
+def reset_clearance(*_):
+    """Undo and file loads replace the objects; check again from scratch"""
+    clear_clearance()
+
+class PJ_OT_check_clearance(Operator):
+    """Check every projector body and beam against the venue, the rigging and the other projectors"""
+    bl_idname = "projection.check_clearance"
+    bl_label = "Check Clearance"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        if not scene_projectors(context, active_only=False):
+            self.report({'ERROR'}, "No projectors in the scene")
+            return {'CANCELLED'}
+
+        # A full pass: forget the state of earlier checks
+        clear_clearance()
+        rig, checked = update_clearance(context, context.evaluated_depsgraph_get())
+        issues = rig.all_issues()
+        counts = {kind: sum(1 for found in issues.values() for issue in found if issue["kind"] == kind)
+                  for kind in (COLLISION, CLEARANCE, BEAM)}
+        if not issues:
+            self.report({'INFO'}, f"{checked} projectors clear of the venue, the rigging and each other")
+        else:
+            self.report({'WARNING'}, f"{len(issues)} of {checked} projectors with issues: "
+                                     f"{counts[COLLISION]} collisions, {counts[CLEARANCE]} too close, "
+                                     f"{counts[BEAM]} blocked beams")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_check_clearance)
+    bpy.app.handlers.depsgraph_update_post.append(clearance_depsgraph_update)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(reset_clearance)
+
+def unregister():
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if reset_clearance in handlers:
+            handlers.remove(reset_clearance)
+    if clearance_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(clearance_depsgraph_update)
+    bpy.utils.unregister_class(PJ_OT_check_clearance)
+    clear_clearance()
@@ -0,0 +1,4 @@
+# Core calculations for the Blender Projection System.
+#
+# Everything in this package is pure Python/NumPy and must never import bpy,
+# so it can be unit tested outside Blender and run in worker processes.
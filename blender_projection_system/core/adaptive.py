@@ -0,0 +1,296 @@
+"""
+Adaptive (triangle quadtree) sampling of environment surfaces.
+
+Uniform sampling spends most of its samples where nothing changes: regions
+entirely inside one image or entirely outside all of them. The adaptive
+sampler starts from a coarse grid of cells on every triangle and splits a
+cell into four (at its edge midpoints) only while it straddles
+
+* the frustum of a projector it faces (the image border),
+* the inner edge of a projector's blend zone, when blend amounts are
+  given, or
+* an occlusion boundary: the cell's corners and centre disagree on whether
+  a projector sees them.
+
+Frustum tests are exact for whole cells: in the projector frame the image
+borders are four planes through the lens, and a flat convex cell lies
+completely outside the frustum when all its corners lie outside the same
+plane (Cohen-Sutherland outcodes). Cells that straddle a boundary are
+split until their longest edge is below the tolerance, so the area that
+can be misclassified is bounded by tolerance x boundary length.
+
+The leaves become ordinary SurfaceSamples (one sample at each cell centre,
+weighted by its area), so every analysis consumes them unchanged.
+"""
+
+import numpy as np
+
+from .frustum import NEAR_CLIP, chunk_slices, facing_mask, local_axis
+from .sampling import SurfaceSamples, triangle_areas_normals
+
+# Upper bound on (projectors x cell corners) elements evaluated at once
+CHUNK_BUDGET = 4_000_000
+
+# Most cells a source triangle is cut into along one edge by the coarse grid
+MAX_GRID_SPLITS = 64
+
+
+def frustum_outcodes(projectors, points, margin=0.0):
+    """
+    Outcodes of points against every projector's image frustum, (N, M).
+
+    Bit k is set when the point lies outside plane k: the u >= lo, u <= hi,
+    v >= lo and v <= hi borders (lo = margin, hi = 1 - margin) and the near
+    clip plane. A code of 0 means the point lands inside the image, the
+    same test as inside_image(*project_points(...)). The border planes pass
+    through the lens, so points behind the projector are always outside at
+    least one of them.
+
+    Args:
+        margin: Inset on every side, scalar or (N, 1)
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    x = local_axis(projectors, points, 0)
+    depth = -local_axis(projectors, points, 1)
+    z = local_axis(projectors, points, 2)
+    return local_outcodes(x, depth, z, projectors.throw_ratio[:, None],
+                          projectors.aspect[:, None],
+                          projectors.shift[:, 0, None],
+                          projectors.shift[:, 1, None], margin)
+
+
+def local_outcodes(x, depth, z, throw_ratio, aspect, shift_h, shift_v,
+                   margin=0.0):
+    """
+    Frustum outcodes from projector-local coordinates, see frustum_outcodes.
+
+    The projector parameters broadcast against the coordinates, so the
+    same planes serve all-pairs and per-pair queries.
+    """
+    tr = throw_ratio
+    tr_v = tr * aspect
+    lo = np.asarray(margin, dtype=np.float64)
+    hi = 1.0 - lo
+
+    planes = (
+        (0.5 - shift_h - lo) * depth - tr * x,
+        tr * x + (hi - 0.5 + shift_h) * depth,
+        tr_v * z + (0.5 - shift_v - lo) * depth,
+        (hi - 0.5 + shift_v) * depth - tr_v * z,
+        depth - NEAR_CLIP,
+    )
+    codes = np.zeros(np.shape(depth), dtype=np.uint8)
+    for bit, value in enumerate(planes):
+        codes |= (value < 0).astype(np.uint8) << np.uint8(bit)
+    return codes
+
+
+def straddles(codes):
+    """
+    Cells crossing a frustum boundary, from (..., K, 3) corner outcodes.
+
+    A cell is inside when all corners are (all codes 0) and outside when
+    all corners share an outside plane; anything else may cross a border.
+    """
+    both = codes[..., 0] & codes[..., 1] & codes[..., 2]
+    either = codes[..., 0] | codes[..., 1] | codes[..., 2]
+    return (either != 0) & (both == 0)
+
+
+def grid_cells(vertices, triangles, cell_size, max_splits=MAX_GRID_SPLITS):
+    """
+    Cut every triangle into a regular grid of similar sub-triangles.
+
+    A triangle whose longest edge is L becomes n^2 cells with
+    n = ceil(L / cell_size), so no cell edge is longer than cell_size.
+
+    Returns:
+        Tuple (cells (K, 3, 3) corner positions, source triangle (K,))
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    corners = vertices[triangles]
+    splits = np.ceil(longest_edges(corners) / max(cell_size, 1e-9))
+    splits = np.clip(splits, 1, max_splits).astype(np.int64)
+
+    cells = []
+    source = []
+    for n in np.unique(splits):
+        chosen = np.flatnonzero(splits == n)
+        s, t = _grid_template(int(n))
+        a = corners[chosen, 0][:, None, None, :]
+        ab = (corners[chosen, 1] - corners[chosen, 0])[:, None, None, :]
+        ac = (corners[chosen, 2] - corners[chosen, 0])[:, None, None, :]
+        grid = a + s[None, :, :, None] * ab + t[None, :, :, None] * ac
+        cells.append(grid.reshape(-1, 3, 3))
+        source.append(np.repeat(chosen, len(s)))
+    if not cells:
+        return np.zeros((0, 3, 3)), np.zeros(0, dtype=np.int64)
+    return np.concatenate(cells), np.concatenate(source)
+
+
+def _grid_template(n):
+    """Barycentric (s, t) corners, each (n^2, 3), of an n x n triangle grid."""
+    cells = []
+    for i in range(n):
+        for j in range(n - i):
+            cells.append(((i, j), (i + 1, j), (i, j + 1)))
+            if i + j < n - 1:
+                cells.append(((i + 1, j), (i + 1, j + 1), (i, j + 1)))
+    grid = np.array(cells, dtype=np.float64) / n
+    return grid[:, :, 0], grid[:, :, 1]
+
+
+def split_cells(cells):
+    """Split (K, 3, 3) cells at their edge midpoints into (4K, 3, 3)."""
+    a, b, c = cells[:, 0], cells[:, 1], cells[:, 2]
+    ab = 0.5 * (a + b)
+    bc = 0.5 * (b + c)
+    ca = 0.5 * (c + a)
+    children = np.stack([
+        np.stack([a, ab, ca], axis=1),
+        np.stack([ab, b, bc], axis=1),
+        np.stack([ca, bc, c], axis=1),
+        np.stack([ab, bc, ca], axis=1),
+    ], axis=1)
+    return children.reshape(-1, 3, 3)
+
+
+def longest_edges(cells):
+    """Longest edge length of (K, 3, 3) cells."""
+    edges = cells - np.roll(cells, 1, axis=1)
+    return np.sqrt((edges * edges).sum(axis=2).max(axis=1))
+
+
+def boundary_cells(projectors, cells, normals, blend=None, visible=None,
+                   budget=CHUNK_BUDGET):
+    """
+    Mask of cells that cross a frustum, blend or occlusion boundary.
+
+    Only projectors whose light reaches the front of a cell count: a back
+    facing cell is dark for that projector whatever its outcodes are.
+
+    Args:
+        projectors: ProjectorArrays
+        cells: (K, 3, 3) cell corners
+        normals: (K, 3) unit normals of the cells
+        blend: Optional (N,) edge blend amounts; cells crossing the inner
+            edge of a blend zone are refined too
+        visible: Optional occlusion callable (index, points) -> (M,) mask of
+            the points projector `index` sees
+
+    Returns:
+        (K,) bool mask
+    """
+    k = len(cells)
+    n = len(projectors)
+    result = np.zeros(k, dtype=bool)
+    if n == 0 or k == 0:
+        return result
+
+    centres = cells.mean(axis=1)
+    if blend is not None:
+        blend = np.broadcast_to(np.asarray(blend, dtype=np.float64),
+                                (n,))[:, None]
+    # Candidates for the occlusion test: (projector, cell) pairs with light
+    lit_pairs = []
+    rows = max(1, budget // (4 * n))
+    for sl in chunk_slices(k, rows):
+        corners = cells[sl].reshape(-1, 3)
+        facing = facing_mask(projectors, centres[sl], normals[sl])
+        codes = frustum_outcodes(projectors, corners).reshape(n, -1, 3)
+        crossing = straddles(codes)
+        if blend is not None:
+            inner = frustum_outcodes(projectors, corners, blend)
+            crossing |= straddles(inner.reshape(n, -1, 3))
+        result[sl] = (crossing & facing).any(axis=0)
+        if visible is not None:
+            # Any corner inside: the cell receives some light
+            lit = (codes == 0).any(axis=2) & facing & ~result[sl][None, :]
+            index, cell = np.nonzero(lit)
+            lit_pairs.append((index, cell + sl.start))
+
+    if visible is None:
+        return result
+
+    index = np.concatenate([pair[0] for pair in lit_pairs])
+    cell = np.concatenate([pair[1] for pair in lit_pairs])
+    for i in np.unique(index):
+        chosen = cell[index == i]
+        chosen = chosen[~result[chosen]]
+        if len(chosen) == 0:
+            continue
+        points = np.concatenate([cells[chosen], centres[chosen][:, None]],
+                                axis=1)
+        seen = np.asarray(visible(int(i), points.reshape(-1, 3)), dtype=bool)
+        seen = seen.reshape(len(chosen), 4)
+        mixed = seen.any(axis=1) & ~seen.all(axis=1)
+        result[chosen[mixed]] = True
+    return result
+
+
+def sample_adaptive(projectors, vertices, triangles, tolerance=0.05,
+                    cell_size=1.0, blend=None, visible=None,
+                    max_samples=None):
+    """
+    Adaptive surface samples that resolve image, blend and shadow edges.
+
+    Args:
+        projectors: ProjectorArrays whose boundaries drive the refinement
+        vertices: (V, 3) positions
+        triangles: (T, 3) vertex indices
+        tolerance: Longest edge (metres) of the cells left straddling a
+            boundary; the coverage error is at most tolerance x boundary
+            length
+        cell_size: Longest edge of the coarse starting cells; features
+            smaller than this can be missed when no corner touches them
+        blend: Optional (N,) edge blend amounts, see boundary_cells
+        visible: Optional occlusion callable, see boundary_cells
+        max_samples: Optional cap on the number of samples; once reached,
+            only the largest boundary cells are refined further
+
+    Returns:
+        SurfaceSamples with one sample per leaf cell
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    _, triangle_normals = triangle_areas_normals(vertices, triangles)
+    cells, source = grid_cells(vertices, triangles,
+                               max(cell_size, tolerance))
+
+    leaves = []
+    leaf_source = []
+    count = len(cells)
+    while len(cells):
+        size = longest_edges(cells)
+        refine = size > tolerance
+        if refine.any():
+            refine[refine] = boundary_cells(
+                projectors, cells[refine], triangle_normals[source[refine]],
+                blend, visible)
+        if max_samples is not None:
+            # Every split adds three samples
+            room = max(int(max_samples) - count, 0) // 3
+            chosen = np.flatnonzero(refine)
+            if len(chosen) > room:
+                keep = chosen[np.argsort(-size[chosen], kind='stable')[:room]]
+                refine[:] = False
+                refine[keep] = True
+        leaves.append(cells[~refine])
+        leaf_source.append(source[~refine])
+        count += 3 * int(refine.sum())
+        cells = split_cells(cells[refine])
+        source = np.repeat(source[refine], 4)
+
+    if not leaves:
+        return SurfaceSamples(np.zeros((0, 3)), np.zeros((0, 3)),
+                              np.zeros(0), np.zeros(0, dtype=np.int64))
+    cells = np.concatenate(leaves)
+    source = np.concatenate(leaf_source)
+    order = np.argsort(source, kind='stable')
+    cells = cells[order]
+    source = source[order]
+    area = 0.5 * np.linalg.norm(np.cross(cells[:, 1] - cells[:, 0],
+                                         cells[:, 2] - cells[:, 0]), axis=1)
+    return SurfaceSamples(cells.mean(axis=1), triangle_normals[source],
+                          area, source)
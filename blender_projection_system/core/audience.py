@@ -0,0 +1,394 @@
+"""
+Audience shadows: standing people as capsules in the projector beams.
+
+An audience area is filled with people at a given density, each one a
+vertical capsule (a cylinder with hemispherical ends) from the floor to
+head height. Floor-level and low projectors throw over their heads; the
+analysis reports which beams the audience stands in and how much of every
+surface it shadows.
+
+Hundreds of thousands of capsules are handled with two levels of culling:
+
+1. the ProjectorQuery frustum hierarchy pairs every capsule with the
+   projectors whose frustum its bounding box may touch, and
+2. per projector, the capsules in its frustum are binned into a grid of
+   image tiles by the image-space bounds of their boxes, so a surface
+   sample only tests the capsules of the tile it projects into.
+
+The remaining (sample, capsule) pairs get an exact segment-to-segment
+distance test between the light ray (lens to sample) and the capsule's
+axis, in bounded blocks.
+"""
+
+import numpy as np
+
+from .frustum import NEAR_CLIP, chunk_slices, inside_image, project_points
+from .sampling import sample_surface, triangle_areas_normals
+from .surface_metrics import lit_mask, sample_chunk_size
+
+# Upper bound on (sample, capsule) pairs tested at once
+PAIR_BUDGET = 2_000_000
+
+# Capsules per ray in the first test round; later rounds double it
+ROUND_CAPSULES = 8
+
+# Average capsules per image tile the tile grid aims for
+TILE_CAPSULES = 4
+
+# Upper bound on the tile grid's width and height
+MAX_TILES = 128
+
+# Faces whose normal points at least this much upwards are floor
+FLOOR_COSINE = 0.7
+
+
+class Audience:
+    """
+    Standing people as vertical capsules.
+
+    Args:
+        feet: (P, 3) floor positions
+        height: Scalar or (P,) height to the top of the head
+        radius: Scalar or (P,) half the shoulder width
+    """
+
+    def __init__(self, feet, height=1.75, radius=0.25):
+        self.feet = np.asarray(feet, dtype=np.float64).reshape(-1, 3)
+        n = len(self.feet)
+        self.height = np.broadcast_to(
+            np.asarray(height, dtype=np.float64), (n,)).copy()
+        self.radius = np.broadcast_to(
+            np.asarray(radius, dtype=np.float64), (n,)).copy()
+        # Axis from the centre of the foot sphere to that of the head sphere
+        self.bottom = self.feet.copy()
+        self.bottom[:, 2] += self.radius
+        self.top = self.feet.copy()
+        self.top[:, 2] += np.maximum(self.height - self.radius, self.radius)
+
+    def __len__(self):
+        return len(self.feet)
+
+    def bounds(self):
+        """(lo, hi) bounding boxes of the capsules, (P, 3) each."""
+        r = self.radius[:, None]
+        return (np.minimum(self.bottom, self.top) - r,
+                np.maximum(self.bottom, self.top) + r)
+
+    def box_corners(self, index=None):
+        """(P, 8, 3) corners of the bounding boxes, or of capsules `index`."""
+        lo, hi = self.bounds()
+        if index is not None:
+            lo, hi = lo[index], hi[index]
+        pick = np.array([[x, y, z] for x in (0, 1) for y in (0, 1)
+                         for z in (0, 1)], dtype=bool)
+        return np.where(pick[None], hi[:, None], lo[:, None])
+
+
+def sample_audience(vertices, triangles, density, seed=0):
+    """
+    Floor positions of people standing on the upward faces of a mesh.
+
+    Args:
+        vertices, triangles: Audience area mesh
+        density: People per square metre of floor
+
+    Returns:
+        (P, 3) positions, area-uniform on the floor faces
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    areas, normals = triangle_areas_normals(vertices, triangles)
+    floor = normals[:, 2] >= FLOOR_COSINE
+    count = int(round(density * areas[floor].sum()))
+    return sample_surface(vertices, triangles[floor], count, seed).points
+
+
+def segment_distances(p1, q1, p2, q2):
+    """
+    Closest distance between segments [p1, q1] and [p2, q2], row by row.
+
+    The standard clamped closest-point solution, vectorized; degenerate
+    segments (points) are handled.
+    """
+    d1 = q1 - p1
+    d2 = q2 - p2
+    r = p1 - p2
+    a = np.einsum('ij,ij->i', d1, d1)
+    e = np.einsum('ij,ij->i', d2, d2)
+    f = np.einsum('ij,ij->i', d2, r)
+    c = np.einsum('ij,ij->i', d1, r)
+    b = np.einsum('ij,ij->i', d1, d2)
+    safe_a = np.where(a > 0, a, 1.0)
+    safe_e = np.where(e > 0, e, 1.0)
+
+    denom = a * e - b * b
+    s = np.where(denom > 1e-12 * np.maximum(a * e, 1e-300),
+                 np.clip((b * f - c * e) / np.where(denom > 0, denom, 1.0),
+                         0.0, 1.0), 0.0)
+    t = np.where(e > 0, (b * s + f) / safe_e, 0.0)
+    below = t < 0
+    above = t > 1
+    s = np.where(below, np.clip(-c / safe_a, 0.0, 1.0), s)
+    s = np.where(above, np.clip((b - c) / safe_a, 0.0, 1.0), s)
+    s = np.where(a > 0, s, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    gap = p1 + d1 * s[:, None] - (p2 + d2 * t[:, None])
+    return np.sqrt(np.einsum('ij,ij->i', gap, gap))
+
+
+class AudienceShadows:
+    """
+    Ray tests of an audience against every projector.
+
+    Args:
+        projectors: ProjectorArrays
+        audience: Audience
+        query: ProjectorQuery over the same projectors, its far distance
+            reaching the far side of the venue
+    """
+
+    def __init__(self, projectors, audience, query):
+        self.projectors = projectors
+        self.audience = audience
+        self.query = query
+
+        # (capsule, projector) pairs: box query, then the exact box test
+        lo, hi = audience.bounds()
+        capsule, projector = query.hierarchy.overlapping(lo, hi)
+        corners = audience.box_corners(capsule)
+        codes = np.stack([query.pair_outcodes(corners[:, k], projector)
+                          for k in range(8)], axis=1)
+        inside = np.bitwise_and.reduce(codes, axis=1) == 0
+        capsule, projector = capsule[inside], projector[inside]
+        order = np.argsort(projector, kind='stable')
+        self.beam_capsules = capsule[order]
+        self.beam_start = np.zeros(len(projectors) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(projector, minlength=len(projectors)),
+                  out=self.beam_start[1:])
+        self._tiles = {}
+
+    def in_beam(self, index):
+        """Capsules that may stand in projector `index`'s frustum."""
+        return self.beam_capsules[self.beam_start[index]:
+                                  self.beam_start[index + 1]]
+
+    def heads_in_beam(self, index):
+        """Capsules whose head centre is inside the frustum."""
+        capsules = self.in_beam(index)
+        codes = self.query.pair_outcodes(
+            self.audience.top[capsules],
+            np.full(len(capsules), index, dtype=np.int64))
+        return capsules[codes == 0]
+
+    def tiles(self, index):
+        """
+        Image tile grid of one projector's capsules.
+
+        Returns:
+            Tuple (size, indptr, capsules, near): the capsules touching tile
+            (ty, tx) are capsules[indptr[k]:indptr[k + 1]], k = ty * size + tx,
+            nearest first; near holds the depth where each entry's box starts
+        """
+        cached = self._tiles.get(index)
+        if cached is not None:
+            return cached
+        capsules = self.in_beam(index)
+        size = int(np.clip(np.ceil(np.sqrt(len(capsules) / TILE_CAPSULES)),
+                           1, MAX_TILES))
+        p = self.projectors
+        corners = self.audience.box_corners(capsules)
+        local = (corners - p.origins[index]) @ p.rotations[index]
+        depth = -local[..., 1]
+        near = (depth <= NEAR_CLIP).any(axis=1)
+        safe = np.where(depth > NEAR_CLIP, depth, 1.0)
+        tr = p.throw_ratio[index]
+        u = 0.5 - local[..., 0] / safe * tr - p.shift[index, 0]
+        v = (0.5 + local[..., 2] / safe * tr * p.aspect[index]
+             - p.shift[index, 1])
+        # Boxes reaching behind the near plane may cover any part of the image
+        u_lo = np.where(near, 0.0, u.min(axis=1))
+        u_hi = np.where(near, 1.0, u.max(axis=1))
+        v_lo = np.where(near, 0.0, v.min(axis=1))
+        v_hi = np.where(near, 1.0, v.max(axis=1))
+        x0, x1, y0, y1 = (np.clip(np.floor(value * size), 0, size - 1)
+                          .astype(np.int64)
+                          for value in (u_lo, u_hi, v_lo, v_hi))
+
+        # One entry per (tile, capsule)
+        nx = x1 - x0 + 1
+        counts = nx * (y1 - y0 + 1)
+        owner = np.repeat(np.arange(len(capsules)), counts)
+        step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                   counts)
+        tile = ((y0[owner] + step // nx[owner]) * size + x0[owner]
+                + step % nx[owner])
+        start = depth.min(axis=1)[owner]
+        order = np.lexsort((start, tile))
+        indptr = np.zeros(size * size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tile, minlength=size * size), out=indptr[1:])
+        cached = (size, indptr, capsules[owner[order]], start[order])
+        self._tiles[index] = cached
+        return cached
+
+    def blocked(self, index, points):
+        """
+        (M,) mask of points whose light from projector `index` hits a person.
+
+        Only points inside the projector's image are tested; the rest are
+        never lit by it and come back False.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        blocked = np.zeros(len(points), dtype=bool)
+        size, indptr, capsules, near = self.tiles(index)
+        if len(capsules) == 0 or len(points) == 0:
+            return blocked
+        u, v, depth = project_points(self.projectors.subset([index]), points)
+        inside = inside_image(u, v, depth)[0]
+        tx = np.clip(np.floor(u[0] * size), 0, size - 1).astype(np.int64)
+        ty = np.clip(np.floor(v[0] * size), 0, size - 1).astype(np.int64)
+        tile = ty * size + tx
+        depth = depth[0]
+
+        # Rounds over each tile's capsules, nearest first: a ray leaves once
+        # it is blocked or the next capsule starts behind its sample point
+        origin = self.projectors.origins[index]
+        audience = self.audience
+        active = np.flatnonzero(inside & (indptr[tile + 1] > indptr[tile]))
+        offset = 0
+        width = ROUND_CAPSULES
+        while len(active):
+            for block in chunk_slices(len(active), max(1, PAIR_BUDGET // width)):
+                point = active[block]
+                first = indptr[tile[point]] + offset
+                count = np.minimum(indptr[tile[point] + 1] - first, width)
+                pair = np.repeat(point, count)
+                entry = np.repeat(first - np.cumsum(count) + count, count) + \
+                    np.arange(len(pair))
+                ahead = near[entry] < depth[pair]
+                pair, capsule = pair[ahead], capsules[entry[ahead]]
+                distance = segment_distances(
+                    np.broadcast_to(origin, (len(pair), 3)), points[pair],
+                    audience.bottom[capsule], audience.top[capsule])
+                blocked[pair[distance < audience.radius[capsule]]] = True
+            offset += width
+            width *= 2
+            next_entry = indptr[tile[active]] + offset
+            active = active[~blocked[active] &
+                            (next_entry < indptr[tile[active] + 1])]
+            next_entry = indptr[tile[active]] + offset
+            active = active[near[next_entry] < depth[active]]
+        return blocked
+
+    def visibility(self, points, base=None):
+        """
+        Occlusion callable for surface_metrics.lit_mask that adds the audience.
+
+        Args:
+            points: (M, 3) all sample positions the analysis selects from
+            base: Optional callable of the same kind for the venue itself
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        def visible(index, samples, candidates):
+            mask = candidates.copy()
+            if base is not None:
+                mask &= base(index, samples, candidates)
+            chunk = points[samples]
+            for row, projector in enumerate(np.atleast_1d(index)):
+                columns = np.flatnonzero(mask[row])
+                if len(columns):
+                    mask[row, columns] = ~self.blocked(int(projector),
+                                                       chunk[columns])
+            return mask
+        return visible
+
+
+class AudienceResult:
+    """
+    Result of analyze_audience.
+
+    Per-sample arrays (length M): lit_count (projectors lighting the sample
+    without an audience) and blocked_count (of those, the ones a person
+    blocks). Per-projector arrays (length N): people and heads (capsules,
+    and heads, in the beam), lit_area and shadow_area (surface it no longer
+    reaches).
+    """
+
+    def __init__(self, m, n):
+        self.lit_count = np.zeros(m, dtype=np.int32)
+        self.blocked_count = np.zeros(m, dtype=np.int32)
+        self.weights = np.zeros(m)
+        self.people = np.zeros(n, dtype=np.int64)
+        self.heads = np.zeros(n, dtype=np.int64)
+        self.lit_area = np.zeros(n)
+        self.shadow_area = np.zeros(n)
+
+    @property
+    def shadow_fraction(self):
+        """(M,) share of a sample's projectors that the audience blocks."""
+        return np.where(self.lit_count > 0,
+                        self.blocked_count / np.maximum(self.lit_count, 1),
+                        0.0)
+
+    @property
+    def shadowed_area(self):
+        """Area where at least one projector is blocked."""
+        return float(self.weights[self.blocked_count > 0].sum())
+
+    @property
+    def dark_area(self):
+        """Lit area every one of whose projectors is blocked."""
+        dark = (self.lit_count > 0) & (self.blocked_count == self.lit_count)
+        return float(self.weights[dark].sum())
+
+    def summary(self, index):
+        """Plain dictionary summary for one projector."""
+        lit = self.lit_area[index]
+        return {
+            "people": int(self.people[index]),
+            "heads": int(self.heads[index]),
+            "lit_area": float(lit),
+            "shadow_area": float(self.shadow_area[index]),
+            "shadow_fraction": float(self.shadow_area[index] / lit)
+            if lit > 0 else 0.0,
+        }
+
+
+def analyze_audience(projectors, samples, shadows, visibility=None,
+                     chunk_size=None):
+    """
+    Which beams the audience stands in and what it shadows.
+
+    Args:
+        projectors: ProjectorArrays
+        samples: SurfaceSamples of the venue
+        shadows: AudienceShadows of the same projectors
+        visibility: Optional occlusion callable of the venue, see lit_mask
+        chunk_size: Samples per block
+
+    Returns:
+        AudienceResult
+    """
+    n = len(projectors)
+    m = len(samples)
+    result = AudienceResult(m, n)
+    result.weights = samples.weights.copy()
+    for i in range(n):
+        result.people[i] = len(shadows.in_beam(i))
+        result.heads[i] = len(shadows.heads_in_beam(i))
+
+    index = np.arange(n)
+    chunk_size = chunk_size or sample_chunk_size(n)
+    for sl in chunk_slices(m, chunk_size):
+        points = samples.points[sl]
+        weights = samples.weights[sl]
+        lit, _, _, _ = lit_mask(projectors, points, samples.normals[sl],
+                                visibility, index, sl)
+        result.lit_count[sl] = lit.sum(axis=0)
+        result.lit_area += lit @ weights
+        for i in np.flatnonzero(lit.any(axis=1)):
+            columns = np.flatnonzero(lit[i])
+            blocked = columns[shadows.blocked(i, points[columns])]
+            result.blocked_count[sl][blocked] += 1
+            result.shadow_area[i] += weights[blocked].sum()
+    return result
@@ -0,0 +1,271 @@
+"""
+Edge-blend masks in each projector's native raster.
+
+Every pixel of projector i is traced to the surface point it lights. All
+projectors lighting that point (inside their image, on the lit side of the
+surface and, given an occlusion test, unobstructed) get a weight that
+ramps smoothly from 0 at their image border to 1 at `blend` (their
+pj_edge_blend_amount, as a fraction of the image width/height) inside it;
+the weights are normalized so the contributions at every surface point sum
+to one. Pixels lit by a single projector stay at 1.
+
+Projectors emit light as the content value raised to the display gamma,
+so the mask is stored as alpha ** (1 / gamma): multiplied into the gamma
+encoded signal it produces the linear alpha on the surface, keeping the
+light in blend zones constant.
+
+Masks are evaluated on a grid every `step` pixels and interpolated
+bilinearly in between (step=1 evaluates every pixel); the ramps are smooth,
+so the interpolation error is far below one 16-bit code value for the usual
+steps.
+"""
+
+import numpy as np
+
+from .frustum import (
+    cone_cull,
+    facing_mask,
+    half_angle_tangents,
+    inside_image,
+    pixel_rays,
+    project_points,
+)
+
+# Default grid spacing (pixels) at which the blend weights are evaluated
+DEFAULT_STEP = 8
+
+# Points evaluated per block when tracing a projector's pixel grid
+BLOCK_SIZE = 262144
+
+
+def edge_weight(u, v, blend):
+    """
+    Smoothstep ramp towards the image border.
+
+    Args:
+        u, v: Normalized image coordinates
+        blend: Ramp width as a fraction of the image (broadcastable)
+    """
+    blend = np.maximum(blend, 1e-6)
+    t = np.clip(np.minimum(u, 1.0 - u) / blend, 0.0, 1.0) * \
+        np.clip(np.minimum(v, 1.0 - v) / blend, 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def throw_plane_surface(projectors, throw_distance):
+    """
+    Surface callable that puts every pixel on its projector's focus plane.
+
+    Exact for flat screens where the projectors' throw distances are set to
+    the screen; use a ray-cast surface for arbitrary geometry.
+
+    Returns:
+        Callable (index, u, v) -> (points (K, 3), valid mask (K,),
+        normals (K, 3))
+    """
+    throw_distance = np.broadcast_to(
+        np.asarray(throw_distance, dtype=np.float64), (len(projectors),))
+
+    def surface(index, u, v):
+        directions = pixel_rays(projectors, index, u, v)
+        points = (projectors.origins[index] +
+                  throw_distance[index] * directions)
+        # The focus plane faces back along the projector's axis (local +Y)
+        normals = np.broadcast_to(projectors.rotations[index][:, 1],
+                                  points.shape)
+        return points, np.ones(len(points), dtype=bool), normals
+
+    return surface
+
+
+def raycast_surface(projectors, bvh):
+    """
+    Surface callable that traces every pixel onto real geometry.
+
+    Args:
+        bvh: raycast.TriangleBVH of the environment
+
+    Returns:
+        Callable (index, u, v) -> (points (K, 3), valid mask (K,),
+        normals (K, 3)) with the normals of the triangles hit, turned
+        towards the projector
+    """
+    def surface(index, u, v):
+        directions = pixel_rays(projectors, index, u, v)
+        origins = np.broadcast_to(projectors.origins[index], directions.shape)
+        hits = bvh.ray_cast(origins, directions)
+        data = bvh.triangle_data[bvh.item_position[np.maximum(hits.triangle, 0)]]
+        normals = np.cross(data[:, 1], data[:, 2])
+        normals[np.einsum('ij,ij->i', normals, directions) > 0] *= -1.0
+        return hits.points(origins, directions), hits.hit, normals
+
+    return surface
+
+
+def grid_coordinates(size, step):
+    """Pixel positions of the evaluation grid along one axis."""
+    positions = np.arange(0, size, max(int(step), 1), dtype=np.float64)
+    if positions[-1] != size - 1:
+        positions = np.append(positions, size - 1)
+    return positions
+
+
+def upsample_bilinear(grid, grid_x, grid_y, width, height):
+    """Interpolate grid values (at pixel positions grid_x/y) to every pixel."""
+    def axis_weights(grid_positions, size):
+        pixels = np.arange(size, dtype=np.float64)
+        right = np.clip(np.searchsorted(grid_positions, pixels, side='right'),
+                        1, len(grid_positions) - 1)
+        left = right - 1
+        span = grid_positions[right] - grid_positions[left]
+        frac = (pixels - grid_positions[left]) / np.where(span > 0, span, 1)
+        return left, right, np.clip(frac, 0.0, 1.0).astype(np.float32)
+
+    if len(grid_x) == 1 or len(grid_y) == 1:
+        return np.broadcast_to(grid.mean(), (height, width)).astype(
+            np.float32)
+    x0, x1, fx = axis_weights(grid_x, width)
+    y0, y1, fy = axis_weights(grid_y, height)
+    rows = grid[:, x0] * (1.0 - fx) + grid[:, x1] * fx
+    return rows[y0] * (1.0 - fy)[:, None] + rows[y1] * fy[:, None]
+
+
+def blend_alpha(projectors, index, u, v, surface, blend, candidates=None,
+                visible=None):
+    """
+    Normalized blend weight of projector `index` at image points (u, v).
+
+    Only the other projectors that actually light a point share it: those
+    behind its surface or, given `visible`, shadowed from it leave this
+    projector's weight alone.
+
+    Args:
+        projectors: ProjectorArrays
+        index: Projector the points belong to
+        u, v: (K,) normalized image coordinates
+        surface: Callable (index, u, v) -> (points, valid, normals)
+        blend: (N,) ramp widths
+        candidates: Projector indices that may overlap (all if None)
+        visible: Optional occlusion callable (index, points) -> (M,) mask,
+            e.g. ShadowMaps.visible
+
+    Returns:
+        (K,) alpha in [0, 1]; 0 where the pixel hits no surface
+    """
+    points, valid, normals = surface(index, u, v)
+    own = edge_weight(u, v, blend[index])
+    total = own.copy()
+
+    if candidates is None:
+        candidates = np.arange(len(projectors))
+    others = np.asarray([c for c in candidates if c != index], dtype=np.int64)
+    if len(others):
+        subset = projectors.subset(others)
+        ou, ov, depth = project_points(subset, points)
+        lit = inside_image(ou, ov, depth) & valid[None, :] & \
+            facing_mask(subset, points, normals)
+        if visible is not None:
+            for row, other in enumerate(others):
+                columns = np.flatnonzero(lit[row])
+                if len(columns):
+                    lit[row, columns] = visible(int(other), points[columns])
+        total += np.where(lit, edge_weight(ou, ov, blend[others, None]),
+                          0.0).sum(axis=0)
+
+    alpha = np.where(total > 1e-12, own / np.maximum(total, 1e-12), 1.0)
+    return np.where(valid, alpha, 0.0)
+
+
+def footprint_bounds(surface, index, probe=16):
+    """
+    Padded world bounds (lo, hi) of a projector's footprint, or None.
+
+    The footprint is traced on a coarse probe grid of the image and padded
+    by one probe cell so footprints touching between probes still count.
+    """
+    pu, pv = np.meshgrid(np.linspace(0, 1, probe), np.linspace(0, 1, probe))
+    points, valid, _ = surface(index, pu.reshape(-1), pv.reshape(-1))
+    points = points[valid]
+    if len(points) == 0:
+        return None
+    lo = points.min(axis=0)
+    hi = points.max(axis=0)
+    pad = (hi - lo).max() / (probe - 1)
+    return lo - pad, hi + pad
+
+
+def overlap_candidates(projectors, index, surface, probe=16):
+    """
+    Projectors whose footprint may overlap projector `index`'s footprint.
+
+    A frustum cone test against the footprint's bounding sphere prunes the
+    list before the candidates' own footprints are traced and compared.
+    """
+    bounds = footprint_bounds(surface, index, probe)
+    if bounds is None:
+        return np.zeros(0, dtype=np.int64)
+    lo, hi = bounds
+    mask = cone_cull(projectors, 0.5 * (lo + hi),
+                     0.5 * np.linalg.norm(hi - lo),
+                     half_angle_tangents(projectors))
+    candidates = []
+    for other in np.flatnonzero(mask):
+        other_bounds = footprint_bounds(surface, other, probe)
+        if other_bounds is not None and \
+                np.all(other_bounds[0] <= hi) and np.all(other_bounds[1] >= lo):
+            candidates.append(other)
+    return np.asarray(candidates, dtype=np.int64)
+
+
+def blend_mask(projectors, index, surface, blend, gamma=2.2,
+               step=DEFAULT_STEP, resolution=None, candidates=None,
+               visible=None):
+    """
+    Gamma-corrected blend mask of one projector in its native raster.
+
+    Args:
+        projectors: ProjectorArrays
+        index: Projector index
+        surface: Callable (index, u, v) -> (points, valid, normals), e.g.
+            throw_plane_surface
+        blend: (N,) edge blend amounts
+        gamma: Display gamma the mask is corrected for (1 = linear)
+        step: Grid spacing in pixels
+        resolution: Optional (width, height) override
+        candidates: Optional indices of the projectors that may overlap
+            this one, e.g. its neighbours in the overlap graph; traced
+            from coarse footprints if None
+        visible: Optional occlusion callable (index, points) -> (M,) mask;
+            see blend_alpha
+
+    Returns:
+        (height, width) float32 mask, row 0 at the top of the image
+    """
+    blend = np.broadcast_to(np.asarray(blend, dtype=np.float64),
+                            (len(projectors),))
+    if resolution is None:
+        resolution = projectors.resolution[index]
+    width, height = (int(r) for r in resolution)
+
+    grid_x = grid_coordinates(width, step)
+    grid_y = grid_coordinates(height, step)
+    gu, gv = np.meshgrid((grid_x + 0.5) / width, 1.0 - (grid_y + 0.5) / height)
+    gu = gu.reshape(-1)
+    gv = gv.reshape(-1)
+
+    if candidates is None:
+        candidates = overlap_candidates(projectors, index, surface)
+    candidates = np.asarray(candidates, dtype=np.int64)
+    alpha = np.empty(len(gu))
+    for start in range(0, len(gu), BLOCK_SIZE):
+        sl = slice(start, min(start + BLOCK_SIZE, len(gu)))
+        alpha[sl] = blend_alpha(projectors, index, gu[sl], gv[sl], surface,
+                                blend, candidates, visible)
+
+    grid = alpha.reshape(len(grid_y), len(grid_x))
+    if gamma != 1.0:
+        grid = grid ** (1.0 / gamma)
+    grid = grid.astype(np.float32)
+    if len(grid_x) == width and len(grid_y) == height:
+        return grid
+    return upsample_bilinear(grid, grid_x, grid_y, width, height)
@@ -0,0 +1,37 @@
+"""Basic projection formulas shared by the operators and the analyses."""
+
+import math
+
+
+def calculate_throw_ratio(distance, image_width):
+    """Throw ratio TR = D / W (infinite for a degenerate image width)."""
+    if image_width < 1e-6:
+        return float('inf')
+    return distance / image_width
+
+
+def calculate_image_width(distance, throw_ratio):
+    """Image width W = D / TR (infinite for a degenerate throw ratio)."""
+    if throw_ratio < 1e-6:
+        return float('inf')
+    return distance / throw_ratio
+
+
+def calculate_throw_distance(image_width, throw_ratio):
+    """Throw distance D = W * TR."""
+    return image_width * throw_ratio
+
+
+def aspect_from_resolution(resolution_x, resolution_y):
+    """
+    Reduce a native resolution to its aspect ratio.
+
+    Args:
+        resolution_x: Horizontal pixel count (e.g. 1920)
+        resolution_y: Vertical pixel count (e.g. 1200)
+
+    Returns:
+        Tuple (w, h) such as (8, 5) for WUXGA or (16, 9) for UHD
+    """
+    divisor = math.gcd(int(resolution_x), int(resolution_y)) or 1
+    return int(resolution_x) // divisor, int(resolution_y) // divisor
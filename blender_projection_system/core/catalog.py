@@ -0,0 +1,201 @@
+"""
+Projector body / lens catalog with fast constraint queries.
+
+The bundled catalog (data/projector_catalog.json) is stored column-wise:
+one list per field for bodies and for lenses, joined on the lens mount.
+On load every compatible body + lens combination is expanded into parallel
+NumPy arrays sorted by minimum throw ratio. That sort order is the index: a
+throw-geometry query is a binary search for the candidate prefix followed by
+a handful of vectorized masks, which stays well under a millisecond even for
+tens of thousands of combinations.
+"""
+
+import functools
+import json
+import os
+
+import numpy as np
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data", "projector_catalog.json")
+
+BODY_COLUMNS = ("id", "name", "lumens", "resolution_x", "resolution_y",
+                "mount", "weight_kg")
+LENS_COLUMNS = ("id", "name", "mount", "throw_ratio_min", "throw_ratio_max",
+                "shift_v", "shift_h", "weight_kg")
+
+
+def _check_columns(table, required, label):
+    missing = [name for name in required if name not in table]
+    if missing:
+        raise ValueError(f"Catalog {label} table is missing columns: "
+                         f"{', '.join(missing)}")
+    lengths = {len(table[name]) for name in required}
+    if len(lengths) > 1:
+        raise ValueError(f"Catalog {label} columns have different lengths")
+
+
+class ProjectorCatalog:
+    """
+    Indexed table of every valid projector body + lens combination.
+
+    Args:
+        bodies: Mapping of BODY_COLUMNS to equal-length sequences
+        lenses: Mapping of LENS_COLUMNS to equal-length sequences
+    """
+
+    def __init__(self, bodies, lenses):
+        _check_columns(bodies, BODY_COLUMNS, "body")
+        _check_columns(lenses, LENS_COLUMNS, "lens")
+
+        self.body_ids = list(bodies["id"])
+        self.body_names = list(bodies["name"])
+        self.lens_ids = list(lenses["id"])
+        self.lens_names = list(lenses["name"])
+
+        body_mounts = np.asarray(bodies["mount"])
+        lens_mounts = np.asarray(lenses["mount"])
+
+        # Join bodies and lenses on the mount column
+        body_index = []
+        lens_index = []
+        for mount in np.unique(body_mounts):
+            b = np.flatnonzero(body_mounts == mount)
+            n = np.flatnonzero(lens_mounts == mount)
+            if len(b) and len(n):
+                bb, ll = np.meshgrid(b, n, indexing='ij')
+                body_index.append(bb.ravel())
+                lens_index.append(ll.ravel())
+
+        if body_index:
+            body_index = np.concatenate(body_index)
+            lens_index = np.concatenate(lens_index)
+        else:
+            body_index = np.zeros(0, dtype=np.intp)
+            lens_index = np.zeros(0, dtype=np.intp)
+
+        tr_min = np.asarray(lenses["throw_ratio_min"], dtype=np.float64)
+        order = np.argsort(tr_min[lens_index], kind='stable')
+        self.body_index = body_index[order]
+        self.lens_index = lens_index[order]
+
+        # Columnar combination table, sorted by minimum throw ratio
+        b, n = self.body_index, self.lens_index
+        self.throw_ratio_min = tr_min[n]
+        self.throw_ratio_max = np.asarray(
+            lenses["throw_ratio_max"], dtype=np.float64)[n]
+        self.lumens = np.asarray(bodies["lumens"], dtype=np.float64)[b]
+        self.resolution_x = np.asarray(bodies["resolution_x"],
+                                       dtype=np.int32)[b]
+        self.resolution_y = np.asarray(bodies["resolution_y"],
+                                       dtype=np.int32)[b]
+        self.shift_v = np.asarray(lenses["shift_v"], dtype=np.float64)[n]
+        self.shift_h = np.asarray(lenses["shift_h"], dtype=np.float64)[n]
+        self.weight_kg = (
+            np.asarray(bodies["weight_kg"], dtype=np.float64)[b] +
+            np.asarray(lenses["weight_kg"], dtype=np.float64)[n])
+
+        self._key_index = {self.key(i): i for i in range(len(self))}
+
+    def __len__(self):
+        return len(self.body_index)
+
+    def key(self, index):
+        """Stable string identifier of a combination ("BODY/LENS")."""
+        return (f"{self.body_ids[self.body_index[index]]}/"
+                f"{self.lens_ids[self.lens_index[index]]}")
+
+    def find(self, key):
+        """Return the combination index for a key, or None if unknown."""
+        return self._key_index.get(key)
+
+    def query(self, image_width, distance_min, distance_max=None,
+              min_lumens=0.0, min_resolution_x=0):
+        """
+        Find every combination that can throw a given image width.
+
+        A lens qualifies when its throw distance range for the image width
+        (W * TR_min .. W * TR_max) intersects [distance_min, distance_max].
+
+        Args:
+            image_width: Required image width in meters
+            distance_min: Nearest allowed throw distance in meters
+            distance_max: Farthest allowed throw distance (defaults to min)
+            min_lumens: Minimum body brightness
+            min_resolution_x: Minimum native horizontal resolution
+
+        Returns:
+            Array of combination indices, ordered by minimum throw ratio
+        """
+        if distance_max is None:
+            distance_max = distance_min
+        if image_width <= 0 or distance_max < distance_min:
+            return np.zeros(0, dtype=np.intp)
+
+        ratio_low = distance_min / image_width
+        ratio_high = distance_max / image_width
+
+        # Only lenses whose TR_min <= ratio_high can reach; the table is
+        # sorted on TR_min so that is a prefix.
+        end = np.searchsorted(self.throw_ratio_min, ratio_high, side='right')
+
+        mask = self.throw_ratio_max[:end] >= ratio_low
+        if min_lumens > 0:
+            mask &= self.lumens[:end] >= min_lumens
+        if min_resolution_x > 0:
+            mask &= self.resolution_x[:end] >= min_resolution_x
+        return np.flatnonzero(mask)
+
+    def throw_ratio_for(self, index, image_width=None, distance_min=None,
+                        distance_max=None):
+        """
+        Pick the throw ratio to use for a combination.
+
+        Without constraints this is the middle of the zoom range; with a
+        target width and distance window it is the ratio closest to the
+        middle of that window that the lens can actually reach.
+        """
+        low = self.throw_ratio_min[index]
+        high = self.throw_ratio_max[index]
+        if not image_width or distance_min is None:
+            return float(0.5 * (low + high))
+        if distance_max is None:
+            distance_max = distance_min
+        target = 0.5 * (distance_min + distance_max) / image_width
+        return float(min(max(target, low), high))
+
+    def entry(self, index):
+        """Return one combination as a plain dictionary."""
+        b = self.body_index[index]
+        n = self.lens_index[index]
+        return {
+            "key": self.key(index),
+            "body_id": self.body_ids[b],
+            "body_name": self.body_names[b],
+            "lens_id": self.lens_ids[n],
+            "lens_name": self.lens_names[n],
+            "throw_ratio_min": float(self.throw_ratio_min[index]),
+            "throw_ratio_max": float(self.throw_ratio_max[index]),
+            "lumens": float(self.lumens[index]),
+            "resolution_x": int(self.resolution_x[index]),
+            "resolution_y": int(self.resolution_y[index]),
+            "shift_v": float(self.shift_v[index]),
+            "shift_h": float(self.shift_h[index]),
+            "weight_kg": float(self.weight_kg[index]),
+        }
+
+
+def read_catalog(path):
+    """Read a catalog JSON file into a ProjectorCatalog."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != "pj-catalog":
+        raise ValueError(f"Not a projector catalog file: {path}")
+    return ProjectorCatalog(data["bodies"], data["lenses"])
+
+
+@functools.lru_cache(maxsize=4)
+def load_catalog(path=DEFAULT_CATALOG_PATH):
+    """Load (and cache) a catalog; defaults to the bundled one."""
+    return read_catalog(path)
@@ -0,0 +1,375 @@
+"""
+Rigging clearance: projector bodies and beams against the venue and each other.
+
+Every projector brings two solids: its body, a triangle mesh, and its beam,
+the pyramid from the lens to the image corners at a reach short of the
+throw distance. The checks are
+
+- body against venue and rigging triangles, and against other bodies:
+  intersecting is a collision, coming closer than the minimum clearance is
+  a clearance violation (rigging such as trusses carries the projectors, so
+  only intersecting it counts);
+- beam against venue and rigging triangles and other bodies: anything
+  inside the beam before it reaches the screen blocks the image.
+
+The broad phase is the AABB tree: a TriangleBVH over the static venue and
+rigging, and BoxHierarchy trees over the bodies and beams of the rig. The
+candidate pairs get exact tests: triangle-triangle distances (vertex to
+triangle and edge to edge, zero where an edge crosses the other triangle)
+and separating-axis tests between beam pyramids and triangles.
+
+RigClearance keeps the results per projector, so moving a few projectors
+only re-tests the pairs they take part in.
+"""
+
+import numpy as np
+
+from .audience import segment_distances
+from .raycast import BoxHierarchy, TriangleBVH
+from .sightlines import sweep_boxes, triangle_frames
+
+# Issue kinds
+COLLISION = 'COLLISION'
+CLEARANCE = 'CLEARANCE'
+BEAM = 'BEAM'
+
+# Upper bound on triangle pairs tested at once
+PAIR_BUDGET = 500_000
+
+# Boxes along a beam in its broad phase query of the venue
+SWEEP_STEPS = 8
+
+
+def point_triangle_distances(points, triangles):
+    """
+    Distance of points[k] to triangles[k], by the closest-point regions.
+
+    Args:
+        points: (K, 3)
+        triangles: (K, 3, 3) corners
+    """
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    ab = b - a
+    ac = c - a
+
+    def dot(u, v):
+        return np.einsum('ij,ij->i', u, v)
+
+    ap = points - a
+    bp = points - b
+    cp = points - c
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    def ratio(num, den):
+        return num / np.where(np.abs(den) > 1e-300, den, 1.0)
+
+    denom = va + vb + vc
+    v = ratio(vb, denom)
+    w = ratio(vc, denom)
+    ab_t = ratio(d1, d1 - d3)
+    ac_t = ratio(d2, d2 - d6)
+    bc_t = ratio(d4 - d3, (d4 - d3) + (d5 - d6))
+    # Vertex regions first, then edges, then the face
+    regions = [
+        (d1 <= 0) & (d2 <= 0),
+        (d3 >= 0) & (d4 <= d3),
+        (d6 >= 0) & (d5 <= d6),
+        (vc <= 0) & (d1 >= 0) & (d3 <= 0),
+        (vb <= 0) & (d2 >= 0) & (d6 <= 0),
+        (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0),
+    ]
+    closest = a + ab * v[:, None] + ac * w[:, None]
+    choices = [a, b, c, a + ab * ab_t[:, None], a + ac * ac_t[:, None],
+               b + (c - b) * bc_t[:, None]]
+    for region, choice in reversed(list(zip(regions, choices))):
+        closest = np.where(region[:, None], choice, closest)
+    return np.linalg.norm(points - closest, axis=1)
+
+
+def segment_triangle_crossings(starts, ends, triangles):
+    """(K,) mask of segments crossing the interior of their triangle."""
+    data = np.stack([triangles[:, 0], triangles[:, 1] - triangles[:, 0],
+                     triangles[:, 2] - triangles[:, 0]], axis=1)
+    normal, offset, dual = triangle_frames(data)
+    start_side = np.einsum('ij,ij->i', starts, normal) - offset
+    end_side = np.einsum('ij,ij->i', ends, normal) - offset
+    crosses = ((start_side > 0) & (end_side < 0)) | \
+        ((start_side < 0) & (end_side > 0))
+    t = start_side / np.where(crosses, start_side - end_side, 1.0)
+    point = starts + (ends - starts) * t[:, None] - triangles[:, 0]
+    b1 = np.einsum('ij,ij->i', point, dual[:, 0])
+    b2 = np.einsum('ij,ij->i', point, dual[:, 1])
+    return crosses & (b1 >= 0) & (b2 >= 0) & (b1 + b2 <= 1)
+
+
+def triangle_pair_distances(first, second):
+    """
+    Distance between triangles first[k] and second[k], zero where they intersect.
+
+    Args:
+        first, second: (K, 3, 3) corners
+    """
+    count = len(first)
+    distance = np.full(count, np.inf)
+    crossing = np.zeros(count, dtype=bool)
+    for a, b in ((first, second), (second, first)):
+        for i in range(3):
+            distance = np.minimum(distance,
+                                  point_triangle_distances(a[:, i], b))
+            crossing |= segment_triangle_crossings(a[:, i], a[:, (i + 1) % 3],
+                                                   b)
+    for i in range(3):
+        for j in range(3):
+            distance = np.minimum(distance, segment_distances(
+                first[:, i], first[:, (i + 1) % 3],
+                second[:, j], second[:, (j + 1) % 3]))
+    return np.where(crossing, 0.0, distance)
+
+
+def pyramid_triangle_overlap(pyramids, triangles):
+    """
+    (K,) mask of beam pyramids overlapping their triangle (separating axes).
+
+    Args:
+        pyramids: (K, 5, 3) apex and the four base corners in order
+        triangles: (K, 3, 3) corners
+    """
+    apex = pyramids[:, 0]
+    base = pyramids[:, 1:]
+    following = np.roll(base, -1, axis=1)
+    side_normals = np.cross(base - apex[:, None], following - apex[:, None])
+    base_normal = np.cross(base[:, 1] - base[:, 0], base[:, 2] - base[:, 0])
+    pyramid_edges = np.concatenate([base - apex[:, None], following - base],
+                                   axis=1)
+    triangle_edges = np.roll(triangles, -1, axis=1) - triangles
+    triangle_normal = np.cross(triangle_edges[:, 0], triangle_edges[:, 1])
+    crossed = np.cross(pyramid_edges[:, :, None], triangle_edges[:, None])
+    axes = np.concatenate([side_normals, base_normal[:, None],
+                           triangle_normal[:, None],
+                           crossed.reshape(len(pyramids), -1, 3)], axis=1)
+
+    on_pyramid = np.einsum('kaj,kpj->kap', axes, pyramids)
+    on_triangle = np.einsum('kaj,kpj->kap', axes, triangles)
+    separated = (on_pyramid.max(axis=2) < on_triangle.min(axis=2)) | \
+        (on_triangle.max(axis=2) < on_pyramid.min(axis=2))
+    return ~separated.any(axis=1)
+
+
+def _expand(counts):
+    """Owner and position within the owner of every entry of a ragged expansion."""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    step = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, step
+
+
+class RigClearance:
+    """
+    Clearance issues of a rig against static venue and rigging geometry.
+
+    Args:
+        vertices, triangles: Venue and rigging triangles
+        triangle_object: (T,) object index of every triangle
+        object_names: Name of every object
+        rigging: (objects,) mask of the rigging objects, which only count
+            when intersected
+        clearance: Minimum distance (m) of the bodies to the venue and to
+            each other
+        bvh: Optional TriangleBVH of the triangles, e.g. from a cache
+    """
+
+    def __init__(self, vertices, triangles, triangle_object, object_names,
+                 rigging=None, clearance=0.1, bvh=None):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.corners = vertices[triangles]
+        self.triangle_object = np.asarray(triangle_object, dtype=np.int64)
+        self.object_names = list(object_names)
+        self.object_clearance = np.where(
+            np.zeros(len(self.object_names), dtype=bool) if rigging is None
+            else np.asarray(rigging, dtype=bool), 0.0, clearance)
+        self.clearance = float(clearance)
+        self.bvh = bvh if bvh is not None else TriangleBVH(vertices, triangles)
+        self.bodies = {}
+        self.beams = {}
+        self._own = {}
+        self._pairs = {}
+
+    def set_projector(self, name, body, beam):
+        """
+        Store a projector's solids; check() then re-tests it.
+
+        Args:
+            body: (B, 3, 3) world triangles of the body, or None
+            beam: (5, 3) lens and image corners at the checked reach, or None
+        """
+        self.bodies[name] = None if body is None else \
+            np.asarray(body, dtype=np.float64).reshape(-1, 3, 3)
+        self.beams[name] = None if beam is None else \
+            np.asarray(beam, dtype=np.float64).reshape(5, 3)
+
+    def remove_projector(self, name):
+        self.bodies.pop(name, None)
+        self.beams.pop(name, None)
+        self._own.pop(name, None)
+        for pair in [pair for pair in self._pairs if name in pair]:
+            del self._pairs[pair]
+
+    def issues(self, name):
+        """Issues of one projector as dictionaries (kind, other, distance)."""
+        found = list(self._own.get(name, []))
+        for pair, entries in self._pairs.items():
+            if name in pair:
+                found.extend(issue for owner, issue in entries if owner == name)
+        return found
+
+    def all_issues(self):
+        """Issues of every projector with any, by projector name."""
+        return {name: issues for name in self.bodies
+                for issues in (self.issues(name),) if issues}
+
+    def check(self, names=None):
+        """
+        Re-test the given projectors (all if None) and every pair they take part in.
+
+        Returns:
+            Number of projectors tested
+        """
+        names = list(self.bodies) if names is None else \
+            [name for name in names if name in self.bodies]
+        if not names:
+            return 0
+        changed = set(names)
+        for pair in [pair for pair in self._pairs if changed & set(pair)]:
+            del self._pairs[pair]
+        for name in names:
+            self._own[name] = []
+        self._check_venue(names)
+        self._check_rig(names)
+        return len(names)
+
+    def _body_boxes(self, names, margin=0.0):
+        bodies = [self.bodies[name] for name in names]
+        lo = np.array([body.reshape(-1, 3).min(axis=0) - margin for body in bodies])
+        hi = np.array([body.reshape(-1, 3).max(axis=0) + margin for body in bodies])
+        return lo.reshape(-1, 3), hi.reshape(-1, 3)
+
+    def _check_venue(self, names):
+        if self.bvh.triangle_count == 0:
+            return
+        with_body = [name for name in names if self.bodies[name] is not None]
+        if with_body:
+            lo, hi = self._body_boxes(with_body, self.clearance)
+            query, triangle = self.bvh.overlapping(lo, hi)
+            # Every body triangle against every candidate of its body
+            counts = np.array([len(self.bodies[name]) for name in with_body])
+            pair, step = _expand(counts[query])
+            body = np.concatenate([self.bodies[name] for name in with_body])
+            first = (np.cumsum(counts) - counts)[query[pair]] + step
+            triangle = triangle[pair]
+            distance = self._pair_distances(body[first], self.corners[triangle])
+            self._record_venue(with_body, query[pair],
+                               self.triangle_object[triangle], distance)
+
+        with_beam = [name for name in names if self.beams[name] is not None]
+        if with_beam:
+            beams = np.stack([self.beams[name] for name in with_beam])
+            # Boxes swept from the lens to the image keep the candidates
+            # along the beam rather than in its whole bounding box
+            lo, hi = sweep_boxes(beams[:, 0], beams[:, 0], beams[:, 1:].min(axis=1),
+                                 beams[:, 1:].max(axis=1), SWEEP_STEPS)
+            query, triangle = self.bvh.overlapping(lo.reshape(-1, 3), hi.reshape(-1, 3))
+            key = np.unique(query // SWEEP_STEPS * self.bvh.triangle_count + triangle)
+            query, triangle = np.divmod(key, self.bvh.triangle_count)
+            hit = self._overlaps(beams[query], self.corners[triangle])
+            for q, obj in set(zip(query[hit].tolist(),
+                                  self.triangle_object[triangle[hit]].tolist())):
+                self._own[with_beam[q]].append(
+                    {"kind": BEAM, "other": self.object_names[obj], "distance": 0.0})
+
+    def _pair_distances(self, first, second):
+        distance = np.empty(len(first))
+        for start in range(0, len(first), PAIR_BUDGET):
+            sl = slice(start, start + PAIR_BUDGET)
+            distance[sl] = triangle_pair_distances(first[sl], second[sl])
+        return distance
+
+    def _overlaps(self, pyramids, triangles):
+        hit = np.zeros(len(pyramids), dtype=bool)
+        for start in range(0, len(pyramids), PAIR_BUDGET):
+            sl = slice(start, start + PAIR_BUDGET)
+            hit[sl] = pyramid_triangle_overlap(pyramids[sl], triangles[sl])
+        return hit
+
+    def _record_venue(self, names, body, obj, distance):
+        """Closest approach of every (body, object) pair, as issues."""
+        if len(distance) == 0:
+            return
+        key = body * len(self.object_names) + obj
+        order = np.lexsort((distance, key))
+        first = order[np.r_[True, key[order][1:] != key[order][:-1]]]
+        for b, o, d in zip(body[first].tolist(), obj[first].tolist(),
+                           distance[first].tolist()):
+            if d <= 0.0:
+                kind = COLLISION
+            elif d < self.object_clearance[o]:
+                kind = CLEARANCE
+            else:
+                continue
+            self._own[names[b]].append(
+                {"kind": kind, "other": self.object_names[o], "distance": d})
+
+    def _check_rig(self, names):
+        """Bodies against bodies and beams against bodies, for pairs with a changed projector."""
+        all_bodies = [name for name in self.bodies if self.bodies[name] is not None]
+        if not all_bodies:
+            return
+        lo, hi = self._body_boxes(all_bodies)
+        tree = BoxHierarchy(lo, hi)
+        index = {name: i for i, name in enumerate(all_bodies)}
+        changed = set(names)
+
+        # Body pairs, with one changed body at least
+        moved = [name for name in names if name in index]
+        if moved:
+            q_lo, q_hi = self._body_boxes(moved, self.clearance)
+            query, item = tree.overlapping(q_lo, q_hi)
+            pairs = {tuple(sorted((moved[q], all_bodies[i])))
+                     for q, i in zip(query.tolist(), item.tolist())
+                     if moved[q] != all_bodies[i]}
+            for a, b in pairs:
+                first, second = self.bodies[a], self.bodies[b]
+                f, s = np.divmod(np.arange(len(first) * len(second)), len(second))
+                distance = float(self._pair_distances(first[f], second[s]).min())
+                if distance <= 0.0:
+                    kind = COLLISION
+                elif distance < self.clearance:
+                    kind = CLEARANCE
+                else:
+                    continue
+                entries = self._pairs.setdefault((a, b), [])
+                entries.append((a, {"kind": kind, "other": b, "distance": distance}))
+                entries.append((b, {"kind": kind, "other": a, "distance": distance}))
+
+        # Beams against bodies: changed beams against every body, every
+        # beam against the changed bodies
+        beam_names = [name for name in self.beams if self.beams[name] is not None]
+        if not beam_names:
+            return
+        beams = np.stack([self.beams[name] for name in beam_names])
+        candidates = set()
+        query, item = tree.overlapping(beams.min(axis=1), beams.max(axis=1))
+        for q, i in zip(query.tolist(), item.tolist()):
+            beam, body = beam_names[q], all_bodies[i]
+            if beam != body and (beam in changed or body in changed):
+                candidates.add((beam, body))
+        for beam, body in candidates:
+            triangles = self.bodies[body]
+            pyramids = np.broadcast_to(self.beams[beam], (len(triangles), 5, 3))
+            if self._overlaps(pyramids, triangles).any():
+                entries = self._pairs.setdefault(tuple(sorted((beam, body))), [])
+                entries.append((beam, {"kind": BEAM, "other": body, "distance": 0.0}))
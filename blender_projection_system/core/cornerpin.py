@@ -0,0 +1,381 @@
+"""
+Corner pins and homographies for planar screens.
+
+On a flat screen a projector's raster maps onto the screen plane by a
+projective transform, so four corner points (or equivalently one 3 x 3
+homography) describe the whole warp. The solver intersects the four
+image-corner rays of every projector with its target plane in a single
+vectorized pass and solves all homographies as one batched 8 x 8 linear
+system.
+
+Pixels are measured from the top-left corner of the raster (x right, y
+down). Plane coordinates (s, t) are metres along the plane's u and v
+axes from the plane origin.
+"""
+
+import csv
+
+import numpy as np
+
+from .frustum import NEAR_CLIP
+
+CORNER_NAMES = ("top_left", "top_right", "bottom_right", "bottom_left")
+
+# Normalized (u, v) image coordinates of the corners in CORNER_NAMES order
+CORNER_UV = np.array([[0.0, 1.0], [1.0, 1.0], [1.0, 0.0], [0.0, 0.0]])
+
+
+class CornerPins:
+    """
+    Result of solve_corner_pins for N projectors.
+
+    Attributes:
+        corners: (N, 4, 3) world positions of the image corners
+        plane: (N, 4, 2) image corners in plane coordinates
+        pixels: (N, 4, 2) raster corners in pixels
+        homography: (N, 3, 3) maps pixels to plane coordinates
+        valid: (N,) projectors whose four corners all land on the plane
+        screen_pixels: Optional (N, 4, 2) screen corners in projector
+            pixels, the corner pin that fits content to the screen
+    """
+
+    def __init__(self, names, resolution, corners, plane, pixels,
+                 homography, valid, screen_pixels=None):
+        self.names = list(names)
+        self.resolution = resolution
+        self.corners = corners
+        self.plane = plane
+        self.pixels = pixels
+        self.homography = homography
+        self.valid = valid
+        self.screen_pixels = screen_pixels
+
+    def __len__(self):
+        return len(self.names)
+
+    def pixel_to_plane(self, index, pixels):
+        """Map (K, 2) pixels of projector `index` to plane coordinates."""
+        return apply_homography(self.homography[index], pixels)
+
+    def plane_to_pixel(self, index, plane):
+        """Map (K, 2) plane coordinates to pixels of projector `index`."""
+        return apply_homography(np.linalg.inv(self.homography[index]),
+                                plane)
+
+    def summary(self, index):
+        """Plain dictionary for one projector, e.g. for ID properties."""
+        summary = {
+            "valid": bool(self.valid[index]),
+            "corners": self.corners[index].ravel().tolist(),
+            "plane": self.plane[index].ravel().tolist(),
+            "homography": self.homography[index].ravel().tolist(),
+        }
+        if self.screen_pixels is not None:
+            summary["screen_pixels"] = self.screen_pixels[index].ravel().tolist()
+        return summary
+
+
+def image_corner_rays(projectors):
+    """
+    (N, 4, 3) world directions through every projector's image corners.
+
+    Like frustum.pixel_rays, the directions have unit axial length.
+    """
+    tr = projectors.throw_ratio[:, None]
+    aspect = projectors.aspect[:, None]
+    u = CORNER_UV[None, :, 0]
+    v = CORNER_UV[None, :, 1]
+    local = np.stack([
+        -(u - 0.5 + projectors.shift[:, 0, None]) / tr,
+        -np.ones((len(projectors), 4)),
+        (v - 0.5 + projectors.shift[:, 1, None]) / (tr * aspect),
+    ], axis=-1)
+    return np.einsum('nij,nkj->nki', projectors.rotations, local)
+
+
+def image_plane_quads(projectors, distance):
+    """
+    (N, 4, 3) image corners on the plane perpendicular to each axis.
+
+    This is the quad the "Create Test Surface" operator builds: the image
+    at `distance` along the axis, including the lens shift.
+    """
+    distance = np.broadcast_to(np.asarray(distance, dtype=np.float64),
+                               (len(projectors),))
+    return (projectors.origins[:, None, :] +
+            distance[:, None, None] * image_corner_rays(projectors))
+
+
+def throw_plane_frames(projectors, distance):
+    """
+    Plane frames of the image quads at the given axial distances.
+
+    The frame matches fit_plane applied to the quad: the normal faces the
+    projector, u runs along image right, v along image up and the origin
+    is the image's bottom-left corner.
+
+    Returns:
+        Tuple (origin, normal, u_axis, v_axis) of (N, 3) arrays and the
+        (N, 2) image size
+    """
+    quads = image_plane_quads(projectors, distance)
+    origin = quads[:, 3]
+    width = np.linalg.norm(quads[:, 2] - quads[:, 3], axis=1)
+    height = np.linalg.norm(quads[:, 0] - quads[:, 3], axis=1)
+    return (origin, -projectors.forward, projectors.right,
+            projectors.up.copy(), np.stack([width, height], axis=1))
+
+
+def screen_rectangles(size):
+    """(N, 4, 2) plane coordinates of [0, w] x [0, h] screens."""
+    size = np.asarray(size, dtype=np.float64).reshape(-1, 2)
+    w, h = size[:, 0], size[:, 1]
+    zero = np.zeros_like(w)
+    return np.stack([np.stack([zero, h], axis=1), np.stack([w, h], axis=1),
+                     np.stack([w, zero], axis=1),
+                     np.stack([zero, zero], axis=1)], axis=1)
+
+
+def plane_axes(normal, reference):
+    """
+    In-plane (u, v) axes for planes given by their normals.
+
+    u is the reference axis projected onto the plane (world X is used where
+    the reference is parallel to the normal) and v = normal x u, so with
+    the normal towards the viewer u points right and v up.
+
+    Returns:
+        Tuple of (N, 3) unit u and v axes
+    """
+    normal = np.atleast_2d(np.asarray(normal, dtype=np.float64))
+    normal = normal / np.linalg.norm(normal, axis=1, keepdims=True)
+    reference = np.broadcast_to(np.asarray(reference, dtype=np.float64),
+                                normal.shape).copy()
+    u = reference - np.einsum('ij,ij->i', reference, normal)[:, None] * normal
+    length = np.linalg.norm(u, axis=1)
+    degenerate = length < 1e-9
+    if degenerate.any():
+        fallback = np.where(np.abs(normal[degenerate, :1]) < 0.9,
+                            np.array([[1.0, 0.0, 0.0]]),
+                            np.array([[0.0, 1.0, 0.0]]))
+        u[degenerate] = fallback - np.einsum(
+            'ij,ij->i', fallback, normal[degenerate])[:, None] * \
+            normal[degenerate]
+        length = np.linalg.norm(u, axis=1)
+    u /= length[:, None]
+    return u, np.cross(normal, u)
+
+
+def fit_plane(vertices, triangles, reference=(1.0, 0.0, 0.0)):
+    """
+    Plane frame of a (nearly) planar triangle mesh.
+
+    The normal is the area-weighted mean of the face normals, so it keeps
+    the mesh's front side. The origin is the bottom-left corner of the
+    mesh's bounding rectangle in the plane, so the mesh spans
+    [0, width] x [0, height] in plane coordinates.
+
+    Returns:
+        Tuple (origin, normal, u_axis, v_axis, size, flatness) where size is
+        the (width, height) of the bounding rectangle and flatness the
+        largest distance of a vertex from the plane
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    a, b, c = (vertices[triangles[:, k]] for k in range(3))
+    cross = np.cross(b - a, c - a)
+    normal = cross.sum(axis=0)
+    length = np.linalg.norm(normal)
+    if length < 1e-12:
+        raise ValueError("Mesh has no area to fit a plane to")
+    normal /= length
+
+    # Area-weighted centroid fixes the plane offset
+    area = np.linalg.norm(cross, axis=1)
+    center = ((a + b + c) / 3.0 * area[:, None]).sum(axis=0) / area.sum()
+    u_axis, v_axis = plane_axes(normal, reference)
+    u_axis, v_axis = u_axis[0], v_axis[0]
+
+    used = vertices[np.unique(triangles)]
+    offset = used - center
+    s = offset @ u_axis
+    t = offset @ v_axis
+    flatness = float(np.abs(offset @ normal).max())
+    origin = center + s.min() * u_axis + t.min() * v_axis
+    size = (float(s.max() - s.min()), float(t.max() - t.min()))
+    return origin, normal, u_axis, v_axis, size, flatness
+
+
+def solve_homographies(source, target):
+    """
+    Batched homographies from four point correspondences.
+
+    Args:
+        source, target: (N, 4, 2) corresponding points
+
+    Returns:
+        Tuple (homography (N, 3, 3) normalized so H[2, 2] = 1, solved mask
+        (N,)). Degenerate quads (three collinear points) are not solved
+        and get the identity.
+    """
+    source = np.asarray(source, dtype=np.float64).reshape(-1, 4, 2)
+    target = np.asarray(target, dtype=np.float64).reshape(-1, 4, 2)
+    n = len(source)
+    solved = _non_degenerate(source) & _non_degenerate(target)
+
+    # Normalize both point sets for a well conditioned system
+    source_norm, source_t = _normalize(source)
+    target_norm, target_t = _normalize(target)
+
+    x, y = source_norm[..., 0], source_norm[..., 1]
+    xp, yp = target_norm[..., 0], target_norm[..., 1]
+    zero = np.zeros_like(x)
+    one = np.ones_like(x)
+    rows_x = np.stack([x, y, one, zero, zero, zero, -x * xp, -y * xp],
+                      axis=-1)
+    rows_y = np.stack([zero, zero, zero, x, y, one, -x * yp, -y * yp],
+                      axis=-1)
+    a = np.concatenate([rows_x, rows_y], axis=1)
+    b = np.concatenate([xp, yp], axis=1)
+
+    h = np.zeros((n, 9))
+    h[:, 8] = 1.0
+    if solved.any():
+        h[solved, :8] = np.linalg.solve(a[solved],
+                                        b[solved][..., None])[..., 0]
+    h = np.linalg.inv(target_t) @ h.reshape(n, 3, 3) @ source_t
+    h /= h[:, 2:, 2:]
+    h[~solved] = np.eye(3)
+    return h, solved
+
+
+def _non_degenerate(quads):
+    """Mask of (N, 4, 2) quads without three (nearly) collinear points."""
+    extent = np.ptp(quads, axis=1).max(axis=1)
+    tolerance = 1e-9 * np.maximum(extent, 1e-300) ** 2
+    ok = extent > 0
+    for skip in range(4):
+        a, b, c = (quads[:, k] for k in range(4) if k != skip)
+        area = ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+                (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+        ok &= np.abs(area) > tolerance
+    return ok
+
+
+def _normalize(points):
+    """Center (N, K, 2) points and scale them to unit mean radius."""
+    center = points.mean(axis=1)
+    radius = np.linalg.norm(points - center[:, None], axis=2).mean(axis=1)
+    scale = np.sqrt(2.0) / np.maximum(radius, 1e-300)
+    transform = np.zeros((len(points), 3, 3))
+    transform[:, 0, 0] = scale
+    transform[:, 1, 1] = scale
+    transform[:, :2, 2] = -center * scale[:, None]
+    transform[:, 2, 2] = 1.0
+    return (points - center[:, None]) * scale[:, None, None], transform
+
+
+def apply_homography(homography, points):
+    """Map (..., K, 2) points through (..., 3, 3) homographies."""
+    points = np.asarray(points, dtype=np.float64)
+    homography = np.asarray(homography, dtype=np.float64)
+    mapped = (points @ np.swapaxes(homography[..., :, :2], -1, -2) +
+              homography[..., None, :, 2])
+    return mapped[..., :2] / mapped[..., 2:]
+
+
+def solve_corner_pins(projectors, plane_origin, plane_normal, plane_u,
+                      plane_v, screen=None):
+    """
+    Corner points and homographies of every projector on its target plane.
+
+    Args:
+        projectors: ProjectorArrays
+        plane_origin, plane_normal, plane_u, plane_v: (N, 3) or (3,) plane
+            frame per projector (see fit_plane)
+        screen: Optional (N, 4, 2) or (4, 2) screen corners in plane
+            coordinates, in CORNER_NAMES order
+
+    Returns:
+        CornerPins
+    """
+    n = len(projectors)
+    shape = (n, 3)
+    origin = np.broadcast_to(np.asarray(plane_origin, dtype=np.float64), shape)
+    normal = np.broadcast_to(np.asarray(plane_normal, dtype=np.float64), shape)
+    axis_u = np.broadcast_to(np.asarray(plane_u, dtype=np.float64), shape)
+    axis_v = np.broadcast_to(np.asarray(plane_v, dtype=np.float64), shape)
+
+    rays = image_corner_rays(projectors)
+    denominator = np.einsum('nkj,nj->nk', rays, normal)
+    numerator = np.einsum('nj,nj->n', origin - projectors.origins, normal)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        depth = numerator[:, None] / denominator
+    hit = np.isfinite(depth) & (depth > NEAR_CLIP)
+    depth = np.where(hit, depth, 0.0)
+
+    corners = projectors.origins[:, None, :] + depth[..., None] * rays
+    offset = corners - origin[:, None, :]
+    plane = np.stack([np.einsum('nkj,nj->nk', offset, axis_u),
+                      np.einsum('nkj,nj->nk', offset, axis_v)], axis=-1)
+
+    resolution = projectors.resolution.astype(np.float64)
+    pixels = np.stack([CORNER_UV[None, :, 0] * resolution[:, :1],
+                       (1.0 - CORNER_UV[None, :, 1]) * resolution[:, 1:]],
+                      axis=-1)
+
+    valid = hit.all(axis=1)
+    source = np.where(valid[:, None, None], pixels, CORNER_UV[None])
+    target = np.where(valid[:, None, None], plane, CORNER_UV[None])
+    homography, solved = solve_homographies(source, target)
+    valid &= solved
+    homography[~valid] = np.eye(3)
+
+    screen_pixels = None
+    if screen is not None:
+        screen = np.broadcast_to(np.asarray(screen, dtype=np.float64),
+                                 (n, 4, 2))
+        inverse = np.linalg.inv(homography)
+        screen_pixels = apply_homography(inverse, screen)
+        screen_pixels[~valid] = np.nan
+
+    return CornerPins(projectors.names, projectors.resolution.copy(),
+                      corners, plane, pixels, homography, valid,
+                      screen_pixels)
+
+
+def corner_pin_header(with_screen=False):
+    """Column names of write_corner_pin_csv."""
+    header = ["projector", "valid", "width", "height"]
+    for corner in CORNER_NAMES:
+        header += [f"{corner}_{axis}" for axis in ("x", "y", "z", "s", "t")]
+    if with_screen:
+        for corner in CORNER_NAMES:
+            header += [f"screen_{corner}_px", f"screen_{corner}_py"]
+    header += [f"h{row}{col}" for row in range(1, 4) for col in range(1, 4)]
+    return header
+
+
+def write_corner_pin_csv(pins, path):
+    """
+    Write one CSV row per projector.
+
+    Each row holds the world position and plane coordinates of the four
+    image corners, the screen corners in projector pixels (when a screen
+    was given) and the row-major pixel-to-plane homography.
+    """
+    with_screen = pins.screen_pixels is not None
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(corner_pin_header(with_screen))
+        for i, name in enumerate(pins.names):
+            row = [name, int(pins.valid[i]), int(pins.resolution[i, 0]),
+                   int(pins.resolution[i, 1])]
+            corners = np.concatenate([pins.corners[i], pins.plane[i]],
+                                     axis=1)
+            row += [f"{x:.6f}" for x in corners.ravel()]
+            if with_screen:
+                row += [f"{x:.3f}" for x in pins.screen_pixels[i].ravel()]
+            row += [f"{x:.9g}" for x in pins.homography[i].ravel()]
+            writer.writerow(row)
+    return path
@@ -0,0 +1,295 @@
+"""
+Vectorized projector frustum math.
+
+Projectors follow the add-on's object convention: the projector shoots
+along its local -Y axis with local +Z as image up. Seen from behind the
+lens that makes local -X image right (the frame is right-handed), so
+exported rasters come out the way the content is viewed.
+A projector with throw ratio TR and aspect A covers, at axial depth d, an
+image d / TR wide and d / (TR * A) high, offset by its lens shift.
+
+Normalized image coordinates (u, v) run from 0 to 1 left to right and
+bottom to top, so a point is inside the image when both are in [0, 1].
+"""
+
+import numpy as np
+
+# Points closer than this along the projector axis are never lit
+NEAR_CLIP = 1e-3
+
+
+class ProjectorArrays:
+    """
+    Struct-of-arrays description of N projectors.
+
+    Args:
+        origins: (N, 3) world positions
+        rotations: (N, 3, 3) world rotation matrices; the columns are the
+            projector's local X, Y and Z axes in world space
+        throw_ratio: (N,) throw ratios
+        aspect: (N,) image aspect ratios (width / height)
+        shift: Optional (N, 2) horizontal/vertical lens shift as fractions
+            of the image width/height
+        resolution: Optional (N, 2) native resolution in pixels
+        lumens: Optional (N,) light output
+        names: Optional list of N object names
+        vignetting: Optional (N,) fraction of light lost at the image
+            corners of an unshifted lens (0 = perfectly even)
+    """
+
+    def __init__(self, origins, rotations, throw_ratio, aspect, shift=None,
+                 resolution=None, lumens=None, names=None, vignetting=None):
+        self.origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        n = len(self.origins)
+        self.rotations = np.asarray(rotations,
+                                    dtype=np.float64).reshape(n, 3, 3)
+        self.throw_ratio = np.broadcast_to(
+            np.asarray(throw_ratio, dtype=np.float64), (n,)).copy()
+        self.aspect = np.broadcast_to(
+            np.asarray(aspect, dtype=np.float64), (n,)).copy()
+        if shift is None:
+            shift = np.zeros((n, 2))
+        self.shift = np.broadcast_to(
+            np.asarray(shift, dtype=np.float64), (n, 2)).copy()
+        if resolution is None:
+            resolution = (1920, 1080)
+        self.resolution = np.broadcast_to(
+            np.asarray(resolution, dtype=np.int64), (n, 2)).copy()
+        if lumens is None:
+            lumens = 5000.0
+        self.lumens = np.broadcast_to(
+            np.asarray(lumens, dtype=np.float64), (n,)).copy()
+        self.names = list(names) if names is not None else [
+            f"Projector.{i:03d}" for i in range(n)]
+        if vignetting is None:
+            vignetting = 0.0
+        self.vignetting = np.broadcast_to(
+            np.asarray(vignetting, dtype=np.float64), (n,)).copy()
+
+    def __len__(self):
+        return len(self.origins)
+
+    @property
+    def right(self):
+        return -self.rotations[:, :, 0]
+
+    @property
+    def forward(self):
+        return -self.rotations[:, :, 1]
+
+    @property
+    def up(self):
+        return self.rotations[:, :, 2]
+
+    def subset(self, index):
+        """Return a new ProjectorArrays for the given index array/mask."""
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        return ProjectorArrays(
+            self.origins[index], self.rotations[index],
+            self.throw_ratio[index], self.aspect[index], self.shift[index],
+            self.resolution[index], self.lumens[index],
+            [self.names[i] for i in index], self.vignetting[index])
+
+
+def look_at_rotations(origins, targets, up=(0.0, 0.0, 1.0)):
+    """
+    Build projector rotations that aim each origin at its target.
+
+    Image up is kept as close to the given world up as possible; when the
+    throw is (nearly) vertical world +Y is used instead.
+
+    Returns:
+        (N, 3, 3) rotation matrices (columns are local X, Y, Z)
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    targets = np.asarray(targets, dtype=np.float64).reshape(-1, 3)
+    forward = targets - origins
+    forward /= np.maximum(np.linalg.norm(forward, axis=1, keepdims=True),
+                          1e-12)
+
+    world_up = np.broadcast_to(np.asarray(up, dtype=np.float64),
+                               forward.shape).copy()
+    degenerate = np.abs(np.einsum('ij,ij->i', forward, world_up)) > 0.999
+    world_up[degenerate] = (0.0, 1.0, 0.0)
+
+    right = np.cross(world_up, forward)
+    right /= np.maximum(np.linalg.norm(right, axis=1, keepdims=True), 1e-12)
+    local_y = -forward
+    local_z = np.cross(right, local_y)
+    return np.stack([right, local_y, local_z], axis=2)
+
+
+def local_axis(projectors, points, axis):
+    """
+    One local coordinate of every point in every projector's frame, (N, M).
+
+    Computed as a single (N, 3) x (3, M) product instead of materializing
+    the (N, M, 3) offsets.
+    """
+    column = projectors.rotations[:, :, axis]
+    offset = np.einsum('nk,nk->n', projectors.origins, column)
+    return column @ points.T - offset[:, None]
+
+
+def project_points(projectors, points):
+    """
+    Project world points into every projector's normalized image.
+
+    Args:
+        projectors: ProjectorArrays with N projectors
+        points: (M, 3) world positions
+
+    Returns:
+        Tuple (u, v, depth) of (N, M) arrays; depth is measured along the
+        projector axis and is <= 0 behind the lens
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    x = local_axis(projectors, points, 0)
+    y = local_axis(projectors, points, 1)
+    z = local_axis(projectors, points, 2)
+
+    depth = -y
+    safe_depth = np.where(depth > NEAR_CLIP, depth, np.inf)
+    tr = projectors.throw_ratio[:, None]
+    u = 0.5 - x / safe_depth * tr - projectors.shift[:, 0, None]
+    v = (0.5 + z / safe_depth * tr * projectors.aspect[:, None]
+         - projectors.shift[:, 1, None])
+    return u, v, depth
+
+
+def pixel_rays(projectors, index, u, v):
+    """
+    World-space ray directions through normalized image coordinates.
+
+    The inverse of project_points: the returned directions have unit axial
+    length, so origin + depth * direction lies at that axial depth.
+
+    Args:
+        projectors: ProjectorArrays
+        index: Projector index
+        u, v: Arrays of normalized image coordinates (same shape)
+
+    Returns:
+        (..., 3) directions
+    """
+    tr = projectors.throw_ratio[index]
+    aspect = projectors.aspect[index]
+    shift_h, shift_v = projectors.shift[index]
+    u = np.asarray(u, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    local = np.stack([-(u - 0.5 + shift_h) / tr, -np.ones_like(u),
+                      (v - 0.5 + shift_v) / (tr * aspect)], axis=-1)
+    return local @ projectors.rotations[index].T
+
+
+def inside_image(u, v, depth, margin=0.0):
+    """
+    Mask of projected points that land inside the image.
+
+    Args:
+        margin: Inset on every side in normalized units, e.g. 0.1 keeps
+            only the inner 80% of the image in each direction
+    """
+    lo = margin
+    hi = 1.0 - margin
+    return ((depth > NEAR_CLIP) & (u >= lo) & (u <= hi) &
+            (v >= lo) & (v <= hi))
+
+
+def facing_mask(projectors, points, normals):
+    """(N, M) mask of surface samples whose front face sees the projector."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    plane = np.einsum('mk,mk->m', points, normals)
+    return projectors.origins @ normals.T > plane[None, :]
+
+
+def image_size_at(projectors, depth):
+    """Image (width, height) at an axial depth for every projector."""
+    width = np.asarray(depth, dtype=np.float64) / projectors.throw_ratio
+    return width, width / projectors.aspect
+
+
+def incidence_cosines(projectors, points, normals):
+    """
+    Cosines needed for illuminance on tilted surfaces.
+
+    Returns:
+        Tuple (cos_surface, cos_axis, distance) of (N, M) arrays: the cosine
+        between the incoming ray and the surface normal, between the ray and
+        the projector axis, and the straight-line distance to the lens
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    # |p - o|^2 expanded so no (N, M, 3) ray array is needed
+    distance_sq = (np.einsum('mk,mk->m', points, points)[None, :] -
+                   2.0 * projectors.origins @ points.T +
+                   np.einsum('nk,nk->n', projectors.origins,
+                             projectors.origins)[:, None])
+    distance = np.sqrt(np.maximum(distance_sq, 0.0))
+    safe = np.maximum(distance, 1e-12)
+    plane = np.einsum('mk,mk->m', points, normals)
+    cos_surface = np.abs(plane[None, :] -
+                         projectors.origins @ normals.T) / safe
+    forward = projectors.forward
+    cos_axis = (forward @ points.T -
+                np.einsum('nk,nk->n', projectors.origins,
+                          forward)[:, None]) / safe
+    return cos_surface, cos_axis, distance
+
+
+def illuminance(projectors, depth, cos_surface, cos_axis):
+    """
+    Illuminance (lux) from an evenly lit image on arbitrary surfaces.
+
+    The flux spreads over an image area of depth^2 / (TR^2 * A) on the plane
+    perpendicular to the axis; a tilted surface element receives that flux
+    density scaled by the ratio of its foreshortening to the plane's.
+    """
+    tr = projectors.throw_ratio[:, None]
+    aspect = projectors.aspect[:, None]
+    lumens = projectors.lumens[:, None]
+    safe_depth = np.maximum(depth, NEAR_CLIP)
+    flux_density = lumens * tr * tr * aspect / (safe_depth * safe_depth)
+    return flux_density * cos_surface / np.maximum(cos_axis, 1e-6)
+
+
+def half_angle_tangents(projectors):
+    """
+    Tangent of the widest angle between each axis and its image corners.
+
+    The cone with this half angle around the axis contains the whole
+    (shifted) frustum, which makes it a cheap conservative culling volume.
+    """
+    half_w = 0.5 / projectors.throw_ratio
+    half_h = half_w / projectors.aspect
+    x = np.abs(projectors.shift[:, 0]) * 2.0 * half_w + half_w
+    z = np.abs(projectors.shift[:, 1]) * 2.0 * half_h + half_h
+    return np.hypot(x, z)
+
+
+def cone_cull(projectors, center, radius, tangents=None):
+    """
+    Mask of projectors whose frustum may reach a bounding sphere.
+
+    Conservative: a projector is only rejected when the sphere lies
+    entirely outside the cone enclosing its frustum.
+    """
+    if tangents is None:
+        tangents = half_angle_tangents(projectors)
+    offset = np.asarray(center, dtype=np.float64) - projectors.origins
+    axial = np.einsum('ij,ij->i', offset, projectors.forward)
+    perp = np.linalg.norm(offset - axial[:, None] * projectors.forward,
+                          axis=1)
+    cos_a = 1.0 / np.sqrt(1.0 + tangents * tangents)
+    sin_a = tangents * cos_a
+    return perp * cos_a - axial * sin_a <= radius
+
+
+def chunk_slices(count, chunk_size):
+    """Yield slices that split range(count) into chunks of chunk_size."""
+    chunk_size = max(1, int(chunk_size))
+    for start in range(0, count, chunk_size):
+        yield slice(start, min(start + chunk_size, count))
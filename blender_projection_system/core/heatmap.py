@@ -0,0 +1,98 @@
+"""
+False-colour heatmaps of per-face analysis results.
+
+Values are normalized into [0, 1] over a display range and mapped through a
+colour ramp given as stops (positions, RGBA colours), the same data as a
+Blender ColorRamp node. The colours carry the normalized value in alpha so
+a shader can re-evaluate the ramp, with NO_DATA marking faces that have no
+result (e.g. unlit faces of a pixel density map).
+"""
+
+import numpy as np
+
+# Blue - cyan - green - yellow - red, low to high
+DEFAULT_RAMP = (
+    (0.0, (0.02, 0.02, 0.45, 1.0)),
+    (0.25, (0.0, 0.45, 0.85, 1.0)),
+    (0.5, (0.05, 0.75, 0.15, 1.0)),
+    (0.75, (0.95, 0.8, 0.05, 1.0)),
+    (1.0, (0.85, 0.02, 0.02, 1.0)),
+)
+
+# Alpha of faces without a result, and the colour they are shown in
+NO_DATA = -1.0
+NO_DATA_COLOR = (0.2, 0.2, 0.2)
+
+
+def evaluate_ramp(t, positions, colors, interpolation='LINEAR'):
+    """
+    Colours of a ramp at parameters t.
+
+    Args:
+        t: (M,) ramp parameters, clamped to the first and last stop
+        positions: (S,) increasing stop positions
+        colors: (S, 4) RGBA stop colours
+        interpolation: 'LINEAR' or 'CONSTANT' (each stop holds until the
+            next), as in a ColorRamp node
+
+    Returns:
+        (M, 4) RGBA colours
+    """
+    t = np.asarray(t, dtype=np.float64).reshape(-1)
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1)
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 4)
+    if interpolation == 'CONSTANT':
+        stop = np.searchsorted(positions, t, side='right') - 1
+        return colors[np.clip(stop, 0, len(positions) - 1)]
+    return np.column_stack([np.interp(t, positions, colors[:, channel])
+                            for channel in range(4)])
+
+
+def value_range(values, valid=None):
+    """(low, high) of the valid values; (0, 1) when there are none."""
+    values = np.asarray(values, dtype=np.float64).reshape(-1)
+    if valid is not None:
+        values = values[valid]
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return 0.0, 1.0
+    return float(values.min()), float(values.max())
+
+
+def heatmap_colors(values, low, high, positions, colors, valid=None,
+                   interpolation='LINEAR'):
+    """
+    Ramp colours of values over the display range [low, high].
+
+    Args:
+        values: (M,) values
+        low, high: Values mapped to the first and last ramp stop
+        positions, colors, interpolation: Ramp, see evaluate_ramp
+        valid: Optional (M,) mask; other values get NO_DATA_COLOR
+
+    Returns:
+        (M, 4) float32 RGBA; alpha is the normalized value, or NO_DATA
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(-1)
+    span = high - low
+    t = np.clip((values - low) / span if span > 0 else
+                (values > low).astype(np.float64), 0.0, 1.0)
+    result = evaluate_ramp(t, positions, colors, interpolation)
+    result[:, 3] = t
+    missing = ~np.isfinite(values)
+    if valid is not None:
+        missing |= ~np.asarray(valid, dtype=bool)
+    result[missing, :3] = NO_DATA_COLOR
+    result[missing, 3] = NO_DATA
+    return result.astype(np.float32)
+
+
+def corner_colors(face_colors, loop_totals):
+    """
+    Expand per-face colours to face corners.
+
+    Blender stores the corners of face i contiguously after those of face
+    i - 1, so repeating every face colour loop_total times lines them up.
+    """
+    return np.repeat(face_colors, np.asarray(loop_totals, dtype=np.int64),
+                     axis=0)
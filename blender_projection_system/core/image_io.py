@@ -0,0 +1,200 @@
+"""
+Dependency-free writers for 16-bit PNG and single-channel half-float EXR.
+
+Blend masks, previews and similar rasters are written straight from NumPy
+arrays (values in [0, 1], row 0 at the top) so exports don't need
+Blender's image API and can run on worker threads; zlib and file I/O
+release the GIL.
+"""
+
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+EXR_MAGIC = 20000630
+EXR_HALF = 1
+
+# PNG colour type by channel count: gray, RGB, RGBA
+PNG_COLOR_TYPES = {1: 0, 3: 2, 4: 6}
+
+
+def _png_chunk(kind, data):
+    chunk = kind + data
+    return (struct.pack(">I", len(data)) + chunk +
+            struct.pack(">I", zlib.crc32(chunk) & 0xFFFFFFFF))
+
+
+def encode_png16(image, level=3):
+    """
+    Encode an array as a 16-bit grayscale, RGB or RGBA PNG.
+
+    Rows use the PNG "Up" filter, which turns smooth ramps and flat
+    regions into long runs that compress well.
+
+    Args:
+        image: (H, W) or (H, W, 3 | 4) values in [0, 1]
+        level: zlib compression level
+    """
+    image = np.asarray(image)
+    height, width = image.shape[:2]
+    channels = image.shape[2] if image.ndim == 3 else 1
+    row_bytes = width * channels * 2
+    pixels = np.round(np.clip(image, 0.0, 1.0) * 65535.0).astype('>u2')
+    rows = np.ascontiguousarray(pixels).view(np.uint8).reshape(height, row_bytes)
+    filtered = np.empty((height, row_bytes + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+
+    header = struct.pack(">IIBBBBB", width, height, 16,
+                         PNG_COLOR_TYPES[channels], 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" +
+            _png_chunk(b"IHDR", header) +
+            _png_chunk(b"IDAT", zlib.compress(filtered.tobytes(), level)) +
+            _png_chunk(b"IEND", b""))
+
+
+def decode_png16(data):
+    """Decode a PNG written by encode_png16 back to float values."""
+    offset = 8
+    width = height = 0
+    channels = 1
+    idat = b""
+    while offset < len(data):
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        if kind == b"IHDR":
+            width, height = struct.unpack(">II", body[:8])
+            color_type = body[9]
+            channels = next(count for count, value in PNG_COLOR_TYPES.items()
+                            if value == color_type)
+        elif kind == b"IDAT":
+            idat += body
+        offset += 12 + length
+    raw = np.frombuffer(zlib.decompress(idat), dtype=np.uint8)
+    raw = raw.reshape(height, width * channels * 2 + 1)
+    rows = np.cumsum(raw[:, 1:], axis=0, dtype=np.uint8)
+    shape = (height, width, channels) if channels > 1 else (height, width)
+    return rows.view('>u2').reshape(shape) / 65535.0
+
+
+def _exr_attribute(name, kind, value):
+    return (name.encode() + b"\0" + kind.encode() + b"\0" +
+            struct.pack("<i", len(value)) + value)
+
+
+def encode_exr_half(image, channel="Y"):
+    """
+    Encode a 2D array as an uncompressed single-channel half-float EXR.
+
+    Args:
+        image: (H, W) values
+        channel: Channel name ("Y" is read as luminance by most tools)
+    """
+    image = np.asarray(image)
+    height, width = image.shape
+    channels = (channel.encode() + b"\0" +
+                struct.pack("<iB3xii", EXR_HALF, 0, 1, 1) + b"\0")
+    window = struct.pack("<iiii", 0, 0, width - 1, height - 1)
+    header = (struct.pack("<ii", EXR_MAGIC, 2) +
+              _exr_attribute("channels", "chlist", channels) +
+              _exr_attribute("compression", "compression", b"\0") +
+              _exr_attribute("dataWindow", "box2i", window) +
+              _exr_attribute("displayWindow", "box2i", window) +
+              _exr_attribute("lineOrder", "lineOrder", b"\0") +
+              _exr_attribute("pixelAspectRatio", "float",
+                             struct.pack("<f", 1.0)) +
+              _exr_attribute("screenWindowCenter", "v2f",
+                             struct.pack("<ff", 0.0, 0.0)) +
+              _exr_attribute("screenWindowWidth", "float",
+                             struct.pack("<f", 1.0)) +
+              b"\0")
+
+    # One scanline per block: y, byte count, pixel data
+    line_bytes = width * 2
+    block = 8 + line_bytes
+    first = len(header) + 8 * height
+    offsets = np.arange(height, dtype='<u8') * block + first
+
+    blocks = np.empty((height, block), dtype=np.uint8)
+    prefix = np.empty((height, 2), dtype='<i4')
+    prefix[:, 0] = np.arange(height)
+    prefix[:, 1] = line_bytes
+    blocks[:, :8] = prefix.view(np.uint8)
+    blocks[:, 8:] = image.astype('<f2').view(np.uint8).reshape(
+        height, line_bytes)
+    return header + offsets.tobytes() + blocks.tobytes()
+
+
+def write_image(path, image, file_format='PNG'):
+    """
+    Write an image to disk as 'PNG' (16-bit) or 'EXR' (half float, single
+    channel only).
+
+    `image` may also be a callable returning the array, so the image itself
+    can be computed on the writer thread.
+    """
+    if callable(image):
+        image = image()
+    data = encode_exr_half(image) if file_format == 'EXR' else \
+        encode_png16(image)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(data)
+    return path
+
+
+class ImageWriter:
+    """
+    Background thread pool that encodes and writes images.
+
+    Submitting returns immediately; images given as callables are computed
+    on the pool as well. Poll `done` / `completed` or call
+    wait() to collect the written paths and any errors.
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="pj-image")
+        self._futures = []
+
+    def submit(self, path, image, file_format='PNG'):
+        self._futures.append(self._executor.submit(write_image, path, image,
+                                                   file_format))
+
+    @property
+    def completed(self):
+        return sum(future.done() for future in self._futures)
+
+    @property
+    def done(self):
+        return self.completed == len(self._futures)
+
+    def results(self):
+        """Tuple (written paths, error messages) of the finished writes."""
+        paths = []
+        errors = []
+        for future in self._futures:
+            if not future.done():
+                continue
+            error = future.exception()
+            if error is None:
+                paths.append(future.result())
+            else:
+                errors.append(str(error))
+        return paths, errors
+
+    def wait(self):
+        for future in self._futures:
+            future.exception()
+        return self.results()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,275 @@
+"""
+Vectorized projector layouts for flat, curved and dome screens.
+
+Every generator computes all projector positions, aim rotations and throw
+ratios in one NumPy pass from the screen geometry and the requested
+overlap, and returns a LayoutResult that the operator writes back to the
+projector objects.
+
+Tiles are laid out so that neighbouring images share `overlap` of their
+size: n tiles of size t with overlap o cover n * t - (n - 1) * o * t, or
+n * t * (1 - o) on a closed (360 degree) screen. With several rows the
+image is also kept tall enough for its row tile at the projector aspect,
+so the rows overlap as well; the width then grows past the column tile.
+"""
+
+import numpy as np
+
+from .frustum import look_at_rotations
+
+
+class LayoutResult:
+    """Positions, rotations and lens settings of a generated layout."""
+
+    def __init__(self, origins, rotations, throw_ratio, throw_distance):
+        self.origins = np.asarray(origins, dtype=np.float64)
+        self.rotations = np.asarray(rotations, dtype=np.float64)
+        self.throw_ratio = np.asarray(throw_ratio, dtype=np.float64)
+        self.throw_distance = np.asarray(throw_distance, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.origins)
+
+    @property
+    def image_width(self):
+        return self.throw_distance / self.throw_ratio
+
+    def euler_xyz(self):
+        """Rotations as (N, 3) XYZ Euler angles (Blender's default order)."""
+        return matrices_to_euler_xyz(self.rotations)
+
+
+def tile_size(total, count, overlap, closed=False):
+    """Size of each of `count` tiles covering `total` with overlap."""
+    count = max(int(count), 1)
+    if closed:
+        return total / (count * (1.0 - overlap))
+    return total / (count - (count - 1) * overlap)
+
+
+def tile_centers(start, total, count, overlap, closed=False):
+    """Centers of `count` overlapping tiles along a span."""
+    size = tile_size(total, count, overlap, closed)
+    index = np.arange(max(int(count), 1))
+    if closed:
+        return start + index * size * (1.0 - overlap), size
+    return start + 0.5 * size + index * size * (1.0 - overlap), size
+
+
+def matrices_to_euler_xyz(rotations):
+    """
+    Convert rotation matrices to XYZ Euler angles.
+
+    Blender's XYZ order applies X first, so R = Rz @ Ry @ Rx.
+    """
+    r = np.asarray(rotations, dtype=np.float64).reshape(-1, 3, 3)
+    sy = np.hypot(r[:, 0, 0], r[:, 1, 0])
+    regular = sy > 1e-9
+    x = np.where(regular, np.arctan2(r[:, 2, 1], r[:, 2, 2]),
+                 np.arctan2(-r[:, 1, 2], r[:, 1, 1]))
+    y = np.arctan2(-r[:, 2, 0], sy)
+    z = np.where(regular, np.arctan2(r[:, 1, 0], r[:, 0, 0]), 0.0)
+    return np.stack([x, y, z], axis=1)
+
+
+def _finish(origins, targets, image_width, width_depth=None):
+    """
+    Aim projectors at their tile centers and derive the throw ratio.
+
+    Args:
+        image_width: Required image width at `width_depth`
+        width_depth: Axial depth at which that width applies (defaults to
+            the distance to the tile center)
+    """
+    rotations = look_at_rotations(origins, targets)
+    forward = -rotations[:, :, 1]
+    # Axial distance to the tile center (equal to the straight distance
+    # because the projector aims at it)
+    distance = np.einsum('ij,ij->i', targets - origins, forward)
+    if width_depth is None:
+        width_depth = distance
+    throw_ratio = width_depth / np.maximum(image_width, 1e-9)
+    return LayoutResult(origins, rotations, throw_ratio, distance)
+
+
+def grid_layout(center, normal, width, height, columns, rows, overlap,
+                throw_distance, up=(0.0, 0.0, 1.0), aspect=16.0 / 9.0):
+    """
+    Tile a flat screen with a columns x rows projector array.
+
+    Args:
+        center: Screen center
+        normal: Screen normal pointing towards the projectors
+        width: Screen width
+        height: Screen height
+        columns: Projectors across
+        rows: Projectors down
+        overlap: Blend overlap fraction between neighbours
+        throw_distance: Distance from the lenses to the screen
+        aspect: Projector aspect ratio (width / height)
+    """
+    center = np.asarray(center, dtype=np.float64)
+    normal = np.asarray(normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+    up = np.asarray(up, dtype=np.float64)
+    if abs(np.dot(normal, up)) > 0.999:
+        up = np.array((0.0, 1.0, 0.0))
+    # Screen right as seen from the projectors (looking along -normal)
+    right = np.cross(-normal, up)
+    right /= np.linalg.norm(right)
+    screen_up = np.cross(right, -normal)
+
+    xs, tile_w = tile_centers(-0.5 * width, width, columns, overlap)
+    zs, tile_h = tile_centers(-0.5 * height, height, rows, overlap)
+    if rows > 1:
+        # Images tall enough to overlap the neighbouring rows as well
+        tile_w = max(tile_w, tile_h * aspect)
+    gx, gz = np.meshgrid(xs, zs)
+    targets = (center + gx.reshape(-1, 1) * right +
+               gz.reshape(-1, 1) * screen_up)
+    origins = targets + throw_distance * normal
+    return _finish(origins, targets, np.full(len(targets), tile_w))
+
+
+def arc_layout(center, radius, start_angle, span, count, overlap, height,
+               screen_z=0.0, rows=1, projector_radius=0.0, projector_z=None,
+               closed=False, aspect=16.0 / 9.0):
+    """
+    Tile a cylindrical screen (an arc or a closed 360 degree cylinder).
+
+    Projectors sit on a concentric circle of `projector_radius` (0 puts
+    them on the axis, as in a panorama rig) and each one aims at the
+    middle of its angular tile. The image is sized so that its width at
+    the depth of the tile's chord equals the chord, so the image edges land
+    exactly on the tile edges of the curved screen.
+
+    Args:
+        center: Point on the cylinder axis at floor level
+        radius: Screen radius
+        start_angle: Angle of the first tile edge (radians, from +X)
+        span: Angular span of the screen (radians; ignored when closed)
+        count: Projectors per row
+        overlap: Blend overlap fraction between neighbours
+        height: Screen height
+        screen_z: Height of the bottom screen edge above `center`
+        rows: Number of stacked projector rows
+        projector_radius: Distance of the lenses from the axis
+        projector_z: Lens height above `center` (defaults to the row center)
+        closed: Wrap the tiles all the way around
+        aspect: Projector aspect ratio (width / height)
+    """
+    center = np.asarray(center, dtype=np.float64)
+    if closed:
+        span = 2.0 * np.pi
+    angles, tile_angle = tile_centers(start_angle, span, count, overlap,
+                                      closed)
+    row_z, tile_h = tile_centers(screen_z, height, rows, overlap)
+
+    a, z = np.meshgrid(angles, row_z)
+    a = a.reshape(-1)
+    z = z.reshape(-1)
+    radial = np.stack([np.cos(a), np.sin(a), np.zeros_like(a)], axis=1)
+
+    targets = center + radius * radial + z[:, None] * (0.0, 0.0, 1.0)
+    lens_z = z if projector_z is None else np.full_like(z, projector_z)
+    # Projectors on the far side of the axis look across it
+    origins = (center - projector_radius * radial +
+               lens_z[:, None] * (0.0, 0.0, 1.0))
+
+    half = 0.5 * min(tile_angle, np.pi)
+    chord = np.full(len(targets), 2.0 * radius * np.sin(half))
+    # Axial depth of the chord ends (the aim may tilt up or down)
+    rise = z - lens_z
+    reach = radius + projector_radius
+    distance = np.hypot(reach, rise)
+    chord_depth = (((radius * np.cos(half) + projector_radius) * reach +
+                    rise * rise) / distance)
+    if rows > 1:
+        # Image tall enough at the tile center for the row tile, which a
+        # tilted aim sees foreshortened by reach / distance
+        needed = tile_h * reach / distance * aspect * chord_depth / distance
+        chord = np.maximum(chord, needed)
+    return _finish(origins, targets, chord, chord_depth)
+
+
+def cylinder_layout(center, radius, count, overlap, height, screen_z=0.0,
+                    rows=1, projector_radius=0.0, projector_z=None,
+                    start_angle=0.0, aspect=16.0 / 9.0):
+    """Closed 360 degree panorama; see arc_layout."""
+    return arc_layout(center, radius, start_angle, 2.0 * np.pi, count,
+                      overlap, height, screen_z, rows, projector_radius,
+                      projector_z, closed=True, aspect=aspect)
+
+
+def dome_layout(center, radius, rings, count_per_ring, overlap, aspect,
+                zenith=True, projector_radius=None, projector_z=0.0,
+                tilt=0.0):
+    """
+    Tile a hemispherical dome with rings of projectors.
+
+    Ring r covers an elevation band; the number of projectors per ring
+    shrinks with the cosine of the band's elevation so tiles stay roughly
+    square. Projectors sit around the springline on the far side of the
+    dome from their tile and shoot across it, the usual dome arrangement.
+
+    Args:
+        center: Dome center (springline level)
+        radius: Dome radius
+        rings: Number of elevation bands below the zenith cap (>= 1)
+        count_per_ring: Projectors on the lowest ring
+        overlap: Blend overlap fraction between neighbours
+        aspect: Projector aspect ratio (width / height)
+        zenith: Add one projector for the zenith cap
+        projector_radius: Distance of the lenses from the dome axis
+            (defaults to 0.8 x radius)
+        projector_z: Lens height above the springline
+        tilt: Dome tilt about the X axis (radians)
+    """
+    center = np.asarray(center, dtype=np.float64)
+    if projector_radius is None:
+        projector_radius = 0.8 * radius
+
+    # Elevation bands, leaving a cap for the zenith projector
+    top = 0.5 * np.pi * (1.0 - 1.0 / (rings + 1)) if zenith else 0.5 * np.pi
+    band_centers, band = tile_centers(0.0, top, rings, overlap)
+
+    counts = np.maximum(np.round(count_per_ring *
+                                 np.cos(band_centers) /
+                                 np.cos(band_centers[0])), 3).astype(int)
+    ring = np.repeat(np.arange(rings), counts)
+    index = np.arange(len(ring)) - np.repeat(np.cumsum(counts) - counts,
+                                             counts)
+    az_tile = 2.0 * np.pi / (counts[ring] * (1.0 - overlap))
+    azimuth = index * az_tile * (1.0 - overlap)
+    elevation = band_centers[ring]
+
+    if zenith:
+        azimuth = np.append(azimuth, 0.0)
+        elevation = np.append(elevation, 0.5 * np.pi)
+        az_tile = np.append(az_tile, 2.0 * np.pi)
+
+    direction = np.stack([np.cos(elevation) * np.cos(azimuth),
+                          np.cos(elevation) * np.sin(azimuth),
+                          np.sin(elevation)], axis=1)
+    horizontal = np.stack([np.cos(azimuth), np.sin(azimuth),
+                           np.zeros_like(azimuth)], axis=1)
+
+    c, s = np.cos(tilt), np.sin(tilt)
+    tilt_matrix = np.array([[1.0, 0.0, 0.0], [0.0, c, -s], [0.0, s, c]])
+
+    targets = center + (radius * direction) @ tilt_matrix.T
+    origins = center + (-projector_radius * horizontal +
+                        projector_z * np.array((0.0, 0.0, 1.0))) @ \
+        tilt_matrix.T
+
+    # Tile extent on the sphere: azimuth chord at the band's elevation,
+    # and the band height converted to an equivalent width via the aspect
+    width_az = 2.0 * radius * np.cos(elevation) * \
+        np.sin(0.5 * np.minimum(az_tile, np.pi))
+    width_el = 2.0 * radius * np.sin(0.5 * band) * aspect
+    width = np.maximum(width_az, width_el)
+    if zenith:
+        # The cap is a disc; the image must span it in both directions
+        width[-1] = (2.0 * radius * np.cos(top) * max(aspect, 1.0) /
+                     (1.0 - overlap))
+    return _finish(origins, targets, width)
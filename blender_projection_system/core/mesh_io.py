@@ -0,0 +1,497 @@
+"""
+Fast OBJ and PLY readers for large venue scans.
+
+Both formats are read straight into flat NumPy arrays (float32 vertex
+positions, polygon sizes and corner indices), the layout Blender's bulk
+foreach_set mesh construction takes, without building per-face Python
+objects:
+
+* OBJ is split into newline-aligned chunks parsed by worker processes.
+  Each chunk is parsed with vectorized byte masks: the vertex and face
+  lines are picked out by their first two bytes, the numbers are
+  converted by NumPy's C parser and texture and normal references are
+  dropped by the position of their number inside each face corner.
+  Peak memory per worker is bounded by the chunk size.
+* Binary PLY is memory-mapped. Fixed-size vertex records are viewed in
+  place and converted by worker threads; face lists are read in runs of
+  equal length, so all-triangle or all-quad meshes need one vectorized
+  view per block.
+* ASCII PLY is parsed like an OBJ chunk, in one piece.
+
+Only geometry is read: materials, UVs, normals and colours are ignored.
+"""
+
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Bytes of OBJ text parsed per task
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Records converted per block when reading binary PLY
+PLY_BLOCK = 1 << 20
+
+# PLY scalar type names and their NumPy codes
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+PLY_BYTE_ORDER = {'binary_little_endian': '<', 'binary_big_endian': '>'}
+
+
+class PolygonMesh:
+    """
+    Flat polygon mesh arrays.
+
+    Args:
+        vertices: (V, 3) float32 positions
+        face_sizes: (F,) corner count of every polygon
+        corners: (sum(face_sizes),) vertex index of every polygon corner,
+            polygon after polygon
+    """
+
+    def __init__(self, vertices, face_sizes, corners):
+        self.vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        self.face_sizes = np.asarray(face_sizes, dtype=np.int32).reshape(-1)
+        self.corners = np.asarray(corners, dtype=np.int32).reshape(-1)
+
+    @property
+    def loop_starts(self):
+        """Index of the first corner of every polygon."""
+        starts = np.zeros(len(self.face_sizes), dtype=np.int64)
+        np.cumsum(self.face_sizes[:-1], out=starts[1:])
+        return starts
+
+    def triangles(self):
+        """(T, 3) fan triangulation of the polygons."""
+        fans = self.face_sizes.astype(np.int64) - 2
+        first = np.repeat(self.loop_starts, fans)
+        # Position of every fan triangle inside its polygon, 1 .. size - 2
+        step = np.arange(len(first)) - np.repeat(np.cumsum(fans) - fans, fans) + 1
+        return np.column_stack([self.corners[first],
+                                self.corners[first + step],
+                                self.corners[first + step + 1]])
+
+
+def read_mesh(path, workers=None):
+    """Read an OBJ or PLY file by its extension, see read_obj / read_ply."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.obj':
+        return read_obj(path, workers)
+    if extension == '.ply':
+        return read_ply(path, workers)
+    raise ValueError(f"Unsupported mesh format: {extension}")
+
+
+def default_workers():
+    """Worker count used when none is given."""
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def blender_axes(vertices, up_axis='Z', scale=1.0):
+    """
+    Scaled copy of positions in Blender's Z-up axes.
+
+    Args:
+        vertices: (V, 3) positions
+        up_axis: 'Y' for Y-up files (the OBJ convention, -Z forward), 'Z'
+            for files already in Blender's axes
+        scale: Uniform scale applied to the result
+    """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    if up_axis == 'Y':
+        result = np.empty_like(vertices)
+        result[:, 0] = vertices[:, 0]
+        result[:, 1] = -vertices[:, 2]
+        result[:, 2] = vertices[:, 1]
+    else:
+        result = vertices.copy()
+    if scale != 1.0:
+        result *= np.float32(scale)
+    return result
+
+
+def _numbers_per_line(text, lines, dtype, references=False):
+    """
+    Numbers of whitespace separated text lines.
+
+    With `references`, every token is an OBJ face corner like 7/3/1 or
+    7//1 and only its first number, the vertex, is kept.
+
+    Returns:
+        Tuple (flat numbers, count per line (lines,))
+    """
+    data = np.frombuffer(text, dtype=np.uint8)
+    if len(data) == 0:
+        return np.zeros(0, dtype=dtype), np.zeros(lines, dtype=np.int64)
+    newline = data == 10
+    space = newline | (data == 32) | (data == 9) | (data == 13)
+    token_start = ~space
+    token_start[1:] &= space[:-1]
+    line = np.cumsum(newline, dtype=np.int32)
+    counts = np.bincount(line[token_start], minlength=lines)[:lines]
+
+    slash = (data == 47) if references else None
+    if slash is not None and slash.any():
+        # Parse every number of the corners, then keep those starting a token
+        separator = space | slash
+        number_start = ~separator
+        number_start[1:] &= separator[:-1]
+        keep = token_start[number_start]
+        data = data.copy()
+        data[slash] = 32
+        values = np.fromstring(data.tobytes(), dtype=dtype, sep=' ')
+        if len(values) != len(keep):
+            raise ValueError("Malformed number in mesh file")
+        values = values[keep]
+    else:
+        values = np.fromstring(text, dtype=dtype, sep=' ')
+    if len(values) != counts.sum():
+        raise ValueError("Malformed number in mesh file")
+    return values, counts
+
+
+def _line_records(data, kind):
+    """
+    Mask the bytes of the lines starting with `kind` and whitespace.
+
+    Returns:
+        Tuple (text of those lines with the keyword blanked, line mask,
+        line start offsets)
+    """
+    newlines = np.flatnonzero(data == 10)
+    starts = np.concatenate([[0], newlines + 1])
+    starts = starts[starts < len(data)]
+    lengths = np.diff(np.append(starts, len(data)))
+    first = data[starts]
+    second = data[np.minimum(starts + 1, len(data) - 1)]
+    keyword = ((first == ord(kind)) & (lengths > 1) &
+               ((second == 32) | (second == 9)))
+
+    text = data[np.repeat(keyword, lengths)].copy()
+    # Blank the keyword so only numbers remain
+    kept_starts = np.cumsum(lengths[keyword]) - lengths[keyword]
+    text[kept_starts] = 32
+    return text.tobytes(), keyword, starts
+
+
+def parse_obj_chunk(path, start, stop):
+    """
+    Parse the vertex and face lines in bytes [start, stop) of an OBJ file.
+
+    Face corners come back 0-based; negative (relative) references are
+    left for read_obj to resolve, together with the number of vertices
+    defined in the chunk before their face.
+
+    Returns:
+        Tuple (vertices (n, 3) float32, face sizes, corners, indices of the
+        relative corners, vertices before each relative corner)
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = np.frombuffer(f.read(stop - start), dtype=np.uint8)
+
+    vertex_text, is_vertex, _ = _line_records(data, 'v')
+    values, counts = _numbers_per_line(vertex_text, int(is_vertex.sum()),
+                                       np.float64)
+    if (counts < 3).any():
+        raise ValueError("OBJ vertex line with fewer than 3 coordinates")
+    first = np.cumsum(counts) - counts
+    vertices = values[first[:, None] + np.arange(3)].astype(np.float32)
+
+    face_text, is_face, _ = _line_records(data, 'f')
+    corners, sizes = _numbers_per_line(face_text, int(is_face.sum()),
+                                       np.int64, references=True)
+
+    relative = np.flatnonzero(corners < 0)
+    # Vertices defined in this chunk before every face line
+    before = np.cumsum(is_vertex)[is_face]
+    relative_base = np.repeat(before, sizes)[relative]
+    if (corners == 0).any():
+        raise ValueError("OBJ face references vertex 0")
+    corners[corners > 0] -= 1
+    return vertices, sizes, corners, relative, relative_base
+
+
+def obj_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """Newline-aligned (start, stop) byte ranges covering a text file."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges = []
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            stop = min(start + chunk_bytes, size)
+            if stop < size:
+                newline = data.find(b'\n', stop)
+                stop = size if newline < 0 else newline + 1
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def map_chunks(function, tasks, workers):
+    """
+    Run function(*task) for every task, in worker processes when possible.
+
+    Falls back to threads where processes cannot be started or cannot
+    import this module (e.g. an embedded interpreter).
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        return [function(*task) for task in tasks]
+    arguments = list(zip(*tasks))
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            return list(pool.map(function, *arguments))
+    except (OSError, BrokenProcessPool, ImportError):
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(function, *arguments))
+
+
+def read_obj(path, workers=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Read the vertices and faces of an OBJ file.
+
+    Groups and objects are merged into one mesh; faces with fewer than
+    three corners are dropped.
+
+    Returns:
+        PolygonMesh
+    """
+    workers = workers or default_workers()
+    tasks = [(path, start, stop) for start, stop in obj_chunks(path, chunk_bytes)]
+    parts = map_chunks(parse_obj_chunk, tasks, workers)
+    if not parts:
+        return PolygonMesh(np.zeros((0, 3)), [], [])
+
+    vertices = np.concatenate([part[0] for part in parts])
+    sizes = np.concatenate([part[1] for part in parts])
+    offset = 0
+    corners = []
+    for chunk_vertices, _, chunk_corners, relative, base in parts:
+        # -1 is the last vertex defined before the face
+        chunk_corners[relative] += offset + base
+        corners.append(chunk_corners)
+        offset += len(chunk_vertices)
+    corners = np.concatenate(corners)
+    return _checked_mesh(vertices, sizes, corners)
+
+
+def _checked_mesh(vertices, sizes, corners):
+    """Drop degenerate faces and validate the corner indices."""
+    if len(corners) and (corners.min() < 0 or corners.max() >= len(vertices)):
+        raise ValueError("Face references a vertex that does not exist")
+    valid = sizes >= 3
+    if not valid.all():
+        corners = corners[np.repeat(valid, sizes)]
+        sizes = sizes[valid]
+    return PolygonMesh(vertices, sizes, corners)
+
+
+def parse_ply_header(data):
+    """
+    Parse a PLY header.
+
+    Returns:
+        Tuple (format, elements, header size in bytes); elements are
+        (name, count, properties) with properties (name, type) for scalars
+        and (name, count type, item type) for lists
+    """
+    end = data.find(b'end_header')
+    if data[:3] != b'ply' or end < 0:
+        raise ValueError("Not a PLY file")
+    newline = data.find(b'\n', end)
+    header = bytes(data[:newline + 1]).decode('ascii', 'replace')
+
+    file_format = None
+    elements = []
+    for line in header.splitlines():
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == 'format':
+            file_format = words[1]
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property' and elements:
+            if words[1] == 'list':
+                elements[-1][2].append((words[4], PLY_TYPES[words[2]],
+                                        PLY_TYPES[words[3]]))
+            else:
+                elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+    if file_format not in ('ascii', *PLY_BYTE_ORDER):
+        raise ValueError(f"Unsupported PLY format: {file_format}")
+    return file_format, elements, newline + 1
+
+
+def read_ply(path, workers=None):
+    """
+    Read the vertices and faces of a PLY file.
+
+    Returns:
+        PolygonMesh
+    """
+    workers = workers or default_workers()
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        file_format, elements, offset = parse_ply_header(data)
+        if file_format == 'ascii':
+            return _read_ply_ascii(data[offset:], elements)
+
+        order = PLY_BYTE_ORDER[file_format]
+        vertices = np.zeros((0, 3), dtype=np.float32)
+        sizes = np.zeros(0, dtype=np.int64)
+        corners = np.zeros(0, dtype=np.int64)
+        for name, count, properties in elements:
+            lists = [prop for prop in properties if len(prop) == 3]
+            if name == 'vertex':
+                vertices = _ply_vertices(data, offset, count, properties,
+                                         order, workers)
+            if not lists:
+                offset += count * _record_dtype(properties, order).itemsize
+                continue
+            if name != 'face':
+                # Elements after a variable length one can't be located
+                # without parsing it, and nothing else here is needed
+                break
+            sizes, corners, offset = _ply_lists(data, offset, count,
+                                                properties, order)
+            break
+        # Copy out of the mapping before it closes
+        return _checked_mesh(np.array(vertices), sizes, corners)
+
+
+def _record_dtype(properties, order, list_lengths=None):
+    """Structured dtype of one PLY record; lists need their lengths."""
+    fields = []
+    for prop in properties:
+        if len(prop) == 2:
+            fields.append((prop[0], order + prop[1]))
+        else:
+            length = list_lengths[prop[0]]
+            fields.append((prop[0] + '_count', order + prop[1]))
+            fields.append((prop[0], order + prop[2], (length,)))
+    return np.dtype(fields)
+
+
+def _ply_vertices(data, offset, count, properties, order, workers,
+                  columns=('x', 'y', 'z')):
+    """(count, 3) float32 columns (positions by default) of vertex records."""
+    names = [prop[0] for prop in properties]
+    if any(len(prop) == 3 for prop in properties):
+        raise ValueError("PLY vertices with list properties are not supported")
+    if not set(columns) <= set(names):
+        raise ValueError(f"PLY vertices have no {', '.join(columns)} properties")
+    records = np.frombuffer(data, _record_dtype(properties, order), count,
+                            offset)
+    vertices = np.empty((count, 3), dtype=np.float32)
+
+    def convert(start):
+        block = records[start:start + PLY_BLOCK]
+        for axis, name in enumerate(columns):
+            vertices[start:start + len(block), axis] = block[name]
+
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(convert, range(0, count, PLY_BLOCK)))
+    return vertices
+
+
+def _ply_lists(data, offset, count, properties, order):
+    """
+    Face records with variable length lists, read in runs of equal length.
+
+    Every run assumes the list lengths of its first record, views a block
+    of records with that fixed layout and keeps the prefix whose count
+    fields agree; the next run starts at the first record that differs.
+
+    Returns:
+        Tuple (face sizes, corners, offset after the element)
+    """
+    index_name = next((prop[0] for prop in properties
+                       if prop[0] in ('vertex_indices', 'vertex_index')
+                       and len(prop) == 3), None)
+    if index_name is None:
+        raise ValueError("PLY faces have no vertex_indices list")
+
+    sizes = []
+    corners = []
+    done = 0
+    while done < count:
+        lengths = _first_record_lengths(data, offset, properties, order)
+        record = _record_dtype(properties, order, lengths)
+        block = min(PLY_BLOCK, count - done,
+                    (len(data) - offset) // record.itemsize)
+        if block <= 0:
+            raise ValueError("PLY file ends inside the face element")
+        records = np.frombuffer(data, record, block, offset)
+        agree = np.ones(block, dtype=bool)
+        for name, length in lengths.items():
+            agree &= records[name + '_count'] == length
+        run = block if agree.all() else int(np.argmin(agree))
+
+        sizes.append(np.full(run, lengths[index_name], dtype=np.int64))
+        corners.append(records[index_name][:run].reshape(-1)
+                       .astype(np.int64))
+        offset += run * record.itemsize
+        done += run
+    if not sizes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), offset
+    return np.concatenate(sizes), np.concatenate(corners), offset
+
+
+def _first_record_lengths(data, offset, properties, order):
+    """List lengths of the record at offset, by walking its fields."""
+    lengths = {}
+    for prop in properties:
+        if len(prop) == 2:
+            offset += np.dtype(prop[1]).itemsize
+            continue
+        length = int(np.frombuffer(data, order + prop[1], 1, offset)[0])
+        lengths[prop[0]] = length
+        offset += (np.dtype(prop[1]).itemsize +
+                   length * np.dtype(prop[2]).itemsize)
+    return lengths
+
+
+def _read_ply_ascii(body, elements):
+    """Vertices and faces of an ASCII PLY body, one record per line."""
+    data = np.frombuffer(body, dtype=np.uint8)
+    newlines = np.flatnonzero(data == 10)
+    line = 0
+    start = 0
+    vertices = np.zeros((0, 3), dtype=np.float32)
+    sizes = np.zeros(0, dtype=np.int64)
+    corners = np.zeros(0, dtype=np.int64)
+    for name, count, properties in elements:
+        stop = (int(newlines[line + count - 1]) + 1
+                if line + count - 1 < len(newlines) else len(data))
+        text = bytes(body[start:stop])
+        if name == 'vertex':
+            values, counts = _numbers_per_line(text, count, np.float64)
+            names = [prop[0] for prop in properties]
+            first = np.cumsum(counts) - counts
+            columns = [first + names.index(axis) for axis in 'xyz']
+            vertices = np.column_stack([values[c] for c in columns])
+        elif name == 'face':
+            values, counts = _numbers_per_line(text, count, np.float64)
+            # Scalar properties written before the index list
+            names = [prop[0] for prop in properties]
+            index = next(i for i, name in enumerate(names)
+                         if name in ('vertex_indices', 'vertex_index'))
+            first = np.cumsum(counts) - counts + index
+            sizes = values[first].astype(np.int64)
+            corners = values[np.repeat(first + 1, sizes) +
+                             np.arange(sizes.sum()) -
+                             np.repeat(np.cumsum(sizes) - sizes, sizes)]
+            corners = corners.astype(np.int64)
+        line += count
+        start = stop
+    return _checked_mesh(vertices.astype(np.float32), sizes, corners)
@@ -0,0 +1,500 @@
+"""
+Planar mirrors folding projector throws.
+
+A throw folded by planar mirrors is the straight throw of a virtual
+projector: reflecting the projector across the mirrors of its path, in
+order, gives a lens position and a (mirrored) orientation whose straight
+rays coincide with the folded rays past the last mirror. Reflections keep
+distances and angles, so the frustum math of every analysis (pixel density,
+keystone, incidence, the inverse square law) holds as is for the virtual
+projector. The reflections only flip the raster, and the content is flipped
+to match.
+
+Three things differ from a straight throw:
+
+1. The mirror path of a projector is found by tracing its optical axis
+   through the mirrors. trace_reflections bounces all rays together, one
+   bounce per step.
+2. A virtual ray only lights a point if it passes every mirror of the path
+   inside the mirror's outline and the point lies past the last mirror.
+   Walking back from the point, each crossing is the segment from the
+   virtual lens of one reflection fewer to the previous crossing.
+3. Occluders only count on the real segments of the folded path, which
+   that walk yields: lens to first mirror, mirror to mirror, and last
+   mirror to the point. Past the last mirror, a depth map of the geometry
+   clipped to the far side of the mirror tests every point at once.
+
+Mirrors lose light, so the lumens of a virtual projector are scaled by the
+reflectivities along its path. Every pixel follows the path of the optical
+axis: the part of an image that misses the mirrors of that path is lost
+rather than traced along a path of its own.
+"""
+
+import hashlib
+
+import numpy as np
+
+from .frustum import ProjectorArrays
+from .pointcloud import PointShadowMaps
+from .raycast import EDGE_EPSILON, TriangleBVH
+from .shadowmap import ShadowMaps, clip_near
+from .sightlines import triangle_frames
+
+# Most reflections followed along a throw
+MAX_BOUNCES = 4
+
+# Geometry closer than this to the far side of the last mirror (e.g. the
+# wall the mirror is mounted on) does not occlude the folded throw
+EXIT_MARGIN = 1e-3
+
+
+def reflect_points(points, normals, offsets):
+    """Mirror images of points[k] across the plane normals[k] . x = offsets[k]."""
+    side = np.einsum('ij,ij->i', points, normals) - offsets
+    return points - 2.0 * side[:, None] * normals
+
+
+def reflect_rotations(rotations, normals):
+    """Mirror images of the frames rotations[k] (columns are axes) across planes with normals[k]."""
+    return rotations - 2.0 * normals[:, :, None] * \
+        np.einsum('kj,kji->ki', normals, rotations)[:, None, :]
+
+
+class Mirrors:
+    """
+    Planar mirrors, reflective on the side their face normals point to.
+
+    Args:
+        vertices, triangles: World triangles of all mirrors
+        triangle_mirror: (T,) mirror index of every triangle
+        reflectivity: Scalar or (K,) share of the light each mirror reflects
+    """
+
+    def __init__(self, vertices, triangles, triangle_mirror, reflectivity=0.95):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.triangle_mirror = np.asarray(triangle_mirror, dtype=np.int64)
+        reflectivity = np.atleast_1d(np.asarray(reflectivity, dtype=np.float64))
+        count = int(self.triangle_mirror.max()) + 1 if len(triangles) else 0
+        count = max(count, len(reflectivity)) if reflectivity.size > 1 else count
+        self.reflectivity = np.broadcast_to(reflectivity, (count,)).copy()
+        self.bvh = TriangleBVH(vertices, triangles)
+
+        corners = vertices[triangles]
+        self.data = np.stack([corners[:, 0], corners[:, 1] - corners[:, 0],
+                              corners[:, 2] - corners[:, 0]], axis=1)
+        _, _, self.dual = triangle_frames(self.data)
+
+        # One plane per mirror, from its area weighted normal and centroid
+        cross = np.cross(self.data[:, 1], self.data[:, 2])
+        area = np.linalg.norm(cross, axis=1)
+        normals = np.zeros((count, 3))
+        np.add.at(normals, self.triangle_mirror, cross)
+        self.normals = normals / np.maximum(
+            np.linalg.norm(normals, axis=1, keepdims=True), 1e-300)
+        centroid = np.zeros((count, 3))
+        np.add.at(centroid, self.triangle_mirror,
+                  corners.mean(axis=1) * area[:, None])
+        weight = np.bincount(self.triangle_mirror, area, minlength=count)
+        centroid /= np.maximum(weight, 1e-300)[:, None]
+        self.offsets = np.einsum('ij,ij->i', centroid, self.normals)
+
+        order = np.argsort(self.triangle_mirror, kind='stable')
+        self.triangle_order = order
+        self.triangle_start = np.searchsorted(self.triangle_mirror[order],
+                                              np.arange(count + 1))
+
+    def __len__(self):
+        return len(self.reflectivity)
+
+    def contains(self, mirror, points):
+        """(K,) mask of points[k], on the plane of mirror[k], inside that mirror's outline."""
+        inside = np.zeros(len(points), dtype=bool)
+        for m in np.unique(mirror):
+            rows = np.flatnonzero(mirror == m)
+            for t in self.triangle_order[self.triangle_start[m]:
+                                         self.triangle_start[m + 1]]:
+                offset = points[rows] - self.data[t, 0]
+                b1 = offset @ self.dual[t, 0]
+                b2 = offset @ self.dual[t, 1]
+                inside[rows] |= (b1 >= -EDGE_EPSILON) & (b2 >= -EDGE_EPSILON) & \
+                    (b1 + b2 <= 1.0 + EDGE_EPSILON)
+        return inside
+
+
+class MirrorPaths:
+    """
+    Rays followed through the mirrors.
+
+    Attributes:
+        vertices: (R, B + 1, 3) ray origin and bounce points; entries past a
+            ray's last bounce repeat its last point
+        directions: (R, 3) directions after the last bounce
+        path: (R, B) mirror of every bounce, -1 past the last one
+        bounces: (R,) number of bounces
+    """
+
+    def __init__(self, vertices, directions, path):
+        self.vertices = vertices
+        self.directions = directions
+        self.path = path
+        self.bounces = (path >= 0).sum(axis=1)
+
+    def point_at(self, distance):
+        """(R, 3) points at the given distances along the folded rays."""
+        distance = np.broadcast_to(np.asarray(distance, dtype=np.float64),
+                                   (len(self.path),))
+        legs = np.linalg.norm(np.diff(self.vertices, axis=1), axis=2)
+        travelled = np.concatenate([np.zeros((len(legs), 1)),
+                                    np.cumsum(legs, axis=1)], axis=1)
+        rows = np.arange(len(self.path))
+        # Last bounce point reached before the distance
+        leg = np.minimum((travelled <= distance[:, None]).sum(axis=1) - 1,
+                         self.bounces)
+        start = self.vertices[rows, leg]
+        heading = np.where((leg < self.bounces)[:, None],
+                           self.vertices[rows, np.minimum(leg + 1, self.path.shape[1])] - start,
+                           self.directions)
+        heading /= np.maximum(np.linalg.norm(heading, axis=1, keepdims=True), 1e-300)
+        return start + heading * (distance - travelled[rows, leg])[:, None]
+
+
+def trace_reflections(mirrors, origins, directions, max_bounces=MAX_BOUNCES):
+    """
+    Follow rays through the mirrors, all rays one bounce at a time.
+
+    Rays bounce off the reflective side only; a ray meeting the back of a
+    mirror stops bouncing there.
+
+    Returns:
+        MirrorPaths
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.array(directions, dtype=np.float64).reshape(-1, 3)
+    count = len(origins)
+    vertices = np.repeat(origins[:, None], max_bounces + 1, axis=1)
+    path = np.full((count, max_bounces), -1, dtype=np.int64)
+    live = np.arange(count) if len(mirrors) else np.zeros(0, dtype=np.int64)
+    for bounce in range(max_bounces):
+        if len(live) == 0:
+            break
+        start = vertices[live, bounce]
+        hits = mirrors.bvh.ray_cast(start, directions[live])
+        mirror = mirrors.triangle_mirror[np.maximum(hits.triangle, 0)]
+        normal = mirrors.normals[mirror]
+        heading = directions[live]
+        front = hits.hit & (np.einsum('ij,ij->i', heading, normal) < 0)
+
+        live, mirror, normal = live[front], mirror[front], normal[front]
+        point = hits.points(start, heading)[front]
+        heading = heading[front]
+        directions[live] = heading - 2.0 * np.einsum(
+            'ij,ij->i', heading, normal)[:, None] * normal
+        vertices[live, bounce + 1:] = point[:, None]
+        path[live, bounce] = mirror
+    return MirrorPaths(vertices, directions, path)
+
+
+def fold_projectors(projectors, mirrors, max_bounces=MAX_BOUNCES):
+    """
+    Virtual projectors of a rig whose throws may be folded by mirrors.
+
+    Returns:
+        FoldedProjectors; projectors whose optical axis meets no mirror are
+        their own virtual projector
+    """
+    local = np.stack([-projectors.shift[:, 0] / projectors.throw_ratio,
+                      -np.ones(len(projectors)),
+                      projectors.shift[:, 1] / (projectors.throw_ratio * projectors.aspect)],
+                     axis=1)
+    axis = np.einsum('nij,nj->ni', projectors.rotations, local)
+    paths = trace_reflections(mirrors, projectors.origins, axis, max_bounces)
+    return FoldedProjectors(projectors, mirrors, paths.path)
+
+
+class FoldedProjectors(ProjectorArrays):
+    """
+    Virtual projectors of throws folded by mirrors.
+
+    The arrays describe the virtual projectors, so every frustum analysis
+    takes them as they are. Occlusion callables come from visibility and
+    visible_points, which also hold a virtual ray to its mirrors.
+
+    Args:
+        projectors: ProjectorArrays of the real projectors
+        mirrors: Mirrors
+        path: (N, B) mirror of every reflection along each throw, -1 past
+            the last one
+    """
+
+    def __init__(self, projectors, mirrors, path):
+        self.real = projectors
+        self.mirrors = mirrors
+        self.path = np.asarray(path, dtype=np.int64).reshape(len(projectors), -1)
+        self.bounces = (self.path >= 0).sum(axis=1)
+
+        # Virtual lens after every reflection; level 0 is the real lens
+        levels = [projectors.origins]
+        rotations = projectors.rotations.copy()
+        lumens = projectors.lumens.copy()
+        for bounce in range(self.path.shape[1]):
+            mirror = self.path[:, bounce]
+            active = mirror >= 0
+            normals = mirrors.normals[np.maximum(mirror, 0)] if len(mirrors) else \
+                np.zeros((len(mirror), 3))
+            offsets = mirrors.offsets[np.maximum(mirror, 0)] if len(mirrors) else \
+                np.zeros(len(mirror))
+            levels.append(np.where(active[:, None],
+                                   reflect_points(levels[-1], normals, offsets), levels[-1]))
+            rotations = np.where(active[:, None, None],
+                                 reflect_rotations(rotations, normals), rotations)
+            if active.any():
+                lumens[active] *= mirrors.reflectivity[mirror[active]]
+        self.levels = np.stack(levels, axis=1)
+
+        super().__init__(self.levels[:, -1], rotations, projectors.throw_ratio,
+                         projectors.aspect, projectors.shift, projectors.resolution,
+                         lumens, projectors.names, projectors.vignetting)
+
+    @property
+    def folded(self):
+        """(N,) mask of the projectors reflected at least once."""
+        return self.bounces > 0
+
+    def subset(self, index):
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        return FoldedProjectors(self.real.subset(index), self.mirrors,
+                                self.path[index])
+
+    def virtual(self, index):
+        """ProjectorArrays of one virtual projector, e.g. for a depth map."""
+        return ProjectorArrays.subset(self, [index])
+
+    def last_mirror(self, index):
+        """Mirror the throw of projector `index` leaves last, or -1."""
+        bounces = self.bounces[index]
+        return int(self.path[index, bounces - 1]) if bounces else -1
+
+    def beyond(self, index, points, margin=EXIT_MARGIN):
+        """(M,) mask of points past the last mirror of projector `index`."""
+        mirror = self.last_mirror(index)
+        if mirror < 0:
+            return np.ones(len(points), dtype=bool)
+        return points @ self.mirrors.normals[mirror] - self.mirrors.offsets[mirror] > margin
+
+    def exit_geometry(self, index, vertices, triangles, margin=EXIT_MARGIN):
+        """
+        Triangles clipped to the far side of the last mirror of projector `index`.
+
+        Returns:
+            Tuple (vertices, triangles) of an unindexed triangle soup
+        """
+        corners = np.asarray(vertices, dtype=np.float64)[
+            np.asarray(triangles, dtype=np.int64).reshape(-1, 3)]
+        mirror = self.last_mirror(index)
+        if mirror >= 0:
+            normal = self.mirrors.normals[mirror]
+            offset = self.mirrors.offsets[mirror]
+            # Clip in a frame whose third axis is the height over the mirror plane
+            helper = np.eye(3)[np.argmin(np.abs(normal))]
+            u = np.cross(normal, helper)
+            u /= np.linalg.norm(u)
+            w = np.cross(normal, u)
+            frame = np.stack([u, w, normal], axis=1)
+            local = corners @ frame
+            local[:, :, 2] -= offset
+            local = clip_near(local, margin)
+            local[:, :, 2] += offset
+            corners = local @ frame.T
+        return corners.reshape(-1, 3), np.arange(len(corners) * 3).reshape(-1, 3)
+
+    def exit_key(self, index):
+        """Digest of the plane exit_geometry clips at, for depth map caches."""
+        digest = hashlib.blake2b(digest_size=8)
+        mirror = self.last_mirror(index)
+        if mirror >= 0:
+            digest.update(self.mirrors.normals[mirror].tobytes())
+            digest.update(self.mirrors.offsets[mirror].tobytes())
+        return digest.hexdigest()
+
+    def fold_key(self):
+        """Digest of the mirror paths and outlines, which the arrays alone don't capture."""
+        digest = hashlib.blake2b(digest_size=16)
+        for values in (self.path, self.mirrors.data, self.mirrors.triangle_mirror,
+                       self.mirrors.reflectivity):
+            digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.hexdigest()
+
+    def exit_visibility(self, vertices, triangles, resolution=1024, cache=None,
+                        geometry_key=None, points=None, radius=0.0):
+        """
+        Depth map test of the segments past the last mirror, for reaches.
+
+        Every folded projector gets its own map of the geometry clipped to
+        the far side of its last mirror, rendered when first needed.
+
+        Args:
+            vertices, triangles: Occluding geometry
+            resolution, cache, geometry_key: See ShadowMaps
+            points: Optional (P, 3) occluding point cloud points, splatted
+                with the given radius (see PointShadowMaps)
+
+        Returns:
+            Callable (projector index, points) -> (M,) mask
+        """
+        maps = {}
+
+        def visible(index, targets):
+            exit_maps = maps.get(index)
+            if exit_maps is None:
+                exit_vertices, exit_triangles = self.exit_geometry(index, vertices, triangles)
+                key = None if geometry_key is None else geometry_key + self.exit_key(index)
+                if points is not None:
+                    exit_maps = PointShadowMaps(
+                        self.virtual(index), exit_vertices, exit_triangles,
+                        points[self.beyond(index, points)], radius, resolution, cache, key)
+                else:
+                    exit_maps = ShadowMaps(self.virtual(index), exit_vertices, exit_triangles,
+                                           resolution, cache, key)
+                maps[index] = exit_maps
+            return exit_maps.visible(0, targets)
+
+        return visible
+
+    def unfold(self, index, points):
+        """
+        Real mirror crossings of the virtual rays to points[k] from projector index[k].
+
+        Returns:
+            Tuple (valid (K,), crossings (K, B, 3)); a ray is valid when it
+            passes every mirror of its path inside the outline, in order
+        """
+        index = np.asarray(index, dtype=np.int64)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        valid = np.ones(len(points), dtype=bool)
+        crossings = np.zeros((len(points), self.path.shape[1], 3))
+        target = points.copy()
+        for bounce in range(self.path.shape[1] - 1, -1, -1):
+            mirror = self.path[index, bounce]
+            rows = np.flatnonzero((mirror >= 0) & valid)
+            if len(rows) == 0:
+                continue
+            mirror = mirror[rows]
+            origin = self.levels[index[rows], bounce + 1]
+            normal = self.mirrors.normals[mirror]
+            offset = self.mirrors.offsets[mirror]
+            # The virtual lens is behind the mirror, the target in front of it
+            start_side = np.einsum('ij,ij->i', origin, normal) - offset
+            end_side = np.einsum('ij,ij->i', target[rows], normal) - offset
+            ok = (start_side < 0) & (end_side > 0)
+            t = start_side / np.where(ok, start_side - end_side, -1.0)
+            crossing = origin + (target[rows] - origin) * t[:, None]
+            ok &= self.mirrors.contains(mirror, crossing)
+            valid[rows[~ok]] = False
+            crossings[rows, bounce] = crossing
+            target[rows] = crossing
+        return valid, crossings
+
+    def reaches(self, index, points, bvh=None, exit_visible=None):
+        """
+        (K,) mask of points[k] lit along the folded path of projector index[k].
+
+        Args:
+            bvh: Optional TriangleBVH of the occluders; without it only the
+                mirror outlines are tested
+            exit_visible: Optional callable (projector index, points) ->
+                mask testing the segments past the last mirror, e.g. a
+                depth map of exit_geometry; they are ray cast otherwise
+        """
+        index = np.asarray(index, dtype=np.int64)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        valid, crossings = self.unfold(index, points)
+        if bvh is None and exit_visible is None:
+            return valid
+
+        rows = np.flatnonzero(valid & (self.bounces[index] > 0))
+        last = crossings[rows, self.bounces[index[rows]] - 1]
+        if exit_visible is not None:
+            for projector in np.unique(index[rows]):
+                sub = np.flatnonzero(index[rows] == projector)
+                valid[rows[sub]] = exit_visible(int(projector), points[rows[sub]])
+        elif len(rows):
+            valid[rows] = ~bvh.occluded(last, points[rows])
+        if bvh is None:
+            return valid
+
+        # Segments up to the last mirror, only where the AABB tree finds
+        # geometry in the box around the projector's mirrors
+        rows = rows[valid[rows]]
+        projectors = np.unique(index[rows])
+        if len(rows) == 0 or bvh.triangle_count == 0:
+            return valid
+        lo, hi = self._fold_boxes(projectors)
+        query, _ = bvh.overlapping(lo, hi)
+        rows = rows[np.isin(index[rows], projectors[np.unique(query)])]
+        for bounce in range(self.path.shape[1]):
+            sub = rows[self.path[index[rows], bounce] >= 0]
+            if len(sub) == 0:
+                break
+            start = self.real.origins[index[sub]] if bounce == 0 else \
+                crossings[sub, bounce - 1]
+            valid[sub] &= ~bvh.occluded(start, crossings[sub, bounce])
+        return valid
+
+    def _fold_boxes(self, index):
+        """Boxes around the real lens and the path mirrors of projectors."""
+        lo = self.real.origins[index].copy()
+        hi = lo.copy()
+        for row, projector in enumerate(index):
+            for mirror in self.path[projector, :self.bounces[projector]]:
+                triangles = self.mirrors.triangle_order[
+                    self.mirrors.triangle_start[mirror]:self.mirrors.triangle_start[mirror + 1]]
+                data = self.mirrors.data[triangles]
+                corners = np.concatenate([data[:, 0], data[:, 0] + data[:, 1],
+                                          data[:, 0] + data[:, 2]])
+                lo[row] = np.minimum(lo[row], corners.min(axis=0))
+                hi[row] = np.maximum(hi[row], corners.max(axis=0))
+        return lo, hi
+
+    def visibility(self, points, inner=None, bvh=None, exit_visible=None):
+        """
+        Occlusion callable for surface_metrics.lit_mask.
+
+        Folded projectors are tested along their paths (see reaches), the
+        others by the inner callable of the straight throws, if any.
+
+        Args:
+            points: (M, 3) all sample positions the analysis selects from
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        def visible(index, samples, candidates):
+            index = np.atleast_1d(index)
+            folded = (self.bounces[index] > 0)[:, None]
+            straight = candidates & ~folded
+            if inner is not None:
+                mask = inner(index, samples, straight)
+            else:
+                mask = straight.copy()
+            rows, columns = np.nonzero(candidates & folded)
+            if len(rows):
+                lit = self.reaches(index[rows], points[samples][columns], bvh,
+                                   exit_visible)
+                mask[rows[lit], columns[lit]] = True
+            return mask
+
+        return visible
+
+    def visible_points(self, inner=None, bvh=None, exit_visible=None):
+        """Occlusion test (index, points) -> (M,) mask; see visibility."""
+
+        def visible(index, points):
+            if self.bounces[index] == 0:
+                return inner(index, points) if inner is not None else \
+                    np.ones(len(points), dtype=bool)
+            return self.reaches(np.full(len(points), index), points, bvh,
+                                exit_visible)
+
+        return visible
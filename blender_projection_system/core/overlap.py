@@ -0,0 +1,325 @@
+"""
+Projector overlap graph.
+
+Projectors are nodes; two projectors are joined by an edge when they light
+a common piece of surface. Every edge carries
+
+* area: the surface area lit by both projectors,
+* blend width: the width of the overlap strip in each projector's image,
+  as a fraction of the image (the narrow side of the strip's bounding box
+  in normalized image coordinates), comparable to pj_edge_blend_amount,
+* surface: the index of the environment object holding most of the
+  overlap, or -1.
+
+The adjacency is stored in compressed sparse row (CSR) form: the
+neighbours of projector i are indices[indptr[i]:indptr[i + 1]], so
+neighbour lookups cost O(degree), and the whole graph is a handful of
+flat arrays that can be saved with the scene.
+"""
+
+import numpy as np
+
+from .frustum import chunk_slices
+from .surface_metrics import lit_mask, sample_chunk_size
+
+
+class OverlapGraph:
+    """
+    Undirected overlap graph of `count` projectors.
+
+    Args:
+        count: Number of projectors
+        edges: (E, 2) projector index pairs, first < second
+        area: (E,) overlap area of every edge
+        blend_width: (E, 2) overlap strip width in the image of the first
+            and of the second projector of every edge
+        surface: (E,) environment object index of every edge, -1 if unknown
+    """
+
+    def __init__(self, count, edges, area=None, blend_width=None,
+                 surface=None):
+        self.count = int(count)
+        self.edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        e = len(self.edges)
+        self.area = (np.zeros(e) if area is None else
+                     np.asarray(area, dtype=np.float64).reshape(e))
+        self.blend_width = (np.zeros((e, 2)) if blend_width is None else
+                            np.asarray(blend_width,
+                                       dtype=np.float64).reshape(e, 2))
+        self.surface = (np.full(e, -1, dtype=np.int64) if surface is None
+                        else np.asarray(surface, dtype=np.int64).reshape(e))
+
+        # Both directions of every edge, sorted by source projector
+        source = np.concatenate([self.edges[:, 0], self.edges[:, 1]])
+        target = np.concatenate([self.edges[:, 1], self.edges[:, 0]])
+        edge = np.concatenate([np.arange(e), np.arange(e)])
+        side = np.repeat([0, 1], e)
+        order = np.lexsort((target, source))
+        self.indices = target[order]
+        self.edge_index = edge[order]
+        # Blend width of every entry, seen from its source projector
+        self.entry_blend_width = self.blend_width[edge[order], side[order]]
+        self.indptr = np.zeros(self.count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=self.count),
+                  out=self.indptr[1:])
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, index):
+        """Projectors overlapping projector `index`."""
+        return self.indices[self.indptr[index]:self.indptr[index + 1]]
+
+    def neighbor_edges(self, index):
+        """Edge indices of projector `index`, aligned with neighbors()."""
+        return self.edge_index[self.indptr[index]:self.indptr[index + 1]]
+
+    def neighbor_blend_widths(self, index):
+        """Overlap strip widths in projector `index`'s image, per neighbour."""
+        return self.entry_blend_width[self.indptr[index]:
+                                      self.indptr[index + 1]]
+
+    def edge_between(self, first, second):
+        """Edge index joining two projectors, or -1."""
+        neighbors = self.neighbors(first)
+        position = np.searchsorted(neighbors, second)
+        if position < len(neighbors) and neighbors[position] == second:
+            return int(self.edge_index[self.indptr[first] + position])
+        return -1
+
+    def components(self):
+        """
+        Connected components.
+
+        Returns:
+            (count,) component label of every projector, numbered from 0 in
+            order of each component's lowest projector index
+        """
+        labels = np.arange(self.count)
+        if len(self.edges) == 0:
+            return labels
+        first, second = self.edges.T
+        while True:
+            low = np.minimum(labels[first], labels[second])
+            updated = labels.copy()
+            np.minimum.at(updated, labels[first], low)
+            np.minimum.at(updated, labels[second], low)
+            # Pointer jumping flattens the label trees
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+        return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+    def component(self, index):
+        """Projectors connected to projector `index`, including itself."""
+        labels = self.components()
+        return np.flatnonzero(labels == labels[index])
+
+    def blend_chain(self, index):
+        """
+        The run of projectors blending into one another through `index`.
+
+        A chain follows projectors with exactly two neighbours, like a row
+        of projectors across a wide screen, and ends at projectors with one
+        neighbour or at branch points (three or more neighbours), which are
+        included. A projector at a branch point is a chain of its own.
+
+        Returns:
+            Tuple (projector indices in order along the chain, starting at
+            the lower numbered end, closed: True if the chain is a ring)
+        """
+        degree = self.degree
+        if degree[index] == 0 or degree[index] > 2:
+            return [int(index)], False
+
+        neighbors = self.neighbors(index)
+        forward = self._walk(index, int(neighbors[0]), degree)
+        if forward[-1] == index:
+            return [int(index)] + forward[:-1], True
+        backward = (self._walk(index, int(neighbors[1]), degree)
+                    if len(neighbors) > 1 else [])
+        chain = backward[::-1] + [int(index)] + forward
+        if chain[0] > chain[-1]:
+            chain.reverse()
+        return chain, False
+
+    def _walk(self, previous, current, degree):
+        """Follow degree-2 projectors away from `previous`."""
+        path = [current]
+        start = previous
+        while degree[current] == 2:
+            following = [int(n) for n in self.neighbors(current)
+                         if n != previous]
+            if not following:
+                break
+            previous, current = current, following[0]
+            path.append(current)
+            if current == start:
+                break
+        return path
+
+    def blend_chains(self):
+        """
+        Every chain with at least two projectors, see blend_chain.
+
+        Returns:
+            List of (projector indices, closed) tuples
+        """
+        degree = self.degree
+        seen = np.zeros(self.count, dtype=bool)
+        chains = []
+        # Chains between ends and branch points are found from both ends
+        for index in np.flatnonzero((degree > 0) & (degree != 2)):
+            for neighbor in self.neighbors(index):
+                path = [int(index)] + self._walk(index, int(neighbor), degree)
+                if (path[0], path[1]) < (path[-1], path[-2]):
+                    chains.append((path, False))
+                seen[path] = True
+        # What is left are rings of degree-2 projectors
+        for index in np.flatnonzero((degree == 2) & ~seen):
+            if not seen[index]:
+                chain, closed = self.blend_chain(index)
+                seen[chain] = True
+                chains.append((chain, closed))
+        return chains
+
+    def subgraph(self, keep):
+        """Graph of the projectors selected by a boolean mask or index array."""
+        mask = np.zeros(self.count, dtype=bool)
+        mask[keep] = True
+        remap = np.cumsum(mask) - 1
+        edges = mask[self.edges].all(axis=1)
+        return OverlapGraph(int(mask.sum()), remap[self.edges[edges]],
+                            self.area[edges], self.blend_width[edges],
+                            self.surface[edges])
+
+    def to_dict(self):
+        """Flat lists for storage, e.g. as scene ID properties."""
+        return {
+            "count": self.count,
+            "edges": self.edges.reshape(-1).tolist(),
+            "area": self.area.tolist(),
+            "blend_width": self.blend_width.reshape(-1).tolist(),
+            "surface": self.surface.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Graph stored by to_dict."""
+        return cls(data["count"], list(data["edges"]), list(data["area"]),
+                   list(data["blend_width"]), list(data["surface"]))
+
+
+def overlap_graph(projectors, samples, visibility=None, sample_object=None,
+                  min_area=0.0, chunk_size=None):
+    """
+    Overlap graph of projectors lighting common surface samples.
+
+    Args:
+        projectors: ProjectorArrays
+        samples: SurfaceSamples
+        visibility: Optional occlusion callable, see lit_mask
+        sample_object: Optional (M,) environment object index of every
+            sample, for the shared surface of every edge
+        min_area: Edges with less overlap area are dropped
+        chunk_size: Samples per block
+
+    Returns:
+        OverlapGraph
+    """
+    n = len(projectors)
+    m = len(samples)
+    objects = (int(sample_object.max()) + 1
+               if sample_object is not None and len(sample_object) else 1)
+    chunk_size = chunk_size or sample_chunk_size(n)
+    index = np.arange(n)
+
+    parts = []
+    for sl in chunk_slices(m, chunk_size):
+        lit, u, v, _ = lit_mask(projectors, samples.points[sl],
+                                samples.normals[sl], visibility, index, sl)
+        weights = samples.weights[sl]
+        owner = (np.zeros(lit.shape[1], dtype=np.int64)
+                 if sample_object is None else sample_object[sl])
+        # Every ordered pair of projectors lighting a sample
+        shared = lit[:, lit.sum(axis=0) > 1]
+        if not shared.any():
+            continue
+        columns = np.flatnonzero(lit.sum(axis=0) > 1)
+        for i in range(n):
+            own = np.flatnonzero(shared[i])
+            if len(own) == 0:
+                continue
+            others = shared[:, own]
+            others[i] = False
+            j, column = np.nonzero(others)
+            sample = columns[own[column]]
+            parts.append(_reduce_pairs(
+                i * n + j, u[i, sample], v[i, sample], weights[sample],
+                owner[sample], objects))
+
+    if not parts:
+        return OverlapGraph(n, np.zeros((0, 2), dtype=np.int64))
+    keys, u_min, u_max, v_min, v_max, area, owner_area = _merge_pairs(parts)
+
+    # Directed pairs (i, j) give the blend width in projector i's image
+    first, second = np.divmod(keys, n)
+    width = np.minimum(u_max - u_min, v_max - v_min)
+    lookup = dict(zip(keys.tolist(), width.tolist()))
+
+    keep = (first < second) & (area >= min_area) & (area > 0)
+    edges = np.column_stack([first[keep], second[keep]])
+    reverse = (edges[:, 1] * n + edges[:, 0]).tolist()
+    blend_width = np.column_stack([width[keep],
+                                   [lookup.get(k, 0.0) for k in reverse]])
+    surface = (owner_area[keep].argmax(axis=1) if sample_object is not None
+               else np.full(len(edges), -1))
+    return OverlapGraph(n, edges, area[keep], blend_width, surface)
+
+
+def _reduce_pairs(keys, u, v, weights, owner, objects):
+    """Bounds, area and per-object area of every directed pair in a block."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    k = len(unique)
+    u_min = np.full(k, np.inf)
+    u_max = np.full(k, -np.inf)
+    v_min = np.full(k, np.inf)
+    v_max = np.full(k, -np.inf)
+    np.minimum.at(u_min, inverse, u)
+    np.maximum.at(u_max, inverse, u)
+    np.minimum.at(v_min, inverse, v)
+    np.maximum.at(v_max, inverse, v)
+    area = np.bincount(inverse, weights=weights, minlength=k)
+    owner_area = np.bincount(inverse * objects + owner, weights=weights,
+                             minlength=k * objects).reshape(k, objects)
+    return unique, u_min, u_max, v_min, v_max, area, owner_area
+
+
+def _merge_pairs(parts):
+    """Combine the per-block pair reductions."""
+    keys = np.concatenate([part[0] for part in parts])
+    unique, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    k = len(unique)
+    merged = [unique]
+    for column, (reduce, fill) in enumerate(
+            [(np.minimum, np.inf), (np.maximum, -np.inf),
+             (np.minimum, np.inf), (np.maximum, -np.inf)], start=1):
+        values = np.full(k, fill)
+        reduce.at(values, inverse,
+                  np.concatenate([part[column] for part in parts]))
+        merged.append(values)
+    merged.append(np.bincount(
+        inverse, weights=np.concatenate([part[5] for part in parts]),
+        minlength=k))
+    owner_area = np.zeros((k, parts[0][6].shape[1]))
+    np.add.at(owner_area, inverse,
+              np.concatenate([part[6] for part in parts]))
+    merged.append(owner_area)
+    return merged
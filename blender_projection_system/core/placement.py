@@ -0,0 +1,368 @@
+"""
+Automatic projector placement search.
+
+The search samples candidate placements (a lens position inside one of the
+allowed mounting zones, aimed at a point on the target surface, with the
+widest throw that still meets the brightness requirement), evaluates which
+surface samples every candidate covers and then picks a small subset with a
+lazy greedy set cover followed by a redundancy prune.
+
+A sample only counts as covered when it lands in the inner part of an image
+(inset by half the required overlap on each side), so neighbouring images
+chosen to cover the surface are guaranteed to overlap by at least the
+required fraction of their width.
+
+Candidate evaluation is the expensive part and is spread over a process
+pool in batches. After every finished batch the cover is recomputed from
+the best layout so far and the new batch only, so each update costs the
+same however long the search runs, and the caller can show progress and
+the best layout found so far. Batches are merged in batch order, which
+keeps the search reproducible whatever order the workers finish in.
+"""
+
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .frustum import (
+    ProjectorArrays,
+    facing_mask,
+    illuminance,
+    incidence_cosines,
+    inside_image,
+    look_at_rotations,
+    project_points,
+)
+
+# Upper bound on (projectors x samples) elements evaluated at once
+EVALUATION_BUDGET = 2_000_000
+
+
+class PlacementProblem:
+    """
+    Inputs of a placement search, as plain picklable arrays.
+
+    Args:
+        samples: SurfaceSamples on the target surface
+        zones_min: (Z, 3) lower corners of the mounting zone boxes
+        zones_max: (Z, 3) upper corners of the mounting zone boxes
+        throw_ratio_min: Shortest available throw ratio
+        throw_ratio_max: Longest available throw ratio
+        aspect: Image aspect ratio
+        lumens: Projector light output
+        resolution: Native (x, y) resolution
+        min_lux: Minimum illuminance every covered sample must receive
+        overlap: Required blend overlap as a fraction of the image size
+        target_coverage: Fraction of surface area that counts as done
+    """
+
+    def __init__(self, samples, zones_min, zones_max, throw_ratio_min,
+                 throw_ratio_max, aspect, lumens, resolution=(1920, 1080),
+                 min_lux=0.0, overlap=0.15, target_coverage=0.99):
+        self.samples = samples
+        self.zones_min = np.asarray(zones_min, dtype=np.float64).reshape(-1, 3)
+        self.zones_max = np.asarray(zones_max, dtype=np.float64).reshape(-1, 3)
+        if len(self.zones_min) == 0:
+            raise ValueError("At least one mounting zone is required")
+        self.throw_ratio_min = float(throw_ratio_min)
+        self.throw_ratio_max = float(max(throw_ratio_max, throw_ratio_min))
+        self.aspect = float(aspect)
+        self.lumens = float(lumens)
+        self.resolution = tuple(int(r) for r in resolution)
+        self.min_lux = float(min_lux)
+        self.overlap = float(overlap)
+        self.target_coverage = float(target_coverage)
+
+
+class PlacementResult:
+    """A chosen set of placements and how well it covers the surface."""
+
+    def __init__(self, projectors, covered_fraction, candidates_evaluated):
+        self.projectors = projectors
+        self.covered_fraction = covered_fraction
+        self.candidates_evaluated = candidates_evaluated
+
+    @property
+    def projector_count(self):
+        return len(self.projectors)
+
+    def score(self, target_coverage):
+        """Sort key: meeting the target first, then fewest projectors."""
+        if self.covered_fraction >= target_coverage:
+            return (1, -self.projector_count, self.covered_fraction)
+        return (0, self.covered_fraction, -self.projector_count)
+
+
+def generate_candidates(problem, count, rng):
+    """
+    Draw random candidate placements.
+
+    Returns:
+        ProjectorArrays with `count` candidates
+    """
+    extents = np.maximum(problem.zones_max - problem.zones_min, 1e-3)
+    volumes = extents.prod(axis=1)
+    zone = rng.choice(len(volumes), size=count, p=volumes / volumes.sum())
+    origins = (problem.zones_min[zone] +
+               rng.random((count, 3)) * (problem.zones_max[zone] -
+                                         problem.zones_min[zone]))
+
+    weights = problem.samples.weights
+    aim = rng.choice(len(weights), size=count, p=weights / weights.sum())
+    targets = problem.samples.points[aim]
+    rotations = look_at_rotations(origins, targets)
+
+    # Widest image (smallest throw ratio) that still meets the brightness
+    # requirement on the aim point; see frustum.illuminance
+    distance = np.linalg.norm(targets - origins, axis=1)
+    throw_ratio = np.full(count, problem.throw_ratio_min)
+    if problem.min_lux > 0 and problem.lumens > 0:
+        bright = distance * np.sqrt(
+            problem.min_lux / (problem.lumens * problem.aspect))
+        throw_ratio = np.maximum(throw_ratio, bright)
+    throw_ratio = np.minimum(throw_ratio, problem.throw_ratio_max)
+
+    return ProjectorArrays(origins, rotations, throw_ratio, problem.aspect,
+                           resolution=problem.resolution,
+                           lumens=problem.lumens)
+
+
+def evaluate_candidates(problem, candidates):
+    """
+    Coverage of every candidate, bit-packed along the samples axis.
+
+    Returns:
+        (K, ceil(M / 8)) uint8 array from np.packbits
+    """
+    samples = problem.samples
+    m = len(samples)
+    rows = max(1, EVALUATION_BUDGET // max(m, 1))
+    packed = []
+    for start in range(0, len(candidates), rows):
+        chunk = candidates.subset(np.arange(start,
+                                            min(start + rows,
+                                                len(candidates))))
+        u, v, depth = project_points(chunk, samples.points)
+        covered = inside_image(u, v, depth, margin=0.5 * problem.overlap)
+        covered &= facing_mask(chunk, samples.points, samples.normals)
+        if problem.min_lux > 0:
+            cos_surface, cos_axis, _ = incidence_cosines(
+                chunk, samples.points, samples.normals)
+            covered &= illuminance(chunk, depth, cos_surface,
+                                   cos_axis) >= problem.min_lux
+        packed.append(np.packbits(covered, axis=1))
+    return np.concatenate(packed, axis=0)
+
+
+def greedy_cover(coverage, weights, target_weight=None):
+    """
+    Lazy greedy weighted set cover followed by a redundancy prune.
+
+    Args:
+        coverage: (K, M) boolean coverage matrix
+        weights: (M,) sample weights
+        target_weight: Stop once this much weight is covered
+
+    Returns:
+        Tuple (chosen candidate indices, covered weight)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if target_weight is None:
+        target_weight = weights.sum()
+
+    gains = np.zeros(len(coverage))
+    for start in range(0, len(coverage), 256):
+        gains[start:start + 256] = coverage[start:start + 256] @ weights
+
+    # Gains only shrink as samples get covered, so stale heap entries are
+    # upper bounds and only the top entry needs re-evaluating
+    heap = [(-g, i) for i, g in enumerate(gains) if g > 0]
+    heapq.heapify(heap)
+    uncovered = np.ones(len(weights), dtype=bool)
+    covered_weight = 0.0
+    chosen = []
+    while heap and covered_weight < target_weight:
+        _, i = heapq.heappop(heap)
+        gain = weights[coverage[i] & uncovered].sum()
+        if gain <= 1e-12:
+            continue
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, i))
+            continue
+        chosen.append(i)
+        uncovered &= ~coverage[i]
+        covered_weight += gain
+
+    # Drop projectors whose samples are all covered by the others
+    counts = coverage[chosen].sum(axis=0, dtype=np.int32) if chosen else None
+    for i in sorted(chosen, key=lambda c: weights[coverage[c]].sum()):
+        if np.all(counts[coverage[i]] > 1):
+            counts -= coverage[i]
+            chosen.remove(i)
+
+    return chosen, covered_weight
+
+
+def _select(problem, candidates, packed, evaluated):
+    """
+    Run the greedy cover over a set of candidates.
+
+    Returns:
+        Tuple (PlacementResult, packed coverage of the chosen candidates)
+    """
+    weights = problem.samples.weights
+    coverage = np.unpackbits(packed, axis=1, count=len(weights)).astype(bool)
+    total = weights.sum()
+    chosen, covered = greedy_cover(coverage, weights,
+                                   problem.target_coverage * total)
+    chosen = np.asarray(chosen, dtype=int)
+    return (PlacementResult(candidates.subset(chosen),
+                            covered / total if total > 0 else 0.0,
+                            evaluated),
+            packed[chosen])
+
+
+# Worker process state, set once per worker by the pool initializer
+_worker_problem = None
+
+
+def _init_worker(problem):
+    global _worker_problem
+    _worker_problem = problem
+
+
+def _evaluate_batch(batch_index, batch_size, seed, problem=None):
+    problem = problem if problem is not None else _worker_problem
+    rng = np.random.default_rng([seed, batch_index])
+    candidates = generate_candidates(problem, batch_size, rng)
+    return batch_index, candidates, evaluate_candidates(problem, candidates)
+
+
+def _concat_candidates(parts):
+    return ProjectorArrays(
+        np.concatenate([p.origins for p in parts]),
+        np.concatenate([p.rotations for p in parts]),
+        np.concatenate([p.throw_ratio for p in parts]),
+        np.concatenate([p.aspect for p in parts]),
+        np.concatenate([p.shift for p in parts]),
+        np.concatenate([p.resolution for p in parts]),
+        np.concatenate([p.lumens for p in parts]))
+
+
+class PlacementSearch:
+    """
+    Incremental, optionally parallel placement search.
+
+    Call start() once, then poll() repeatedly (e.g. from a modal timer)
+    until it returns True; `best` always holds the best layout found so
+    far. max_workers=0 evaluates batches in the calling process, one batch
+    per poll().
+
+    Args:
+        problem: PlacementProblem
+        candidate_count: Total number of candidates to evaluate
+        batch_size: Candidates per pool task
+        max_workers: Process count (None = one per CPU, 0 = no pool)
+        seed: Seed that makes the search reproducible
+    """
+
+    def __init__(self, problem, candidate_count=4096, batch_size=256,
+                 max_workers=None, seed=0):
+        self.problem = problem
+        self.batch_size = int(batch_size)
+        self.batch_count = max(1, -(-int(candidate_count) // self.batch_size))
+        self.max_workers = max_workers
+        self.seed = int(seed)
+        self.best = None
+        self._executor = None
+        self._futures = []
+        # Finished batches waiting for the ones before them
+        self._pending = {}
+        self._merged = 0
+        self._evaluated = 0
+        # Packed coverage of the best layout's projectors
+        self._best_packed = None
+        self._next_serial = 0
+
+    @property
+    def progress(self):
+        return (self._merged + len(self._pending)) / self.batch_count
+
+    @property
+    def finished(self):
+        return self._merged == self.batch_count
+
+    def start(self):
+        if self.max_workers == 0:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, initializer=_init_worker,
+            initargs=(self.problem,))
+        self._futures = [
+            self._executor.submit(_evaluate_batch, i, self.batch_size,
+                                  self.seed)
+            for i in range(self.batch_count)]
+
+    def poll(self):
+        """Collect finished batches and refresh `best`; True when done."""
+        new = []
+        if self._executor is None:
+            if self._next_serial < self.batch_count:
+                new.append(_evaluate_batch(self._next_serial, self.batch_size,
+                                           self.seed, self.problem))
+                self._next_serial += 1
+        else:
+            pending = []
+            for future in self._futures:
+                if future.done():
+                    new.append(future.result())
+                else:
+                    pending.append(future)
+            self._futures = pending
+
+        for batch_index, candidates, packed in new:
+            self._pending[batch_index] = (candidates, packed)
+        while self._merged in self._pending:
+            self._update_best(*self._pending.pop(self._merged))
+            self._merged += 1
+
+        if self.finished:
+            self.shutdown()
+        return self.finished
+
+    def run(self):
+        """Blocking search; returns the final PlacementResult."""
+        self.start()
+        while not self.poll():
+            if self._executor is not None:
+                # Block on the next batch instead of spinning
+                self._futures[0].result()
+        return self.best
+
+    def cancel(self):
+        for future in self._futures:
+            future.cancel()
+        self.shutdown()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _update_best(self, candidates, packed):
+        """Cover with the best layout so far and one new batch."""
+        self._evaluated += len(candidates)
+        if self.best is not None:
+            candidates = _concat_candidates([self.best.projectors,
+                                             candidates])
+            packed = np.concatenate([self._best_packed, packed], axis=0)
+        result, chosen = _select(self.problem, candidates, packed,
+                                 self._evaluated)
+        target = self.problem.target_coverage
+        if self.best is None or (result.score(target) >=
+                                 self.best.score(target)):
+            self.best = result
+            self._best_packed = chosen
+        else:
+            self.best.candidates_evaluated = self._evaluated
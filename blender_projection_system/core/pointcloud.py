@@ -0,0 +1,405 @@
+"""
+Point-cloud venues: analyses straight on survey points, without meshing.
+
+LiDAR surveys arrive as tens of millions of points. Instead of meshing
+them, the analyses treat every point as a surface sample:
+
+* Binary PLY is memory-mapped and its vertex records are converted in
+  place (see mesh_io); XYZ/PTS text is parsed in newline-aligned chunks by
+  worker processes like OBJ.
+* A sparse voxel grid (cells sorted by their linear key, found again by
+  binary search) replaces a KD-tree. Normals come from one vectorized
+  PCA pass over the point moments of every cell (or of its 3 x 3 x 3
+  neighbourhood when sparse), and every point gets its share of the
+  surface area crossing its cell.
+* Occlusion uses the shadow-map lookups with the points splatted into
+  the projectors' depth maps as squares about one voxel wide, so the
+  surveyed surfaces block light like a closed mesh would.
+"""
+
+import mmap
+import os
+
+import numpy as np
+
+from .frustum import NEAR_CLIP
+from .mesh_io import (PLY_BYTE_ORDER, _numbers_per_line, _ply_vertices,
+                      _record_dtype, default_workers, map_chunks, obj_chunks,
+                      parse_ply_header, read_ply)
+from .sampling import SurfaceSamples
+from .shadowmap import GUARD, ShadowMaps, rasterize_depth, shadow_map_size
+
+# Cells whose neighbourhood moments are summed at once
+CELL_BATCH = 1 << 16
+
+# Largest splat radius in texels; nearer points leave small gaps instead
+# of covering ever larger squares
+MAX_SPLAT = 8
+
+# Splatted texels written at once
+SPLAT_BUDGET = 4_000_000
+
+# Depth slack of the point lookups in voxels, so a surface's own splats
+# (up to about 60 degrees from facing the projector) don't shadow it
+SPLAT_BIAS = 2.0
+
+# Cells with fewer points fit their plane to the 3 x 3 x 3 cells around
+# them instead of their own points
+MIN_CELL_POINTS = 8
+
+# Largest deviation from unit length of XYZ columns read as normals
+NORMAL_TOLERANCE = 1e-2
+
+
+def read_point_cloud(path, workers=None):
+    """
+    Read the points of a PLY, XYZ or PTS file by its extension.
+
+    Returns:
+        Tuple (points (N, 3) float32, normals (N, 3) float32 or None when
+        the file has none)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.ply':
+        return read_ply_points(path, workers)
+    if extension in ('.xyz', '.txt', '.pts'):
+        return read_xyz(path, workers)
+    raise ValueError(f"Unsupported point cloud format: {extension}")
+
+
+def read_ply_points(path, workers=None):
+    """Vertices (and nx, ny, nz normals if present) of a PLY file."""
+    workers = workers or default_workers()
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        file_format, elements, offset = parse_ply_header(data)
+        if file_format != 'ascii':
+            order = PLY_BYTE_ORDER[file_format]
+            for name, count, properties in elements:
+                if name == 'vertex':
+                    points = _ply_vertices(data, offset, count, properties,
+                                           order, workers)
+                    normals = None
+                    if {'nx', 'ny', 'nz'} <= {prop[0] for prop in properties}:
+                        normals = _ply_vertices(data, offset, count,
+                                                properties, order, workers,
+                                                ('nx', 'ny', 'nz'))
+                    return points, normals
+                if any(len(prop) == 3 for prop in properties):
+                    break
+                offset += count * _record_dtype(properties, order).itemsize
+            raise ValueError("PLY file has no vertex element before its lists")
+    # ASCII clouds are rare and small; read their positions only
+    return read_ply(path, workers).vertices, None
+
+
+def parse_xyz_chunk(path, start, stop):
+    """
+    Parse the point lines in bytes [start, stop) of an XYZ/PTS file.
+
+    Lines with fewer than three numbers (the PTS point count) are skipped,
+    as are comment lines starting with '#' or '//'.
+
+    Returns:
+        Tuple (points (n, 3) float32, columns 4-6 (n, 3) float32 or None if
+        some line has fewer than six numbers)
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = np.frombuffer(f.read(stop - start), dtype=np.uint8).copy()
+
+    newlines = np.flatnonzero(data == 10)
+    starts = np.concatenate([[0], newlines + 1])
+    starts = starts[starts < len(data)]
+    lengths = np.diff(np.append(starts, len(data)))
+    comment = (data[starts] == ord('#')) | (data[starts] == ord('/'))
+    if comment.any():
+        blank = np.repeat(comment, lengths) & (data != 10)
+        data[blank] = 32
+
+    values, counts = _numbers_per_line(data.tobytes(), len(starts),
+                                       np.float64)
+    first = (np.cumsum(counts) - counts)[counts >= 3]
+    points = values[first[:, None] + np.arange(3)].astype(np.float32)
+    extra = None
+    if len(first) and counts[counts >= 3].min() >= 6:
+        extra = values[first[:, None] + np.arange(3, 6)].astype(np.float32)
+    return points, extra
+
+
+def read_xyz(path, workers=None):
+    """
+    Read an XYZ or PTS text point cloud.
+
+    Columns 4-6 are taken as normals when every line has them and they
+    have unit length; colours and intensities are ignored.
+    """
+    workers = workers or default_workers()
+    tasks = [(path, start, stop) for start, stop in obj_chunks(path)]
+    parts = map_chunks(parse_xyz_chunk, tasks, workers)
+    if not parts:
+        return np.zeros((0, 3), dtype=np.float32), None
+
+    points = np.concatenate([part[0] for part in parts])
+    normals = None
+    if all(part[1] is not None for part in parts):
+        normals = np.concatenate([part[1] for part in parts])
+        length = np.linalg.norm(normals, axis=1)
+        if len(length) == 0 or np.abs(length - 1.0).max() > NORMAL_TOLERANCE:
+            normals = None
+    return points, normals
+
+
+class VoxelGrid:
+    """
+    Sparse grid of the occupied cells of a point set.
+
+    Args:
+        points: (N, 3) positions
+        cell_size: Edge length of the cubic cells
+
+    Attributes:
+        cells: (C, 3) integer coordinates of the occupied cells, sorted by
+            their linear key
+        cell_start: (C + 1,) CSR offsets into `order`
+        order: (N,) point indices grouped by cell
+        point_cell: (N,) cell of every point
+    """
+
+    def __init__(self, points, cell_size):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.cell_size = float(cell_size)
+        self.origin = points.min(axis=0) if len(points) else np.zeros(3)
+        coords = np.floor((points - self.origin) /
+                          self.cell_size).astype(np.int64)
+        self.dims = coords.max(axis=0) + 1 if len(points) else \
+            np.ones(3, dtype=np.int64)
+
+        keys = self.keys(coords)
+        self.order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[self.order]
+        first = np.ones(len(sorted_keys), dtype=bool)
+        first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        starts = np.flatnonzero(first)
+        self.cell_keys = sorted_keys[starts]
+        self.cells = coords[self.order[starts]]
+        self.cell_start = np.append(starts, len(points))
+        self.point_cell = np.empty(len(points), dtype=np.int64)
+        self.point_cell[self.order] = np.cumsum(first) - 1
+
+    def __len__(self):
+        return len(self.cell_keys)
+
+    @property
+    def counts(self):
+        """(C,) points per cell."""
+        return np.diff(self.cell_start)
+
+    def keys(self, coords):
+        """Linear keys of integer cell coordinates."""
+        return (coords[..., 0] * self.dims[1] + coords[..., 1]) * \
+            self.dims[2] + coords[..., 2]
+
+    def find(self, coords):
+        """Cell index of every integer coordinate, -1 for empty cells."""
+        coords = np.asarray(coords, dtype=np.int64)
+        inside = np.all((coords >= 0) & (coords < self.dims), axis=-1)
+        keys = self.keys(np.where(inside[..., None], coords, 0))
+        if len(self.cell_keys) == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self.cell_keys, keys),
+                           len(self.cell_keys) - 1)
+        return np.where(inside & (self.cell_keys[found] == keys), found, -1)
+
+    def centroids(self, points):
+        """(C, 3) mean position of the points in every cell."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        sums = np.add.reduceat(points[self.order], self.cell_start[:-1],
+                               axis=0) if len(points) else np.zeros((0, 3))
+        return sums / self.counts[:, None]
+
+
+def voxel_downsample(points, voxel_size, normals=None):
+    """
+    One point per occupied voxel, at the mean of the points inside.
+
+    Returns:
+        Tuple (points (C, 3) float32, normals (C, 3) float32 or None)
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    if voxel_size <= 0 or len(points) == 0:
+        return points, normals
+    grid = VoxelGrid(points, voxel_size)
+    reduced = grid.centroids(points).astype(np.float32)
+    if normals is None:
+        return reduced, None
+    sums = np.add.reduceat(np.asarray(normals, dtype=np.float64)[grid.order],
+                           grid.cell_start[:-1], axis=0)
+    length = np.linalg.norm(sums, axis=1, keepdims=True)
+    return reduced, (sums / np.maximum(length, 1e-12)).astype(np.float32)
+
+
+def _cell_moments(grid, points):
+    """(C, 10) point count, coordinate sums and the six product sums."""
+    local = np.asarray(points, dtype=np.float64)[grid.order] - grid.origin
+    x, y, z = local[:, 0], local[:, 1], local[:, 2]
+    columns = np.column_stack([np.ones(len(local)), x, y, z, x * x, x * y,
+                               x * z, y * y, y * z, z * z])
+    return np.add.reduceat(columns, grid.cell_start[:-1], axis=0)
+
+
+def estimate_normals(points, cell_size, viewpoint=None, grid=None):
+    """
+    Unit normals and represented surface area of every point.
+
+    The normal of a cell is the direction of least variance of its points,
+    or of the points in its 3 x 3 x 3 cell neighbourhood when it holds
+    fewer than MIN_CELL_POINTS; every point takes the normal of its cell,
+    turned toward `viewpoint`. A plane crosses about
+    area * |n|_1 / cell_size^2 cells of a grid, so each crossed cell
+    stands for cell_size^2 / |n|_1 of surface, shared by its points.
+
+    Args:
+        points: (N, 3) positions
+        cell_size: Neighbourhood cell size, a few point spacings
+        viewpoint: Position the normals face, e.g. the scanner; the centre
+            of the bounds if None (right for venues scanned from inside)
+        grid: Optional VoxelGrid of the points with this cell size
+
+    Returns:
+        Tuple (normals (N, 3), weights (N,))
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) == 0:
+        return np.zeros((0, 3)), np.zeros(0)
+    if grid is None:
+        grid = VoxelGrid(points, cell_size)
+    if viewpoint is None:
+        viewpoint = 0.5 * (points.min(axis=0) + points.max(axis=0))
+    moments = _cell_moments(grid, points)
+    offsets = np.stack(np.meshgrid(*[np.arange(-1, 2)] * 3, indexing='ij'),
+                       axis=-1).reshape(-1, 3)
+
+    normals = np.zeros((len(grid), 3))
+    for start in range(0, len(grid), CELL_BATCH):
+        cells = grid.cells[start:start + CELL_BATCH]
+        total = moments[start:start + len(cells)].copy()
+        sparse = np.flatnonzero(total[:, 0] < MIN_CELL_POINTS)
+        if len(sparse):
+            total[sparse] = 0.0
+            for offset in offsets:
+                neighbor = grid.find(cells[sparse] + offset)
+                total[sparse] += np.where(neighbor[:, None] >= 0,
+                                          moments[np.maximum(neighbor, 0)],
+                                          0.0)
+        count = total[:, 0]
+        mean = total[:, 1:4] / count[:, None]
+        products = total[:, 4:] / count[:, None]
+        covariance = np.empty((len(cells), 3, 3))
+        for k, (i, j) in enumerate(((0, 0), (0, 1), (0, 2), (1, 1), (1, 2),
+                                    (2, 2))):
+            covariance[:, i, j] = covariance[:, j, i] = \
+                products[:, k] - mean[:, i] * mean[:, j]
+        _, vectors = np.linalg.eigh(covariance)
+        normal = vectors[:, :, 0]
+        # Too few neighbours for a plane: face the viewpoint
+        toward = viewpoint - (grid.origin + mean)
+        lonely = count < 3
+        normal[lonely] = toward[lonely]
+        flip = np.einsum('ij,ij->i', normal, toward) < 0
+        normal[flip] *= -1
+        normals[start:start + len(cells)] = normal / np.maximum(
+            np.linalg.norm(normal, axis=1, keepdims=True), 1e-12)
+
+    cell_area = cell_size ** 2 / np.abs(normals).sum(axis=1)
+    weights = (cell_area / grid.counts)[grid.point_cell]
+    return normals[grid.point_cell], weights
+
+
+def point_samples(points, normals, weights):
+    """SurfaceSamples of a point cloud; `triangles` holds the point index."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return SurfaceSamples(points, normals, weights, np.arange(len(points)))
+
+
+def splat_depth(projectors, index, points, radius, resolution=1024,
+                budget=SPLAT_BUDGET):
+    """
+    Depth buffer of a point cloud seen from one projector.
+
+    Every point covers a square of texels as wide as a sphere of `radius`
+    at its depth (at most MAX_SPLAT texels from its centre), so a dense
+    enough survey leaves no gaps light could slip through.
+
+    Returns:
+        Depth map laid out like rasterize_depth
+    """
+    width, height = shadow_map_size(projectors.aspect[index], resolution)
+    full_width = width + 2 * GUARD
+    full_height = height + 2 * GUARD
+    depth_map = np.full(full_width * full_height, np.inf)
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    local = (points - projectors.origins[index]) @ projectors.rotations[index]
+    depth = -local[:, 1]
+    front = depth > NEAR_CLIP
+    local, depth = local[front], depth[front]
+    tr = projectors.throw_ratio[index]
+    shift_h, shift_v = projectors.shift[index]
+    sx = (0.5 - local[:, 0] / depth * tr - shift_h) * width + GUARD
+    sy = (0.5 + local[:, 2] / depth * tr * projectors.aspect[index]
+          - shift_v) * height + GUARD
+    size = np.clip(np.ceil(radius / depth * tr * width - 0.5), 0,
+                   MAX_SPLAT).astype(np.int64)
+    px = np.floor(sx).astype(np.int64)
+    py = np.floor(sy).astype(np.int64)
+    keep = ((px + size >= 0) & (px - size < full_width) &
+            (py + size >= 0) & (py - size < full_height))
+    px, py, depth, size = px[keep], py[keep], depth[keep], size[keep]
+
+    for k in np.unique(size):
+        group = np.flatnonzero(size == k)
+        steps = np.arange(-k, k + 1)
+        dx = np.tile(steps, len(steps))
+        dy = np.repeat(steps, len(steps))
+        per_block = max(budget // len(dx), 1)
+        for start in range(0, len(group), per_block):
+            block = group[start:start + per_block]
+            x = (px[block, None] + dx).reshape(-1)
+            y = (py[block, None] + dy).reshape(-1)
+            z = np.repeat(depth[block], len(dx))
+            inside = (x >= 0) & (x < full_width) & (y >= 0) & \
+                (y < full_height)
+            np.minimum.at(depth_map, y[inside] * full_width + x[inside],
+                          z[inside])
+    return depth_map.reshape(full_height, full_width).astype(np.float32)
+
+
+class PointShadowMaps(ShadowMaps):
+    """
+    Depth maps of point clouds, and of any triangle meshes among them.
+
+    Args:
+        projectors: ProjectorArrays
+        vertices, triangles: Occluding triangle geometry (may be empty)
+        points: (P, 3) occluding points
+        radius: Splat radius, about the voxel size of the cloud
+        resolution, cache, geometry_key: See ShadowMaps
+    """
+
+    def __init__(self, projectors, vertices, triangles, points, radius,
+                 resolution=1024, cache=None, geometry_key=None):
+        super().__init__(projectors, vertices, triangles, resolution, cache,
+                         geometry_key)
+        self.points = points
+        self.radius = float(radius)
+        self.bias = SPLAT_BIAS * self.radius
+
+    def render(self, index):
+        depth_map = splat_depth(self.projectors, index, self.points,
+                                self.radius, self.resolution)
+        if len(self.triangles):
+            np.minimum(depth_map, rasterize_depth(
+                self.projectors, index, self.vertices, self.triangles,
+                self.resolution), out=depth_map)
+        return depth_map
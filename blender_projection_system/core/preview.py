@@ -0,0 +1,308 @@
+"""
+CPU preview of the combined projection as an audience member sees it.
+
+The environment is rasterized from a viewing camera with the same NumPy
+scanline rasterizer as the shadow maps, giving the visible triangle and
+its depth at every preview pixel. Every projector then lights those
+surface points:
+
+    L = content ** gamma * alpha * E * gain / pi
+
+with E the illuminance of photometry (throw, incidence and vignetting
+falloff), alpha the normalized edge-blend weight the exported blend masks
+apply (see blending.blend_alpha) and content the projector's test pattern
+or image, display encoded. Light from all projectors adds up, so blend
+zones, stacking and shadows show up as they would in the venue.
+
+The viewing camera is described as a one-element ProjectorArrays: a
+pinhole with a throw ratio, aspect and lens shift is the same model.
+"""
+
+import numpy as np
+
+from .blending import edge_weight
+from .frustum import (
+    ProjectorArrays,
+    facing_mask,
+    illuminance,
+    incidence_cosines,
+    inside_image,
+    pixel_rays,
+    project_points,
+)
+from .photometry import vignetting_factor
+from .shadowmap import rasterize_triangles
+
+# Test grid layout, in pixels of a GRID_SIZE square image (matches the
+# "projection_test_grid" image of the projection material)
+GRID_SIZE = 1024
+GRID_SPACING = 128
+GRID_LINE = 2
+GRID_CORNER = 100
+
+# Luminance percentile mapped to white when no white level is given
+AUTO_WHITE_PERCENTILE = 99.0
+
+
+def grid_pattern(u, v):
+    """
+    Test grid colours at normalized image coordinates.
+
+    White grid lines on dark grey with a red, green, blue and yellow
+    square in the bottom left, bottom right, top left and top right
+    corner, so orientation and overlaps can be read off the preview.
+
+    Returns:
+        (..., 3) display encoded RGB
+    """
+    # Texel of the grid image the coordinates fall into
+    x = np.clip(np.floor(np.asarray(u) * GRID_SIZE), 0, GRID_SIZE - 1)
+    y = np.clip(np.floor(np.asarray(v) * GRID_SIZE), 0, GRID_SIZE - 1)
+    colour = np.full(x.shape + (3,), 0.1)
+
+    lines = (x % GRID_SPACING < GRID_LINE) | (y % GRID_SPACING < GRID_LINE)
+    colour[lines] = 1.0
+    left = x < GRID_CORNER
+    right = x > GRID_SIZE - GRID_CORNER
+    bottom = y < GRID_CORNER
+    top = y > GRID_SIZE - GRID_CORNER
+    colour[left & bottom] = (1.0, 0.0, 0.0)
+    colour[right & bottom] = (0.0, 1.0, 0.0)
+    colour[left & top] = (0.0, 0.0, 1.0)
+    colour[right & top] = (1.0, 1.0, 0.0)
+    return colour
+
+
+def sample_image(image, u, v):
+    """
+    Bilinear lookup of an image at normalized coordinates.
+
+    Args:
+        image: (H, W, C) values with row 0 at the bottom (v=0), the
+            order of Blender's image pixels
+        u, v: (M,) normalized image coordinates
+
+    Returns:
+        (M, 3) colours; gray images are repeated into RGB
+    """
+    image = np.asarray(image, dtype=np.float64)
+    if image.ndim == 2:
+        image = image[:, :, None]
+    height, width = image.shape[:2]
+    x = np.clip(np.asarray(u) * width - 0.5, 0, width - 1)
+    y = np.clip(np.asarray(v) * height - 0.5, 0, height - 1)
+    xa = np.minimum(np.floor(x).astype(np.int64), width - 1)
+    ya = np.minimum(np.floor(y).astype(np.int64), height - 1)
+    xb = np.minimum(xa + 1, width - 1)
+    yb = np.minimum(ya + 1, height - 1)
+    fx = (x - xa)[:, None]
+    fy = (y - ya)[:, None]
+    colour = ((image[ya, xa] * (1.0 - fx) + image[ya, xb] * fx) * (1.0 - fy) +
+              (image[yb, xa] * (1.0 - fx) + image[yb, xb] * fx) * fy)
+    if colour.shape[1] < 3:
+        colour = np.repeat(colour[:, :1], 3, axis=1)
+    return colour[:, :3]
+
+
+def camera_view(matrix, lens, sensor_width, sensor_height=None,
+                sensor_fit='AUTO', shift_x=0.0, shift_y=0.0,
+                width=1920, height=1080):
+    """
+    Describe a perspective camera as a one-element ProjectorArrays.
+
+    A camera looks down its local -Z axis with +Y up and +X right; the
+    projector frame looks down -Y with +Z up and -X right.
+
+    Args:
+        matrix: (4, 4) world matrix of the camera
+        lens: Focal length, in the units of the sensor size
+        sensor_width, sensor_height: Sensor size
+        sensor_fit: 'AUTO', 'HORIZONTAL' or 'VERTICAL', as in Blender
+        shift_x, shift_y: Lens shift in units of the fitted sensor size
+        width, height: Output resolution in pixels
+    """
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+    axes = matrix[:3, :3] / np.linalg.norm(matrix[:3, :3], axis=0)
+    rotation = np.stack([-axes[:, 0], axes[:, 2], axes[:, 1]], axis=1)
+
+    aspect = width / float(height)
+    if sensor_fit == 'AUTO':
+        sensor_fit = 'HORIZONTAL' if aspect >= 1.0 else 'VERTICAL'
+        sensor_height = sensor_width
+    if sensor_height is None:
+        sensor_height = sensor_width
+
+    # The fitted sensor edge spans the image width or height, and both
+    # shifts are measured in units of it
+    if sensor_fit == 'HORIZONTAL':
+        throw_ratio = lens / sensor_width
+        shift = (shift_x, shift_y * aspect)
+    else:
+        throw_ratio = lens / (sensor_height * aspect)
+        shift = (shift_x / aspect, shift_y)
+
+    return ProjectorArrays(matrix[:3, 3], rotation, throw_ratio, aspect,
+                           shift, (width, height), names=["Camera"])
+
+
+class PreviewRender:
+    """
+    Result of render_preview.
+
+    Per-pixel (H, W) arrays with row 0 at the bottom: depth along the view
+    axis (inf on the background), triangle (-1 on the background),
+    luminance as (H, W, 3) linear cd/m^2 per colour channel, shading (the
+    cosine between the view ray and the surface, for the ambient term) and
+    projectors (number of projectors lighting the pixel).
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.depth = np.full((height, width), np.inf)
+        self.triangle = np.full((height, width), -1, dtype=np.int64)
+        self.luminance = np.zeros((height, width, 3))
+        self.shading = np.zeros((height, width))
+        self.projectors = np.zeros((height, width), dtype=np.int32)
+
+    def white_level(self):
+        """Luminance shown as white by image() when none is given."""
+        lit = self.projectors > 0
+        if not lit.any():
+            return 1.0
+        level = float(np.percentile(self.luminance[lit].max(axis=1),
+                                    AUTO_WHITE_PERCENTILE))
+        return level if level > 0 else 1.0
+
+    def image(self, white=None, gamma=2.2, ambient=0.05):
+        """
+        Display encoded RGB image.
+
+        Args:
+            white: Luminance (cd/m^2) mapped to full white; the 99th
+                percentile of the lit pixels if None
+            gamma: Display gamma the image is encoded for
+            ambient: Fraction of white added on every surface so unlit
+                geometry stays visible
+
+        Returns:
+            (H, W, 3) values in [0, 1], row 0 at the top
+        """
+        if not white:
+            white = self.white_level()
+        linear = self.luminance / white
+        linear += (ambient * self.shading)[:, :, None]
+        linear[self.triangle < 0] = 0.0
+        return np.clip(linear, 0.0, 1.0)[::-1] ** (1.0 / gamma)
+
+
+def render_preview(view, projectors, vertices, triangles, width, height=None,
+                   content=None, blend=None, gain=1.0, visible=None,
+                   gamma=2.2):
+    """
+    Render what a viewing camera sees of the projected result.
+
+    Args:
+        view: One-element ProjectorArrays of the camera (see camera_view)
+        projectors: ProjectorArrays (lumens and vignetting are used)
+        vertices: (V, 3) world positions of the environment
+        triangles: (T, 3) vertex indices
+        width, height: Preview size in pixels; the height follows the
+            camera's aspect if None
+        content: Optional list with one entry per projector: an image
+            (see sample_image) or None for the test pattern
+        blend: Optional (N,) edge blend amounts; the overlaps are blended
+            like the exported masks do. No blending if None
+        gain: Screen gain, scalar or (T,) per triangle
+        visible: Optional occlusion callable (index, points) -> (M,) mask,
+            e.g. ShadowMaps.visible
+        gamma: Projector gamma the content is encoded with
+
+    Returns:
+        PreviewRender
+    """
+    width = int(width)
+    if height is None:
+        height = max(int(round(width / float(view.aspect[0]))), 1)
+    height = int(height)
+    result = PreviewRender(width, height)
+
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    depth, triangle = rasterize_triangles(view, 0, vertices, triangles,
+                                          width, height)
+    result.depth = depth
+    result.triangle = triangle
+    hit = np.flatnonzero(triangle.reshape(-1) >= 0)
+    if len(hit) == 0:
+        return result
+
+    # Surface point and normal behind every covered pixel
+    pu, pv = np.meshgrid((np.arange(width) + 0.5) / width,
+                         (np.arange(height) + 0.5) / height)
+    directions = pixel_rays(view, 0, pu.reshape(-1)[hit], pv.reshape(-1)[hit])
+    points = view.origins[0] + depth.reshape(-1)[hit, None] * directions
+    corners = vertices[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0],
+                            corners[:, 2] - corners[:, 0])
+    face_normals /= np.maximum(np.linalg.norm(face_normals, axis=1,
+                                              keepdims=True), 1e-12)
+    pixel_triangle = triangle.reshape(-1)[hit]
+    normals = face_normals[pixel_triangle]
+    # Only the side the audience looks at can be lit
+    view_cos = np.einsum('ij,ij->i', normals, directions)
+    normals[view_cos > 0] *= -1.0
+    result.shading.reshape(-1)[hit] = np.abs(view_cos) / np.linalg.norm(
+        directions, axis=1)
+
+    gain = np.asarray(gain, dtype=np.float64)
+    pixel_gain = gain[pixel_triangle] if gain.ndim else np.full(len(hit), float(gain))
+
+    if blend is not None:
+        blend = np.broadcast_to(np.asarray(blend, dtype=np.float64),
+                                (len(projectors),))
+    light = np.zeros((len(hit), 3))
+    total_weight = np.zeros(len(hit))
+    count = np.zeros(len(hit), dtype=np.int32)
+    for index in range(len(projectors)):
+        projector = projectors.subset([index])
+        u, v, axial = project_points(projector, points)
+        u, v, axial = u[0], v[0], axial[0]
+        inside = np.flatnonzero(inside_image(u, v, axial))
+        if len(inside) == 0:
+            continue
+
+        lit = facing_mask(projector, points[inside], normals[inside])[0]
+        if visible is not None and lit.any():
+            lit[lit] = visible(index, points[inside[lit]])
+        columns = inside[lit]
+        if len(columns) == 0:
+            continue
+
+        # Blend masks normalize against the projectors lighting the point
+        weight = np.ones(len(columns))
+        if blend is not None:
+            weight = edge_weight(u[columns], v[columns], blend[index])
+            total_weight[columns] += weight
+
+        cos_surface, cos_axis, _ = incidence_cosines(
+            projector, points[columns], normals[columns])
+        lux = illuminance(projector, axial[None, columns], cos_surface,
+                          cos_axis)[0]
+        lux *= vignetting_factor(projector, u[None, columns],
+                                 v[None, columns])[0]
+        image = content[index] if content is not None else None
+        if image is None:
+            colour = grid_pattern(u[columns], v[columns])
+        else:
+            colour = sample_image(image, u[columns], v[columns])
+        light[columns] += (np.clip(colour, 0.0, None) ** gamma *
+                           (weight * lux * pixel_gain[columns] /
+                            np.pi)[:, None])
+        count[columns] += 1
+
+    if blend is not None:
+        light /= np.where(total_weight > 1e-12, total_weight, 1.0)[:, None]
+    result.luminance.reshape(-1, 3)[hit] = light
+    result.projectors.reshape(-1)[hit] = count
+    return result
@@ -0,0 +1,157 @@
+"""
+Decimated analysis proxies of heavy environment meshes.
+
+Photogrammetry scans of a venue easily carry tens of millions of triangles,
+far more than the analyses need: occlusion and coverage only care about
+surfaces at the scale of a projector pixel footprint. A proxy is built by
+vertex clustering:
+
+1. weld: vertices closer than a small distance (split UV seams, duplicated
+   scan tiles) are merged so the mesh becomes connected, then
+2. decimate: all vertices inside one cell of a uniform grid collapse to
+   their mean, and triangles that lost a corner to the collapse disappear.
+
+The grid size is searched so the proxy lands near a triangle budget.
+Vertex clustering is not shape-optimal, but it is fully vectorized and
+bounded by the cell size: no surface moves by more than one cell diagonal.
+"""
+
+import numpy as np
+
+from .sampling import triangle_areas_normals
+
+# Grid size refinements when searching for a triangle budget
+DECIMATE_ITERATIONS = 8
+
+# Accepted overshoot of the triangle budget
+DECIMATE_SLACK = 1.1
+
+
+def cluster_vertices(vertices, triangles, cell_size):
+    """
+    Collapse the vertices inside each grid cell to their mean.
+
+    Args:
+        vertices: (V, 3) positions
+        triangles: (T, 3) vertex indices
+        cell_size: Grid cell edge length
+
+    Returns:
+        Tuple (vertices (V', 3), triangles (T', 3)) with degenerate and
+        duplicate triangles and unused vertices removed
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    if len(vertices) == 0 or len(triangles) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+
+    cells = np.floor((vertices - vertices.min(axis=0)) /
+                     max(cell_size, 1e-12)).astype(np.int64)
+    _, cluster = unique_rows(cells, cells.max(axis=0) + 1, inverse=True)
+    count = np.bincount(cluster)
+    merged = np.column_stack([
+        np.bincount(cluster, weights=vertices[:, axis]) / count
+        for axis in range(3)])
+    return compact_triangles(merged, cluster[triangles])
+
+
+def compact_triangles(vertices, triangles):
+    """
+    Drop degenerate and duplicate triangles, then unused vertices.
+
+    Triangles with the same corners in opposite orders are both kept: they
+    are the two sides of a thin wall.
+    """
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    a, b, c = triangles.T
+    triangles = triangles[(a != b) & (b != c) & (c != a)]
+
+    # Rotate each triangle to start at its smallest index, keeping its winding
+    first = np.argmin(triangles, axis=1)
+    rotation = (first[:, None] + np.arange(3)) % 3
+    canonical = np.take_along_axis(triangles, rotation, axis=1)
+    keep, _ = unique_rows(canonical, np.full(3, len(vertices)))
+    triangles = triangles[np.sort(keep)]
+
+    used, remap = np.unique(triangles, return_inverse=True)
+    return (np.asarray(vertices)[used],
+            remap.reshape(-1, 3).astype(np.int64))
+
+
+def unique_rows(rows, sizes, inverse=False):
+    """
+    np.unique over the rows of a (K, C) non-negative integer array.
+
+    Rows are packed into one int64 key when the value ranges `sizes`
+    allow it, which is many times faster than np.unique(axis=0).
+
+    Returns:
+        Tuple (index of the first occurrence of every unique row, inverse
+        index of every row or None)
+    """
+    sizes = [int(size) for size in sizes]
+    if np.prod([float(size) for size in sizes]) < 2.0 ** 62:
+        key = rows[:, 0]
+        for column in range(1, rows.shape[1]):
+            key = key * sizes[column] + rows[:, column]
+        result = np.unique(key, return_index=True, return_inverse=inverse)
+    else:
+        result = np.unique(rows, axis=0, return_index=True,
+                           return_inverse=inverse)
+    first = result[1]
+    return first, result[2].reshape(-1) if inverse else None
+
+
+def weld_vertices(vertices, triangles, distance):
+    """Merge vertices closer than about `distance`, see cluster_vertices."""
+    return cluster_vertices(vertices, triangles, distance)
+
+
+def decimate(vertices, triangles, target_triangles,
+             iterations=DECIMATE_ITERATIONS):
+    """
+    Cluster the mesh down to roughly `target_triangles` triangles.
+
+    A closed-form first guess (a grid of cells holds two triangles per
+    cell of surface) is corrected by the square root of the overshoot
+    until the result fits the budget within DECIMATE_SLACK.
+
+    Returns:
+        Tuple (vertices, triangles, cell size used; 0 if none was needed)
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    target = max(int(target_triangles), 1)
+    if len(triangles) <= target:
+        return vertices, triangles, 0.0
+
+    areas, _ = triangle_areas_normals(vertices, triangles)
+    cell = np.sqrt(2.0 * areas.sum() / target)
+    result = (vertices, triangles)
+    for _ in range(iterations):
+        result = cluster_vertices(vertices, triangles, cell)
+        count = len(result[1])
+        if count <= target * DECIMATE_SLACK:
+            break
+        cell *= np.sqrt(count / target)
+    return result[0], result[1], float(cell)
+
+
+def proxy_mesh(vertices, triangles, target_triangles, weld_distance=1e-3):
+    """
+    Welded and decimated analysis mesh.
+
+    Args:
+        vertices: (V, 3) positions
+        triangles: (T, 3) vertex indices
+        target_triangles: Triangle budget of the proxy
+        weld_distance: Vertices closer than this are merged first
+
+    Returns:
+        Tuple (vertices, triangles, decimation cell size; 0 if the welded
+        mesh already fit the budget)
+    """
+    if weld_distance > 0:
+        vertices, triangles = weld_vertices(vertices, triangles,
+                                            weld_distance)
+    return decimate(vertices, triangles, target_triangles)
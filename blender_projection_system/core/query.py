@@ -0,0 +1,218 @@
+"""
+Spatial queries between projectors and points or surfaces.
+
+Interactive tools ask the same questions again and again: which projectors
+light the point under the mouse, which projectors touch these faces, which
+surfaces does this projector land on. Looping over every projector (or
+every triangle) per question does not scale to large rigs and venues, so
+a ProjectorQuery keeps a bounding volume hierarchy over the projectors'
+frusta, truncated at a far distance:
+
+1. candidate (point, projector) or (triangle, projector) pairs come from
+   the hierarchy's box overlap query, then
+2. every candidate pair gets the exact frustum test, per pair instead of
+   as a (projectors x points) block: the outcodes of the image border and
+   near planes, plus an optional facing test.
+
+Surfaces a projector lands on come from the same box query against the
+environment's TriangleBVH, with the projector's frustum box as the query.
+Occlusion is not part of the frustum test; pass a visibility callable to
+include it.
+"""
+
+import numpy as np
+
+from .adaptive import local_outcodes
+from .frustum import pixel_rays
+from .raycast import BoxHierarchy
+
+# Normalized image corners of the frustum boxes
+FRUSTUM_CORNERS = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+
+
+class ProjectorQuery:
+    """
+    Frustum hierarchy answering point and surface queries.
+
+    Args:
+        projectors: ProjectorArrays
+        far: Scalar or (N,) axial distance beyond which projectors are not
+            reported, e.g. the far side of the venue
+        leaf_size: Maximum frusta per leaf
+    """
+
+    def __init__(self, projectors, far, leaf_size=2):
+        self.projectors = projectors
+        n = len(projectors)
+        self.far = np.broadcast_to(np.asarray(far, dtype=np.float64),
+                                   (n,)).copy()
+        corners = self.frustum_corners()
+        self.hierarchy = BoxHierarchy(corners.min(axis=1),
+                                      corners.max(axis=1), leaf_size)
+
+    def __len__(self):
+        return len(self.projectors)
+
+    def frustum_corners(self, index=None):
+        """(N, 5, 3) lens and far image corners of the frusta."""
+        index = np.arange(len(self.projectors)) if index is None else \
+            np.atleast_1d(index)
+        corners = np.zeros((len(index), 5, 3))
+        for row, i in enumerate(index):
+            rays = pixel_rays(self.projectors, i, FRUSTUM_CORNERS[:, 0],
+                              FRUSTUM_CORNERS[:, 1])
+            corners[row, 0] = self.projectors.origins[i]
+            corners[row, 1:] = self.projectors.origins[i] + rays * self.far[i]
+        return corners
+
+    def pair_outcodes(self, points, index, margin=0.0):
+        """
+        Frustum outcodes of points[k] against projector index[k].
+
+        Besides the bits of frustum_outcodes, bit 5 is set beyond the far
+        distance.
+        """
+        p = self.projectors
+        rotations = p.rotations[index]
+        offset = np.asarray(points, dtype=np.float64) - p.origins[index]
+        local = np.einsum('kij,ki->kj', rotations, offset)
+        depth = -local[:, 1]
+        codes = local_outcodes(local[:, 0], depth, local[:, 2],
+                               p.throw_ratio[index], p.aspect[index],
+                               p.shift[index, 0], p.shift[index, 1], margin)
+        codes |= (depth > self.far[index]).astype(np.uint8) << np.uint8(5)
+        return codes
+
+    def point_pairs(self, points, normals=None, visible=None):
+        """
+        Every (point, projector) pair where the projector lights the point.
+
+        Args:
+            points: (K, 3) world positions
+            normals: Optional (K, 3) normals; back faces are not lit
+            visible: Optional callable (projector index, (M, 3) points) ->
+                (M,) mask for occlusion, called once per projector
+
+        Returns:
+            Tuple (point indices, projector indices), sorted by point
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        point, projector = self.hierarchy.overlapping(points, points)
+        lit = self.pair_outcodes(points[point], projector) == 0
+        if normals is not None:
+            normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+            toward = self.projectors.origins[projector] - points[point]
+            lit &= np.einsum('ij,ij->i', toward, normals[point]) > 0
+        point = point[lit]
+        projector = projector[lit]
+        if visible is not None and len(point):
+            keep = np.ones(len(point), dtype=bool)
+            for index in np.unique(projector):
+                pairs = np.flatnonzero(projector == index)
+                keep[pairs] = visible(int(index), points[point[pairs]])
+            point = point[keep]
+            projector = projector[keep]
+        return point, projector
+
+    def projectors_at(self, points, normals=None, visible=None):
+        """
+        Projectors lighting every point, as CSR arrays.
+
+        Returns:
+            Tuple (indptr (K + 1,), projector indices): the projectors of
+            point k are indices[indptr[k]:indptr[k + 1]]
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        point, projector = self.point_pairs(points, normals, visible)
+        indptr = np.zeros(len(points) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(point, minlength=len(points)),
+                  out=indptr[1:])
+        return indptr, projector
+
+    def triangle_pairs(self, vertices, triangles, facing=True):
+        """
+        Every (triangle, projector) pair where the triangle may be lit.
+
+        A triangle counts when no frustum plane has all its corners
+        outside, which keeps every touching triangle and, rarely, one
+        passing just outside a frustum's corner edge.
+
+        Args:
+            vertices: (V, 3) positions
+            triangles: (T, 3) vertex indices, e.g. a face set
+            facing: Skip projectors behind the triangle's front face
+
+        Returns:
+            Tuple (triangle indices, projector indices), sorted by triangle
+        """
+        corners = np.asarray(vertices, dtype=np.float64)[
+            np.asarray(triangles, dtype=np.int64).reshape(-1, 3)]
+        triangle, projector = self.hierarchy.overlapping(
+            corners.min(axis=1), corners.max(axis=1))
+        return self._touching(corners, triangle, projector, facing)
+
+    def _touching(self, corners, triangle, projector, facing):
+        """Exact per-pair frustum (and facing) test of candidate pairs."""
+        codes = np.stack([self.pair_outcodes(corners[triangle, k], projector)
+                          for k in range(3)], axis=1)
+        touching = np.bitwise_and.reduce(codes, axis=1) == 0
+        if facing:
+            a, b, c = (corners[triangle, k] for k in range(3))
+            normal = np.cross(b - a, c - a)
+            toward = self.projectors.origins[projector] - a
+            touching &= np.einsum('ij,ij->i', toward, normal) > 0
+        return triangle[touching], projector[touching]
+
+    def projectors_touching(self, vertices, triangles, facing=True):
+        """Indices of the projectors that may light any of the triangles."""
+        _, projector = self.triangle_pairs(vertices, triangles, facing)
+        return np.unique(projector)
+
+    def surface_triangles(self, index, bvh, facing=True, visible=None):
+        """
+        Environment triangles projector `index` lands on.
+
+        Args:
+            index: Projector index
+            bvh: TriangleBVH of the environment
+            facing: Skip triangles turned away from the projector
+            visible: Optional callable (projector index, (M, 3) points) ->
+                (M,) mask; triangles whose centroid is hidden are dropped
+
+        Returns:
+            Sorted triangle indices into the BVH's triangles
+        """
+        corners = self.frustum_corners(index)[0]
+        _, candidates = bvh.overlapping(corners.min(axis=0)[None],
+                                        corners.max(axis=0)[None])
+        if len(candidates) == 0:
+            return candidates
+        data = bvh.triangle_data[bvh.item_position[candidates]]
+        triangle_corners = np.stack([data[:, 0], data[:, 0] + data[:, 1],
+                                     data[:, 0] + data[:, 2]], axis=1)
+        projector = np.full(len(candidates), index, dtype=np.int64)
+        kept, _ = self._touching(triangle_corners,
+                                 np.arange(len(candidates)), projector,
+                                 facing)
+        if visible is not None and len(kept):
+            centroids = triangle_corners[kept].mean(axis=1)
+            kept = kept[visible(index, centroids)]
+        return np.sort(candidates[kept])
+
+    def surfaces(self, index, bvh, triangle_object, facing=True,
+                 visible=None):
+        """
+        Environment objects projector `index` lands on, by triangle count.
+
+        Args:
+            triangle_object: (T,) object index of every BVH triangle
+
+        Returns:
+            Tuple (object indices, triangles per object), most triangles
+            first
+        """
+        triangles = self.surface_triangles(index, bvh, facing, visible)
+        objects, counts = np.unique(np.asarray(triangle_object)[triangles],
+                                    return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        return objects[order], counts[order]
@@ -0,0 +1,492 @@
+"""
+Batched ray casting against triangle meshes with a NumPy BVH.
+
+The hierarchy is a linear BVH: triangles are sorted along a Morton curve
+of their centroids and split in halves until the leaves hold at most
+`leaf_size` triangles, so the whole build is a handful of vectorized
+passes. Traversal runs all rays of a batch in lock step: every iteration
+each ray pops one node from its own stack, tests the children's boxes
+(pushing the nearer child last) or intersects the leaf's triangles, and
+rays whose stack is empty drop out. Boxes beyond the closest hit so far
+are skipped, and any-hit queries stop at the first hit.
+"""
+
+import numpy as np
+
+from .sampling import spatial_order
+
+# Rays traced together; bounds the per-iteration temporaries
+RAY_BATCH = 65536
+
+# Box queries descending the tree together
+QUERY_BATCH = 16384
+
+# Hits closer than this to the ray origin are ignored (self intersection)
+RAY_EPSILON = 1e-6
+
+# Barycentric slack so rays through shared edges hit one of the triangles
+EDGE_EPSILON = 1e-9
+
+
+class RayHits:
+    """
+    Closest hits of R rays.
+
+    Attributes:
+        distance: (R,) ray parameter of the hit (inf for misses)
+        triangle: (R,) index of the hit triangle in the input order, -1 for
+            misses
+        barycentric: (R, 2) weights of the triangle's 2nd and 3rd vertex
+    """
+
+    def __init__(self, count):
+        self.distance = np.full(count, np.inf)
+        self.triangle = np.full(count, -1, dtype=np.int64)
+        self.barycentric = np.zeros((count, 2))
+
+    def __len__(self):
+        return len(self.distance)
+
+    @property
+    def hit(self):
+        return self.triangle >= 0
+
+    def points(self, origins, directions):
+        """World positions of the hits (undefined for misses)."""
+        distance = np.where(self.hit, self.distance, 0.0)
+        return origins + directions * distance[:, None]
+
+    def interpolate(self, corner_values):
+        """
+        Interpolate per-corner triangle data at the hits.
+
+        Args:
+            corner_values: (T, 3, K) values at each triangle's corners
+
+        Returns:
+            (R, K) values, zero for misses
+        """
+        triangle = np.maximum(self.triangle, 0)
+        values = corner_values[triangle]
+        b1 = self.barycentric[:, 0, None]
+        b2 = self.barycentric[:, 1, None]
+        result = (1.0 - b1 - b2) * values[:, 0] + b1 * values[:, 1] + \
+            b2 * values[:, 2]
+        return np.where(self.hit[:, None], result, 0.0)
+
+
+class BoxHierarchy:
+    """
+    Linear bounding volume hierarchy over axis-aligned boxes.
+
+    Args:
+        lo, hi: (K, 3) box corners
+        leaf_size: Maximum boxes per leaf
+        centroids: Optional (K, 3) points ordering the boxes (box centres
+            if None)
+        keep_boxes: Keep the item boxes for the exact test of overlapping();
+            subclasses that can rebuild them from their own data pass False
+    """
+
+    def __init__(self, lo, hi, leaf_size=4, centroids=None, keep_boxes=True):
+        lo = np.asarray(lo, dtype=np.float64).reshape(-1, 3)
+        hi = np.asarray(hi, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = max(int(leaf_size), 1)
+        self.item_count = len(lo)
+        if centroids is None:
+            centroids = 0.5 * (lo + hi)
+        self.item_index = self._split(np.asarray(centroids, dtype=np.float64))
+        # Leaf order position of every item, the inverse of item_index
+        self.item_position = np.empty(self.item_count, dtype=np.int64)
+        self.item_position[self.item_index] = np.arange(self.item_count)
+        lo = lo[self.item_index]
+        hi = hi[self.item_index]
+        self._bounds(lo, hi)
+        self._item_lo = lo if keep_boxes else None
+        self._item_hi = hi if keep_boxes else None
+
+    def __len__(self):
+        return self.item_count
+
+    def _split(self, centroids):
+        """
+        Build the tree topology by median splits, one level at a time.
+
+        Every range above leaf size is split at its median along the
+        longest axis of its centroids, so both halves stay compact.
+
+        Returns:
+            Permutation of the items into leaf order
+        """
+        count = self.item_count
+        order = spatial_order(centroids, bits=16)
+        centroids = centroids[order]
+        starts = [np.zeros(1, dtype=np.int64)]
+        ends = [np.full(1, count, dtype=np.int64)]
+        left = []
+        level_offset = 0
+
+        while True:
+            start, end = starts[-1], ends[-1]
+            split = (end - start) > self.leaf_size
+            child_left = np.full(len(start), -1, dtype=np.int64)
+            n_split = int(split.sum())
+            next_offset = level_offset + len(start)
+            child_left[split] = next_offset + 2 * np.arange(n_split)
+            left.append(child_left)
+            if n_split == 0:
+                break
+
+            # Sort each split range along its longest centroid axis
+            s_start = start[split]
+            s_end = end[split]
+            lengths = s_end - s_start
+            segment = np.repeat(np.arange(n_split), lengths)
+            position = (np.repeat(s_start - np.cumsum(lengths) + lengths,
+                                  lengths) + np.arange(lengths.sum()))
+            points = centroids[position]
+            lo = np.minimum.reduceat(points, np.cumsum(lengths) - lengths)
+            hi = np.maximum.reduceat(points, np.cumsum(lengths) - lengths)
+            axis = (hi - lo).argmax(axis=1)
+            key = points[np.arange(len(position)), axis[segment]]
+            permutation = position[np.lexsort((key, segment))]
+            order[position] = order[permutation]
+            centroids[position] = centroids[permutation]
+
+            mid = (s_start + s_end) // 2
+            starts.append(np.stack([s_start, mid], axis=1).reshape(-1))
+            ends.append(np.stack([mid, s_end], axis=1).reshape(-1))
+            level_offset = next_offset
+
+        self._levels = [len(level) for level in starts]
+        self.node_start = np.concatenate(starts)
+        self.node_end = np.concatenate(ends)
+        self.node_left = np.concatenate(left)
+        return order
+
+    def _bounds(self, tri_lo, tri_hi):
+        """Node boxes from the item boxes (in leaf order)."""
+        count = self.item_count
+        leaf = self.node_left < 0
+        node_count = len(self.node_start)
+
+        self.node_lo = np.zeros((node_count, 3))
+        self.node_hi = np.zeros((node_count, 3))
+        if count == 0:
+            self.node_lo[:] = np.inf
+            self.node_hi[:] = -np.inf
+            self.child_bounds = np.zeros((node_count, 2, 2, 3))
+            return
+
+        # Leaves partition the sorted items in order of their start
+        leaf_nodes = np.flatnonzero(leaf)
+        leaf_nodes = leaf_nodes[np.argsort(self.node_start[leaf_nodes])]
+        leaf_starts = self.node_start[leaf_nodes]
+        self.node_lo[leaf_nodes] = np.minimum.reduceat(tri_lo, leaf_starts)
+        self.node_hi[leaf_nodes] = np.maximum.reduceat(tri_hi, leaf_starts)
+
+        # Internal bounds bottom-up, one level at a time
+        level_starts = np.cumsum([0] + self._levels)
+        for first, last in zip(level_starts[-2::-1], level_starts[:0:-1]):
+            nodes = np.arange(first, last)
+            nodes = nodes[~leaf[nodes]]
+            child = self.node_left[nodes]
+            self.node_lo[nodes] = np.minimum(self.node_lo[child],
+                                             self.node_lo[child + 1])
+            self.node_hi[nodes] = np.maximum(self.node_hi[child],
+                                             self.node_hi[child + 1])
+
+        # Pad every box a little so rays grazing shared edges and flat
+        # (zero thickness) boxes aren't lost to rounding in the slab test
+        pad = 1e-7 * max(float(np.max(self.node_hi[0] - self.node_lo[0])),
+                         1e-3)
+        self.node_lo -= pad
+        self.node_hi += pad
+
+        # Both children's boxes per internal node, (nodes, 2, 2, 3) as
+        # [child][lo/hi][axis], so traversal gathers them in one go
+        self.child_bounds = np.zeros((node_count, 2, 2, 3))
+        internal = np.flatnonzero(~leaf)
+        child = self.node_left[internal]
+        for k in range(2):
+            self.child_bounds[internal, k, 0] = self.node_lo[child + k]
+            self.child_bounds[internal, k, 1] = self.node_hi[child + k]
+
+    def item_bounds(self, items):
+        """(lo, hi) boxes of items given by their leaf order position."""
+        return self._item_lo[items], self._item_hi[items]
+
+    def overlapping(self, lo, hi, batch_size=QUERY_BATCH):
+        """
+        Every (query, item) pair of overlapping boxes.
+
+        The queries descend the tree together, level by level; a point
+        query is a box with lo == hi.
+
+        Args:
+            lo, hi: (Q, 3) query boxes
+            batch_size: Queries descending together
+
+        Returns:
+            Tuple (query indices, item indices), sorted by query
+        """
+        lo = np.asarray(lo, dtype=np.float64).reshape(-1, 3)
+        hi = np.asarray(hi, dtype=np.float64).reshape(-1, 3)
+        queries = []
+        items = []
+        if self.item_count == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        for start in range(0, len(lo), batch_size):
+            query = np.arange(start, min(start + batch_size, len(lo)))
+            node = np.zeros(len(query), dtype=np.int64)
+            while len(query):
+                inside = (np.all(lo[query] <= self.node_hi[node], axis=1) &
+                          np.all(hi[query] >= self.node_lo[node], axis=1))
+                query = query[inside]
+                node = node[inside]
+                leaf = self.node_left[node] < 0
+
+                # Leaves: test the boxes of their items
+                leaf_query = query[leaf]
+                first = self.node_start[node[leaf]]
+                size = self.node_end[node[leaf]] - first
+                pair_query = np.repeat(leaf_query, size)
+                position = (np.repeat(first - np.cumsum(size) + size, size) +
+                            np.arange(size.sum()))
+                item_lo, item_hi = self.item_bounds(position)
+                hit = (np.all(lo[pair_query] <= item_hi, axis=1) &
+                       np.all(hi[pair_query] >= item_lo, axis=1))
+                queries.append(pair_query[hit])
+                items.append(position[hit])
+
+                # Internal nodes: descend into both children
+                child = self.node_left[node[~leaf]]
+                query = np.repeat(query[~leaf], 2)
+                node = np.stack([child, child + 1], axis=1).reshape(-1)
+
+        queries = np.concatenate(queries)
+        items = self.item_index[np.concatenate(items)]
+        order = np.argsort(queries, kind='stable')
+        return queries[order], items[order]
+
+
+class TriangleBVH(BoxHierarchy):
+    """
+    Bounding volume hierarchy over a triangle soup.
+
+    Args:
+        vertices: (V, 3) positions
+        triangles: (T, 3) vertex indices
+        leaf_size: Maximum triangles per leaf
+    """
+
+    def __init__(self, vertices, triangles, leaf_size=4):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        corners = vertices[triangles]
+        super().__init__(corners.min(axis=1), corners.max(axis=1), leaf_size,
+                         centroids=corners.mean(axis=1), keep_boxes=False)
+        self.triangle_count = self.item_count
+        self.triangle_index = self.item_index
+        corners = corners[self.item_index]
+        # (T, 3, 3): first vertex and the two edges, gathered together
+        self.triangle_data = np.stack([corners[:, 0],
+                                       corners[:, 1] - corners[:, 0],
+                                       corners[:, 2] - corners[:, 0]], axis=1)
+
+    def item_bounds(self, items):
+        """Triangle boxes rebuilt from the gathered corner data."""
+        data = self.triangle_data[items]
+        corners = np.stack([data[:, 0], data[:, 0] + data[:, 1],
+                            data[:, 0] + data[:, 2]], axis=1)
+        return corners.min(axis=1), corners.max(axis=1)
+
+    def ray_cast(self, origins, directions, max_distance=np.inf,
+                 any_hit=False, batch_size=RAY_BATCH):
+        """
+        Closest (or any) hit of every ray.
+
+        Args:
+            origins: (R, 3) ray origins
+            directions: (R, 3) ray directions (need not be normalized; the
+                distance is in units of the direction's length)
+            max_distance: Scalar or (R,) upper bound on the hit distance
+            any_hit: Stop at the first hit found (occlusion queries)
+            batch_size: Rays traced together
+
+        Returns:
+            RayHits
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        count = len(origins)
+        max_distance = np.broadcast_to(
+            np.asarray(max_distance, dtype=np.float64), (count,))
+        hits = RayHits(count)
+        if count == 0 or self.triangle_count == 0:
+            return hits
+
+        for start in range(0, count, batch_size):
+            sl = slice(start, min(start + batch_size, count))
+            self._trace(origins[sl], directions[sl], max_distance[sl],
+                        any_hit, hits, sl)
+        hits.triangle = np.where(hits.triangle >= 0,
+                                 self.triangle_index[
+                                     np.maximum(hits.triangle, 0)], -1)
+        return hits
+
+    def occluded(self, origins, targets, epsilon=1e-4):
+        """
+        Mask of segments origin -> target blocked by a triangle.
+
+        The last `epsilon` of each segment is excluded so a target lying
+        on a surface does not occlude itself.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        targets = np.asarray(targets, dtype=np.float64).reshape(-1, 3)
+        directions = targets - origins
+        length = np.linalg.norm(directions, axis=1)
+        limit = np.maximum(1.0 - epsilon / np.maximum(length, 1e-12), 0.0)
+        return self.ray_cast(origins, directions, limit, any_hit=True).hit
+
+    @staticmethod
+    def _slabs(lo, hi, scaled_origin, inverse, limit):
+        """
+        Entry distance of rays into boxes, inf where a box is missed.
+
+        Works component by component; lo/hi are (..., 3) and the ray terms
+        broadcast against them.
+        """
+        near = np.zeros(lo.shape[:-1])
+        far = limit
+        for axis in range(3):
+            t1 = lo[..., axis] * inverse[..., axis] - scaled_origin[..., axis]
+            t2 = hi[..., axis] * inverse[..., axis] - scaled_origin[..., axis]
+            near = np.maximum(near, np.minimum(t1, t2))
+            far = np.minimum(far, np.maximum(t1, t2))
+        return np.where(near <= far, near, np.inf)
+
+    def _trace(self, origins, directions, max_distance, any_hit, hits, sl):
+        count = len(origins)
+        # Zero components get a huge finite inverse so no NaNs appear in
+        # the slab tests
+        safe = np.where(np.abs(directions) > 1e-300, directions,
+                        np.where(directions < 0, -1e-300, 1e-300))
+        inverse = 1.0 / safe
+        scaled_origin = origins * inverse
+        best = max_distance.copy()
+        best_tri = np.full(count, -1, dtype=np.int64)
+        best_bary = np.zeros((count, 2))
+
+        depth = 2 * int(np.ceil(np.log2(max(len(self.node_start), 2)))) + 4
+        stack = np.zeros((count, depth), dtype=np.int64)
+        pointer = np.zeros(count, dtype=np.int64)
+        root_hit = np.isfinite(self._slabs(self.node_lo[0], self.node_hi[0],
+                                           scaled_origin, inverse, best))
+        pointer[root_hit] = 1
+
+        rays = np.flatnonzero(pointer)
+        while len(rays):
+            pointer[rays] -= 1
+            nodes = stack[rays, pointer[rays]]
+            is_leaf = self.node_left[nodes] < 0
+
+            # Leaves: intersect up to leaf_size triangles per ray
+            leaf_rays = rays[is_leaf]
+            if len(leaf_rays):
+                self._intersect_leaves(leaf_rays, nodes[is_leaf], origins,
+                                       directions, best, best_tri, best_bary)
+                if any_hit:
+                    pointer[leaf_rays[best_tri[leaf_rays] >= 0]] = 0
+
+            # Internal nodes: test both children, push the nearer last
+            inner_rays = rays[~is_leaf]
+            if len(inner_rays):
+                inner_nodes = nodes[~is_leaf]
+                bounds = self.child_bounds[inner_nodes]
+                near = self._slabs(bounds[:, :, 0], bounds[:, :, 1],
+                                   scaled_origin[inner_rays, None],
+                                   inverse[inner_rays, None],
+                                   best[inner_rays, None])
+                child = self.node_left[inner_nodes]
+                b_first = near[:, 1] < near[:, 0]
+                first = child + b_first
+                second = child + ~b_first
+                first_near = np.where(b_first, near[:, 1], near[:, 0])
+                second_near = np.where(b_first, near[:, 0], near[:, 1])
+
+                # Push the farther child first so the nearer pops next
+                hit = np.isfinite(second_near)
+                push = inner_rays[hit]
+                stack[push, pointer[push]] = second[hit]
+                pointer[push] += 1
+                hit = np.isfinite(first_near)
+                push = inner_rays[hit]
+                stack[push, pointer[push]] = first[hit]
+                pointer[push] += 1
+
+            rays = rays[pointer[rays] > 0]
+
+        found = best_tri >= 0
+        index = np.arange(sl.start, sl.stop)[found]
+        hits.distance[index] = best[found]
+        hits.triangle[index] = best_tri[found]
+        hits.barycentric[index] = best_bary[found]
+
+    def _intersect_leaves(self, rays, nodes, origins, directions, best,
+                          best_tri, best_bary):
+        """Moller-Trumbore against every triangle of each ray's leaf."""
+        start = self.node_start[nodes]
+        size = self.node_end[nodes] - start
+        for k in range(int(size.max())):
+            valid = k < size
+            r = rays[valid]
+            tri = start[valid] + k
+            d = directions[r]
+            corners = self.triangle_data[tri]
+            v0 = corners[:, 0]
+            e1 = corners[:, 1]
+            e2 = corners[:, 2]
+            p = np.cross(d, e2)
+            det = np.einsum('ij,ij->i', e1, p)
+            ok = np.abs(det) > 1e-14
+            inv_det = np.where(ok, 1.0 / np.where(ok, det, 1.0), 0.0)
+            s = origins[r] - v0
+            b1 = np.einsum('ij,ij->i', s, p) * inv_det
+            q = np.cross(s, e1)
+            b2 = np.einsum('ij,ij->i', d, q) * inv_det
+            t = np.einsum('ij,ij->i', e2, q) * inv_det
+            hit = (ok & (b1 >= -EDGE_EPSILON) & (b2 >= -EDGE_EPSILON) &
+                   (b1 + b2 <= 1.0 + EDGE_EPSILON) &
+                   (t > RAY_EPSILON) & (t < best[r]))
+            r = r[hit]
+            best[r] = t[hit]
+            best_tri[r] = tri[hit]
+            best_bary[r, 0] = b1[hit]
+            best_bary[r, 1] = b2[hit]
+
+
+def ray_visibility(bvh, origins, points):
+    """
+    Occlusion callable for surface_metrics.lit_mask tracing one segment
+    from the projector to every candidate sample.
+
+    Args:
+        bvh: TriangleBVH of the occluders
+        origins: (N, 3) projector positions
+        points: (M, 3) all sample positions the analysis selects from
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+    def visible(index, samples, candidates):
+        rows, columns = np.nonzero(candidates)
+        mask = np.zeros(candidates.shape, dtype=bool)
+        if len(rows):
+            projector = np.atleast_1d(index)[rows]
+            mask[rows, columns] = ~bvh.occluded(origins[projector],
+                                                points[samples][columns])
+        return mask
+
+    return visible
@@ -0,0 +1,141 @@
+"""
+Surface sampling of triangulated environment geometry.
+
+All analyses work on a flat set of surface samples: a position, a unit
+normal, the surface area the sample stands for and the index of the
+triangle it came from (so results can be written back to mesh faces).
+"""
+
+import numpy as np
+
+
+class SurfaceSamples:
+    """
+    Flat arrays describing M surface samples.
+
+    Args:
+        points: (M, 3) world positions
+        normals: (M, 3) unit normals
+        weights: (M,) surface area represented by each sample
+        triangles: (M,) index of the source triangle
+    """
+
+    def __init__(self, points, normals, weights, triangles):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+        self.weights = np.asarray(weights, dtype=np.float64).reshape(-1)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1)
+
+    def __len__(self):
+        return len(self.points)
+
+    def subset(self, index):
+        """Return the samples selected by an index array or mask."""
+        return SurfaceSamples(self.points[index], self.normals[index],
+                              self.weights[index], self.triangles[index])
+
+    @property
+    def total_area(self):
+        return float(self.weights.sum())
+
+
+def triangle_areas_normals(vertices, triangles):
+    """
+    Areas and unit normals of every triangle.
+
+    Args:
+        vertices: (V, 3) positions
+        triangles: (T, 3) vertex indices
+
+    Returns:
+        Tuple (areas (T,), normals (T, 3))
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    a = vertices[triangles[:, 0]]
+    cross = np.cross(vertices[triangles[:, 1]] - a,
+                     vertices[triangles[:, 2]] - a)
+    length = np.linalg.norm(cross, axis=1)
+    normals = cross / np.maximum(length, 1e-30)[:, None]
+    return 0.5 * length, normals
+
+
+def sample_triangle_centers(vertices, triangles):
+    """One sample per triangle, at its centroid, weighted by its area."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    areas, normals = triangle_areas_normals(vertices, triangles)
+    centers = vertices[triangles].mean(axis=1)
+    return SurfaceSamples(centers, normals, areas,
+                          np.arange(len(triangles)))
+
+
+def sample_surface(vertices, triangles, count, seed=0):
+    """
+    Draw area-uniform random samples from a triangle soup.
+
+    Each sample stands for total_area / count of surface, so sums of
+    per-sample weights estimate areas without bias.
+
+    Args:
+        vertices: (V, 3) positions
+        triangles: (T, 3) vertex indices
+        count: Number of samples to draw
+        seed: Seed for reproducible sampling
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    areas, normals = triangle_areas_normals(vertices, triangles)
+    total = areas.sum()
+    if count <= 0 or total <= 0:
+        return SurfaceSamples(np.zeros((0, 3)), np.zeros((0, 3)),
+                              np.zeros(0), np.zeros(0, dtype=np.int64))
+
+    rng = np.random.default_rng(seed)
+    tri = rng.choice(len(triangles), size=int(count), p=areas / total)
+
+    # Uniform barycentric coordinates (square-root warping)
+    r1 = np.sqrt(rng.random(len(tri)))
+    r2 = rng.random(len(tri))
+    corners = vertices[triangles[tri]]
+    points = ((1.0 - r1)[:, None] * corners[:, 0] +
+              (r1 * (1.0 - r2))[:, None] * corners[:, 1] +
+              (r1 * r2)[:, None] * corners[:, 2])
+    weights = np.full(len(tri), total / len(tri))
+    return SurfaceSamples(points, normals[tri], weights, tri)
+
+
+def sample_surface_spacing(vertices, triangles, spacing, max_samples=None,
+                           seed=0):
+    """Sample roughly one point per spacing x spacing patch of surface."""
+    areas, _ = triangle_areas_normals(vertices, triangles)
+    count = int(np.ceil(areas.sum() / max(spacing * spacing, 1e-12)))
+    if max_samples is not None:
+        count = min(count, int(max_samples))
+    return sample_surface(vertices, triangles, count, seed)
+
+
+def spatial_order(points, bits=10):
+    """
+    Permutation that sorts points along a Morton (Z-order) curve.
+
+    Consecutive runs of the sorted samples are spatially compact, so
+    chunked analyses can cull whole projectors per chunk.
+
+    Args:
+        points: (M, 3) positions
+        bits: Grid resolution per axis (2^bits cells)
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-12)
+    cells = ((points - lo) / extent * ((1 << bits) - 1)).astype(np.uint64)
+
+    code = np.zeros(len(points), dtype=np.uint64)
+    for bit in range(bits):
+        for axis in range(3):
+            code |= (((cells[:, axis] >> np.uint64(bit)) & np.uint64(1))
+                     << np.uint64(3 * bit + axis))
+    return np.argsort(code, kind='stable')
@@ -0,0 +1,157 @@
+"""
+Packed projector parameters for the shared projection shader.
+
+Every projector owns a slot, one column of a small float lookup texture
+whose rows hold what the shader node group needs to turn a world position
+into that projector's image coordinates:
+
+    rows 0-2: rows x, y, z of the world -> projector matrix (RGB the
+              rotation, alpha the offset)
+    row 3:    throw ratio, aspect, horizontal and vertical lens shift
+    row 4:    edge blend, enabled flag
+
+Mapped surfaces store the slots of the (up to LAYERS) projectors lighting
+each face as integer face attributes. All projectors then share a single
+material and node group, so N projectors cost one shader compile, and
+moving a projector only rewrites its texels.
+"""
+
+import numpy as np
+
+from .blending import edge_weight
+from .frustum import (
+    NEAR_CLIP,
+    chunk_slices,
+    facing_mask,
+    inside_image,
+    project_points,
+)
+
+# Texel rows per projector slot
+SLOT_ROWS = 5
+
+# Projectors blended per face by the shader
+LAYERS = 2
+
+# Smallest lookup texture width; it grows in powers of two
+MIN_CAPACITY = 64
+
+# Faces assigned per block when picking their projectors
+ASSIGN_CHUNK = 65536
+
+
+def slot_capacity(count, minimum=MIN_CAPACITY):
+    """Lookup texture width holding `count` slots."""
+    capacity = max(int(minimum), 1)
+    while capacity < count:
+        capacity *= 2
+    return capacity
+
+
+def pack_parameters(projectors, slots, capacity, blend=None):
+    """
+    Lookup texture texels of the projectors.
+
+    Args:
+        projectors: ProjectorArrays
+        slots: (N,) slot (texture column) of every projector
+        capacity: Texture width, see slot_capacity
+        blend: Optional (N,) edge blend amounts
+
+    Returns:
+        (SLOT_ROWS, capacity, 4) float32 RGBA texels, row 0 at the bottom
+        like Blender image pixels; unused slots are disabled
+    """
+    slots = np.asarray(slots, dtype=np.int64).reshape(-1)
+    texels = np.zeros((SLOT_ROWS, capacity, 4), dtype=np.float32)
+    if len(slots) == 0:
+        return texels
+
+    # World -> projector: local = R^T (p - o)
+    inverse = np.transpose(projectors.rotations, (0, 2, 1))
+    offset = -np.einsum('nij,nj->ni', inverse, projectors.origins)
+    for row in range(3):
+        texels[row, slots, :3] = inverse[:, row]
+        texels[row, slots, 3] = offset[:, row]
+    texels[3, slots] = np.column_stack([projectors.throw_ratio,
+                                        projectors.aspect,
+                                        projectors.shift])
+    if blend is not None:
+        texels[4, slots, 0] = np.broadcast_to(blend, (len(slots),))
+    texels[4, slots, 1] = 1.0
+    return texels
+
+
+def lookup_coordinates(texels, slot, points):
+    """
+    Image coordinates the node group computes from the lookup texture.
+
+    A NumPy reference of the shader: the same texel reads and arithmetic.
+
+    Args:
+        texels: Texture from pack_parameters
+        slot: (M,) slot per point, -1 for none
+        points: (M, 3) world positions
+
+    Returns:
+        Tuple (u, v, weight) of (M,) arrays; weight is the edge blend
+        ramp inside the image and 0 outside it or for disabled slots
+    """
+    slot = np.asarray(slot, dtype=np.int64)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    column = np.clip(slot, 0, texels.shape[1] - 1)
+    rows = texels[:, column].astype(np.float64)
+    x, y, z = (np.einsum('mk,mk->m', rows[r, :, :3], points) + rows[r, :, 3]
+               for r in range(3))
+    throw_ratio, aspect, shift_h, shift_v = rows[3].T
+    blend, enabled = rows[4, :, 0], rows[4, :, 1]
+
+    depth = -y
+    safe = np.where(depth > NEAR_CLIP, depth, np.inf)
+    u = 0.5 - x / safe * throw_ratio - shift_h
+    v = 0.5 + z / safe * throw_ratio * aspect - shift_v
+    inside = inside_image(u, v, depth) & (enabled > 0) & (slot >= 0)
+    return u, v, np.where(inside, edge_weight(u, v, blend), 0.0)
+
+
+def assign_slots(projectors, slots, points, normals, blend=None,
+                 layers=LAYERS, chunk_size=ASSIGN_CHUNK):
+    """
+    Pick the projectors the shader blends on every face.
+
+    Faces take the projectors whose image reaches them furthest from the
+    image border (the largest edge blend weight), which keeps the shader's
+    blend zones where the blend masks put them. Occlusion is not tested.
+
+    Args:
+        projectors: ProjectorArrays
+        slots: (N,) slot of every projector
+        points, normals: (M, 3) face centres and normals in world space
+        blend: Optional (N,) edge blend amounts
+        layers: Projectors kept per face
+
+    Returns:
+        (layers, M) int32 slots, -1 where fewer projectors reach the face
+    """
+    slots = np.asarray(slots, dtype=np.int64).reshape(-1)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    result = np.full((layers, len(points)), -1, dtype=np.int32)
+    if len(projectors) == 0:
+        return result
+    if blend is None:
+        blend = np.zeros(len(projectors))
+    blend = np.broadcast_to(np.asarray(blend, dtype=np.float64),
+                            (len(projectors),))
+
+    kept = min(layers, len(projectors))
+    for sl in chunk_slices(len(points), chunk_size):
+        u, v, depth = project_points(projectors, points[sl])
+        lit = inside_image(u, v, depth) & facing_mask(projectors, points[sl],
+                                                      normals[sl])
+        # Lit faces on the image border still beat unlit ones
+        score = np.where(lit, edge_weight(u, v, blend[:, None]) + 1e-6, 0.0)
+        best = np.argsort(-score, axis=0, kind='stable')[:kept]
+        best_score = np.take_along_axis(score, best, axis=0)
+        result[:kept, sl] = np.where(best_score > 0, slots[best], -1)
+    return result
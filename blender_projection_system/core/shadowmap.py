@@ -0,0 +1,396 @@
+"""
+Shadow-map visibility: CPU depth rasterization from every projector.
+
+Instead of tracing one ray per (projector, sample) pair, the environment is
+rasterized once per projector into a depth buffer covering its image, and
+samples are then lit when they are no deeper than the buffer where they
+project. The rasterizer is a plain NumPy z-buffer: triangles are clipped
+against the near plane, split into one horizontal span per pixel row, and
+the spans are expanded into pixels whose depth comes from the triangle's
+screen-space plane equation; the nearest depth per pixel wins.
+
+The lookup takes the deepest of the four texels around a sample, so a
+surface never shadows itself on a slope; the price is that shadow edges
+are resolved to about one texel. The map resolution therefore trades
+accuracy against speed.
+"""
+
+from collections import OrderedDict
+import hashlib
+
+import numpy as np
+
+from .frustum import NEAR_CLIP, project_points
+
+# Candidate pixels tested at once while rasterizing
+RASTER_BUDGET = 2_000_000
+
+# Relative depth slack of the lookup
+DEPTH_TOLERANCE = 1e-4
+
+# Texels rendered beyond each image edge so lookups at the border have
+# neighbours on both sides
+GUARD = 1
+
+
+def shadow_map_size(aspect, resolution):
+    """(width, height) of a shadow map whose long edge follows the image width."""
+    width = max(int(resolution), 1)
+    return width, max(int(round(width / float(aspect))), 1)
+
+
+def clip_near(corners, near=NEAR_CLIP, return_index=False):
+    """
+    Clip triangles against the plane depth = near.
+
+    Args:
+        corners: (T, 3, 3) triangle corners as (x, z, depth) in the
+            projector frame
+        return_index: Also return the input triangle of every output one
+
+    Returns:
+        (T', 3, 3) triangles in front of the near plane; triangles cut by it
+        become one or two triangles
+    """
+    inside = corners[:, :, 2] > near
+    count = inside.sum(axis=1)
+    whole = np.flatnonzero(count == 3)
+    parts = [corners[whole]]
+    sources = [whole]
+
+    def crossing(a, b):
+        t = (near - a[:, 2]) / (b[:, 2] - a[:, 2])
+        return a + (b - a) * t[:, None]
+
+    # One corner in front: rotate it to the first slot, keep one triangle
+    one = np.flatnonzero(count == 1)
+    if len(one):
+        first = inside[one].argmax(axis=1)
+        roll = (first[:, None] + np.arange(3)) % 3
+        a, b, c = (corners[one, roll[:, k]] for k in range(3))
+        parts.append(np.stack([a, crossing(a, b), crossing(a, c)], axis=1))
+        sources.append(one)
+
+    # Two corners in front: the clipped quad splits into two triangles
+    two = np.flatnonzero(count == 2)
+    if len(two):
+        first = (~inside[two]).argmax(axis=1)
+        roll = (first[:, None] + np.arange(3)) % 3
+        a, b, c = (corners[two, roll[:, k]] for k in range(3))
+        p = crossing(a, b)
+        q = crossing(a, c)
+        parts.append(np.stack([b, c, q], axis=1))
+        parts.append(np.stack([b, q, p], axis=1))
+        sources.extend([two, two])
+
+    clipped = np.concatenate(parts)
+    if return_index:
+        return clipped, np.concatenate(sources)
+    return clipped
+
+
+def fragments(projectors, index, vertices, triangles, width, height,
+              guard=0, budget=RASTER_BUDGET):
+    """
+    Rasterize a triangle mesh seen from one projector into pixel fragments.
+
+    Args:
+        projectors: ProjectorArrays
+        index: Projector index
+        vertices: (V, 3) world positions
+        triangles: (T, 3) vertex indices
+        width, height: Raster size covering the image
+        guard: Extra pixels rendered beyond each image edge
+        budget: Candidate pixels processed per block
+
+    Yields:
+        Tuples (pixel, depth, triangle) of flat pixel indices into the
+        (height + 2 * guard, width + 2 * guard) raster with row 0 at the
+        bottom of the image (v=0), axial depths and source triangle indices
+    """
+    scale_x, scale_y = width, height
+    width += 2 * guard
+    height += 2 * guard
+
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    local = (vertices - projectors.origins[index]) @ projectors.rotations[index]
+    frame = np.stack([local[:, 0], local[:, 2], -local[:, 1]], axis=1)
+    corners, source = clip_near(frame[triangles], return_index=True)
+
+    # Screen space in pixel units
+    tr = projectors.throw_ratio[index]
+    shift_h, shift_v = projectors.shift[index]
+    depth = corners[:, :, 2]
+    sx = (0.5 - corners[:, :, 0] / depth * tr - shift_h) * scale_x + guard
+    sy = (0.5 + corners[:, :, 1] / depth * tr * projectors.aspect[index]
+          - shift_v) * scale_y + guard
+
+    # Pixel centres (i + 0.5) covered by each bounding box
+    x0 = np.maximum(np.ceil(sx.min(axis=1) - 0.5), 0).astype(np.int64)
+    x1 = np.minimum(np.floor(sx.max(axis=1) - 0.5), width - 1).astype(np.int64)
+    y0 = np.maximum(np.ceil(sy.min(axis=1) - 0.5), 0).astype(np.int64)
+    y1 = np.minimum(np.floor(sy.max(axis=1) - 0.5), height - 1).astype(np.int64)
+    nx = np.maximum(x1 - x0 + 1, 0)
+    ny = np.maximum(y1 - y0 + 1, 0)
+
+    # 1 / depth is linear in screen space: inverse = a * x + b * y + c
+    ex1, ex2 = sx[:, 1] - sx[:, 0], sx[:, 2] - sx[:, 0]
+    ey1, ey2 = sy[:, 1] - sy[:, 0], sy[:, 2] - sy[:, 0]
+    det = ex1 * ey2 - ex2 * ey1
+    keep = np.flatnonzero((nx * ny > 0) & (np.abs(det) > 1e-12))
+    if len(keep) == 0:
+        return
+
+    sx, sy, depth, source = sx[keep], sy[keep], depth[keep], source[keep]
+    inverse = 1.0 / depth
+    d1 = (inverse[:, 1] - inverse[:, 0]) / det[keep]
+    d2 = (inverse[:, 2] - inverse[:, 0]) / det[keep]
+    plane_a = ey2[keep] * d1 - ey1[keep] * d2
+    plane_b = ex1[keep] * d2 - ex2[keep] * d1
+    plane_c = inverse[:, 0] - plane_a * sx[:, 0] - plane_b * sy[:, 0]
+    x0, y0, ny = x0[keep], y0[keep], ny[keep]
+
+    # Blocks of whole triangles covering about `budget` bounding box pixels
+    ends = np.cumsum(nx[keep] * ny)
+    block_ends = np.searchsorted(ends, np.arange(budget, ends[-1], budget),
+                                 side='right')
+    bounds = np.unique(np.concatenate([[0], block_ends, [len(keep)]]))
+    edge_start = (0, 1, 2)
+    edge_end = (1, 2, 0)
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        # One span per (triangle, pixel row): where the row's centre line
+        # crosses the triangle's edges
+        tri = np.repeat(np.arange(first, last), ny[first:last])
+        row = y0[tri] + np.arange(len(tri)) - np.repeat(
+            np.cumsum(ny[first:last]) - ny[first:last], ny[first:last])
+        centre = row + 0.5
+        left = np.full(len(tri), np.inf)
+        right = np.full(len(tri), -np.inf)
+        for a, b in zip(edge_start, edge_end):
+            # Interpolate from the lower end so an edge shared by two
+            # triangles gives both the same crossing and leaves no cracks
+            flip = sy[tri, a] > sy[tri, b]
+            ya = np.where(flip, sy[tri, b], sy[tri, a])
+            yb = np.where(flip, sy[tri, a], sy[tri, b])
+            xa = np.where(flip, sx[tri, b], sx[tri, a])
+            xb = np.where(flip, sx[tri, a], sx[tri, b])
+            crosses = (ya <= centre) & (centre <= yb) & (ya != yb)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = xa + (centre - ya) * (xb - xa) / (yb - ya)
+            left = np.where(crosses, np.minimum(left, x), left)
+            right = np.where(crosses, np.maximum(right, x), right)
+        span_start = np.maximum(np.ceil(left - 0.5), 0)
+        span_end = np.minimum(np.floor(right - 0.5), width - 1)
+        length = np.maximum(span_end - span_start + 1, 0).astype(np.int64)
+        spans = np.flatnonzero(length)
+        if len(spans) == 0:
+            continue
+
+        # Every covered pixel of every span
+        length = length[spans]
+        span = np.repeat(spans, length)
+        px = span_start[span].astype(np.int64) + np.arange(len(span)) - np.repeat(
+            np.cumsum(length) - length, length)
+        py = row[span]
+        t = tri[span]
+        z = 1.0 / (plane_a[t] * (px + 0.5) + plane_b[t] * (py + 0.5) + plane_c[t])
+        yield py * width + px, z, source[t]
+
+
+def rasterize_depth(projectors, index, vertices, triangles, resolution=1024,
+                    budget=RASTER_BUDGET):
+    """
+    Depth buffer of a triangle mesh seen from one projector.
+
+    Args:
+        projectors: ProjectorArrays
+        index: Projector index
+        vertices: (V, 3) world positions
+        triangles: (T, 3) vertex indices
+        resolution: Width of the map in texels; the height follows the
+            projector's aspect ratio
+        budget: Candidate pixels processed per block
+
+    Returns:
+        (H + 2 * GUARD, W + 2 * GUARD) float32 axial depths, row 0 at the
+        bottom of the image (v=0) and inf where no geometry is seen
+    """
+    width, height = shadow_map_size(projectors.aspect[index], resolution)
+    depth_map = np.full((width + 2 * GUARD) * (height + 2 * GUARD), np.inf)
+    for pixel, z, _ in fragments(projectors, index, vertices, triangles,
+                                 width, height, GUARD, budget):
+        np.minimum.at(depth_map, pixel, z)
+    return depth_map.reshape(height + 2 * GUARD,
+                             width + 2 * GUARD).astype(np.float32)
+
+
+def rasterize_triangles(projectors, index, vertices, triangles, width, height,
+                        budget=RASTER_BUDGET):
+    """
+    Visible triangle and its depth at every pixel centre of an image.
+
+    Returns:
+        Tuple (depth, triangle) of (height, width) arrays, row 0 at the
+        bottom of the image; depth is inf and triangle -1 where no geometry
+        is seen
+    """
+    depth_map = np.full(width * height, np.inf)
+    triangle_map = np.full(width * height, -1, dtype=np.int64)
+    for pixel, z, tri in fragments(projectors, index, vertices, triangles,
+                                   width, height, 0, budget):
+        # Nearest fragment per pixel within the block, then against the
+        # buffer
+        order = np.lexsort((z, pixel))
+        pixel, z, tri = pixel[order], z[order], tri[order]
+        first = np.ones(len(pixel), dtype=bool)
+        first[1:] = pixel[1:] != pixel[:-1]
+        pixel, z, tri = pixel[first], z[first], tri[first]
+        nearer = z < depth_map[pixel]
+        depth_map[pixel[nearer]] = z[nearer]
+        triangle_map[pixel[nearer]] = tri[nearer]
+    return (depth_map.reshape(height, width),
+            triangle_map.reshape(height, width))
+
+
+def lookup_visible(depth_map, u, v, depth, tolerance=DEPTH_TOLERANCE):
+    """
+    Mask of projected samples not hidden behind the depth map.
+
+    Args:
+        depth_map: (H, W) map from rasterize_depth
+        u, v, depth: Normalized image coordinates and axial depth (same
+            shape) of the samples in the map's projector
+    """
+    height, width = depth_map.shape
+    x = np.asarray(u) * (width - 2 * GUARD) - 0.5 + GUARD
+    y = np.asarray(v) * (height - 2 * GUARD) - 0.5 + GUARD
+    xa = np.clip(np.floor(x), 0, max(width - 2, 0)).astype(np.int64)
+    ya = np.clip(np.floor(y), 0, max(height - 2, 0)).astype(np.int64)
+    xb = np.minimum(xa + 1, width - 1)
+    yb = np.minimum(ya + 1, height - 1)
+    stored = np.maximum(np.maximum(depth_map[ya, xa], depth_map[ya, xb]),
+                        np.maximum(depth_map[yb, xa], depth_map[yb, xb]))
+    return depth <= stored * (1.0 + tolerance)
+
+
+def projector_key(projectors, index):
+    """Digest of everything that changes what a projector's map sees."""
+    digest = hashlib.blake2b(digest_size=16)
+    for values in (projectors.origins[index], projectors.rotations[index],
+                   projectors.throw_ratio[index], projectors.aspect[index],
+                   projectors.shift[index]):
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class ShadowMapCache:
+    """
+    Least recently used depth maps, bounded by their total size.
+
+    Keys combine the geometry, the projector pose and lens and the map
+    resolution, so moving a projector or editing the geometry simply misses
+    the cache and stale maps age out.
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._maps = OrderedDict()
+
+    def __len__(self):
+        return len(self._maps)
+
+    def get(self, key):
+        depth_map = self._maps.get(key)
+        if depth_map is not None:
+            self._maps.move_to_end(key)
+        return depth_map
+
+    def put(self, key, depth_map):
+        old = self._maps.pop(key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._maps[key] = depth_map
+        self.nbytes += depth_map.nbytes
+        while self.nbytes > self.max_bytes and len(self._maps) > 1:
+            _, dropped = self._maps.popitem(last=False)
+            self.nbytes -= dropped.nbytes
+
+    def clear(self):
+        self._maps.clear()
+        self.nbytes = 0
+
+
+class ShadowMaps:
+    """
+    Lazily rendered depth maps of a set of projectors.
+
+    Args:
+        projectors: ProjectorArrays
+        vertices, triangles: Occluding geometry
+        resolution: Map width in texels
+        cache: Optional ShadowMapCache shared between runs
+        geometry_key: Identifies the geometry in the cache (e.g. a hash of
+            the triangles); required for the cache to be used
+    """
+
+    def __init__(self, projectors, vertices, triangles, resolution=1024,
+                 cache=None, geometry_key=None):
+        self.projectors = projectors
+        self.vertices = vertices
+        self.triangles = triangles
+        self.resolution = int(resolution)
+        self.cache = cache if geometry_key is not None else None
+        self.geometry_key = geometry_key
+        # Absolute depth slack of the lookups, on top of DEPTH_TOLERANCE
+        self.bias = 0.0
+        self._maps = {}
+
+    def depth_map(self, index):
+        depth_map = self._maps.get(index)
+        if depth_map is not None:
+            return depth_map
+        key = None
+        if self.cache is not None:
+            key = (self.geometry_key, projector_key(self.projectors, index),
+                   self.resolution)
+            depth_map = self.cache.get(key)
+        if depth_map is None:
+            depth_map = self.render(index)
+            if key is not None:
+                self.cache.put(key, depth_map)
+        self._maps[index] = depth_map
+        return depth_map
+
+    def render(self, index):
+        """Depth map of projector `index`, bypassing the caches."""
+        return rasterize_depth(self.projectors, index, self.vertices,
+                               self.triangles, self.resolution)
+
+    def visible(self, index, points):
+        """(M,) mask of points projector `index` sees unobstructed."""
+        u, v, depth = project_points(self.projectors.subset([index]), points)
+        return lookup_visible(self.depth_map(index), u[0], v[0],
+                              depth[0] - self.bias)
+
+    def visibility(self, points):
+        """
+        Occlusion callable for surface_metrics.lit_mask.
+
+        Args:
+            points: (M, 3) all sample positions the analysis selects from
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        def visible(index, samples, candidates):
+            chunk = points[samples]
+            mask = np.zeros(candidates.shape, dtype=bool)
+            for row, projector in enumerate(np.atleast_1d(index)):
+                columns = np.flatnonzero(candidates[row])
+                if len(columns):
+                    mask[row, columns] = self.visible(int(projector),
+                                                      chunk[columns])
+            return mask
+
+        return visible
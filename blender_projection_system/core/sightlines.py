@@ -0,0 +1,410 @@
+"""
+Sightlines: what every seat sees of the projection surfaces.
+
+Every (seat, surface sample) pair is a sight line. A sample counts as seen
+from a seat when it faces the seat within the largest viewing angle, lies
+within the viewing distance and no triangle of the venue crosses the line.
+
+Tracing 5,000 seats against 50,000 samples ray by ray is out of reach for
+NumPy, so the lines are culled in bundles: seats are grouped with their
+neighbours and samples are cut into tiles along a space-filling curve. For
+every (seat group, sample tile) bundle,
+
+1. a few boxes swept from the group's box to the tile's box enclose all of
+   its lines, and the triangles whose boxes they touch come from the cached
+   BVH of the venue;
+2. a triangle only blocks a line whose ends lie on opposite sides of its
+   plane, which drops the walls, floors and the projection surfaces
+   themselves (their samples lie in the plane) for the whole bundle;
+3. the lines of the bundle are intersected exactly with the few triangles
+   left, in bounded blocks.
+
+In an open hall nearly every bundle ends after step 2.
+"""
+
+import csv
+
+import numpy as np
+
+from .frustum import chunk_slices
+from .mesh_io import map_chunks
+from .raycast import EDGE_EPSILON
+from .sampling import spatial_order
+
+# Neighbouring seats whose sight lines are culled together
+SEAT_GROUP = 16
+
+# Surface samples per tile
+SAMPLE_TILE = 256
+
+# Boxes swept from a seat group to a tile, enclosing its sight lines
+SWEEP_STEPS = 8
+
+# Upper bound on (line, triangle) tests evaluated at once
+TEST_BUDGET = 1_000_000
+
+# Seat groups per pool task
+GROUP_BATCH = 16
+
+# Seats closer than this (m) to a sample do not count as viewing it
+SIGHT_EPSILON = 1e-4
+
+# Distance (m) from a triangle's plane that counts as lying in it, so a
+# sample does not hide itself behind its own surface
+PLANE_TOLERANCE = 1e-6
+
+
+def seat_grid(rows, seats, seat_width=0.55, row_depth=0.9, rake=0.0,
+              radius=0.0):
+    """
+    Seat positions of a block of rows, in the block's local frame.
+
+    The audience faces +Y; the front row runs along the X axis through the
+    origin and every further row is row_depth behind and rake higher.
+
+    Args:
+        rows: Number of rows
+        seats: Seats per row
+        seat_width: Seat centre spacing along a row
+        row_depth: Row spacing
+        rake: Rise of every row over the one in front
+        radius: Radius of curved rows about a point ahead of the front row
+            (0 = straight rows)
+
+    Returns:
+        (rows * seats, 3) positions, row by row
+    """
+    row = np.repeat(np.arange(rows), seats).astype(np.float64)
+    seat = np.tile(np.arange(seats) - (seats - 1) / 2.0, rows)
+    if radius > 0:
+        arc = radius + row * row_depth
+        angle = seat * seat_width / radius
+        x = arc * np.sin(angle)
+        y = radius - arc * np.cos(angle)
+    else:
+        x = seat * seat_width
+        y = -row * row_depth
+    return np.column_stack([x, y, row * rake])
+
+
+def read_seat_list(path):
+    """
+    Read seats from a CSV file of x, y, z columns and an optional label.
+
+    Rows that do not start with three numbers (e.g. a header) are skipped.
+
+    Returns:
+        Tuple ((S, 3) positions, list of S labels, empty where missing)
+    """
+    positions = []
+    labels = []
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        for row in csv.reader(handle):
+            try:
+                position = [float(value) for value in row[:3]]
+            except ValueError:
+                continue
+            if len(position) < 3:
+                continue
+            positions.append(position)
+            labels.append(row[3].strip() if len(row) > 3 else "")
+    return np.array(positions, dtype=np.float64).reshape(-1, 3), labels
+
+
+def sweep_boxes(a_lo, a_hi, b_lo, b_hi, steps=SWEEP_STEPS):
+    """
+    Boxes enclosing every segment from a point of box A to a point of box B.
+
+    A segment's point at parameter t lies in the box interpolated between A
+    and B at t, so the boxes spanning the interpolated boxes at consecutive
+    steps cover the segments.
+
+    Returns:
+        Tuple (lo, hi) of (Q, steps, 3) boxes
+    """
+    t = np.linspace(0.0, 1.0, steps + 1)[None, :, None]
+    lo = a_lo[:, None] * (1 - t) + b_lo[:, None] * t
+    hi = a_hi[:, None] * (1 - t) + b_hi[:, None] * t
+    return (np.minimum(lo[:, :-1], lo[:, 1:]),
+            np.maximum(hi[:, :-1], hi[:, 1:]))
+
+
+def triangle_frames(triangles):
+    """
+    Unit normals, plane offsets and barycentric dual vectors of triangles.
+
+    A point x in the plane of triangle (v0, e1, e2) has barycentric weights
+    dual[:, 0] . (x - v0) and dual[:, 1] . (x - v0) of its 2nd and 3rd vertex.
+
+    Args:
+        triangles: (P, 3, 3) first vertex and the two edges
+
+    Returns:
+        Tuple (normal (P, 3), offset (P,), dual (P, 2, 3)); degenerate
+        triangles get a zero normal
+    """
+    e1 = triangles[:, 1]
+    e2 = triangles[:, 2]
+    normal = np.cross(e1, e2)
+    length = np.linalg.norm(normal, axis=1)
+    normal /= np.maximum(length, 1e-300)[:, None]
+    offset = np.einsum('ij,ij->i', normal, triangles[:, 0])
+    d00 = np.einsum('ij,ij->i', e1, e1)
+    d01 = np.einsum('ij,ij->i', e1, e2)
+    d11 = np.einsum('ij,ij->i', e2, e2)
+    denom = np.maximum(d00 * d11 - d01 * d01, 1e-300)[:, None]
+    dual = np.stack([(d11[:, None] * e1 - d01[:, None] * e2) / denom,
+                     (d00[:, None] * e2 - d01[:, None] * e1) / denom], axis=1)
+    return normal, offset, dual
+
+
+def segment_hits(eyes, targets, triangles):
+    """
+    Which sight lines each triangle crosses.
+
+    A line crosses a triangle when its ends lie on opposite sides of the
+    plane (beyond PLANE_TOLERANCE) and the crossing point is inside the
+    triangle. Both the side and the barycentric weights are linear along
+    the line, so they are computed at the ends and interpolated: the work
+    per line is a few scalar operations.
+
+    Args:
+        eyes: (G, 3) line starts
+        targets: (P, T, 3) line ends, one row per triangle
+        triangles: (P, 3, 3) first vertex and the two edges
+
+    Returns:
+        (P, G, T) mask
+    """
+    normal, offset, dual = triangle_frames(triangles)
+    v0 = triangles[:, 0]
+    start = eyes[None] - v0[:, None]
+    end = targets - v0[:, None]
+    seat_side = np.einsum('pgk,pk->pg', start, normal)[:, :, None]
+    sample_side = np.einsum('ptk,pk->pt', end, normal)[:, None, :]
+    crosses = (((seat_side > PLANE_TOLERANCE) & (sample_side < -PLANE_TOLERANCE)) |
+               ((seat_side < -PLANE_TOLERANCE) & (sample_side > PLANE_TOLERANCE)))
+    t = seat_side / np.where(crosses, seat_side - sample_side, 1.0)
+    start_bary = np.einsum('pgk,pjk->pgj', start, dual)
+    end_bary = np.einsum('ptk,pjk->ptj', end, dual)
+    b1 = start_bary[:, :, None, 0] + (end_bary[:, None, :, 0] - start_bary[:, :, None, 0]) * t
+    b2 = start_bary[:, :, None, 1] + (end_bary[:, None, :, 1] - start_bary[:, :, None, 1]) * t
+    return (crosses & (b1 >= -EDGE_EPSILON) & (b2 >= -EDGE_EPSILON) &
+            (b1 + b2 <= 1.0 + EDGE_EPSILON))
+
+
+class SampleTiles:
+    """
+    Samples cut into equal tiles along a space-filling curve.
+
+    The last tile is padded by repeating its last sample, which leaves
+    every reduction over a tile unchanged.
+
+    Attributes:
+        index: (tiles, T) sample indices
+        lo, hi: (tiles, 3) bounds of every tile
+    """
+
+    def __init__(self, points, tile_size=SAMPLE_TILE):
+        order = spatial_order(points)
+        count = len(order)
+        tiles = max(1, -(-count // tile_size))
+        position = np.minimum(np.arange(tiles * tile_size), max(count - 1, 0))
+        self.index = order[position].reshape(tiles, tile_size) if count else \
+            np.zeros((0, tile_size), dtype=np.int64)
+        tile_points = points[self.index]
+        self.lo = tile_points.min(axis=1) if count else np.zeros((0, 3))
+        self.hi = tile_points.max(axis=1) if count else np.zeros((0, 3))
+
+    def __len__(self):
+        return len(self.index)
+
+
+def blocked_lines(eyes, points, tiles, live, bvh):
+    """
+    (G, M) mask of the sight lines from a seat group that a triangle blocks.
+
+    Args:
+        eyes: (G, 3) eye positions of the group
+        points: (M, 3) sample positions
+        tiles: SampleTiles of the samples
+        live: Indices of the tiles with lines worth testing
+        bvh: TriangleBVH of the venue
+    """
+    blocked = np.zeros((len(eyes), len(points)), dtype=bool)
+    if len(live) == 0 or bvh.triangle_count == 0:
+        return blocked
+
+    lo, hi = sweep_boxes(np.broadcast_to(eyes.min(axis=0), (len(live), 3)),
+                         np.broadcast_to(eyes.max(axis=0), (len(live), 3)),
+                         tiles.lo[live], tiles.hi[live])
+    query, triangle = bvh.overlapping(lo.reshape(-1, 3), hi.reshape(-1, 3))
+    pair = np.unique(live[query // SWEEP_STEPS] * bvh.triangle_count + triangle)
+    pair_tile, pair_triangle = np.divmod(pair, bvh.triangle_count)
+
+    size = tiles.index.shape[1]
+    for sl in chunk_slices(len(pair), max(1, TEST_BUDGET // (len(eyes) * size))):
+        tile = pair_tile[sl]
+        data = bvh.triangle_data[bvh.item_position[pair_triangle[sl]]]
+        normal, offset, _ = triangle_frames(data)
+
+        # Only triangles with seats and samples on opposite sides of their plane
+        seat_side = eyes @ normal.T - offset
+        targets = points[tiles.index[tile]]
+        sample_side = np.einsum('ptk,pk->pt', targets, normal) - offset[:, None]
+        crosses = (((seat_side.max(axis=0) > PLANE_TOLERANCE) &
+                    (sample_side.min(axis=1) < -PLANE_TOLERANCE)) |
+                   ((seat_side.min(axis=0) < -PLANE_TOLERANCE) &
+                    (sample_side.max(axis=1) > PLANE_TOLERANCE)))
+        if not crosses.any():
+            continue
+        tile = tile[crosses]
+        hit = segment_hits(eyes, targets[crosses], data[crosses])
+
+        # Pairs come sorted by tile: merge the triangles of every tile
+        first = np.flatnonzero(np.r_[True, tile[1:] != tile[:-1]])
+        merged = np.logical_or.reduceat(hit, first, axis=0)
+        for row, index in enumerate(tiles.index[tile[first]]):
+            blocked[:, index] |= merged[row]
+    return blocked
+
+
+class SightlineResult:
+    """
+    Result of analyze_sightlines.
+
+    Per (seat, surface) arrays (S, G): area seen, and its area-weighted mean
+    viewing angle (degrees from the surface normal) and distance. Per
+    sample arrays (M,): number of seats that see it, and their mean viewing
+    angle and distance.
+    """
+
+    def __init__(self, seat_count, sample_count, group_count):
+        self.area = np.zeros((seat_count, group_count))
+        self.angle = np.zeros((seat_count, group_count))
+        self.distance = np.zeros((seat_count, group_count))
+        self.group_area = np.zeros(group_count)
+        self.sample_seats = np.zeros(sample_count, dtype=np.int64)
+        self.sample_angle = np.zeros(sample_count)
+        self.sample_distance = np.zeros(sample_count)
+
+    def finish(self):
+        """Turn the weighted sums into means."""
+        seen = np.maximum(self.area, 1e-300)
+        self.angle /= seen
+        self.distance /= seen
+        seats = np.maximum(self.sample_seats, 1)
+        self.sample_angle /= seats
+        self.sample_distance /= seats
+
+    @property
+    def seat_fraction(self):
+        """(S, G) share of every surface each seat sees."""
+        return self.area / np.maximum(self.group_area, 1e-300)
+
+    @property
+    def sample_fraction(self):
+        """(M,) share of the seats that see each sample."""
+        return self.sample_seats / max(len(self.area), 1)
+
+    def clear_view(self, fraction=0.9):
+        """(G,) share of the seats that see at least `fraction` of a surface."""
+        if len(self.area) == 0:
+            return np.zeros(len(self.group_area))
+        return (self.seat_fraction >= fraction).mean(axis=0)
+
+    def summary(self, group, fraction=0.9):
+        """Plain dictionary summary for one surface."""
+        seats = self.area[:, group] > 0
+        seen = self.seat_fraction[:, group]
+        return {
+            "area": float(self.group_area[group]),
+            "clear_view": float(self.clear_view(fraction)[group]),
+            "seen_mean": float(seen.mean()) if len(seen) else 0.0,
+            "seen_min": float(seen.min()) if len(seen) else 0.0,
+            "angle_mean": float(self.angle[seats, group].mean())
+            if seats.any() else 0.0,
+            "distance_min": float(self.distance[seats, group].min())
+            if seats.any() else 0.0,
+            "distance_max": float(self.distance[seats, group].max())
+            if seats.any() else 0.0,
+        }
+
+
+def _sightline_batch(eyes, points, normals, weights, groups, group_count,
+                     tiles, bvh, max_angle, max_distance, group_size):
+    """Sight lines of a run of seats, as a SightlineResult of sums."""
+    result = SightlineResult(len(eyes), len(points), group_count)
+    membership = np.zeros((len(points), group_count))
+    membership[np.arange(len(points)), groups] = weights
+    cos_limit = np.cos(np.radians(max_angle))
+
+    for sl in chunk_slices(len(eyes), group_size):
+        group = eyes[sl]
+        offset = group[:, None] - points[None]
+        distance = np.sqrt(np.einsum('gmk,gmk->gm', offset, offset))
+        cosine = np.einsum('gmk,mk->gm', offset, normals) / \
+            np.maximum(distance, 1e-12)
+        seen = (cosine > cos_limit) & (distance <= max_distance) & \
+            (distance > SIGHT_EPSILON)
+        live = np.flatnonzero(seen[:, tiles.index].any(axis=(0, 2)))
+        seen &= ~blocked_lines(group, points, tiles, live, bvh)
+
+        angle = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+        result.area[sl] = seen @ membership
+        result.angle[sl] = (seen * angle) @ membership
+        result.distance[sl] = (seen * distance) @ membership
+        result.sample_seats += seen.sum(axis=0)
+        result.sample_angle += (seen * angle).sum(axis=0)
+        result.sample_distance += (seen * distance).sum(axis=0)
+    return result
+
+
+def analyze_sightlines(seats, samples, groups, bvh, max_angle=75.0,
+                       max_distance=np.inf, workers=1,
+                       group_size=SEAT_GROUP, tile_size=SAMPLE_TILE):
+    """
+    What every seat sees of the surfaces, at what angle and distance.
+
+    Args:
+        seats: (S, 3) eye positions
+        samples: SurfaceSamples of the projection surfaces
+        groups: (M,) surface index of every sample
+        bvh: TriangleBVH of everything that can block a view, usually the
+            whole venue including the surfaces
+        max_angle: Largest viewing angle (degrees from the surface normal)
+            that counts as a view
+        max_distance: Largest distance that counts as a view
+        workers: Process count
+        group_size: Seats culled together
+        tile_size: Samples per tile
+
+    Returns:
+        SightlineResult
+    """
+    seats = np.asarray(seats, dtype=np.float64).reshape(-1, 3)
+    groups = np.asarray(groups, dtype=np.int64).reshape(-1)
+    group_count = int(groups.max()) + 1 if len(groups) else 0
+    order = spatial_order(seats) if len(seats) else np.zeros(0, dtype=np.int64)
+    tiles = SampleTiles(samples.points, tile_size)
+
+    batch = group_size * GROUP_BATCH
+    tasks = [(seats[order[sl]], samples.points, samples.normals,
+              samples.weights, groups, group_count, tiles, bvh, max_angle,
+              max_distance, group_size)
+             for sl in chunk_slices(len(seats), batch)]
+    parts = map_chunks(_sightline_batch, tasks, workers)
+
+    result = SightlineResult(len(seats), len(samples), group_count)
+    result.group_area = np.bincount(groups, weights=samples.weights,
+                                    minlength=group_count)
+    for sl, part in zip(chunk_slices(len(seats), batch), parts):
+        index = order[sl]
+        result.area[index] = part.area
+        result.angle[index] = part.angle
+        result.distance[index] = part.distance
+        result.sample_seats += part.sample_seats
+        result.sample_angle += part.sample_angle
+        result.sample_distance += part.sample_distance
+    result.finish()
+    return result
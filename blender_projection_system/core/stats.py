@@ -0,0 +1,88 @@
+"""
+Projector statistics of a scene, maintained incrementally.
+
+The multi-projector panel shows projector counts per collection, overlap
+totals and configuration warnings. Counting them in the panel's draw
+callback scans every object on every redraw, which Blender runs
+constantly while the mouse moves. Instead, a ProjectorStats holds one
+record per projector and running totals; the add-on updates it from the
+objects a depsgraph update reports, so a change costs O(changed objects)
+and drawing costs nothing.
+"""
+
+from collections import Counter
+
+# Warnings listed at most, the rest are summarized
+MAX_WARNINGS = 5
+
+
+class ProjectorStats:
+    """Per-projector records and running totals of one scene."""
+
+    def __init__(self):
+        # key -> (name, collection)
+        self.records = {}
+        self.names = Counter()
+        self.collection_counts = Counter()
+        self.overlapping = 0
+        self.warnings = []
+
+    @property
+    def projector_count(self):
+        return len(self.records)
+
+    def set(self, key, name, collection):
+        """Add or update the record of a projector."""
+        self.discard(key)
+        self.records[key] = (name, collection)
+        self.names[name] += 1
+        if collection:
+            self.collection_counts[collection] += 1
+
+    def discard(self, key):
+        """Remove the record of an object that is no longer a projector."""
+        record = self.records.pop(key, None)
+        if record is None:
+            return
+        name, collection = record
+        _decrement(self.names, name)
+        if collection:
+            _decrement(self.collection_counts, collection)
+
+    def update_warnings(self, collection_names, overlapping_names=()):
+        """
+        Recompute the overlap total and the configuration warnings.
+
+        Costs O(collections + overlapping projectors), not O(objects).
+
+        Args:
+            collection_names: Names of the scene's projector collections
+            overlapping_names: Names of the projectors with at least one
+                neighbour in the scene's overlap graph
+        """
+        collection_names = list(collection_names)
+        known = set(collection_names)
+        warnings = []
+        for name in collection_names:
+            if not self.collection_counts.get(name):
+                warnings.append(f"Collection '{name}' has no projectors")
+        for collection, count in sorted(self.collection_counts.items()):
+            if collection not in known:
+                warnings.append(f"{count} projectors in missing collection '{collection}'")
+        missing = [name for name in overlapping_names if name not in self.names]
+        self.overlapping = len(overlapping_names) - len(missing)
+        if missing:
+            warnings.append(f"{len(missing)} projectors in the overlap graph no longer exist; "
+                            "detect overlaps again")
+
+        if len(warnings) > MAX_WARNINGS:
+            hidden = len(warnings) - MAX_WARNINGS + 1
+            warnings = warnings[:MAX_WARNINGS - 1] + [f"... and {hidden} more"]
+        self.warnings = warnings
+
+
+def _decrement(counter, key):
+    """Decrement a count, dropping keys that reach zero."""
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
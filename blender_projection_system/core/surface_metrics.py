@@ -0,0 +1,201 @@
+"""
+Per-sample pixel density, keystone and incidence analysis.
+
+For every surface sample lit by a projector the analysis derives:
+
+* pixels per metre: the square root of the pixel count per square metre of
+  surface. A projector spreads res_x * res_y pixels over an image area of
+  d^2 / (TR^2 * A) on the plane perpendicular to its axis at depth d; the
+  surface element receives them scaled by cos(surface) / cos(axis), the
+  same foreshortening used for illuminance.
+* keystone factor: how much larger the pixels are here than the sharpest
+  pixels the same projector puts on the surface (1.0 = no keystone).
+* incidence angle: between the incoming ray and the surface normal.
+
+Where several projectors overlap, the sample keeps the metrics of the
+projector with the highest pixel density. Everything is evaluated in
+(projectors x sample chunk) blocks so memory stays bounded for millions of
+samples.
+"""
+
+import numpy as np
+
+from .frustum import (
+    facing_mask,
+    incidence_cosines,
+    inside_image,
+    project_points,
+)
+
+# Upper bound on (projectors x samples) elements evaluated at once
+CHUNK_BUDGET = 4_000_000
+
+
+class SurfaceMetrics:
+    """
+    Result of analyze_surface_metrics.
+
+    Per-sample arrays (length M): pixels_per_meter, keystone,
+    incidence_deg, projector (index of the best projector, -1 if unlit) and
+    coverage_count. Per-projector arrays (length N): lit_area, ppm_min,
+    ppm_mean, ppm_max, keystone_max, incidence_max and area_below_spec.
+    """
+
+    def __init__(self, m, n):
+        self.pixels_per_meter = np.zeros(m)
+        self.keystone = np.zeros(m)
+        self.incidence_deg = np.zeros(m)
+        self.projector = np.full(m, -1, dtype=np.int64)
+        self.coverage_count = np.zeros(m, dtype=np.int32)
+
+        self.lit_area = np.zeros(n)
+        self.ppm_min = np.full(n, np.inf)
+        self.ppm_mean = np.zeros(n)
+        self.ppm_max = np.zeros(n)
+        self.keystone_max = np.ones(n)
+        self.incidence_max = np.zeros(n)
+        self.area_below_spec = np.zeros(n)
+
+    def summary(self, index):
+        """Plain dictionary summary for one projector."""
+        lit = self.lit_area[index] > 0
+        return {
+            "lit_area": float(self.lit_area[index]),
+            "ppm_min": float(self.ppm_min[index]) if lit else 0.0,
+            "ppm_mean": float(self.ppm_mean[index]),
+            "ppm_max": float(self.ppm_max[index]),
+            "keystone_max": float(self.keystone_max[index]),
+            "incidence_max": float(self.incidence_max[index]),
+            "area_below_spec": float(self.area_below_spec[index]),
+        }
+
+
+def pixel_density(projectors, depth, cos_surface, cos_axis):
+    """Linear pixel density (pixels per metre) on the surface, (N, M)."""
+    tr = projectors.throw_ratio[:, None]
+    aspect = projectors.aspect[:, None]
+    pixels = (projectors.resolution[:, 0] *
+              projectors.resolution[:, 1]).astype(np.float64)[:, None]
+    safe_depth = np.maximum(depth, 1e-6)
+    per_square_meter = (pixels * tr * tr * aspect / (safe_depth * safe_depth)
+                        * cos_surface / np.maximum(cos_axis, 1e-6))
+    return np.sqrt(per_square_meter)
+
+
+def lit_mask(projectors, points, normals, visibility=None, index=None,
+             samples_slice=None):
+    """
+    (N, M) mask of samples inside each image and facing the projector.
+
+    Args:
+        visibility: Optional callable (projector index array, sample
+            selector, candidate mask) -> (N, M) bool mask applied on top,
+            e.g. an occlusion test from a ray caster or depth buffer. Only
+            the candidates (lit so far) need to be tested.
+    """
+    u, v, depth = project_points(projectors, points)
+    lit = inside_image(u, v, depth)
+    lit &= facing_mask(projectors, points, normals)
+    if visibility is not None and lit.any():
+        lit &= visibility(index, samples_slice, lit)
+    return lit, u, v, depth
+
+
+def sample_chunk_size(projector_count, budget=CHUNK_BUDGET):
+    return max(1, budget // max(projector_count, 1))
+
+
+def analyze_surface_metrics(projectors, samples, min_pixel_density=0.0,
+                            visibility=None, chunk_size=None):
+    """
+    Evaluate pixel density, keystone and incidence for every sample.
+
+    Args:
+        projectors: ProjectorArrays
+        samples: SurfaceSamples
+        min_pixel_density: Spec threshold for area_below_spec (pixels/m)
+        visibility: Optional occlusion callable, see lit_mask
+        chunk_size: Samples per block (derived from CHUNK_BUDGET if None)
+
+    Returns:
+        SurfaceMetrics
+    """
+    n = len(projectors)
+    m = len(samples)
+    result = SurfaceMetrics(m, n)
+    if n == 0 or m == 0:
+        return result
+
+    chunk_size = chunk_size or sample_chunk_size(n)
+    index = np.arange(n)
+    ppm_weighted = np.zeros(n)
+
+    for start in range(0, m, chunk_size):
+        sl = slice(start, min(start + chunk_size, m))
+        points = samples.points[sl]
+        normals = samples.normals[sl]
+        weights = samples.weights[sl]
+
+        lit, _, _, depth = lit_mask(projectors, points, normals, visibility,
+                                    index, sl)
+        cos_surface, cos_axis, _ = incidence_cosines(projectors, points,
+                                                     normals)
+        ppm = np.where(lit, pixel_density(projectors, depth, cos_surface,
+                                          cos_axis), 0.0)
+
+        best = ppm.argmax(axis=0)
+        cols = np.arange(ppm.shape[1])
+        best_ppm = ppm[best, cols]
+        any_lit = lit.any(axis=0)
+
+        result.pixels_per_meter[sl] = best_ppm
+        result.projector[sl] = np.where(any_lit, best, -1)
+        result.coverage_count[sl] = lit.sum(axis=0)
+        incidence = np.degrees(np.arccos(np.clip(cos_surface, -1.0, 1.0)))
+        result.incidence_deg[sl] = np.where(any_lit, incidence[best, cols],
+                                            0.0)
+
+        # Per-projector summaries
+        lit_weights = lit * weights[None, :]
+        result.lit_area += lit_weights.sum(axis=1)
+        ppm_weighted += (ppm * lit_weights).sum(axis=1)
+        result.ppm_max = np.maximum(result.ppm_max, ppm.max(axis=1))
+        result.ppm_min = np.minimum(
+            result.ppm_min, np.where(lit, ppm, np.inf).min(axis=1))
+        result.incidence_max = np.maximum(
+            result.incidence_max, np.where(lit, incidence, 0.0).max(axis=1))
+        if min_pixel_density > 0:
+            result.area_below_spec += (
+                lit_weights * (ppm < min_pixel_density)).sum(axis=1)
+
+    result.ppm_mean = ppm_weighted / np.maximum(result.lit_area, 1e-12)
+
+    # Keystone: pixel area here relative to the projector's sharpest pixels
+    lit_samples = result.projector >= 0
+    best = result.projector[lit_samples]
+    result.keystone[lit_samples] = (
+        result.ppm_max[best] /
+        np.maximum(result.pixels_per_meter[lit_samples], 1e-12)) ** 2
+    lit_proj = result.lit_area > 0
+    result.keystone_max[lit_proj] = (
+        result.ppm_max[lit_proj] /
+        np.maximum(result.ppm_min[lit_proj], 1e-12)) ** 2
+    return result
+
+
+def aggregate_to_faces(values, weights, face_index, face_count):
+    """
+    Area-weighted mean of per-sample values for every face.
+
+    Faces without samples get 0.
+
+    Args:
+        values: (M,) per-sample values
+        weights: (M,) sample areas
+        face_index: (M,) face each sample belongs to
+        face_count: Number of faces in the mesh
+    """
+    total = np.bincount(face_index, weights=weights, minlength=face_count)
+    summed = np.bincount(face_index, weights=values * weights,
+                         minlength=face_count)
+    return np.where(total > 0, summed / np.maximum(total, 1e-30), 0.0)
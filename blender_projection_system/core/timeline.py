@@ -0,0 +1,442 @@
+"""
+Frame-range analysis of animated projector rigs and scenery.
+
+Every frame of the range is reduced to a FrameSnapshot: the projector
+arrays and the world-space environment triangles at that frame. A snapshot
+is analysed on its own (surface samples drawn with the same seed every
+frame, shadow-map occlusion, illuminance) and summarised as a FrameResult:
+
+* coverage: fraction of the target surface area lit by any projector,
+* gap: area of the largest connected dark patch of the target surface,
+  found on a voxel grid of the samples (a dark hole opening between two
+  images shows up here, while coverage only drops a little),
+* overlap: area lit by more than one projector,
+* brightness: minimum, mean and uniformity of the illuminance.
+
+Snapshots are identified by a digest of their projectors, geometry and
+analysis settings, so frames where nothing moved, and frames revisited by a
+later run, are read from a FrameCache instead of being analysed again.
+The remaining snapshots are analysed in a process pool; frames sharing a
+digest are analysed once.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+
+import numpy as np
+
+from .mirrors import FoldedProjectors
+from .photometry import solve_illuminance
+from .pointcloud import VoxelGrid
+from .sampling import sample_surface
+from .shadowmap import ShadowMaps
+
+# Forward half of the 26-neighbourhood; with the reverse pairs implied it
+# joins every pair of touching cells once
+NEIGHBOR_OFFSETS = np.array([(x, y, z) for x in (-1, 0, 1)
+                             for y in (-1, 0, 1) for z in (-1, 0, 1)
+                             if (x, y, z) > (0, 0, 0)], dtype=np.int64)
+
+# Gap cells are at least this many sample spacings wide, so neighbouring
+# dark cells are not split by cells that received no sample at all
+GAP_CELL_SPACINGS = 2.0
+
+# Frame results kept in memory; each is a handful of floats
+FRAME_CACHE_SIZE = 16384
+
+
+class FrameSnapshot:
+    """
+    State of the rig and the venue at one frame.
+
+    Args:
+        projectors: ProjectorArrays at the frame
+        vertices, triangles: World-space environment triangles at the frame
+        target: Optional (T,) mask of the triangles whose surface is
+            analysed; every triangle still occludes
+        gain: Screen gain, scalar or (T,) per triangle
+        geometry_key: Digest identifying vertices, triangles and target
+            (e.g. of the mesh data and world matrices); hashed from the
+            arrays when None
+    """
+
+    def __init__(self, projectors, vertices, triangles, target=None,
+                 gain=1.0, geometry_key=None):
+        self.projectors = projectors
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64)
+        if target is not None:
+            target = np.asarray(target, dtype=bool)
+        self.target = target
+        self.gain = np.asarray(gain, dtype=np.float64)
+        self.geometry_key = geometry_key
+        self._key = None
+
+    @property
+    def key(self):
+        """Digest of everything the analysis of this frame depends on."""
+        if self._key is None:
+            digest = hashlib.blake2b(digest_size=16)
+            p = self.projectors
+            for values in (p.origins, p.rotations, p.throw_ratio, p.aspect,
+                           p.shift, p.resolution, p.lumens, p.vignetting):
+                digest.update(np.ascontiguousarray(
+                    values, dtype=np.float64).tobytes())
+            if isinstance(p, FoldedProjectors):
+                digest.update(p.fold_key().encode())
+            if self.geometry_key is not None:
+                digest.update(str(self.geometry_key).encode())
+            else:
+                digest.update(self.vertices.tobytes())
+                digest.update(self.triangles.tobytes())
+                if self.target is not None:
+                    digest.update(self.target.tobytes())
+            digest.update(self.gain.tobytes())
+            self._key = digest.hexdigest()
+        return self._key
+
+
+class FrameResult:
+    """
+    Summary of one analysed frame.
+
+    Attributes:
+        area: Target surface area (m^2)
+        lit_area: Area lit by at least one projector
+        overlap_area: Area lit by more than one projector
+        gap_area: Area of the largest connected dark patch
+        lux_min, lux_mean, uniformity: Illuminance statistics of the lit
+            surface (uniformity = min / mean)
+    """
+
+    FIELDS = ("area", "lit_area", "overlap_area", "gap_area", "lux_min",
+              "lux_mean", "uniformity")
+
+    def __init__(self, area=0.0, lit_area=0.0, overlap_area=0.0,
+                 gap_area=0.0, lux_min=0.0, lux_mean=0.0, uniformity=0.0):
+        self.area = float(area)
+        self.lit_area = float(lit_area)
+        self.overlap_area = float(overlap_area)
+        self.gap_area = float(gap_area)
+        self.lux_min = float(lux_min)
+        self.lux_mean = float(lux_mean)
+        self.uniformity = float(uniformity)
+
+    @property
+    def coverage(self):
+        return self.lit_area / self.area if self.area > 0 else 0.0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.FIELDS})
+
+
+class FrameCache:
+    """Least recently used frame results, keyed by snapshot and settings."""
+
+    def __init__(self, max_entries=FRAME_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __contains__(self, key):
+        return key in self._results
+
+    def get(self, key):
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        self._results.clear()
+
+
+def connected_labels(count, first, second):
+    """
+    Connected components of an undirected graph given as edge lists.
+
+    Labels are propagated to the smallest node index of each component by
+    alternately hooking components onto their smallest neighbour and
+    jumping pointers, which takes a few rounds even on long chains.
+
+    Returns:
+        (count,) label of every node: the smallest node index of its
+        component
+    """
+    labels = np.arange(count)
+    first = np.asarray(first, dtype=np.int64)
+    second = np.asarray(second, dtype=np.int64)
+    while True:
+        a = labels[first]
+        b = labels[second]
+        low = np.minimum(a, b)
+        hooked = labels.copy()
+        np.minimum.at(hooked, a, low)
+        np.minimum.at(hooked, b, low)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, labels):
+            return labels
+        labels = hooked
+
+
+def largest_dark_patch(points, weights, lit, cell_size):
+    """
+    Area of the largest connected unlit region of a sampled surface.
+
+    Samples are binned into cubic cells; a cell is dark when none of its
+    samples is lit, and touching dark cells (26-neighbourhood) form one
+    patch.
+
+    Args:
+        points: (M, 3) sample positions
+        weights: (M,) sample areas
+        lit: (M,) bool, True where a projector reaches the sample
+        cell_size: Cell edge length; the smallest gap width resolved
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) == 0 or np.all(lit):
+        return 0.0
+    grid = VoxelGrid(points, cell_size)
+    dark = np.bincount(grid.point_cell, weights=lit.astype(np.float64),
+                       minlength=len(grid)) == 0
+    cell_area = np.bincount(grid.point_cell, weights=weights,
+                            minlength=len(grid))
+
+    first = []
+    second = []
+    cells = np.flatnonzero(dark)
+    for offset in NEIGHBOR_OFFSETS:
+        neighbor = grid.find(grid.cells[cells] + offset)
+        joined = neighbor >= 0
+        joined[joined] = dark[neighbor[joined]]
+        first.append(cells[joined])
+        second.append(neighbor[joined])
+    labels = connected_labels(len(grid), np.concatenate(first),
+                              np.concatenate(second))
+    return float(np.bincount(labels[cells], weights=cell_area[cells]).max())
+
+
+def analyze_frame(snapshot, sample_count=100000, seed=0,
+                  shadow_resolution=1024, gap_cell=0.25, occlusion=True):
+    """
+    Coverage, gap, overlap and brightness of one frame.
+
+    Args:
+        snapshot: FrameSnapshot
+        sample_count: Random samples on the target surface
+        seed: Sampling seed, the same for every frame so frames differ
+            only where something moved
+        shadow_resolution: Shadow map width in texels
+        gap_cell: Smallest dark patch width resolved (m)
+        occlusion: Whether the environment shadows the projectors
+
+    Returns:
+        FrameResult
+    """
+    triangles = snapshot.triangles
+    target = np.arange(len(triangles)) if snapshot.target is None \
+        else np.flatnonzero(snapshot.target)
+    samples = sample_surface(snapshot.vertices, triangles[target],
+                             sample_count, seed)
+    if len(samples) == 0:
+        return FrameResult()
+
+    gain = snapshot.gain
+    if gain.ndim:
+        gain = gain[target][samples.triangles]
+    projectors = snapshot.projectors
+    visibility = None
+    if occlusion and len(triangles):
+        maps = ShadowMaps(projectors, snapshot.vertices, triangles,
+                          shadow_resolution)
+        visibility = maps.visibility(samples.points)
+    if isinstance(projectors, FoldedProjectors) and projectors.folded.any():
+        # Folded throws: mirror outlines, and depth maps past the mirrors
+        exit_visible = None
+        if occlusion and len(triangles):
+            exit_visible = projectors.exit_visibility(
+                snapshot.vertices, triangles, shadow_resolution)
+        visibility = projectors.visibility(samples.points, visibility,
+                                           exit_visible=exit_visible)
+    result = solve_illuminance(projectors, samples, gain, visibility)
+
+    lit = result.contributors > 0
+    lux = result.statistics()
+    area = samples.total_area
+    spacing = np.sqrt(area / len(samples))
+    gap = largest_dark_patch(samples.points, samples.weights, lit,
+                             max(gap_cell, GAP_CELL_SPACINGS * spacing))
+    return FrameResult(area, lux["lit_area"], lux["stacked_area"], gap,
+                       lux["min"], lux["mean"], lux["uniformity"])
+
+
+class FrameRangeAnalysis:
+    """
+    Incremental, cached and optionally parallel analysis of many frames.
+
+    Add the snapshot of every frame with add() (e.g. while stepping
+    through the timeline), then poll() repeatedly until finished. Frames
+    whose digest is already in the cache are answered at once; frames
+    sharing a digest with a frame in flight wait for its result.
+    max_workers=0 analyses in the calling process, one snapshot per poll().
+
+    Args:
+        cache: FrameCache shared between runs
+        max_workers: Process count (None = one per CPU, 0 = no pool)
+        sample_count, seed, shadow_resolution, gap_cell, occlusion: See
+            analyze_frame
+    """
+
+    def __init__(self, cache, max_workers=None, sample_count=100000, seed=0,
+                 shadow_resolution=1024, gap_cell=0.25, occlusion=True):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.settings = (int(sample_count), int(seed), int(shadow_resolution),
+                         float(gap_cell), bool(occlusion))
+        self.results = {}
+        self.reused = 0
+        self._executor = None
+        self._waiting = {}
+        self._futures = {}
+        self._serial = []
+
+    def key(self, snapshot):
+        """Cache key of a snapshot under these settings."""
+        return snapshot.key + repr(self.settings)
+
+    @property
+    def pending(self):
+        return sum(len(frames) for frames in self._waiting.values())
+
+    @property
+    def finished(self):
+        return not self._waiting
+
+    def add(self, frame, snapshot):
+        """Queue one frame; True when its result came from the cache."""
+        key = self.key(snapshot)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.results[frame] = cached
+            self.reused += 1
+            return True
+        if key in self._waiting:
+            self._waiting[key].append(frame)
+            self.reused += 1
+            return False
+        self._waiting[key] = [frame]
+        self._submit(key, snapshot)
+        return False
+
+    def _submit(self, key, snapshot):
+        if self.max_workers == 0:
+            self._serial.append((key, snapshot))
+            return
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(self.max_workers)
+            except (OSError, NotImplementedError):
+                self._executor = ThreadPoolExecutor(self.max_workers)
+        try:
+            future = self._executor.submit(analyze_frame, snapshot,
+                                           *self.settings)
+        except BrokenProcessPool:
+            # Processes cannot start here (e.g. an embedded interpreter)
+            self._executor = ThreadPoolExecutor(self.max_workers)
+            future = self._executor.submit(analyze_frame, snapshot,
+                                           *self.settings)
+        self._futures[key] = (future, snapshot)
+
+    def _store(self, key, result):
+        self.cache.put(key, result)
+        for frame in self._waiting.pop(key):
+            self.results[frame] = result
+
+    def poll(self):
+        """Collect finished frames; returns their frame numbers."""
+        done = [frame for frames in self._waiting.values() for frame in frames]
+        if self._serial:
+            key, snapshot = self._serial.pop(0)
+            self._store(key, analyze_frame(snapshot, *self.settings))
+        for key, (future, snapshot) in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[key]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+                self._submit(key, snapshot)
+                continue
+            self._store(key, result)
+        waiting = {frame for frames in self._waiting.values()
+                   for frame in frames}
+        return [frame for frame in done if frame not in waiting]
+
+    def run(self):
+        """Blocking: analyse every queued frame; returns `results`."""
+        while not self.finished:
+            if self._futures and not self._serial:
+                # Block on a frame instead of spinning
+                next(iter(self._futures.values()))[0].result()
+            self.poll()
+        self.shutdown()
+        return self.results
+
+    def cancel(self):
+        for future, _ in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._serial.clear()
+        self._waiting.clear()
+        self.shutdown()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def timeline_summary(results):
+    """
+    Worst frames of an analysed range.
+
+    Args:
+        results: Dictionary frame -> FrameResult
+
+    Returns:
+        Dictionary with the minimum coverage, maximum gap and minimum
+        illuminance and the first frame each occurs at
+    """
+    if not results:
+        return {}
+    frames = sorted(results)
+    coverage = np.array([results[f].coverage for f in frames])
+    gap = np.array([results[f].gap_area for f in frames])
+    lux = np.array([results[f].lux_min for f in frames])
+    return {
+        "coverage_min": float(coverage.min()),
+        "coverage_min_frame": int(frames[int(coverage.argmin())]),
+        "gap_max": float(gap.max()),
+        "gap_max_frame": int(frames[int(gap.argmax())]),
+        "lux_min": float(lux.min()),
+        "lux_min_frame": int(frames[int(lux.argmin())]),
+    }
@@ -0,0 +1,377 @@
+"""
+Monte Carlo mounting-tolerance analysis of blend edges.
+
+Rigging is never exact: every projector ends up a little off in position,
+aim, zoom and lens shift. The analysis draws thousands of such trials from
+user-specified distributions and checks every blend edge of the overlap
+graph in each of them:
+
+* gap: part of the edge's blend zone that was lit is lit by neither
+  projector any more (and by no third projector either),
+* excessive overlap: the two images overlap by more than the planned
+  area plus a tolerance, which the blend ramps were not made for.
+
+The blend zone of an edge is the surface lit by one of its projectors that
+lies in the other projector's image or within a margin around it. Its
+samples are expressed once in the nominal local frame of both projectors;
+a trial then only moves those local coordinates (rotation and offset in
+the projector's own axes) and re-projects them, evaluated as one array
+over (trials x zone samples) per edge projector and block. Occlusion and
+facing are taken from the nominal layout, as millimetre offsets do not
+change which surfaces a projector sees.
+
+Trials are drawn in fixed-size batches seeded by (seed, batch), so results
+are reproducible and independent of how the batches are spread over
+worker processes.
+"""
+
+import numpy as np
+
+from .frustum import NEAR_CLIP, chunk_slices, facing_mask, inside_image, \
+    project_points
+from .mesh_io import map_chunks
+from .overlap import overlap_graph
+from .surface_metrics import lit_mask, sample_chunk_size
+
+# Upper bound on (trials x zone samples) elements evaluated at once
+TRIAL_BUDGET = 200_000
+
+# Trials per pool task; fixed so the seeding does not depend on the workers
+TRIAL_BATCH = 256
+
+# Error distributions of the perturbations
+DISTRIBUTIONS = ('NORMAL', 'UNIFORM')
+
+
+class ToleranceModel:
+    """
+    Rigging errors of every projector, drawn independently per trial.
+
+    Args:
+        position: Position error (m), per axis of the projector
+        rotation: Yaw, pitch and roll error (degrees)
+        zoom: Relative throw ratio error (e.g. 0.01 for 1 %)
+        shift: Lens shift error, as a fraction of the image
+        distribution: 'NORMAL' (the values are standard deviations) or
+            'UNIFORM' (the values are the largest error either way)
+    """
+
+    def __init__(self, position=0.02, rotation=0.25, zoom=0.0, shift=0.0,
+                 distribution='NORMAL'):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}'")
+        self.position = float(position)
+        self.rotation = float(rotation)
+        self.zoom = float(zoom)
+        self.shift = float(shift)
+        self.distribution = distribution
+
+    def draw(self, rng, shape, scale):
+        if scale <= 0:
+            return np.zeros(shape)
+        if self.distribution == 'UNIFORM':
+            return rng.uniform(-scale, scale, shape)
+        return rng.normal(0.0, scale, shape)
+
+    def perturb(self, rng, trials, count):
+        """
+        Errors of `count` projectors in `trials` trials.
+
+        Returns:
+            Tuple (rotation (K, N, 3, 3), offset (K, N, 3), zoom (K, N),
+            shift (K, N, 2)); rotation and offset are in the projectors'
+            local axes
+        """
+        offset = self.draw(rng, (trials, count, 3), self.position)
+        yaw, pitch, roll = np.radians(
+            self.draw(rng, (3, trials, count), self.rotation))
+        zoom = 1.0 + self.draw(rng, (trials, count), self.zoom)
+        shift = self.draw(rng, (trials, count, 2), self.shift)
+        return _axis_rotations(yaw, pitch, roll), offset, zoom, shift
+
+
+def _axis_rotations(yaw, pitch, roll):
+    """Rz(yaw) @ Rx(pitch) @ Ry(roll) about the local up, right and forward axes."""
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cr, sr = np.cos(roll), np.sin(roll)
+    one = np.ones_like(yaw)
+    zero = np.zeros_like(yaw)
+    rz = np.stack([np.stack([cy, -sy, zero], -1),
+                   np.stack([sy, cy, zero], -1),
+                   np.stack([zero, zero, one], -1)], -2)
+    rx = np.stack([np.stack([one, zero, zero], -1),
+                   np.stack([zero, cp, -sp], -1),
+                   np.stack([zero, sp, cp], -1)], -2)
+    ry = np.stack([np.stack([cr, zero, sr], -1),
+                   np.stack([zero, one, zero], -1),
+                   np.stack([-sr, zero, cr], -1)], -2)
+    return rz @ rx @ ry
+
+
+class ToleranceProblem:
+    """
+    Blend zones of every edge, prepared for the trials.
+
+    Build with tolerance_problem(). Zone samples of all edges are stored
+    back to back (edge e owns rows zone_start[e]:zone_start[e + 1]).
+
+    Attributes:
+        edges: (E, 2) projector pairs
+        nominal_overlap: (E,) area lit by both projectors as planned
+        sample: (S,) index of every zone sample in the analysed samples
+        projector: (S, 2) the two projectors of every zone sample
+        local: (S, 2, 3) nominal local coordinates in both projectors
+        visible: (S, 2) facing and unoccluded from either projector
+        weights: (S,) sample areas
+        counted: (S,) zone samples that turn into a gap when both
+            projectors miss them (lit as planned, no third projector)
+    """
+
+    def __init__(self, projectors, edges, nominal_overlap, zone_start,
+                 sample, projector, local, visible, weights, counted):
+        self.throw_ratio = projectors.throw_ratio
+        self.aspect = projectors.aspect
+        self.shift = projectors.shift
+        self.count = len(projectors)
+        self.edges = edges
+        self.nominal_overlap = nominal_overlap
+        self.zone_start = zone_start
+        self.sample = sample
+        self.projector = projector
+        self.local = local
+        self.visible = visible
+        self.weights = weights
+        self.counted = counted
+
+    def __len__(self):
+        return len(self.weights)
+
+
+def tolerance_problem(projectors, samples, visibility=None, margin=0.1,
+                      edges=None):
+    """
+    Find the blend zones of the overlapping projector pairs.
+
+    Args:
+        projectors: ProjectorArrays as planned
+        samples: SurfaceSamples
+        visibility: Optional occlusion callable, see lit_mask
+        margin: Width of the band around the other projector's image
+            included in a zone, as a fraction of that image
+        edges: Optional (E, 2) projector pairs to check; every overlapping
+            pair when None
+
+    Returns:
+        ToleranceProblem
+    """
+    m = len(samples)
+    if edges is None:
+        edges = overlap_graph(projectors, samples, visibility).edges
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+
+    # Projectors lighting every sample as planned
+    coverage = np.zeros(m, dtype=np.int64)
+    index = np.arange(len(projectors))
+    for sl in chunk_slices(m, sample_chunk_size(len(projectors))):
+        lit, _, _, _ = lit_mask(projectors, samples.points[sl],
+                                samples.normals[sl], visibility, index, sl)
+        coverage[sl] = lit.sum(axis=0)
+
+    zone_start = [0]
+    overlap = np.zeros(len(edges))
+    parts = []
+    for e, pair in enumerate(edges):
+        pair_arrays = projectors.subset(pair)
+        zone = []
+        for sl in chunk_slices(m, sample_chunk_size(2)):
+            points = samples.points[sl]
+            u, v, depth = project_points(pair_arrays, points)
+            near = inside_image(u, v, depth, -margin)
+            near &= facing_mask(pair_arrays, points, samples.normals[sl])
+            if visibility is not None and near.any():
+                near &= visibility(pair, sl, near)
+            lit = near & inside_image(u, v, depth)
+            keep = (lit[0] & near[1]) | (lit[1] & near[0])
+            rows = np.flatnonzero(keep)
+            zone.append((rows + sl.start, near[:, rows].T, lit[:, rows].T))
+        rows = np.concatenate([z[0] for z in zone])
+        visible = np.concatenate([z[1] for z in zone])
+        lit = np.concatenate([z[2] for z in zone])
+        overlap[e] = samples.weights[rows][lit.all(axis=1)].sum()
+        parts.append((rows, visible, lit, pair))
+        zone_start.append(zone_start[-1] + len(rows))
+
+    rows = np.concatenate([p[0] for p in parts]) if parts else \
+        np.zeros(0, dtype=np.int64)
+    visible = np.concatenate([p[1] for p in parts]) if parts else \
+        np.zeros((0, 2), dtype=bool)
+    lit = np.concatenate([p[2] for p in parts]) if parts else \
+        np.zeros((0, 2), dtype=bool)
+    projector = np.concatenate([np.broadcast_to(p[3], (len(p[0]), 2))
+                                for p in parts]) if parts else \
+        np.zeros((0, 2), dtype=np.int64)
+
+    # Nominal local coordinates, local = R^T (p - o)
+    offsets = samples.points[rows][:, None] - projectors.origins[projector]
+    local = np.einsum('skji,skj->ski', projectors.rotations[projector],
+                      offsets)
+    counted = lit.any(axis=1) & (coverage[rows] == lit.sum(axis=1))
+    return ToleranceProblem(projectors, edges, overlap,
+                            np.asarray(zone_start), rows, projector, local,
+                            visible, samples.weights[rows], counted)
+
+
+def trial_areas(problem, rotation, offset, zoom, shift):
+    """
+    Gap and overlap area of every edge in a block of trials.
+
+    Args:
+        problem: ToleranceProblem
+        rotation, offset, zoom, shift: Errors from ToleranceModel.perturb
+
+    Returns:
+        Tuple (gap (K, E), overlap (K, E)) areas
+    """
+    trials = len(zoom)
+    edges = len(problem.edges)
+    gap = np.zeros((trials, edges))
+    overlap = np.zeros((trials, edges))
+    if len(problem) == 0:
+        return gap, overlap
+
+    chunk = max(1, TRIAL_BUDGET // max(trials, 1))
+    for e, pair in enumerate(problem.edges):
+        zone = slice(problem.zone_start[e], problem.zone_start[e + 1])
+        for sl in chunk_slices(zone.stop - zone.start, chunk):
+            rows = slice(zone.start + sl.start, zone.start + sl.stop)
+            lit = np.stack([_trial_lit(problem, projector, side, rows,
+                                       rotation, offset, zoom, shift)
+                            for side, projector in enumerate(pair)], axis=2)
+            weights = problem.weights[rows]
+            dark = ~lit.any(axis=2) & problem.counted[rows]
+            gap[:, e] += dark @ weights
+            overlap[:, e] += lit.all(axis=2) @ weights
+    return gap, overlap
+
+
+def _trial_lit(problem, projector, side, rows, rotation, offset, zoom,
+               shift):
+    """(K, S) zone samples inside the image of one moved projector."""
+    # local = Q^T (L - d), one (K, 3) x (3, S) product per axis
+    turn = rotation[:, projector]
+    nominal = problem.local[rows, side].T
+    moved = np.einsum('kj,kji->ki', offset[:, projector], turn)
+    x, y, z = (turn[:, :, i] @ nominal - moved[:, i, None] for i in range(3))
+    depth = -y
+    # Throw ratio over depth, the image scale at every sample
+    scale = (problem.throw_ratio[projector] * zoom[:, projector])[:, None] / \
+        np.where(depth > NEAR_CLIP, depth, np.inf)
+    u = (0.5 - problem.shift[projector, 0] - shift[:, projector, 0, None]
+         - x * scale)
+    v = (0.5 - problem.shift[projector, 1] - shift[:, projector, 1, None]
+         + z * scale * problem.aspect[projector])
+    return inside_image(u, v, depth) & problem.visible[rows, side]
+
+
+def _tolerance_batch(problem, model, seed, batch, trials):
+    rng = np.random.default_rng([seed, batch])
+    return trial_areas(problem, *model.perturb(rng, trials, problem.count))
+
+
+class ToleranceResult:
+    """
+    Outcome of run_tolerance.
+
+    Attributes:
+        edges: (E, 2) projector pairs
+        nominal_overlap: (E,) planned overlap areas
+        gap_area, overlap_area: (K, E) areas of every trial
+        min_gap: Gap area that counts as a visible gap
+        overlap_tolerance: Relative overlap growth that counts as excessive
+    """
+
+    def __init__(self, edges, nominal_overlap, gap_area, overlap_area,
+                 min_gap, overlap_tolerance):
+        self.edges = edges
+        self.nominal_overlap = nominal_overlap
+        self.gap_area = gap_area
+        self.overlap_area = overlap_area
+        self.min_gap = float(min_gap)
+        self.overlap_tolerance = float(overlap_tolerance)
+
+    @property
+    def trials(self):
+        return len(self.gap_area)
+
+    @property
+    def gap(self):
+        """(K, E) trials with a gap at each edge."""
+        return self.gap_area > self.min_gap
+
+    @property
+    def excess(self):
+        """(K, E) trials with too much overlap at each edge."""
+        limit = self.nominal_overlap * (1.0 + self.overlap_tolerance)
+        return self.overlap_area > limit[None]
+
+    @property
+    def gap_probability(self):
+        return self.gap.mean(axis=0) if self.trials else \
+            np.zeros(len(self.edges))
+
+    @property
+    def excess_probability(self):
+        return self.excess.mean(axis=0) if self.trials else \
+            np.zeros(len(self.edges))
+
+    @property
+    def failure_probability(self):
+        """(E,) probability of a gap or excessive overlap at each edge."""
+        return (self.gap | self.excess).mean(axis=0) if self.trials else \
+            np.zeros(len(self.edges))
+
+    def summary(self, index):
+        """Plain dictionary summary for one edge."""
+        overlap = self.overlap_area[:, index]
+        return {
+            "gap_probability": float(self.gap_probability[index]),
+            "excess_probability": float(self.excess_probability[index]),
+            "failure_probability": float(self.failure_probability[index]),
+            "nominal_overlap": float(self.nominal_overlap[index]),
+            "overlap_p05": float(np.percentile(overlap, 5)),
+            "overlap_p95": float(np.percentile(overlap, 95)),
+            "gap_p95": float(np.percentile(self.gap_area[:, index], 95)),
+        }
+
+
+def run_tolerance(problem, model, trials=2000, seed=0, workers=1,
+                  min_gap=0.0, overlap_tolerance=0.25,
+                  batch_size=TRIAL_BATCH):
+    """
+    Run the trials, in worker processes when workers > 1.
+
+    Args:
+        problem: ToleranceProblem
+        model: ToleranceModel
+        trials: Number of trials
+        seed: Seed that makes the run reproducible
+        workers: Process count
+        min_gap: Dark area (m^2) an edge must reach to count as a gap
+        overlap_tolerance: Overlap growth over the planned area, as a
+            fraction of it, that counts as excessive
+
+    Returns:
+        ToleranceResult
+    """
+    tasks = [(problem, model, int(seed), batch,
+              min(batch_size, trials - start))
+             for batch, start in enumerate(range(0, int(trials), batch_size))]
+    parts = map_chunks(_tolerance_batch, tasks, workers)
+    edges = len(problem.edges)
+    gap = np.concatenate([p[0] for p in parts]) if parts else \
+        np.zeros((0, edges))
+    overlap = np.concatenate([p[1] for p in parts]) if parts else \
+        np.zeros((0, edges))
+    return ToleranceResult(problem.edges, problem.nominal_overlap, gap,
+                           overlap, min_gap, overlap_tolerance)
@@ -0,0 +1,166 @@
+"""
+Warp meshes: where a projector's pixel grid lands on the environment.
+
+A warp mesh samples the projector's native raster on a coarse grid
+(e.g. 64 x 36 points), casts a ray through every grid point and records
+the surface point, the triangle it hit and the surface UV there. Media
+servers use it to pre-distort content: the grid in output (projector)
+space carries the content coordinates to sample at each point.
+"""
+
+import csv
+
+import numpy as np
+
+from .frustum import pixel_rays
+
+
+class WarpMesh:
+    """
+    Warp grid of one projector, stored row-major with row 0 at the top.
+
+    Attributes:
+        columns, rows: Grid size
+        resolution: (width, height) of the projector raster
+        u, v: (rows * columns,) normalized projector coordinates
+        hit: (rows * columns,) mask of grid points that reach a surface
+        points: (rows * columns, 3) world positions of the hits
+        triangle: (rows * columns,) hit triangle, -1 for misses
+        surface_uv: (rows * columns, 2) surface UV at the hits
+    """
+
+    def __init__(self, name, columns, rows, resolution, u, v, hit, points,
+                 triangle, surface_uv):
+        self.name = name
+        self.columns = columns
+        self.rows = rows
+        self.resolution = tuple(int(r) for r in resolution)
+        self.u = u
+        self.v = v
+        self.hit = hit
+        self.points = points
+        self.triangle = triangle
+        self.surface_uv = surface_uv
+
+    @property
+    def pixel_x(self):
+        return self.u * self.resolution[0]
+
+    @property
+    def pixel_y(self):
+        """Pixel row measured from the top of the raster."""
+        return (1.0 - self.v) * self.resolution[1]
+
+    @property
+    def hit_fraction(self):
+        return float(self.hit.mean()) if len(self.hit) else 0.0
+
+    def quads(self):
+        """(Q, 4) grid indices of the cells whose four corners all hit."""
+        c = self.columns
+        row, col = np.meshgrid(np.arange(self.rows - 1), np.arange(c - 1),
+                               indexing='ij')
+        corner = (row * c + col).reshape(-1)
+        quads = np.stack([corner + c, corner + c + 1, corner + 1, corner],
+                         axis=1)
+        return quads[self.hit[quads].all(axis=1)]
+
+
+def warp_grid(columns, rows):
+    """Normalized (u, v) of a columns x rows grid spanning the full image."""
+    u, v = np.meshgrid(np.linspace(0.0, 1.0, int(columns)),
+                       np.linspace(1.0, 0.0, int(rows)))
+    return u.reshape(-1), v.reshape(-1)
+
+
+def compute_warps(projectors, bvh, columns, rows, corner_uvs=None):
+    """
+    Ray cast the warp grids of all projectors in one batch.
+
+    Args:
+        projectors: ProjectorArrays
+        bvh: raycast.TriangleBVH of the environment
+        columns, rows: Grid size per projector
+        corner_uvs: Optional (T, 3, 2) UVs at every triangle corner
+
+    Returns:
+        List of WarpMesh, one per projector
+    """
+    u, v = warp_grid(columns, rows)
+    count = len(u)
+    n = len(projectors)
+    origins = np.repeat(projectors.origins, count, axis=0)
+    directions = np.concatenate([pixel_rays(projectors, i, u, v)
+                                 for i in range(n)]) if n else \
+        np.zeros((0, 3))
+    hits = bvh.ray_cast(origins, directions)
+    points = hits.points(origins, directions)
+    if corner_uvs is not None and len(corner_uvs):
+        surface_uv = hits.interpolate(corner_uvs)
+    else:
+        surface_uv = np.zeros((len(hits), 2))
+
+    warps = []
+    for i in range(n):
+        sl = slice(i * count, (i + 1) * count)
+        warps.append(WarpMesh(projectors.names[i], int(columns), int(rows),
+                              projectors.resolution[i], u, v,
+                              hits.hit[sl], points[sl], hits.triangle[sl],
+                              surface_uv[sl]))
+    return warps
+
+
+def write_warp_obj(warp, path, space='OUTPUT'):
+    """
+    Write a warp mesh as OBJ.
+
+    Args:
+        space: 'OUTPUT' puts the vertices at the normalized projector
+            coordinates (x right, y up) with the surface UV as texture
+            coordinates, the layout media servers use to warp content.
+            'SURFACE' puts them at the world hit positions with the
+            projector coordinates as texture coordinates.
+    """
+    index = np.full(len(warp.u), -1, dtype=np.int64)
+    index[warp.hit] = np.arange(int(warp.hit.sum()))
+    if space == 'SURFACE':
+        vertices = warp.points[warp.hit]
+        texture = np.stack([warp.u, warp.v], axis=1)[warp.hit]
+    else:
+        vertices = np.stack([warp.u, warp.v, np.zeros_like(warp.u)],
+                            axis=1)[warp.hit]
+        texture = warp.surface_uv[warp.hit]
+
+    faces = index[warp.quads()] + 1
+    with open(path, "w", newline="\n") as handle:
+        handle.write(f"# Warp mesh for {warp.name}: {warp.columns}x"
+                     f"{warp.rows} grid, {warp.resolution[0]}x"
+                     f"{warp.resolution[1]} px\n")
+        handle.write(f"o {warp.name}\n")
+        np.savetxt(handle, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(handle, texture, fmt="vt %.6f %.6f")
+        if len(faces):
+            np.savetxt(handle, np.repeat(faces, 2, axis=1),
+                       fmt="f %d/%d %d/%d %d/%d %d/%d")
+    return path
+
+
+CSV_HEADER = ["column", "row", "pixel_x", "pixel_y", "u", "v", "hit", "x",
+              "y", "z", "surface_u", "surface_v"]
+
+
+def write_warp_csv(warp, path):
+    """Write every grid point of a warp mesh as one CSV row."""
+    row, column = np.divmod(np.arange(len(warp.u)), warp.columns)
+    table = np.column_stack([column, row, warp.pixel_x, warp.pixel_y,
+                             warp.u, warp.v, warp.hit, warp.points,
+                             warp.surface_uv])
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(CSV_HEADER)
+        for values in table:
+            writer.writerow([int(values[0]), int(values[1])] +
+                            [f"{x:.6f}" for x in values[2:6]] +
+                            [int(values[6])] +
+                            [f"{x:.6f}" for x in values[7:]])
+    return path
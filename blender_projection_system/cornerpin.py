@@ -0,0 +1,161 @@
+import os
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Operator
+
+from .core.cornerpin import (
+    fit_plane,
+    screen_rectangles,
+    solve_corner_pins,
+    throw_plane_frames,
+    write_corner_pin_csv,
+)
+from .scene_arrays import matrix_to_numpy, mesh_triangles, projector_arrays, scene_projectors
+
+# Screens deviating from their plane by more than this fraction of their size need a warp mesh
+FLATNESS_TOLERANCE = 0.005
+
+# Plane frames of target meshes by object name, dropped when the object changes
+_plane_cache = {}
+
+# Inputs each projector's stored corner pin was last solved from
+_pin_signatures = {}
+
+def target_plane(obj, depsgraph):
+    """Plane frame of a corner pin target mesh (see core.cornerpin.fit_plane)"""
+    plane = _plane_cache.get(obj.name)
+    if plane is None:
+        vertices, triangles, _ = mesh_triangles(obj, depsgraph)
+        # The screen's own X axis orients the plane coordinates
+        reference = matrix_to_numpy(obj.matrix_world.to_3x3())[:, 0]
+        plane = fit_plane(vertices, triangles, reference)
+        _plane_cache[obj.name] = plane
+    return plane
+
+def solve_scene_corner_pins(projectors, depsgraph):
+    """
+    Solve the corner pins of projector objects in one batch.
+
+    Projectors without a target screen are solved on the image plane at
+    their throw distance, the quad "Create Test Surface" builds.
+
+    Returns:
+        Tuple (CornerPins, names of targets that are not flat)
+    """
+    arrays = projector_arrays(projectors)
+    origin, normal, axis_u, axis_v, size = throw_plane_frames(
+        arrays, [proj.pj_throw_distance for proj in projectors])
+
+    not_flat = []
+    for i, proj in enumerate(projectors):
+        target = proj.pj_corner_pin_target
+        if target is None:
+            continue
+        try:
+            plane = target_plane(target, depsgraph)
+        except ValueError:
+            not_flat.append(target.name)
+            continue
+        origin[i], normal[i], axis_u[i], axis_v[i], size[i], flatness = plane
+        if flatness > FLATNESS_TOLERANCE * max(size[i]) and target.name not in not_flat:
+            not_flat.append(target.name)
+
+    pins = solve_corner_pins(arrays, origin, normal, axis_u, axis_v, screen_rectangles(size))
+    return pins, not_flat
+
+def projector_signature(obj):
+    """Everything a projector's corner pin depends on, for change detection"""
+    target = obj.pj_corner_pin_target
+    return (tuple(value for row in obj.matrix_world for value in row),
+            obj.pj_throw_ratio, obj.pj_throw_distance, obj.pj_aspect_ratio_w,
+            obj.pj_aspect_ratio_h, obj.pj_lens_shift_h, obj.pj_lens_shift_v,
+            obj.pj_resolution_x, obj.pj_resolution_y,
+            target.name if target is not None else "")
+
+def store_corner_pins(projectors, pins):
+    for index, proj in enumerate(projectors):
+        proj["pj_corner_pin"] = pins.summary(index)
+        _pin_signatures[proj.name] = projector_signature(proj)
+
+def update_corner_pins(scene, depsgraph):
+    """
+    Re-solve only the projectors whose inputs changed since their last solve.
+
+    Returns:
+        Number of projectors solved
+    """
+    changed = [obj for obj in scene.objects
+               if obj.pj_is_projector and _pin_signatures.get(obj.name) != projector_signature(obj)]
+    if changed:
+        pins, _ = solve_scene_corner_pins(changed, depsgraph)
+        store_corner_pins(changed, pins)
+    return len(changed)
+
+@persistent
+def corner_pin_depsgraph_update(scene, depsgraph):
+    """Keep the stored corner pins in sync while projectors and screens are edited"""
+    if not scene.pj_live_corner_pins:
+        # Edits made meanwhile aren't tracked, so start over when switched back on
+        _plane_cache.clear()
+        _pin_signatures.clear()
+        return
+
+    # Edited screens invalidate their plane and the projectors pinned to them
+    edited = {update.id.original.name for update in depsgraph.updates
+              if isinstance(update.id, bpy.types.Object)
+              and (update.is_updated_geometry or update.is_updated_transform)}
+    for name in edited & _plane_cache.keys():
+        del _plane_cache[name]
+        for obj in scene.objects:
+            if obj.pj_is_projector and obj.pj_corner_pin_target and obj.pj_corner_pin_target.name == name:
+                _pin_signatures.pop(obj.name, None)
+
+    update_corner_pins(scene, depsgraph)
+
+class PJ_OT_export_corner_pins(Operator):
+    """Solve every projector's corner pin and homography on its flat screen and export them as a table"""
+    bl_idname = "projection.export_corner_pins"
+    bl_label = "Export Corner Pins"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        scene = context.scene
+        projectors = scene_projectors(context)
+
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+
+        directory = bpy.path.abspath(scene.pj_output_directory)
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            self.report({'ERROR'}, f"Cannot create output directory: {e}")
+            return {'CANCELLED'}
+
+        # Always start from fresh planes; the screens may have been edited without live updates
+        _plane_cache.clear()
+        pins, not_flat = solve_scene_corner_pins(projectors, context.evaluated_depsgraph_get())
+        store_corner_pins(projectors, pins)
+
+        path = write_corner_pin_csv(pins, os.path.join(directory, "corner_pins.csv"))
+
+        missed = [name for name, valid in zip(pins.names, pins.valid) if not valid]
+        if not_flat:
+            self.report({'WARNING'}, f"Not flat, export warp meshes instead: {', '.join(not_flat)}")
+        if missed:
+            self.report({'WARNING'}, f"Image does not land on the screen plane for: {', '.join(missed)}")
+        self.report({'INFO'}, f"Wrote corner pins of {len(projectors)} projectors to {path}")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_export_corner_pins)
+    bpy.app.handlers.depsgraph_update_post.append(corner_pin_depsgraph_update)
+
+def unregister():
+    if corner_pin_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(corner_pin_depsgraph_update)
+    bpy.utils.unregister_class(PJ_OT_export_corner_pins)
+    _plane_cache.clear()
+    _pin_signatures.clear()
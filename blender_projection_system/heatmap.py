@@ -0,0 +1,271 @@
+import bpy
+from bpy.types import Operator
+import numpy as np
+
+from .core.heatmap import DEFAULT_RAMP, NO_DATA_COLOR, corner_colors, heatmap_colors, value_range
+from .proxy import report_stale_proxies
+from .scene_arrays import environment_objects, point_cloud_objects, stale_proxy_sources
+
+HEATMAP_ATTRIBUTE = "pj_heatmap"
+MATERIAL_NAME = "PJ Heatmap"
+RAMP_NODE = "Heatmap Ramp"
+
+# Face attribute each heatmap source reads and the unit shown in the legend
+HEATMAP_SOURCES = {
+    'PIXEL_DENSITY': ("pj_pixels_per_meter", "px/m"),
+    'KEYSTONE': ("pj_keystone", "x"),
+    'INCIDENCE': ("pj_incidence", "°"),
+    'ILLUMINANCE': ("pj_illuminance", "lx"),
+    'LUMINANCE': ("pj_luminance", "cd/m²"),
+    'COVERAGE': ("pj_projector_count", "projectors"),
+    'OVERLAP': ("pj_projector_count", "overlap"),
+    'AUDIENCE_SHADOW': ("pj_audience_shadow", "shadowed"),
+    'SIGHTLINES': ("pj_sightline_seats", "of seats"),
+}
+
+def read_face_attribute(mesh, name, domain='FACE'):
+    """Values of a FLOAT face (or point) attribute with one bulk read, or None if the mesh has none"""
+    attribute = mesh.attributes.get(name)
+    if attribute is None or attribute.domain != domain or attribute.data_type != 'FLOAT':
+        return None
+    values = np.empty(len(mesh.polygons) if domain == 'FACE' else len(mesh.vertices), dtype=np.float32)
+    attribute.data.foreach_get("value", values)
+    return values.astype(np.float64)
+
+def source_values(source, values):
+    """(values, valid mask) shown for a heatmap source; unlit faces have no pixel or light metrics"""
+    if source == 'OVERLAP':
+        return (values > 1).astype(np.float64), np.ones(len(values), dtype=bool)
+    if source in ('COVERAGE', 'AUDIENCE_SHADOW', 'SIGHTLINES'):
+        return values, np.ones(len(values), dtype=bool)
+    return values, values > 0
+
+def heatmap_material():
+    """The material every environment object shares while the heatmap is shown"""
+    mat = bpy.data.materials.get(MATERIAL_NAME)
+    if mat is not None and mat.use_nodes and RAMP_NODE in mat.node_tree.nodes:
+        return mat
+    if mat is None:
+        mat = bpy.data.materials.new(name=MATERIAL_NAME)
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    for node in list(nodes):
+        nodes.remove(node)
+
+    output = nodes.new(type='ShaderNodeOutputMaterial')
+    output.location = (700, 0)
+    emission = nodes.new(type='ShaderNodeEmission')
+    emission.location = (500, 0)
+    attribute = nodes.new(type='ShaderNodeAttribute')
+    attribute.attribute_type = 'GEOMETRY'
+    attribute.attribute_name = HEATMAP_ATTRIBUTE
+    attribute.location = (-400, 0)
+
+    # Alpha holds the normalized value, so editing the ramp recolours the material at once
+    ramp = nodes.new(type='ShaderNodeValToRGB')
+    ramp.name = RAMP_NODE
+    ramp.label = "Heatmap"
+    ramp.location = (-150, 100)
+    elements = ramp.color_ramp.elements
+    for position, color in DEFAULT_RAMP[1:-1]:
+        elements.new(position).color = color
+    elements[0].position, elements[0].color = DEFAULT_RAMP[0]
+    elements[-1].position, elements[-1].color = DEFAULT_RAMP[-1]
+    links.new(attribute.outputs['Alpha'], ramp.inputs['Fac'])
+
+    # Faces without a result carry a negative alpha and stay grey
+    has_data = nodes.new(type='ShaderNodeMath')
+    has_data.operation = 'GREATER_THAN'
+    has_data.inputs[1].default_value = -0.5
+    has_data.location = (-150, -150)
+    links.new(attribute.outputs['Alpha'], has_data.inputs[0])
+
+    # The colour sockets of the Mix node are inputs 6/7 and output 2
+    mix = nodes.new(type='ShaderNodeMix')
+    mix.data_type = 'RGBA'
+    mix.location = (200, 0)
+    mix.inputs[6].default_value = (*NO_DATA_COLOR, 1.0)
+    links.new(has_data.outputs[0], mix.inputs['Factor'])
+    links.new(ramp.outputs['Color'], mix.inputs[7])
+    links.new(mix.outputs[2], emission.inputs['Color'])
+    links.new(emission.outputs[0], output.inputs[0])
+    return mat
+
+def ramp_node(mat=None):
+    """The ColorRamp node of the heatmap material, or None before the heatmap was first shown"""
+    mat = mat or bpy.data.materials.get(MATERIAL_NAME)
+    if mat is None or not mat.use_nodes:
+        return None
+    return mat.node_tree.nodes.get(RAMP_NODE)
+
+def ramp_stops(mat):
+    """(positions, colors, interpolation) of the material's ramp, for evaluating it in NumPy"""
+    ramp = ramp_node(mat).color_ramp
+    positions = np.array([element.position for element in ramp.elements])
+    colors = np.array([tuple(element.color) for element in ramp.elements])
+    # Smooth interpolations are close enough to linear for face colours
+    interpolation = 'CONSTANT' if ramp.interpolation == 'CONSTANT' else 'LINEAR'
+    return positions, colors, interpolation
+
+def write_heatmap_colors(mesh, face_colors, domain='CORNER'):
+    """
+    Store (F, 4) face colours as the mesh's active corner colour attribute with one bulk write.
+
+    Point clouds pass (V, 4) point colours with the POINT domain.
+    """
+    attribute = mesh.attributes.get(HEATMAP_ATTRIBUTE)
+    if attribute is not None and (attribute.domain != domain or attribute.data_type != 'FLOAT_COLOR'):
+        mesh.attributes.remove(attribute)
+        attribute = None
+    if attribute is None:
+        attribute = mesh.color_attributes.new(name=HEATMAP_ATTRIBUTE, type='FLOAT_COLOR', domain=domain)
+
+    if domain == 'CORNER':
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        colors = corner_colors(face_colors, loop_totals)
+    else:
+        colors = face_colors
+    attribute.data.foreach_set("color", np.ascontiguousarray(colors, dtype=np.float32).reshape(-1))
+    mesh.color_attributes.active_color = attribute
+    mesh.update()
+
+def refresh_heatmap(context):
+    """
+    Recolour the environment surfaces from the current analysis attributes.
+
+    One bulk read and one bulk write per mesh, cheap enough to run after every analysis.
+
+    Returns:
+        Legend dictionary (source, low, high, unit, faces with data)
+    """
+    scene = context.scene
+    source = scene.pj_heatmap_source
+    name, unit = HEATMAP_SOURCES[source]
+    objects = environment_objects(context, use_proxies=True) + point_cloud_objects(context)
+
+    meshes = []
+    for obj in objects:
+        mesh = obj.data
+        # Point clouds carry their results per point
+        domain = 'POINT' if obj.pj_is_point_cloud else 'FACE'
+        values = read_face_attribute(mesh, name, domain)
+        if values is None:
+            count = len(mesh.vertices) if obj.pj_is_point_cloud else len(mesh.polygons)
+            values = np.zeros(count)
+            valid = np.zeros(count, dtype=bool)
+        else:
+            values, valid = source_values(source, values)
+        meshes.append((mesh, values, valid, 'CORNER' if domain == 'FACE' else domain))
+
+    if source == 'OVERLAP':
+        low, high = 0.0, 1.0
+    elif scene.pj_heatmap_auto_range:
+        values = np.concatenate([entry[1] for entry in meshes]) if meshes else np.zeros(0)
+        valid = np.concatenate([entry[2] for entry in meshes]) if meshes else np.zeros(0, dtype=bool)
+        low, high = value_range(values, valid)
+        if source in ('COVERAGE', 'AUDIENCE_SHADOW', 'SIGHTLINES'):
+            low = 0.0
+    else:
+        low, high = scene.pj_heatmap_min, scene.pj_heatmap_max
+
+    positions, colors, interpolation = ramp_stops(heatmap_material())
+    # A mesh shared by several objects is coloured once
+    done = set()
+    faces = 0
+    for mesh, values, valid, domain in meshes:
+        if mesh.name in done:
+            continue
+        done.add(mesh.name)
+        write_heatmap_colors(mesh, heatmap_colors(values, low, high, positions, colors, valid,
+                                                  interpolation), domain)
+        faces += int(valid.sum())
+
+    legend = {"source": source, "low": float(low), "high": float(high), "unit": unit, "faces": faces}
+    scene["pj_heatmap_legend"] = legend
+    return legend
+
+def set_heatmap_material(objects, show):
+    """
+    Show or hide the heatmap material on objects without touching their own materials.
+
+    The heatmap is linked to the object's material slots, which override the mesh's
+    materials; hiding it links the slots back to the mesh. Analysis proxies carry
+    the results, so they are drawn solid in place of their (hidden) source objects.
+    """
+    mat = heatmap_material()
+    for obj in objects:
+        if obj.pj_is_proxy:
+            obj.display_type = 'TEXTURED' if show else 'WIRE'
+            if obj.parent is not None:
+                obj.parent.hide_set(show)
+        if show:
+            if not obj.material_slots:
+                obj.data.materials.append(None)
+            for slot in obj.material_slots:
+                slot.link = 'OBJECT'
+                slot.material = mat
+        else:
+            for slot in obj.material_slots:
+                if slot.link == 'OBJECT' and slot.material == mat:
+                    slot.material = None
+                    slot.link = 'DATA'
+
+def set_solid_color_type(context, color_type):
+    """Switch the solid shading colour of the screen's 3D views (VERTEX shows the colour attribute)"""
+    screen = context.screen
+    if screen is None:
+        return
+    for area in screen.areas:
+        if area.type == 'VIEW_3D':
+            area.spaces.active.shading.color_type = color_type
+
+class PJ_OT_show_heatmap(Operator):
+    """Colour the environment surfaces by the chosen analysis result"""
+    bl_idname = "projection.show_heatmap"
+    bl_label = "Show Heatmap"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        environment = environment_objects(context, use_proxies=True) + point_cloud_objects(context)
+        report_stale_proxies(self, context)
+        if not environment:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+
+        legend = refresh_heatmap(context)
+        set_heatmap_material(environment, True)
+        set_solid_color_type(context, 'VERTEX')
+        scene.pj_heatmap_show = True
+
+        if legend["faces"] == 0 and scene.pj_heatmap_source != 'OVERLAP':
+            self.report({'WARNING'}, "No results to show yet; run the matching analysis first")
+        else:
+            self.report({'INFO'}, f"Heatmap {legend['low']:.4g} - {legend['high']:.4g} {legend['unit']} "
+                                  f"on {legend['faces']} faces")
+        return {'FINISHED'}
+
+class PJ_OT_hide_heatmap(Operator):
+    """Give the environment surfaces their own materials back"""
+    bl_idname = "projection.hide_heatmap"
+    bl_label = "Hide Heatmap"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        # Proxies that went out of date while shown still hide their source
+        stale = [obj.pj_proxy for obj in stale_proxy_sources(context)]
+        set_heatmap_material(environment_objects(context, use_proxies=True) + stale + point_cloud_objects(context),
+                             False)
+        set_solid_color_type(context, 'MATERIAL')
+        context.scene.pj_heatmap_show = False
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_show_heatmap)
+    bpy.utils.register_class(PJ_OT_hide_heatmap)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_hide_heatmap)
+    bpy.utils.unregister_class(PJ_OT_show_heatmap)
@@ -2,6 +2,24 @@ import bpy
 from bpy.types import Operator
 from mathutils import Vector
 from . import visualization
+from .analysis import SAMPLING_ITEMS
+from .catalog import apply_catalog_entry
+from .core.catalog import load_catalog
+from .core import layout
+from .core.mesh_io import blender_axes, default_workers, read_mesh
+from .core.mirrors import trace_reflections
+from .core.overlap import overlap_graph
+from .overlaps import overlap_signature, store_overlap_graph
+from .proxy import build_mesh, generate_proxy, report_stale_proxies
+from .scene_arrays import (
+    environment_objects,
+    environment_samples,
+    environment_visibility,
+    projector_arrays,
+    scene_mirrors,
+    scene_projectors,
+    surface_object,
+)
 
 class PJ_OT_add_projector(Operator):
     """Add a new projector object to the scene"""
@@ -9,6 +27,12 @@ class PJ_OT_add_projector(Operator):
     bl_label = "Add Projector"
     bl_options = {'REGISTER', 'UNDO'}
 
+    catalog_entry: bpy.props.StringProperty(
+        name="Catalog Entry",
+        description="Optional catalog body/lens (BODY/LENS) to configure the projector from",
+        default=""
+    )
+
     def execute(self, context):
         # Create a parent empty for the projector
         projector_empty = bpy.data.objects.new("Projector", None)
@@ -46,6 +70,22 @@ class PJ_OT_add_projector(Operator):
         projector_empty.pj_aspect_ratio_w = 16   # Default 16:9
         projector_empty.pj_aspect_ratio_h = 9
 
+        # Configure from a real projector model if one was requested
+        if self.catalog_entry:
+            try:
+                catalog = load_catalog()
+            except (OSError, ValueError) as e:
+                self.report({'WARNING'}, f"Could not load projector catalog, using defaults: {e}")
+            else:
+                index = catalog.find(self.catalog_entry)
+                if index is None:
+                    self.report({'WARNING'}, f"Unknown catalog entry '{self.catalog_entry}', using defaults")
+                else:
+                    apply_catalog_entry(projector_empty, catalog.entry(index))
+
+        # Point the camera child along the projector's throw with a matching lens
+        visualization.sync_projector_camera(projector_empty)
+
         # Select the projector empty
         bpy.ops.object.select_all(action='DESELECT')
         projector_empty.select_set(True)
@@ -112,7 +152,7 @@ class PJ_OT_test_parameter_linking(Operator):
         return {'FINISHED'}
 
 class PJ_OT_import_model(Operator):
-    """Import a model for the projection environment"""
+    """Import a model for the projection environment; OBJ and PLY scans are read natively in parallel"""
     bl_idname = "projection.import_model"
     bl_label = "Import Environment Model"
     bl_options = {'REGISTER', 'UNDO'}
@@ -126,7 +166,7 @@ class PJ_OT_import_model(Operator):
     )
 
     filter_glob: bpy.props.StringProperty(
-        default="*.obj;*.fbx",
+        default="*.obj;*.ply;*.fbx",
         options={'HIDDEN'}
     )
 
@@ -138,10 +178,58 @@ class PJ_OT_import_model(Operator):
         max=1000.0
     )
 
+    up_axis: bpy.props.EnumProperty(
+        name="Up Axis",
+        description="Up axis of OBJ and PLY files",
+        items=[
+            ('AUTO', "Auto", "Y up for OBJ, Z up for PLY"),
+            ('Y', "Y Up", "Y up, -Z forward (converted to Blender's Z up)"),
+            ('Z', "Z Up", "Already in Blender's axes"),
+        ],
+        default='AUTO'
+    )
+
+    workers: bpy.props.IntProperty(
+        name="Workers",
+        description="Parallel workers reading OBJ and PLY files (0 = one per CPU core, up to 8)",
+        default=0,
+        min=0,
+        max=64
+    )
+
+    analysis_proxy: bpy.props.BoolProperty(
+        name="Analysis Proxies",
+        description="Build decimated analysis meshes for imported meshes above the scene's proxy triangle budget",
+        default=True
+    )
+
     def invoke(self, context, event):
         context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
 
+    def import_mesh(self, context, ext):
+        """Read an OBJ or PLY file into one new mesh object with bulk writes, selected and active"""
+        import os
+
+        polygons = read_mesh(self.filepath, self.workers or default_workers())
+        up_axis = self.up_axis
+        if up_axis == 'AUTO':
+            up_axis = 'Y' if ext == '.obj' else 'Z'
+        vertices = blender_axes(polygons.vertices, up_axis, self.scale)
+
+        name = os.path.splitext(os.path.basename(self.filepath))[0]
+        mesh = build_mesh(name, vertices, polygons.corners, polygons.face_sizes)
+        # Scans are not always clean; fix invalid geometry instead of crashing later
+        mesh.validate()
+        obj = bpy.data.objects.new(name, mesh)
+        context.collection.objects.link(obj)
+
+        for selected in context.selected_objects:
+            selected.select_set(False)
+        obj.select_set(True)
+        context.view_layer.objects.active = obj
+        return obj
+
     def execute(self, context):
         import os
 
@@ -151,22 +239,32 @@ class PJ_OT_import_model(Operator):
 
         try:
             # Import the model based on the file extension
-            if ext == '.obj':
-                bpy.ops.import_scene.obj(filepath=self.filepath, global_scale=self.scale)
+            if ext in ('.obj', '.ply'):
+                imported_objects = [self.import_mesh(context, ext)]
             elif ext == '.fbx':
                 bpy.ops.import_scene.fbx(filepath=self.filepath, global_scale=self.scale)
+                imported_objects = context.selected_objects
             else:
                 self.report({'ERROR'}, f"Unsupported file format: {ext}")
                 return {'CANCELLED'}
 
-            # Get the imported objects
-            imported_objects = context.selected_objects
-
             # Tag the objects as projection environment
             for obj in imported_objects:
                 obj.pj_is_environment = True
 
-            self.report({'INFO'}, f"Imported {len(imported_objects)} objects as environment model")
+            # Heavy scans get a decimated stand-in for the analyses
+            proxies = 0
+            if self.analysis_proxy:
+                scene = context.scene
+                depsgraph = context.evaluated_depsgraph_get()
+                for obj in imported_objects:
+                    if obj.type == 'MESH' and len(obj.data.polygons) > scene.pj_proxy_triangles:
+                        generate_proxy(scene, obj, depsgraph, scene.pj_proxy_triangles,
+                                       scene.pj_proxy_weld_distance)
+                        proxies += 1
+
+            self.report({'INFO'}, f"Imported {len(imported_objects)} objects as environment model"
+                                  + (f" ({proxies} analysis proxies)" if proxies else ""))
 
             return {'FINISHED'}
 
@@ -250,8 +348,12 @@ class PJ_OT_position_at_projection_distance(Operator):
         forward_vec = projector.matrix_world.to_3x3() @ Vector((0, -1, 0))
         forward_vec.normalize()
 
-        # Calculate the target position
+        # Calculate the target position, following the throw through any mirrors
         target_pos = projector.matrix_world.translation + (forward_vec * distance)
+        mirrors = scene_mirrors(context)
+        if mirrors is not None:
+            paths = trace_reflections(mirrors, [tuple(projector.matrix_world.translation)], [tuple(forward_vec)])
+            target_pos = Vector(paths.point_at(distance)[0])
 
         # Count how many objects were positioned
         positioned_count = 0
@@ -602,46 +704,62 @@ class PJ_OT_delete_collection(Operator):
         return {'FINISHED'}
 
 class PJ_OT_detect_overlapping_projections(Operator):
-    """Detect overlapping projection areas between projectors"""
+    """Build the overlap graph of the active projectors from the environment surfaces they light together"""
     bl_idname = "projection.detect_overlapping"
     bl_label = "Detect Overlapping Projections"
     bl_options = {'REGISTER', 'UNDO'}
 
+    sampling: bpy.props.EnumProperty(
+        name="Sampling",
+        description="How the environment surfaces are sampled",
+        items=SAMPLING_ITEMS,
+        default='ADAPTIVE'
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Samples",
+        description="Number of random samples, or the most adaptive samples",
+        default=1000000,
+        min=1000
+    )
+
+    min_area: bpy.props.FloatProperty(
+        name="Minimum Area",
+        description="Overlaps smaller than this are ignored",
+        default=0.01,
+        min=0.0,
+        unit='AREA'
+    )
+
     def execute(self, context):
-        projectors = [obj for obj in bpy.data.objects if obj.pj_is_projector]
+        scene = context.scene
+        projectors = scene_projectors(context)
+        environment = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
 
         if len(projectors) < 2:
             self.report({'WARNING'}, "Need at least two projectors to detect overlapping areas")
             return {'CANCELLED'}
+        if not environment:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
 
-        # Simple implementation: just check if projection distances are similar and projectors are close
-        # A more accurate implementation would involve actual geometry calculations
-        overlaps_found = 0
-        for i, proj1 in enumerate(projectors):
-            for proj2 in projectors[i+1:]:
-                # Check if they're in the same collection
-                same_collection = (proj1.pj_collection != "" and
-                                  proj1.pj_collection == proj2.pj_collection)
-
-                # Calculate distance between projectors
-                distance = (proj1.matrix_world.translation - proj2.matrix_world.translation).length
-
-                # Check if projection distances are within 20% of each other
-                dist_ratio = abs(proj1.pj_throw_distance - proj2.pj_throw_distance) / max(proj1.pj_throw_distance, proj2.pj_throw_distance)
-                similar_throw = dist_ratio < 0.2
-
-                # Check projector distance against their throw distances
-                projection_distance = min(proj1.pj_throw_distance, proj2.pj_throw_distance)
-                close_enough = distance < projection_distance * 0.5
-
-                if same_collection and similar_throw and close_enough:
-                    # Mark these projectors as potentially overlapping
-                    proj1.pj_overlaps_with = proj2.name
-                    proj2.pj_overlaps_with = proj1.name
-                    overlaps_found += 1
-
-        if overlaps_found > 0:
-            self.report({'INFO'}, f"Detected {overlaps_found} potential overlapping projection areas")
+        arrays = projector_arrays(projectors, scene_mirrors(context))
+        blend = [proj.pj_edge_blend_amount for proj in projectors]
+        samples, triangle_object, _ = environment_samples(
+            context, environment, self.sampling, self.sample_count, projectors=arrays, blend=blend)
+        visibility = environment_visibility(context, arrays, samples.points, environment)
+        graph = overlap_graph(arrays, samples, visibility, triangle_object[samples.triangles],
+                              self.min_area)
+        store_overlap_graph(scene, graph, [proj.name for proj in projectors],
+                            [surface_object(obj).name for obj in environment],
+                            overlap_signature(context, projectors))
+
+        if len(graph.edges) > 0:
+            chains = graph.blend_chains()
+            self.report({'INFO'}, f"Detected {len(graph.edges)} overlaps between "
+                                  f"{int((graph.degree > 0).sum())} projectors, "
+                                  f"{graph.area.sum():.1f} m² in total, {len(chains)} blend chains")
         else:
             self.report({'INFO'}, "No overlapping projection areas detected")
 
@@ -709,6 +827,222 @@ class PJ_OT_align_projector_group(Operator):
 
         return {'FINISHED'}
 
+class PJ_OT_generate_layout(Operator):
+    """Lay out the active collection's projectors on a flat, curved or dome screen"""
+    bl_idname = "projection.generate_layout"
+    bl_label = "Generate Projector Layout"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    layout_type: bpy.props.EnumProperty(
+        name="Layout",
+        description="Screen shape to tile",
+        items=[
+            ('GRID', "Grid", "Columns x rows on a flat screen"),
+            ('ARC', "Arc", "Projectors along a curved screen segment"),
+            ('CYLINDER', "Cylinder", "Closed 360 degree panorama"),
+            ('DOME', "Dome", "Rings of projectors on a hemispherical dome"),
+        ],
+        default='GRID'
+    )
+
+    count: bpy.props.IntProperty(
+        name="Projectors",
+        description="Projectors per row (grid columns, arc/cylinder count, lowest dome ring)",
+        default=4,
+        min=1
+    )
+
+    rows: bpy.props.IntProperty(
+        name="Rows",
+        description="Stacked projector rows (dome: elevation rings)",
+        default=1,
+        min=1
+    )
+
+    overlap: bpy.props.FloatProperty(
+        name="Overlap",
+        description="Blend overlap between neighbouring images",
+        default=0.15,
+        min=0.0,
+        max=0.5,
+        subtype='FACTOR'
+    )
+
+    screen_width: bpy.props.FloatProperty(
+        name="Screen Width",
+        description="Width of the flat screen",
+        default=12.0,
+        min=0.1,
+        unit='LENGTH'
+    )
+
+    screen_height: bpy.props.FloatProperty(
+        name="Screen Height",
+        description="Height of the screen",
+        default=4.0,
+        min=0.1,
+        unit='LENGTH'
+    )
+
+    screen_bottom: bpy.props.FloatProperty(
+        name="Screen Bottom",
+        description="Height of the lower screen edge above the 3D cursor (curved screens)",
+        default=0.0,
+        unit='LENGTH'
+    )
+
+    throw_distance: bpy.props.FloatProperty(
+        name="Throw Distance",
+        description="Distance from the lenses to a flat screen",
+        default=8.0,
+        min=0.1,
+        unit='LENGTH'
+    )
+
+    radius: bpy.props.FloatProperty(
+        name="Radius",
+        description="Radius of the curved screen or dome",
+        default=10.0,
+        min=0.1,
+        unit='LENGTH'
+    )
+
+    start_angle: bpy.props.FloatProperty(
+        name="Start Angle",
+        description="Angle of the first screen edge, measured from +X",
+        default=0.0,
+        subtype='ANGLE'
+    )
+
+    span: bpy.props.FloatProperty(
+        name="Span",
+        description="Angular span of an arc screen",
+        default=3.14159,
+        min=0.01,
+        max=6.28318,
+        subtype='ANGLE'
+    )
+
+    projector_radius: bpy.props.FloatProperty(
+        name="Rig Radius",
+        description="Distance of the projectors from the screen axis (placed across the axis from their tile)",
+        default=2.0,
+        min=0.0,
+        unit='LENGTH'
+    )
+
+    projector_height: bpy.props.FloatProperty(
+        name="Rig Height",
+        description="Lens height above the 3D cursor for curved screens (negative = aim at each row's center)",
+        default=-1.0,
+        unit='LENGTH'
+    )
+
+    zenith: bpy.props.BoolProperty(
+        name="Zenith Projector",
+        description="Add a projector for the dome's zenith cap",
+        default=True
+    )
+
+    fit_to_active: bpy.props.BoolProperty(
+        name="Fit to Active Screen",
+        description="Take a flat screen's center, facing and size from the active mesh (local Z faces the projectors)",
+        default=False
+    )
+
+    @classmethod
+    def poll(cls, context):
+        # Check if there's an active collection to lay out
+        return (hasattr(context.scene, 'pj_projector_collections') and
+                len(context.scene.pj_projector_collections) > 0)
+
+    def compute_layout(self, context, aspect):
+        """Run the vectorized layout generator for the chosen screen"""
+        center = context.scene.cursor.location.copy()
+        rig_z = None if self.projector_height < 0 else self.projector_height
+
+        if self.layout_type == 'GRID':
+            normal = Vector((0, -1, 0))
+            width, height = self.screen_width, self.screen_height
+            screen = context.active_object
+            if self.fit_to_active and screen and screen.type == 'MESH' and not screen.pj_is_projector:
+                center = screen.matrix_world.translation.copy()
+                normal = (screen.matrix_world.to_3x3() @ Vector((0, 0, 1))).normalized()
+                width, height = screen.dimensions.x, screen.dimensions.y
+            return layout.grid_layout(center, normal, width, height, self.count, self.rows,
+                                      self.overlap, self.throw_distance, aspect=aspect)
+
+        if self.layout_type == 'ARC':
+            return layout.arc_layout(center, self.radius, self.start_angle, self.span, self.count,
+                                     self.overlap, self.screen_height, self.screen_bottom, self.rows,
+                                     self.projector_radius, rig_z, aspect=aspect)
+
+        if self.layout_type == 'CYLINDER':
+            return layout.cylinder_layout(center, self.radius, self.count, self.overlap,
+                                          self.screen_height, self.screen_bottom, self.rows,
+                                          self.projector_radius, rig_z, self.start_angle, aspect)
+
+        return layout.dome_layout(center, self.radius, self.rows, self.count, self.overlap, aspect,
+                                  zenith=self.zenith, projector_radius=self.projector_radius,
+                                  projector_z=max(self.projector_height, 0.0))
+
+    def execute(self, context):
+        scene = context.scene
+
+        if scene.pj_active_collection_index >= len(scene.pj_projector_collections):
+            self.report({'ERROR'}, "Invalid collection index")
+            return {'CANCELLED'}
+
+        collection_name = scene.pj_projector_collections[scene.pj_active_collection_index].name
+
+        # Existing projectors in the collection are reused in name order
+        projectors = sorted((obj for obj in bpy.data.objects
+                             if obj.pj_is_projector and obj.pj_collection == collection_name),
+                            key=lambda obj: obj.name)
+
+        template = projectors[0] if projectors else None
+        aspect = (template.pj_aspect_ratio_w / template.pj_aspect_ratio_h) if template else 16.0 / 9.0
+
+        result = self.compute_layout(context, aspect)
+
+        # Create any projectors the layout needs beyond the existing ones
+        while len(projectors) < len(result):
+            bpy.ops.object.select_all(action='DESELECT')
+            if template:
+                context.view_layer.objects.active = template
+                template.select_set(True)
+                bpy.ops.projection.duplicate_projector()
+            else:
+                bpy.ops.projection.add_projector()
+            new_projector = context.active_object
+            new_projector.pj_collection = collection_name
+            new_projector.name = f"{collection_name}_{len(projectors) + 1:02d}"
+            projectors.append(new_projector)
+
+        # Write all results in one pass from the precomputed arrays
+        locations = result.origins.tolist()
+        rotations = result.euler_xyz().tolist()
+        distances = result.throw_distance.tolist()
+        ratios = result.throw_ratio.tolist()
+        for i in range(len(result)):
+            proj = projectors[i]
+            proj.rotation_mode = 'XYZ'
+            if proj.parent:
+                proj.parent = None
+            proj.location = locations[i]
+            proj.rotation_euler = rotations[i]
+            # Distance first so the throw ratio update recomputes the width
+            proj.pj_throw_distance = distances[i]
+            proj.pj_throw_ratio = ratios[i]
+
+        unused = len(projectors) - len(result)
+        message = f"Laid out {len(result)} projectors in collection '{collection_name}'"
+        if unused > 0:
+            message += f" ({unused} extra projectors left unchanged)"
+        self.report({'INFO'}, message)
+
+        return {'FINISHED'}
+
 def register():
     bpy.utils.register_class(PJ_OT_add_projector)
     bpy.utils.register_class(PJ_OT_test_parameter_linking)
@@ -723,8 +1057,10 @@ def register():
     bpy.utils.register_class(PJ_OT_delete_collection)
     bpy.utils.register_class(PJ_OT_detect_overlapping_projections)
     bpy.utils.register_class(PJ_OT_align_projector_group)
+    bpy.utils.register_class(PJ_OT_generate_layout)
 
 def unregister():
+    bpy.utils.unregister_class(PJ_OT_generate_layout)
     bpy.utils.unregister_class(PJ_OT_align_projector_group)
     bpy.utils.unregister_class(PJ_OT_detect_overlapping_projections)
     bpy.utils.unregister_class(PJ_OT_delete_collection)
@@ -0,0 +1,258 @@
+import bpy
+from bpy.types import Operator
+import numpy as np
+
+from .core.catalog import load_catalog
+from .core.calculations import aspect_from_resolution
+from .core.frustum import inside_image, project_points
+from .core.placement import PlacementProblem, PlacementSearch
+from .core.sampling import sample_surface
+from .proxy import report_stale_proxies
+from .scene_arrays import (
+    apply_projector_transform,
+    environment_objects,
+    gather_triangles,
+    object_world_bounds,
+)
+
+def placement_targets(context):
+    """Selected meshes to cover, falling back to every environment mesh"""
+    targets = [obj for obj in context.selected_objects
+               if obj.type == 'MESH' and not obj.pj_is_mounting_zone
+               and not obj.pj_is_projector]
+    return targets or environment_objects(context, use_proxies=True)
+
+class PJ_OT_optimize_placement(Operator):
+    """Search for a small set of projector placements that cover the target surface"""
+    bl_idname = "projection.optimize_placement"
+    bl_label = "Optimize Projector Placement"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    catalog_entry: bpy.props.StringProperty(
+        name="Catalog Entry",
+        description="Projector body/lens to place (BODY/LENS); empty uses the active projector's settings",
+        default=""
+    )
+
+    overlap: bpy.props.FloatProperty(
+        name="Overlap",
+        description="Required blend overlap between neighbouring images",
+        default=0.15,
+        min=0.0,
+        max=0.5,
+        subtype='FACTOR'
+    )
+
+    min_lux: bpy.props.FloatProperty(
+        name="Minimum Illuminance",
+        description="Minimum illuminance (lux) every covered point must receive",
+        default=0.0,
+        min=0.0
+    )
+
+    target_coverage: bpy.props.FloatProperty(
+        name="Target Coverage",
+        description="Fraction of the surface area that must be covered",
+        default=0.99,
+        min=0.1,
+        max=1.0,
+        subtype='FACTOR'
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Surface Samples",
+        description="Number of points sampled on the target surface",
+        default=4000,
+        min=100
+    )
+
+    candidate_count: bpy.props.IntProperty(
+        name="Candidates",
+        description="Number of candidate placements to evaluate",
+        default=4096,
+        min=64
+    )
+
+    workers: bpy.props.IntProperty(
+        name="Worker Processes",
+        description="Processes used for the search (0 = one per CPU core, 1 = run inside Blender)",
+        default=0,
+        min=0
+    )
+
+    seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Random seed of the search",
+        default=0
+    )
+
+    collection_name: bpy.props.StringProperty(
+        name="Collection Name",
+        description="Projector collection for the placed projectors",
+        default="Optimized Layout"
+    )
+
+    _timer = None
+    _search = None
+    _aspect = (16, 9)
+
+    def projector_spec(self, context):
+        """Throw ratio range, aspect, lumens and resolution to place"""
+        if self.catalog_entry:
+            catalog = load_catalog()
+            index = catalog.find(self.catalog_entry)
+            if index is None:
+                raise ValueError(f"Unknown catalog entry '{self.catalog_entry}'")
+            entry = catalog.entry(index)
+            aspect_w, aspect_h = aspect_from_resolution(entry["resolution_x"], entry["resolution_y"])
+            return (entry["throw_ratio_min"], entry["throw_ratio_max"], (aspect_w, aspect_h),
+                    entry["lumens"], (entry["resolution_x"], entry["resolution_y"]))
+
+        obj = context.active_object
+        if obj and obj.pj_is_projector:
+            tr_min = obj.pj_throw_ratio_min if obj.pj_throw_ratio_max > 0 else obj.pj_throw_ratio
+            tr_max = obj.pj_throw_ratio_max if obj.pj_throw_ratio_max > 0 else obj.pj_throw_ratio
+            return (tr_min, tr_max, (obj.pj_aspect_ratio_w, obj.pj_aspect_ratio_h),
+                    obj.pj_lumens, (obj.pj_resolution_x, obj.pj_resolution_y))
+
+        # Same defaults as a freshly added projector
+        return (2.0, 2.0, (16, 9), 5000.0, (1920, 1080))
+
+    def invoke(self, context, event):
+        return self.execute(context)
+
+    def execute(self, context):
+        targets = placement_targets(context)
+        report_stale_proxies(self, context)
+        if not targets:
+            self.report({'ERROR'}, "Select a target surface or tag environment objects")
+            return {'CANCELLED'}
+
+        zones = [obj for obj in context.scene.objects if obj.pj_is_mounting_zone]
+        if not zones:
+            self.report({'ERROR'}, "No mounting zones; mark objects as mounting zones first")
+            return {'CANCELLED'}
+
+        try:
+            tr_min, tr_max, self._aspect, lumens, resolution = self.projector_spec(context)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        vertices, triangles, _, _ = gather_triangles(targets, context.evaluated_depsgraph_get())
+        samples = sample_surface(vertices, triangles, self.sample_count, self.seed)
+        if len(samples) == 0:
+            self.report({'ERROR'}, "Target surface has no area")
+            return {'CANCELLED'}
+
+        bounds = [object_world_bounds(obj) for obj in zones]
+        problem = PlacementProblem(
+            samples,
+            [b[0] for b in bounds], [b[1] for b in bounds],
+            tr_min, tr_max, self._aspect[0] / self._aspect[1], lumens, resolution,
+            min_lux=self.min_lux, overlap=self.overlap,
+            target_coverage=self.target_coverage)
+
+        # workers=1 evaluates inside Blender's process, one batch per tick
+        max_workers = None if self.workers == 0 else (0 if self.workers == 1 else self.workers)
+        self._search = PlacementSearch(problem, self.candidate_count,
+                                       max_workers=max_workers, seed=self.seed)
+        try:
+            self._search.start()
+        except (OSError, RuntimeError) as e:
+            # Fall back to evaluating in-process if no pool can be created
+            self.report({'WARNING'}, f"Could not start worker processes, searching in Blender instead: {e}")
+            self._search.max_workers = 0
+
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+        self._timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            # Stop early but keep the best layout found so far
+            self._search.cancel()
+            return self.finish(context)
+
+        if event.type == 'RIGHTMOUSE':
+            self._search.cancel()
+            self.cleanup(context)
+            self.report({'INFO'}, "Placement search cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        done = self._search.poll()
+        context.window_manager.progress_update(int(self._search.progress * 100))
+
+        best = self._search.best
+        if best is not None and context.area:
+            context.area.header_text_set(
+                f"Placement search {self._search.progress * 100:.0f}% - best so far: "
+                f"{best.projector_count} projectors, {best.covered_fraction * 100:.1f}% covered "
+                f"(Esc: stop and keep, Right-click: cancel)")
+
+        if done:
+            return self.finish(context)
+        return {'RUNNING_MODAL'}
+
+    def cleanup(self, context):
+        wm = context.window_manager
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer)
+            self._timer = None
+        wm.progress_end()
+        if context.area:
+            context.area.header_text_set(None)
+
+    def finish(self, context):
+        self.cleanup(context)
+        best = self._search.best
+        if best is None or best.projector_count == 0:
+            self.report({'WARNING'}, "No placement covers the target surface from the mounting zones")
+            return {'CANCELLED'}
+
+        self.create_projectors(context, best)
+
+        self.report({'INFO'}, f"Placed {best.projector_count} projectors covering "
+                              f"{best.covered_fraction * 100:.1f}% of the target surface "
+                              f"({best.candidates_evaluated} candidates evaluated)")
+        return {'FINISHED'}
+
+    def create_projectors(self, context, best):
+        scene = context.scene
+        projectors = best.projectors
+        samples = self._search.problem.samples
+
+        # Throw distance: mean axial depth of the samples each image lands on
+        u, v, depth = project_points(projectors, samples.points)
+        lit = inside_image(u, v, depth)
+        lit_count = np.maximum(lit.sum(axis=1), 1)
+        throw_distance = np.where(lit.any(axis=1), (depth * lit).sum(axis=1) / lit_count, 4.0)
+
+        if not any(coll.name == self.collection_name for coll in scene.pj_projector_collections):
+            scene.pj_projector_collections.add().name = self.collection_name
+
+        for i in range(len(projectors)):
+            bpy.ops.object.select_all(action='DESELECT')
+            bpy.ops.projection.add_projector(catalog_entry=self.catalog_entry)
+            obj = context.active_object
+            obj.name = f"Projector_Opt_{i + 1:02d}"
+            apply_projector_transform(obj, projectors.origins[i], projectors.rotations[i])
+
+            # Distance first so the throw ratio update recomputes the width
+            obj.pj_throw_distance = float(throw_distance[i])
+            obj.pj_throw_ratio = float(projectors.throw_ratio[i])
+            obj.pj_aspect_ratio_w, obj.pj_aspect_ratio_h = self._aspect
+            obj.pj_lumens = float(projectors.lumens[i])
+            obj.pj_resolution_x, obj.pj_resolution_y = (int(r) for r in projectors.resolution[i])
+            obj.pj_collection = self.collection_name
+
+def register():
+    bpy.utils.register_class(PJ_OT_optimize_placement)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_optimize_placement)
@@ -0,0 +1,123 @@
+import hashlib
+import uuid
+
+from .core.overlap import OverlapGraph
+from .scene_arrays import environment_objects, mirror_objects, object_geometry_key
+
+# Scene ID property holding the overlap graph arrays
+GRAPH_PROPERTY = "pj_overlap_graph"
+
+# Decoded graphs by scene name: (token, graph, projector names, name -> index, surface names, signature)
+_graph_cache = {}
+
+def overlap_signature(context, projectors, mirrors=True):
+    """
+    Hash of everything the overlaps of the projectors depend on.
+
+    Covers the projector poses and lens settings and the geometry of the
+    environment sources (their proxies follow them) and, with mirrors, of
+    the mirrors folding the throws. Readers that ignore mirrors pass
+    mirrors=False, so they only match graphs of scenes without any.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in projectors:
+        values = [value for row in obj.matrix_world for value in row]
+        values += [obj.pj_throw_ratio, obj.pj_aspect_ratio_w, obj.pj_aspect_ratio_h, obj.pj_lens_shift_h,
+                   obj.pj_lens_shift_v]
+        digest.update(obj.name.encode())
+        digest.update(repr(values).encode())
+    depsgraph = context.evaluated_depsgraph_get()
+    for obj in environment_objects(context) + (mirror_objects(context) if mirrors else []):
+        digest.update(object_geometry_key(obj, depsgraph).encode())
+    return digest.hexdigest()
+
+def store_overlap_graph(scene, graph, projector_names, surface_names, signature=""):
+    """Save an overlap graph with the scene as flat ID property arrays, with its overlap_signature"""
+    data = graph.to_dict()
+    data["projectors"] = list(projector_names)
+    data["surfaces"] = list(surface_names)
+    data["signature"] = signature
+    # Lets readers tell a new graph (or an undone one) from the cached one
+    data["token"] = uuid.uuid4().hex
+    scene[GRAPH_PROPERTY] = data
+    _graph_cache.pop(scene.name, None)
+
+def clear_overlap_graph(scene):
+    if GRAPH_PROPERTY in scene:
+        del scene[GRAPH_PROPERTY]
+    _graph_cache.pop(scene.name, None)
+
+def _cached_graph(scene):
+    data = scene.get(GRAPH_PROPERTY)
+    if data is None:
+        return None
+    cached = _graph_cache.get(scene.name)
+    if cached is not None and cached[0] == data["token"]:
+        return cached
+    names = list(data["projectors"])
+    cached = (data["token"], OverlapGraph.from_dict(data), names,
+              {name: index for index, name in enumerate(names)}, list(data["surfaces"]),
+              data.get("signature", ""))
+    _graph_cache[scene.name] = cached
+    return cached
+
+def scene_overlap_graph(scene):
+    """(OverlapGraph, projector names) saved with the scene, or (None, []); decoded once per change"""
+    cached = _cached_graph(scene)
+    if cached is None:
+        return None, []
+    return cached[1], cached[2]
+
+def projector_overlaps(scene, name):
+    """
+    Overlaps of one projector, looked up in O(degree).
+
+    Returns:
+        List of dictionaries (projector, area, blend_width in this projector's image, surface)
+    """
+    cached = _cached_graph(scene)
+    if cached is None or name not in cached[3]:
+        return []
+    _, graph, names, index_of, surfaces, _ = cached
+    index = index_of[name]
+    overlaps = []
+    for neighbor, edge, width in zip(graph.neighbors(index), graph.neighbor_edges(index),
+                                     graph.neighbor_blend_widths(index)):
+        surface = graph.surface[edge]
+        overlaps.append({"projector": names[neighbor], "area": float(graph.area[edge]),
+                         "blend_width": float(width),
+                         "surface": surfaces[surface] if 0 <= surface < len(surfaces) else ""})
+    return overlaps
+
+def overlapping_names(scene):
+    """Names of the projectors with at least one neighbour in the scene's overlap graph"""
+    cached = _cached_graph(scene)
+    if cached is None:
+        return []
+    graph, names = cached[1], cached[2]
+    return [names[index] for index in (graph.degree > 0).nonzero()[0]]
+
+def neighbor_indices(scene, names, signature):
+    """
+    Overlap candidates of every listed projector as indices into `names`.
+
+    Args:
+        signature: overlap_signature of the projectors as the caller sees them
+
+    Returns:
+        List of index arrays, or None if the graph does not cover every
+        projector or was detected for other poses, lenses or geometry
+    """
+    cached = _cached_graph(scene)
+    if cached is None or cached[5] != signature or any(name not in cached[3] for name in names):
+        return None
+    _, graph, stored_names, index_of, _, _ = cached
+    position = {name: index for index, name in enumerate(names)}
+    candidates = []
+    for name in names:
+        neighbors = graph.neighbors(index_of[name])
+        candidates.append([position[stored_names[n]] for n in neighbors if stored_names[n] in position])
+    return candidates
+
+def clear_graph_cache():
+    _graph_cache.clear()
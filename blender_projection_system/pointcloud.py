@@ -0,0 +1,179 @@
+import os
+
+import bpy
+from bpy.types import Operator
+import numpy as np
+
+from .core.mesh_io import blender_axes, default_workers
+from .core.pointcloud import estimate_normals, read_point_cloud, voxel_downsample
+from .proxy import build_mesh
+from .scene_arrays import AREA_ATTRIBUTE, NORMAL_ATTRIBUTE
+
+# Geometry node group drawing the vertices of point clouds as points
+POINTS_GROUP = "PJ Point Cloud Display"
+POINTS_MODIFIER = "PJ Points"
+
+def point_display_group():
+    """Node group turning the cloud's vertices into render and viewport points"""
+    group = bpy.data.node_groups.get(POINTS_GROUP)
+    if group is not None:
+        return group
+    group = bpy.data.node_groups.new(POINTS_GROUP, 'GeometryNodeTree')
+    group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    radius = group.interface.new_socket("Radius", in_out='INPUT', socket_type='NodeSocketFloat')
+    radius.default_value = 0.01
+    group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    nodes = group.nodes
+    group_input = nodes.new('NodeGroupInput')
+    group_input.location = (-300, 0)
+    to_points = nodes.new('GeometryNodeMeshToPoints')
+    to_points.location = (0, 0)
+    group_output = nodes.new('NodeGroupOutput')
+    group_output.location = (250, 0)
+    group.links.new(group_input.outputs["Geometry"], to_points.inputs["Mesh"])
+    group.links.new(group_input.outputs["Radius"], to_points.inputs["Radius"])
+    group.links.new(to_points.outputs["Points"], group_output.inputs["Geometry"])
+    return group
+
+def write_point_vectors(mesh, name, values):
+    """Store (V, 3) values as a FLOAT_VECTOR point attribute with one bulk write"""
+    attribute = mesh.attributes.get(name)
+    if attribute is not None:
+        mesh.attributes.remove(attribute)
+    attribute = mesh.attributes.new(name=name, type='FLOAT_VECTOR', domain='POINT')
+    attribute.data.foreach_set("vector", np.ascontiguousarray(values, dtype=np.float32).reshape(-1))
+
+def create_point_cloud(context, name, points, normals, weights, spacing):
+    """Vertex-only environment object carrying the points, their normals and areas"""
+    mesh = build_mesh(name, points, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+    write_point_vectors(mesh, NORMAL_ATTRIBUTE, normals)
+    area = mesh.attributes.new(name=AREA_ATTRIBUTE, type='FLOAT', domain='POINT')
+    area.data.foreach_set("value", np.ascontiguousarray(weights, dtype=np.float32))
+
+    obj = bpy.data.objects.new(name, mesh)
+    context.collection.objects.link(obj)
+    obj.pj_is_environment = True
+    obj.pj_is_point_cloud = True
+    obj.pj_point_spacing = spacing
+    # Analysis only: drawn as points, never rendered
+    obj.hide_render = True
+    modifier = obj.modifiers.new(POINTS_MODIFIER, 'NODES')
+    group = point_display_group()
+    modifier.node_group = group
+    modifier[group.interface.items_tree["Radius"].identifier] = 0.5 * spacing
+    return obj
+
+class PJ_OT_import_point_cloud(Operator):
+    """Import a survey point cloud as an analysis-only environment, without meshing it"""
+    bl_idname = "projection.import_point_cloud"
+    bl_label = "Import Point Cloud"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filepath: bpy.props.StringProperty(
+        name="File Path",
+        description="Path to the file",
+        maxlen=1024,
+        default="",
+        subtype='FILE_PATH'
+    )
+
+    filter_glob: bpy.props.StringProperty(
+        default="*.ply;*.xyz;*.pts;*.txt",
+        options={'HIDDEN'}
+    )
+
+    scale: bpy.props.FloatProperty(
+        name="Import Scale",
+        description="Scale factor for the imported points",
+        default=1.0,
+        min=0.001,
+        max=1000.0
+    )
+
+    up_axis: bpy.props.EnumProperty(
+        name="Up Axis",
+        description="Up axis of the file",
+        items=[
+            ('Z', "Z Up", "Already in Blender's axes (usual for surveys)"),
+            ('Y', "Y Up", "Y up, -Z forward (converted to Blender's Z up)"),
+        ],
+        default='Z'
+    )
+
+    voxel_size: bpy.props.FloatProperty(
+        name="Voxel Size",
+        description="Keep one point per voxel of this size (0 keeps every point)",
+        default=0.02,
+        min=0.0,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    normal_cell: bpy.props.FloatProperty(
+        name="Normal Cell Size",
+        description="Cell size the normals and point areas are estimated in; a few point spacings",
+        default=0.1,
+        min=0.001,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    use_file_normals: bpy.props.BoolProperty(
+        name="Use File Normals",
+        description="Keep the normals stored in the file instead of estimating them",
+        default=True
+    )
+
+    workers: bpy.props.IntProperty(
+        name="Workers",
+        description="Parallel workers reading the file (0 = one per CPU core, up to 8)",
+        default=0,
+        min=0,
+        max=64
+    )
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        try:
+            points, normals = read_point_cloud(self.filepath, self.workers or default_workers())
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Error importing point cloud: {e}")
+            return {'CANCELLED'}
+        if len(points) == 0:
+            self.report({'ERROR'}, "The file holds no points")
+            return {'CANCELLED'}
+
+        count = len(points)
+        points = blender_axes(points, self.up_axis, self.scale)
+        if normals is not None:
+            normals = blender_axes(normals, self.up_axis)
+        if not self.use_file_normals:
+            normals = None
+        points, normals = voxel_downsample(points, self.voxel_size, normals)
+
+        # Areas always come from the grid; file normals, when kept, replace the estimates
+        estimated, weights = estimate_normals(points, max(self.normal_cell, self.voxel_size))
+        if normals is None:
+            normals = estimated
+
+        name = os.path.splitext(os.path.basename(self.filepath))[0]
+        spacing = self.voxel_size or self.normal_cell
+        obj = create_point_cloud(context, name, points, normals, weights, spacing)
+        for selected in context.selected_objects:
+            selected.select_set(False)
+        obj.select_set(True)
+        context.view_layer.objects.active = obj
+
+        self.report({'INFO'}, f"Imported {len(points)} of {count} points as {obj.name} "
+                              f"({weights.sum():.0f} m² of surface)")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_import_point_cloud)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_import_point_cloud)
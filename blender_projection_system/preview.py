@@ -0,0 +1,137 @@
+import os
+
+import bpy
+from bpy.types import Operator
+import numpy as np
+
+from .core.image_io import write_image
+from .core.preview import camera_view, render_preview
+from .scene_arrays import (
+    camera_projector_arrays,
+    environment_geometry,
+    environment_objects,
+    matrix_to_numpy,
+    point_visibility,
+    scene_projectors,
+    surface_object,
+)
+from .visualization import sync_projector_camera
+
+PREVIEW_IMAGE = "PJ Preview"
+
+def preview_size(scene):
+    """Preview (width, height) with the aspect of the scene's render output"""
+    render = scene.render
+    aspect = (render.resolution_x * render.pixel_aspect_x) / (render.resolution_y * render.pixel_aspect_y)
+    width = scene.pj_preview_resolution
+    return width, max(int(round(width / aspect)), 1)
+
+def camera_arrays(camera, width, height):
+    """The audience camera as a one-element ProjectorArrays (see core.preview.camera_view)"""
+    cam = camera.data
+    return camera_view(matrix_to_numpy(camera.matrix_world), cam.lens, cam.sensor_width,
+                       cam.sensor_height, cam.sensor_fit, cam.shift_x, cam.shift_y, width, height)
+
+def image_content(image, gamma):
+    """
+    Pixels of a Blender image as an (H, W, C) array, display encoded.
+
+    Float images hold linear values and are encoded with the projector gamma
+    so they light the venue the way they would on the projector.
+    """
+    width, height = image.size
+    channels = image.channels
+    if width == 0 or height == 0:
+        return None
+    pixels = np.empty(width * height * channels, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = pixels.reshape(height, width, channels)
+    if image.is_float:
+        pixels = np.clip(pixels, 0.0, None) ** (1.0 / gamma)
+    return pixels
+
+def store_preview_image(pixels):
+    """Show a (H, W, 3) display encoded preview, row 0 at the top, in Blender's image editor"""
+    height, width = pixels.shape[:2]
+    image = bpy.data.images.get(PREVIEW_IMAGE)
+    if image is None or tuple(image.size) != (width, height):
+        if image is not None:
+            bpy.data.images.remove(image)
+        image = bpy.data.images.new(PREVIEW_IMAGE, width=width, height=height)
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    # Blender images start at the bottom row
+    rgba[:, :, :3] = pixels[::-1]
+    image.pixels.foreach_set(rgba.reshape(-1))
+    image.update()
+    return image
+
+class PJ_OT_render_preview(Operator):
+    """Render what the audience camera sees of all projectors on the environment, on the CPU"""
+    bl_idname = "projection.render_preview"
+    bl_label = "Render Preview"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        scene = context.scene
+        camera = scene.pj_preview_camera or scene.camera
+        projectors = scene_projectors(context)
+        environment = environment_objects(context)
+
+        if camera is None or camera.type != 'CAMERA':
+            self.report({'ERROR'}, "Set an audience camera or a scene camera first")
+            return {'CANCELLED'}
+        if camera.data.type != 'PERSP':
+            self.report({'ERROR'}, "The audience camera must be a perspective camera")
+            return {'CANCELLED'}
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+        if not environment:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+
+        for proj in projectors:
+            sync_projector_camera(proj)
+        context.view_layer.update()
+        arrays = camera_projector_arrays(projectors)
+
+        width, height = preview_size(scene)
+        view = camera_arrays(camera, width, height)
+        geometry = environment_geometry(context, environment)
+        gain = np.array([surface_object(obj).pj_screen_gain for obj in environment])[geometry.triangle_object]
+
+        # Projectors sharing an image read its pixels once
+        gamma = scene.pj_blend_gamma
+        images = {}
+        content = []
+        for proj in projectors:
+            image = proj.pj_content_image
+            if image is not None and image.name not in images:
+                images[image.name] = image_content(image, gamma)
+            content.append(images[image.name] if image is not None else None)
+
+        blend = [proj.pj_edge_blend_amount for proj in projectors] if scene.pj_preview_blend else None
+        render = render_preview(view, arrays, geometry.vertices, geometry.triangles, width, height,
+                                content, blend, gain, point_visibility(context, arrays, geometry), gamma)
+        pixels = render.image(scene.pj_preview_white, ambient=scene.pj_preview_ambient)
+        image = store_preview_image(pixels)
+
+        path = None
+        directory = bpy.path.abspath(scene.pj_output_directory)
+        if directory:
+            try:
+                path = write_image(os.path.join(directory, bpy.path.clean_name(camera.name) + "_preview.png"),
+                                   pixels)
+            except OSError as e:
+                self.report({'WARNING'}, f"Could not write the preview: {e}")
+
+        white = scene.pj_preview_white or render.white_level()
+        self.report({'INFO'}, f"Rendered {width}x{height} preview into image '{image.name}' "
+                              f"(white = {white:.0f} cd/m²)" + (f", saved to {path}" if path else ""))
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_render_preview)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_render_preview)
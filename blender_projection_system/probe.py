@@ -0,0 +1,105 @@
+import bpy
+from bpy.types import Operator
+from bpy_extras import view3d_utils
+import numpy as np
+
+from .core.frustum import project_points
+from .proxy import report_stale_proxies
+from .scene_arrays import (environment_geometry, environment_objects, point_visibility, projector_arrays,
+                           projector_query, scene_mirrors, scene_projectors)
+
+# Projectors listed in the header before the readout is cut short
+MAX_LISTED = 6
+
+def view_region(area):
+    """The 3D view's main region and its view, whichever region the operator was started from"""
+    for region in area.regions:
+        if region.type == 'WINDOW':
+            return region, area.spaces.active.region_3d
+    return None, None
+
+class PJ_OT_inspect_projection(Operator):
+    """Hover the environment to see which projectors light it; click to report them"""
+    bl_idname = "projection.inspect_projection"
+    bl_label = "Inspect Projection"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.area is not None and context.area.type == 'VIEW_3D'
+
+    def invoke(self, context, event):
+        projectors = scene_projectors(context)
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+        objects = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
+        if not objects:
+            self.report({'ERROR'}, "No environment meshes to inspect")
+            return {'CANCELLED'}
+        self._region, self._view = view_region(context.area)
+        if self._region is None:
+            return {'CANCELLED'}
+
+        # Everything the hover needs is built once; each mouse move is one ray and one query
+        self._arrays = projector_arrays(projectors, scene_mirrors(context))
+        self._geometry = environment_geometry(context, objects)
+        self._query = projector_query(self._arrays, self._geometry)
+        self._visible = point_visibility(context, self._arrays, self._geometry)
+        context.area.header_text_set("Inspect: hover a surface, click to report, Esc/right click to finish")
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def inspect(self, event):
+        """(name, pixel x, pixel y) of every projector lighting the surface under the mouse, or None off the surfaces"""
+        region = self._region
+        coord = (event.mouse_x - region.x, event.mouse_y - region.y)
+        if not (0 <= coord[0] < region.width and 0 <= coord[1] < region.height):
+            return None
+        origin = np.array(view3d_utils.region_2d_to_origin_3d(region, self._view, coord))
+        direction = np.array(view3d_utils.region_2d_to_vector_3d(region, self._view, coord))
+        hits = self._geometry.bvh.ray_cast(origin[None], direction[None])
+        if not hits.hit[0]:
+            return None
+
+        point = hits.points(origin[None], direction[None])
+        a, b, c = self._geometry.vertices[self._geometry.triangles[hits.triangle[0]]]
+        normal = np.cross(b - a, c - a)[None]
+        _, index = self._query.point_pairs(point, normal, self._visible)
+        if len(index) == 0:
+            return []
+        arrays = self._arrays.subset(index)
+        u, v, _ = project_points(arrays, point)
+        return [(arrays.names[k], u[k, 0] * arrays.resolution[k, 0], (1.0 - v[k, 0]) * arrays.resolution[k, 1])
+                for k in range(len(index))]
+
+    @staticmethod
+    def describe(readout):
+        if readout is None:
+            return "Not on an environment surface"
+        if not readout:
+            return "No projector lights this point"
+        text = ", ".join(f"{name} ({x:.0f}, {y:.0f} px)" for name, x, y in readout[:MAX_LISTED])
+        if len(readout) > MAX_LISTED:
+            text += f" and {len(readout) - MAX_LISTED} more"
+        return f"{len(readout)} projectors: {text}"
+
+    def modal(self, context, event):
+        if event.type in {'ESC', 'RIGHTMOUSE'}:
+            context.area.header_text_set(None)
+            return {'FINISHED'}
+        if event.type == 'MOUSEMOVE':
+            context.area.header_text_set(self.describe(self.inspect(event)))
+            return {'RUNNING_MODAL'}
+        if event.type == 'LEFTMOUSE' and event.value == 'PRESS':
+            self.report({'INFO'}, self.describe(self.inspect(event)))
+            return {'RUNNING_MODAL'}
+        # Let the view be orbited and zoomed while inspecting
+        return {'PASS_THROUGH'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_inspect_projection)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_inspect_projection)
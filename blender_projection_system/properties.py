@@ -40,6 +40,22 @@ def update_throw_ratio(self, context):
         self.pj_image_width = self.pj_throw_distance / self.pj_throw_ratio
     _updating_projection_params = False
 
+def poll_corner_pin_target(self, obj):
+    # Only meshes that are not projectors can be screens
+    return obj.type == 'MESH' and not obj.pj_is_projector
+
+def poll_preview_camera(self, obj):
+    return obj.type == 'CAMERA'
+
+def poll_proxy(self, obj):
+    return obj.type == 'MESH' and obj.pj_is_proxy
+
+def update_heatmap(self, context):
+    # Recolour a displayed heatmap when its source or range changes
+    if self.pj_heatmap_show:
+        from .heatmap import refresh_heatmap
+        refresh_heatmap(context)
+
 # Collection functionality
 def update_active_collection(self, context):
     # Callback for when active collection changes
@@ -67,8 +83,26 @@ class PJ_PG_ProjectorCollectionV2(bpy.types.PropertyGroup):
         default=""
     )
 
+# Property group for projector catalog search results
+class PJ_PG_CatalogResult(bpy.types.PropertyGroup):
+    name: bpy.props.StringProperty(
+        name="Model",
+        description="Projector body and lens",
+        default=""
+    )
+
+    key: bpy.props.StringProperty(
+        name="Catalog Key",
+        description="Catalog identifier of the body/lens combination",
+        default=""
+    )
+
+    throw_ratio_min: bpy.props.FloatProperty(name="Min Throw Ratio")
+    throw_ratio_max: bpy.props.FloatProperty(name="Max Throw Ratio")
+    lumens: bpy.props.FloatProperty(name="Lumens")
+
 def register():
-    # Register the property group first
+    # Register the property groups first
     try:
         bpy.utils.register_class(PJ_PG_ProjectorCollectionV2)
     except ValueError as e:
@@ -78,6 +112,8 @@ def register():
         else:
             raise e
 
+    bpy.utils.register_class(PJ_PG_CatalogResult)
+
     # Scene property for unit system
     bpy.types.Scene.pj_unit_system = bpy.props.EnumProperty(
         name="Unit System",
@@ -139,6 +175,98 @@ def register():
         default=9
     )
 
+    # Projector model properties (driven by the catalog, editable by hand)
+    bpy.types.Object.pj_catalog_entry = bpy.props.StringProperty(
+        name="Catalog Entry",
+        description="Catalog body/lens combination assigned to this projector",
+        default=""
+    )
+
+    bpy.types.Object.pj_throw_ratio_min = bpy.props.FloatProperty(
+        name="Min Throw Ratio",
+        description="Shortest throw ratio the lens can zoom to (0 = unknown)",
+        min=0.0,
+        default=0.0,
+        precision=3
+    )
+
+    bpy.types.Object.pj_throw_ratio_max = bpy.props.FloatProperty(
+        name="Max Throw Ratio",
+        description="Longest throw ratio the lens can zoom to (0 = unknown)",
+        min=0.0,
+        default=0.0,
+        precision=3
+    )
+
+    bpy.types.Object.pj_resolution_x = bpy.props.IntProperty(
+        name="Resolution X",
+        description="Native horizontal resolution in pixels",
+        min=1,
+        default=1920
+    )
+
+    bpy.types.Object.pj_resolution_y = bpy.props.IntProperty(
+        name="Resolution Y",
+        description="Native vertical resolution in pixels",
+        min=1,
+        default=1080
+    )
+
+    bpy.types.Object.pj_lumens = bpy.props.FloatProperty(
+        name="Lumens",
+        description="Rated light output of the projector (ISO lumens)",
+        min=0.0,
+        default=5000.0
+    )
+
+    bpy.types.Object.pj_vignetting = bpy.props.FloatProperty(
+        name="Vignetting",
+        description="Fraction of the light lost in the image corners relative to the center",
+        min=0.0,
+        max=1.0,
+        default=0.15,
+        subtype='FACTOR'
+    )
+
+    bpy.types.Object.pj_lens_shift_v = bpy.props.FloatProperty(
+        name="Vertical Lens Shift",
+        description="Vertical lens shift as a fraction of the image height",
+        min=-1.0,
+        max=1.0,
+        default=0.0
+    )
+
+    bpy.types.Object.pj_lens_shift_h = bpy.props.FloatProperty(
+        name="Horizontal Lens Shift",
+        description="Horizontal lens shift as a fraction of the image width",
+        min=-1.0,
+        max=1.0,
+        default=0.0
+    )
+
+    bpy.types.Object.pj_lens_shift_v_max = bpy.props.FloatProperty(
+        name="Max Vertical Shift",
+        description="Lens shift limit as a fraction of the image height",
+        min=0.0,
+        max=1.0,
+        default=0.0
+    )
+
+    bpy.types.Object.pj_lens_shift_h_max = bpy.props.FloatProperty(
+        name="Max Horizontal Shift",
+        description="Lens shift limit as a fraction of the image width",
+        min=0.0,
+        max=1.0,
+        default=0.0
+    )
+
+    bpy.types.Object.pj_weight = bpy.props.FloatProperty(
+        name="Weight",
+        description="Projector body plus lens weight (in kilograms)",
+        min=0.0,
+        default=0.0
+    )
+
     bpy.types.Object.pj_show_cone = bpy.props.BoolProperty(
         name="Show Projection Cone",
         description="Toggle visibility of the projection cone",
@@ -152,6 +280,150 @@ def register():
         default=False
     )
 
+    # Screen gain of environment surfaces (1.0 = matte white)
+    bpy.types.Object.pj_screen_gain = bpy.props.FloatProperty(
+        name="Screen Gain",
+        description="Peak gain of the projection surface relative to a Lambertian white screen",
+        min=0.0,
+        soft_max=3.0,
+        default=1.0
+    )
+
+    # Decimated stand-in the analyses use instead of a heavy environment mesh
+    bpy.types.Object.pj_proxy = bpy.props.PointerProperty(
+        name="Analysis Proxy",
+        description="Decimated mesh the analyses use instead of this object",
+        type=bpy.types.Object,
+        poll=poll_proxy
+    )
+
+    bpy.types.Object.pj_is_proxy = bpy.props.BoolProperty(
+        name="Is Analysis Proxy",
+        description="This mesh stands in for its parent environment object in the analyses",
+        default=False
+    )
+
+    # Point-cloud venues: vertex-only meshes analysed point by point
+    bpy.types.Object.pj_is_point_cloud = bpy.props.BoolProperty(
+        name="Is Point Cloud",
+        description="The vertices of this mesh are surveyed surface points with normals, analysed without faces",
+        default=False
+    )
+
+    bpy.types.Object.pj_point_spacing = bpy.props.FloatProperty(
+        name="Point Spacing",
+        description="Voxel size the cloud was reduced to; sets the splat size of its points when they occlude",
+        default=0.02,
+        min=0.001,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    # Audience areas: standing people sampled on the upward faces, as capsules
+    bpy.types.Object.pj_is_audience = bpy.props.BoolProperty(
+        name="Is Audience Area",
+        description="People stand on the upward faces of this mesh and may block the projector beams",
+        default=False
+    )
+
+    bpy.types.Object.pj_audience_density = bpy.props.FloatProperty(
+        name="Density",
+        description="Standing people per square metre of floor",
+        default=1.5,
+        min=0.01,
+        soft_max=4.0
+    )
+
+    bpy.types.Object.pj_person_height = bpy.props.FloatProperty(
+        name="Person Height",
+        description="Height of the standing people, floor to top of the head",
+        default=1.75,
+        min=0.5,
+        max=2.5,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    bpy.types.Object.pj_person_radius = bpy.props.FloatProperty(
+        name="Person Radius",
+        description="Half the shoulder width of the standing people",
+        default=0.25,
+        min=0.05,
+        max=0.6,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    # Seat blocks: one vertex per seat at floor level, for the sightline analysis
+    bpy.types.Object.pj_is_seat_block = bpy.props.BoolProperty(
+        name="Is Seat Block",
+        description="The vertices of this mesh are seats whose view of the projection surfaces is analysed",
+        default=False
+    )
+
+    bpy.types.Object.pj_eye_height = bpy.props.FloatProperty(
+        name="Eye Height",
+        description="Height of a seated viewer's eyes above the seat vertices",
+        default=1.15,
+        min=0.0,
+        max=2.5,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    # Rigging: trusses and pipes the projectors hang from, checked for collisions only
+    bpy.types.Object.pj_is_rigging = bpy.props.BoolProperty(
+        name="Is Rigging",
+        description="Projector bodies and beams must not intersect this mesh; projectors may hang from it",
+        default=False
+    )
+
+    # Mirrors: planar front-surface mirrors folding the throws of the projectors aimed at them
+    bpy.types.Object.pj_is_mirror = bpy.props.BoolProperty(
+        name="Is Mirror",
+        description="Fold the throw of projectors aimed at this planar mesh; its normals face the reflective side",
+        default=False
+    )
+
+    bpy.types.Object.pj_mirror_reflectivity = bpy.props.FloatProperty(
+        name="Reflectivity",
+        description="Share of the light the mirror reflects",
+        default=0.95,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+
+    # Mounting zone property (bounding box limits where projectors may hang)
+    bpy.types.Object.pj_is_mounting_zone = bpy.props.BoolProperty(
+        name="Is Mounting Zone",
+        description="Allow the placement optimizer to mount projectors inside this object's bounds",
+        default=False
+    )
+
+    # Planar target of the corner-pin solver (falls back to the throw-distance plane)
+    bpy.types.Object.pj_corner_pin_target = bpy.props.PointerProperty(
+        name="Corner Pin Target",
+        description="Flat screen mesh the projector's corner pin and homography are solved on",
+        type=bpy.types.Object,
+        poll=poll_corner_pin_target
+    )
+
+    # Column of the projector in the shared projection shader's parameter texture
+    bpy.types.Object.pj_shading_slot = bpy.props.IntProperty(
+        name="Shading Slot",
+        description="Index of the projector in the shared projection material (assigned automatically)",
+        min=-1,
+        default=-1
+    )
+
+    # Content shown by the projector in the preview render (test grid if unset)
+    bpy.types.Object.pj_content_image = bpy.props.PointerProperty(
+        name="Content Image",
+        description="Image the projector shows in the preview render; the test grid if empty",
+        type=bpy.types.Image
+    )
+
     # Multi-projector support properties
 
     # Projector collection property
@@ -161,13 +433,6 @@ def register():
         default=""
     )
 
-    # Overlapping projection property
-    bpy.types.Object.pj_overlaps_with = bpy.props.StringProperty(
-        name="Overlaps With",
-        description="Name of projector this one overlaps with",
-        default=""
-    )
-
     # Edge blend amount
     bpy.types.Object.pj_edge_blend_amount = bpy.props.FloatProperty(
         name="Edge Blend Amount",
@@ -208,6 +473,266 @@ def register():
         items=get_collection_items
     )
 
+    # Projector catalog search
+    bpy.types.Scene.pj_catalog_image_width = bpy.props.FloatProperty(
+        name="Image Width",
+        description="Required image width for the catalog search",
+        min=0.1,
+        default=12.0,
+        unit='LENGTH'
+    )
+
+    bpy.types.Scene.pj_catalog_distance_min = bpy.props.FloatProperty(
+        name="Min Distance",
+        description="Nearest possible mounting distance",
+        min=0.1,
+        default=18.0,
+        unit='LENGTH'
+    )
+
+    bpy.types.Scene.pj_catalog_distance_max = bpy.props.FloatProperty(
+        name="Max Distance",
+        description="Farthest possible mounting distance",
+        min=0.1,
+        default=22.0,
+        unit='LENGTH'
+    )
+
+    bpy.types.Scene.pj_catalog_min_lumens = bpy.props.FloatProperty(
+        name="Min Lumens",
+        description="Minimum projector brightness",
+        min=0.0,
+        default=0.0
+    )
+
+    bpy.types.Scene.pj_catalog_results = bpy.props.CollectionProperty(
+        type=PJ_PG_CatalogResult,
+        name="Catalog Results",
+        description="Body/lens combinations matching the last catalog search"
+    )
+
+    bpy.types.Scene.pj_catalog_results_index = bpy.props.IntProperty(
+        name="Catalog Result Index",
+        default=0
+    )
+
+    # Analysis settings
+    bpy.types.Scene.pj_min_pixel_density = bpy.props.FloatProperty(
+        name="Min Pixel Density",
+        description="Content spec: lowest acceptable pixel density (pixels per meter)",
+        min=0.0,
+        default=100.0
+    )
+
+    bpy.types.Scene.pj_visibility_engine = bpy.props.EnumProperty(
+        name="Occlusion",
+        description="How the analyses decide whether a surface point is hidden from a projector",
+        items=[
+            ('NONE', "Ignore", "Every point inside the image and facing the projector is lit"),
+            ('SHADOW_MAP', "Shadow Maps", "Depth buffer rasterized per projector; fast for dense sampling"),
+            ('RAY_CAST', "Ray Cast", "One ray per projector and point; exact but slower"),
+        ],
+        default='SHADOW_MAP'
+    )
+
+    bpy.types.Scene.pj_shadow_map_resolution = bpy.props.IntProperty(
+        name="Shadow Map Resolution",
+        description="Width of the projector depth maps in texels; higher resolves shadow edges more sharply",
+        min=64,
+        max=8192,
+        default=1024
+    )
+
+    # Output settings (blend masks and other per-projector exports)
+    bpy.types.Scene.pj_output_directory = bpy.props.StringProperty(
+        name="Output Directory",
+        description="Folder the per-projector masks and tables are written to",
+        default="//projection_output/",
+        subtype='DIR_PATH'
+    )
+
+    bpy.types.Scene.pj_blend_format = bpy.props.EnumProperty(
+        name="Mask Format",
+        description="File format of the blend masks",
+        items=[
+            ('PNG', "PNG (16-bit)", "16-bit grayscale PNG"),
+            ('EXR', "OpenEXR (half)", "Half float single-channel OpenEXR"),
+        ],
+        default='PNG'
+    )
+
+    bpy.types.Scene.pj_blend_gamma = bpy.props.FloatProperty(
+        name="Blend Gamma",
+        description="Display gamma the blend ramps are corrected for (1.0 = linear)",
+        min=1.0,
+        max=3.0,
+        default=2.2
+    )
+
+    bpy.types.Scene.pj_blend_step = bpy.props.IntProperty(
+        name="Evaluation Step",
+        description="Pixel spacing of the blend evaluation grid; values in between are interpolated (1 = every pixel)",
+        min=1,
+        max=64,
+        default=8
+    )
+
+    bpy.types.Scene.pj_live_corner_pins = bpy.props.BoolProperty(
+        name="Live Corner Pins",
+        description="Re-solve the corner pins of projectors as they or their target screens change",
+        default=False
+    )
+
+    # Rigging clearance checks
+    bpy.types.Scene.pj_min_clearance = bpy.props.FloatProperty(
+        name="Min Clearance",
+        description="Closest a projector body may come to the venue or another projector body",
+        default=0.1,
+        min=0.0,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    bpy.types.Scene.pj_live_clearance = bpy.props.BoolProperty(
+        name="Live Clearance",
+        description="Re-check the clearance of projectors as they or the venue change",
+        default=False
+    )
+
+    # Preview render settings
+    bpy.types.Scene.pj_preview_camera = bpy.props.PointerProperty(
+        name="Audience Camera",
+        description="Camera the preview is rendered from; the scene camera if empty",
+        type=bpy.types.Object,
+        poll=poll_preview_camera
+    )
+
+    bpy.types.Scene.pj_preview_resolution = bpy.props.IntProperty(
+        name="Preview Width",
+        description="Width of the preview render in pixels; the height follows the scene's render aspect",
+        min=16,
+        max=8192,
+        default=1280
+    )
+
+    bpy.types.Scene.pj_preview_blend = bpy.props.BoolProperty(
+        name="Apply Blend Masks",
+        description="Blend the overlaps like the exported edge-blend masks do",
+        default=True
+    )
+
+    bpy.types.Scene.pj_preview_white = bpy.props.FloatProperty(
+        name="White Level",
+        description="Luminance shown as full white in cd/m² (0 = automatic)",
+        min=0.0,
+        default=0.0
+    )
+
+    bpy.types.Scene.pj_preview_ambient = bpy.props.FloatProperty(
+        name="Ambient",
+        description="Room light on the unlit surfaces, as a fraction of white",
+        min=0.0,
+        max=1.0,
+        default=0.05,
+        subtype='FACTOR'
+    )
+
+    # Analysis proxy generation
+    bpy.types.Scene.pj_proxy_triangles = bpy.props.IntProperty(
+        name="Proxy Triangles",
+        description="Triangle budget of each generated analysis proxy",
+        min=1000,
+        default=200000
+    )
+
+    bpy.types.Scene.pj_proxy_weld_distance = bpy.props.FloatProperty(
+        name="Weld Distance",
+        description="Vertices closer than this are merged before decimating",
+        min=0.0,
+        default=0.001,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    # Heatmap display of the analysis results
+    bpy.types.Scene.pj_heatmap_source = bpy.props.EnumProperty(
+        name="Heatmap",
+        description="Analysis result shown on the environment surfaces",
+        items=[
+            ('PIXEL_DENSITY', "Pixel Density", "Pixels per meter from the pixel density analysis"),
+            ('KEYSTONE', "Keystone", "Pixel size relative to the projector's sharpest pixels"),
+            ('INCIDENCE', "Incidence", "Angle between the projector ray and the surface normal"),
+            ('ILLUMINANCE', "Illuminance", "Illuminance in lux from the brightness analysis"),
+            ('LUMINANCE', "Luminance", "Luminance in cd/m² from the brightness analysis"),
+            ('COVERAGE', "Coverage", "Number of projectors lighting each face"),
+            ('OVERLAP', "Overlap", "Faces lit by more than one projector"),
+            ('AUDIENCE_SHADOW', "Audience Shadow", "Share of each face's projectors the audience blocks"),
+            ('SIGHTLINES', "Sightlines", "Share of the seats with a view of each face"),
+        ],
+        default='PIXEL_DENSITY',
+        update=update_heatmap
+    )
+
+    bpy.types.Scene.pj_heatmap_auto_range = bpy.props.BoolProperty(
+        name="Auto Range",
+        description="Stretch the colour ramp over the values found on the surfaces",
+        default=True,
+        update=update_heatmap
+    )
+
+    bpy.types.Scene.pj_heatmap_min = bpy.props.FloatProperty(
+        name="Min",
+        description="Value shown with the first colour of the ramp",
+        default=0.0,
+        update=update_heatmap
+    )
+
+    bpy.types.Scene.pj_heatmap_max = bpy.props.FloatProperty(
+        name="Max",
+        description="Value shown with the last colour of the ramp",
+        default=1000.0,
+        update=update_heatmap
+    )
+
+    bpy.types.Scene.pj_heatmap_show = bpy.props.BoolProperty(
+        name="Show Heatmap",
+        description="The environment surfaces currently show the heatmap",
+        default=False
+    )
+
+    # Frame range analysis results, keyed per frame by the analysis
+    bpy.types.Scene.pj_frame_coverage = bpy.props.FloatProperty(
+        name="Coverage",
+        description="Fraction of the analysed surface lit at this frame",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+
+    bpy.types.Scene.pj_frame_gap = bpy.props.FloatProperty(
+        name="Largest Gap",
+        description="Area of the largest connected dark patch at this frame",
+        default=0.0,
+        min=0.0,
+        unit='AREA'
+    )
+
+    bpy.types.Scene.pj_frame_overlap = bpy.props.FloatProperty(
+        name="Overlap",
+        description="Surface area lit by more than one projector at this frame",
+        default=0.0,
+        min=0.0,
+        unit='AREA'
+    )
+
+    bpy.types.Scene.pj_frame_lux_min = bpy.props.FloatProperty(
+        name="Minimum Illuminance",
+        description="Lowest illuminance (lux) on the lit surface at this frame",
+        default=0.0,
+        min=0.0
+    )
+
 def unregister():
     del bpy.types.Scene.pj_unit_system
 
@@ -218,12 +743,41 @@ def unregister():
     del bpy.types.Object.pj_throw_ratio
     del bpy.types.Object.pj_aspect_ratio_w
     del bpy.types.Object.pj_aspect_ratio_h
+    del bpy.types.Object.pj_catalog_entry
+    del bpy.types.Object.pj_throw_ratio_min
+    del bpy.types.Object.pj_throw_ratio_max
+    del bpy.types.Object.pj_resolution_x
+    del bpy.types.Object.pj_resolution_y
+    del bpy.types.Object.pj_lumens
+    del bpy.types.Object.pj_lens_shift_v
+    del bpy.types.Object.pj_lens_shift_h
+    del bpy.types.Object.pj_lens_shift_v_max
+    del bpy.types.Object.pj_lens_shift_h_max
+    del bpy.types.Object.pj_vignetting
+    del bpy.types.Object.pj_screen_gain
+    del bpy.types.Object.pj_proxy
+    del bpy.types.Object.pj_is_proxy
+    del bpy.types.Object.pj_is_point_cloud
+    del bpy.types.Object.pj_point_spacing
+    del bpy.types.Object.pj_weight
     del bpy.types.Object.pj_show_cone
     del bpy.types.Object.pj_is_environment
+    del bpy.types.Object.pj_is_mounting_zone
+    del bpy.types.Object.pj_is_audience
+    del bpy.types.Object.pj_audience_density
+    del bpy.types.Object.pj_person_height
+    del bpy.types.Object.pj_person_radius
+    del bpy.types.Object.pj_is_seat_block
+    del bpy.types.Object.pj_eye_height
+    del bpy.types.Object.pj_is_rigging
+    del bpy.types.Object.pj_is_mirror
+    del bpy.types.Object.pj_mirror_reflectivity
+    del bpy.types.Object.pj_corner_pin_target
+    del bpy.types.Object.pj_content_image
+    del bpy.types.Object.pj_shading_slot
 
     # Remove multi-projector properties
     del bpy.types.Object.pj_collection
-    del bpy.types.Object.pj_overlaps_with
     del bpy.types.Object.pj_edge_blend_amount
     del bpy.types.Object.pj_is_active_projector
 
@@ -232,6 +786,52 @@ def unregister():
     del bpy.types.Scene.pj_active_collection_index
     del bpy.types.Scene.pj_collection_selector
 
+    # Remove catalog search properties
+    del bpy.types.Scene.pj_catalog_image_width
+    del bpy.types.Scene.pj_catalog_distance_min
+    del bpy.types.Scene.pj_catalog_distance_max
+    del bpy.types.Scene.pj_catalog_min_lumens
+    del bpy.types.Scene.pj_catalog_results
+    del bpy.types.Scene.pj_catalog_results_index
+
+    bpy.utils.unregister_class(PJ_PG_CatalogResult)
+
+    # Remove analysis settings
+    del bpy.types.Scene.pj_min_pixel_density
+    del bpy.types.Scene.pj_visibility_engine
+    del bpy.types.Scene.pj_shadow_map_resolution
+
+    # Remove output settings
+    del bpy.types.Scene.pj_output_directory
+    del bpy.types.Scene.pj_blend_format
+    del bpy.types.Scene.pj_blend_gamma
+    del bpy.types.Scene.pj_blend_step
+    del bpy.types.Scene.pj_live_corner_pins
+    del bpy.types.Scene.pj_min_clearance
+    del bpy.types.Scene.pj_live_clearance
+
+    # Remove preview settings
+    del bpy.types.Scene.pj_preview_camera
+    del bpy.types.Scene.pj_preview_resolution
+    del bpy.types.Scene.pj_preview_blend
+    del bpy.types.Scene.pj_preview_white
+    del bpy.types.Scene.pj_preview_ambient
+
+    # Remove proxy settings
+    del bpy.types.Scene.pj_proxy_triangles
+    del bpy.types.Scene.pj_proxy_weld_distance
+
+    # Remove heatmap settings
+    del bpy.types.Scene.pj_heatmap_source
+    del bpy.types.Scene.pj_heatmap_auto_range
+    del bpy.types.Scene.pj_heatmap_min
+    del bpy.types.Scene.pj_heatmap_max
+    del bpy.types.Scene.pj_heatmap_show
+    del bpy.types.Scene.pj_frame_coverage
+    del bpy.types.Scene.pj_frame_gap
+    del bpy.types.Scene.pj_frame_overlap
+    del bpy.types.Scene.pj_frame_lux_min
+
     # Unregister the property group last
     try:
         bpy.utils.unregister_class(PJ_PG_ProjectorCollectionV2)
@@ -0,0 +1,178 @@
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Operator
+import numpy as np
+
+from .core.proxy import proxy_mesh
+from .scene_arrays import (
+    PROXY_SOURCE_KEY,
+    clear_geometry_caches,
+    local_mesh_triangles,
+    mark_geometry_edited,
+    stale_proxy_sources,
+)
+
+PROXY_COLLECTION = "PJ Analysis Proxies"
+
+def proxy_collection(scene):
+    """Collection holding the analysis proxies, linked to the scene"""
+    collection = bpy.data.collections.get(PROXY_COLLECTION)
+    if collection is None:
+        collection = bpy.data.collections.new(PROXY_COLLECTION)
+    if collection.name not in scene.collection.children:
+        scene.collection.children.link(collection)
+    return collection
+
+def build_mesh(name, vertices, corners, face_sizes=None, mesh=None):
+    """
+    Mesh filled with bulk writes; an existing mesh is cleared and refilled.
+
+    corners holds (T, 3) triangles, or the flat corner indices of polygons
+    with face_sizes corners each.
+    """
+    if mesh is None:
+        mesh = bpy.data.meshes.new(name)
+    else:
+        mesh.clear_geometry()
+    corners = np.ascontiguousarray(corners, dtype=np.int32).reshape(-1)
+    if face_sizes is None:
+        face_sizes = np.full(len(corners) // 3, 3, dtype=np.int32)
+    loop_starts = np.zeros(len(face_sizes), dtype=np.int32)
+    np.cumsum(face_sizes[:-1], out=loop_starts[1:])
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1))
+    mesh.loops.add(len(corners))
+    mesh.loops.foreach_set("vertex_index", corners)
+    mesh.polygons.add(len(face_sizes))
+    mesh.polygons.foreach_set("loop_start", loop_starts)
+    mesh.update(calc_edges=True)
+    return mesh
+
+def environment_sources(context):
+    """Environment meshes that can carry a proxy: the selected ones, or all of them"""
+    objects = [obj for obj in context.scene.objects
+               if obj.pj_is_environment and obj.type == 'MESH' and not obj.pj_is_proxy
+               and not obj.pj_is_point_cloud]
+    selected = [obj for obj in objects if obj.select_get()]
+    return selected or objects
+
+def generate_proxy(scene, obj, depsgraph, target_triangles, weld_distance):
+    """
+    Create or update the decimated analysis proxy of an environment object.
+
+    The proxy is a wireframe child with the object's evaluated mesh (modifiers
+    applied) in its local space, so it follows the object around. It records
+    the hash of the mesh it was made from; once the object is edited the
+    analyses fall back to the object until the proxy is regenerated.
+
+    Returns:
+        Tuple (proxy object, source triangle count, proxy triangle count)
+    """
+    vertices, triangles, _, source_hash = local_mesh_triangles(obj, depsgraph)
+    proxy_vertices, proxy_triangles, _ = proxy_mesh(vertices, triangles, target_triangles, weld_distance)
+
+    proxy = obj.pj_proxy
+    name = f"{obj.name}_proxy"
+    mesh = build_mesh(name, proxy_vertices, proxy_triangles, mesh=proxy.data if proxy is not None else None)
+    if proxy is None:
+        proxy = bpy.data.objects.new(name, mesh)
+        proxy_collection(scene).objects.link(proxy)
+
+    proxy.parent = obj
+    proxy.matrix_parent_inverse.identity()
+    proxy.matrix_basis.identity()
+    proxy.display_type = 'WIRE'
+    proxy.hide_render = True
+    proxy.pj_is_proxy = True
+    proxy[PROXY_SOURCE_KEY] = source_hash
+    obj.pj_proxy = proxy
+    # The mesh may have been refilled in place
+    mark_geometry_edited(proxy.name)
+    return proxy, len(triangles), len(proxy_triangles)
+
+def remove_proxy(obj):
+    """Delete an object's analysis proxy and its mesh"""
+    proxy = obj.pj_proxy
+    obj.pj_proxy = None
+    if proxy is None:
+        return False
+    mesh = proxy.data
+    bpy.data.objects.remove(proxy)
+    if mesh is not None and mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+    return True
+
+def report_stale_proxies(operator, context):
+    """Warn that edited objects are analysed at full resolution until their proxies are regenerated"""
+    stale = stale_proxy_sources(context)
+    if stale:
+        names = ", ".join(obj.name for obj in stale[:3]) + (", ..." if len(stale) > 3 else "")
+        operator.report({'WARNING'}, f"{len(stale)} analysis proxies are out of date ({names}); "
+                                     f"using the full meshes until they are regenerated")
+    return stale
+
+class PJ_OT_generate_proxies(Operator):
+    """Build decimated, welded analysis meshes for the selected (or all) environment objects; analyses use them instead of the full meshes"""
+    bl_idname = "projection.generate_proxies"
+    bl_label = "Generate Analysis Proxies"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        sources = environment_sources(context)
+        if not sources:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+
+        depsgraph = context.evaluated_depsgraph_get()
+        before = 0
+        after = 0
+        for obj in sources:
+            _, source_count, proxy_count = generate_proxy(scene, obj, depsgraph, scene.pj_proxy_triangles,
+                                                          scene.pj_proxy_weld_distance)
+            before += source_count
+            after += proxy_count
+
+        self.report({'INFO'}, f"Generated {len(sources)} analysis proxies: {before} -> {after} triangles")
+        return {'FINISHED'}
+
+class PJ_OT_remove_proxies(Operator):
+    """Delete the analysis proxies of the selected (or all) environment objects"""
+    bl_idname = "projection.remove_proxies"
+    bl_label = "Remove Analysis Proxies"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        removed = sum(remove_proxy(obj) for obj in environment_sources(context))
+        self.report({'INFO'}, f"Removed {removed} analysis proxies")
+        return {'FINISHED'}
+
+@persistent
+def track_geometry_edits(scene, depsgraph):
+    """Invalidate the cached triangles (and with them the BVH key) of edited objects"""
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+            mark_geometry_edited(update.id.original.name)
+
+@persistent
+def reset_geometry_caches(*_):
+    """Another file or an undo step may reuse object names with different geometry"""
+    clear_geometry_caches()
+
+def register():
+    bpy.utils.register_class(PJ_OT_generate_proxies)
+    bpy.utils.register_class(PJ_OT_remove_proxies)
+    bpy.app.handlers.depsgraph_update_post.append(track_geometry_edits)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(reset_geometry_caches)
+
+def unregister():
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if reset_geometry_caches in handlers:
+            handlers.remove(reset_geometry_caches)
+    if track_geometry_edits in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(track_geometry_edits)
+    bpy.utils.unregister_class(PJ_OT_remove_proxies)
+    bpy.utils.unregister_class(PJ_OT_generate_proxies)
+    clear_geometry_caches()
@@ -0,0 +1,718 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from mathutils import Matrix
+
+from .core.adaptive import sample_adaptive
+from .core.frustum import ProjectorArrays
+from .core.mirrors import FoldedProjectors, Mirrors, fold_projectors
+from .core.pointcloud import PointShadowMaps, estimate_normals, point_samples
+from .core.query import ProjectorQuery
+from .core.raycast import TriangleBVH, ray_visibility
+from .core.sampling import SurfaceSamples, sample_surface, sample_triangle_centers
+from .core.shadowmap import ShadowMapCache, ShadowMaps
+from .core.surface_metrics import aggregate_to_faces
+from .visualization import find_projector_camera
+
+def scene_projectors(context, active_only=True):
+    """Return the projector objects of the scene"""
+    return [obj for obj in context.scene.objects
+            if obj.pj_is_projector and (obj.pj_is_active_projector or not active_only)]
+
+def environment_objects(context, use_proxies=False):
+    """
+    Return the mesh objects tagged as projection environment.
+
+    With use_proxies, objects with an analysis proxy are replaced by their
+    proxy, so the analyses work on the decimated mesh. A proxy whose source
+    was edited since it was generated gives way to the source mesh; see
+    stale_proxy_sources. Everything that exports or renders onto the
+    surfaces (warp, blend masks, preview, clearance) keeps the source
+    meshes, their exact shape and UVs. Point clouds have no faces to
+    project on and are left out; see point_cloud_objects.
+    """
+    objects = []
+    depsgraph = None
+    for obj in context.scene.objects:
+        if not obj.pj_is_environment or obj.type != 'MESH' or obj.pj_is_proxy or obj.pj_is_point_cloud:
+            continue
+        if use_proxies and has_proxy(context, obj):
+            if depsgraph is None:
+                depsgraph = context.evaluated_depsgraph_get()
+            if proxy_is_current(obj, depsgraph):
+                objects.append(obj.pj_proxy)
+                continue
+        objects.append(obj)
+    return objects
+
+def has_proxy(context, obj):
+    """Whether an object has an analysis proxy in the scene"""
+    proxy = obj.pj_proxy
+    return proxy is not None and proxy.type == 'MESH' and proxy.name in context.scene.objects
+
+def proxy_is_current(obj, depsgraph):
+    """Whether an object's proxy was generated from its current geometry"""
+    return obj.pj_proxy.get(PROXY_SOURCE_KEY) == local_mesh_triangles(obj, depsgraph)[3]
+
+def stale_proxy_sources(context):
+    """Return the environment objects whose proxy is out of date, so the analyses use the source instead"""
+    sources = [obj for obj in context.scene.objects
+               if obj.pj_is_environment and obj.type == 'MESH' and not obj.pj_is_proxy
+               and not obj.pj_is_point_cloud and has_proxy(context, obj)]
+    if not sources:
+        return []
+    depsgraph = context.evaluated_depsgraph_get()
+    return [obj for obj in sources if not proxy_is_current(obj, depsgraph)]
+
+def point_cloud_objects(context):
+    """Return the point-cloud environment objects, which only the surface analyses use"""
+    return [obj for obj in context.scene.objects
+            if obj.pj_is_environment and obj.pj_is_point_cloud and obj.type == 'MESH']
+
+def audience_objects(context):
+    """Return the audience area meshes, whose upward faces people stand on"""
+    return [obj for obj in context.scene.objects if obj.pj_is_audience and obj.type == 'MESH']
+
+def seat_block_objects(context):
+    """Return the seat blocks, vertex meshes with one vertex per seat"""
+    return [obj for obj in context.scene.objects if obj.pj_is_seat_block and obj.type == 'MESH']
+
+def rigging_objects(context):
+    """Return the rigging meshes, such as trusses and pipes, the projectors hang from"""
+    return [obj for obj in context.scene.objects if obj.pj_is_rigging and obj.type == 'MESH']
+
+def mirror_objects(context):
+    """Return the mirror meshes folding projector throws"""
+    return [obj for obj in context.scene.objects if obj.pj_is_mirror and obj.type == 'MESH']
+
+def scene_mirrors(context):
+    """Mirrors of the scene for projector_arrays, or None without any"""
+    objects = mirror_objects(context)
+    if not objects:
+        return None
+    vertices, triangles, triangle_object, _ = gather_triangles(objects, context.evaluated_depsgraph_get())
+    if len(triangles) == 0:
+        return None
+    return Mirrors(vertices, triangles, triangle_object, [obj.pj_mirror_reflectivity for obj in objects])
+
+def surface_object(obj):
+    """The environment object a proxy stands in for (the object itself if it is no proxy)"""
+    if obj.pj_is_proxy and obj.parent is not None:
+        return obj.parent
+    return obj
+
+def matrix_to_numpy(matrix):
+    """Convert a mathutils Matrix to a NumPy array"""
+    return np.array(matrix, dtype=np.float64)
+
+def projector_arrays(projectors, mirrors=None):
+    """
+    Gather projector objects into a ProjectorArrays for the core analyses.
+
+    Args:
+        projectors: List of projector empties
+        mirrors: Optional Mirrors (see scene_mirrors); throws they fold are
+            replaced by their virtual projectors
+
+    Returns:
+        ProjectorArrays with one row per projector, in list order
+        (FoldedProjectors with mirrors)
+    """
+    n = len(projectors)
+    origins = np.zeros((n, 3))
+    rotations = np.zeros((n, 3, 3))
+    throw_ratio = np.zeros(n)
+    aspect = np.zeros(n)
+    shift = np.zeros((n, 2))
+    resolution = np.zeros((n, 2), dtype=np.int64)
+    lumens = np.zeros(n)
+    vignetting = np.zeros(n)
+
+    for i, obj in enumerate(projectors):
+        matrix = obj.matrix_world
+        origins[i] = matrix.translation
+        # Strip any object scale so the columns are unit axes
+        rotations[i] = matrix_to_numpy(matrix.to_3x3().normalized())
+        throw_ratio[i] = obj.pj_throw_ratio
+        aspect[i] = obj.pj_aspect_ratio_w / obj.pj_aspect_ratio_h
+        shift[i] = (obj.pj_lens_shift_h, obj.pj_lens_shift_v)
+        resolution[i] = (obj.pj_resolution_x, obj.pj_resolution_y)
+        lumens[i] = obj.pj_lumens
+        vignetting[i] = obj.pj_vignetting
+
+    arrays = ProjectorArrays(origins, rotations, throw_ratio, aspect, shift,
+                             resolution, lumens, [obj.name for obj in projectors], vignetting)
+    if mirrors is not None:
+        return fold_projectors(arrays, mirrors)
+    return arrays
+
+def camera_projector_arrays(projectors):
+    """
+    Like projector_arrays, but with the rays starting at each projector's camera child.
+
+    The camera child sits at the lens; projectors without one keep their own origin.
+    """
+    arrays = projector_arrays(projectors)
+    for i, obj in enumerate(projectors):
+        camera = find_projector_camera(obj)
+        if camera is not None:
+            arrays.origins[i] = camera.matrix_world.translation
+    return arrays
+
+def read_mesh_triangles(obj, depsgraph):
+    """
+    Read an object's evaluated mesh as local-space triangles.
+
+    Returns:
+        Tuple (vertices (V, 3), triangles (T, 3), polygon index per triangle)
+    """
+    eval_obj = obj.evaluated_get(depsgraph)
+    mesh = eval_obj.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", vertices)
+        vertices = vertices.reshape(-1, 3).astype(np.float64)
+
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+        triangles = triangles.reshape(-1, 3).astype(np.int64)
+
+        polygons = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+        mesh.loop_triangles.foreach_get("polygon_index", polygons)
+    finally:
+        eval_obj.to_mesh_clear()
+    return vertices, triangles, polygons.astype(np.int64)
+
+# Local-space triangles and their content hash per (object name, geometry version)
+_mesh_cache = OrderedDict()
+MESH_CACHE_SIZE = 64
+
+# Custom property of a proxy holding the content hash of the source mesh it was generated from
+PROXY_SOURCE_KEY = "pj_source_hash"
+
+# Bumped by the depsgraph handler in proxy.py whenever an object's evaluated geometry changes
+_geometry_versions = {}
+
+def mark_geometry_edited(name):
+    """Invalidate the cached triangles of an object whose geometry changed"""
+    _geometry_versions[name] = _geometry_versions.get(name, 0) + 1
+    for key in [key for key in _mesh_cache if key[0] == name]:
+        del _mesh_cache[key]
+
+def clear_geometry_caches():
+    """Forget all cached triangles, e.g. after loading another file or an undo step"""
+    _mesh_cache.clear()
+    _geometry_cache.clear()
+
+def local_mesh_triangles(obj, depsgraph):
+    """
+    Cached local-space triangles of an object, read once per geometry edit.
+
+    Returns:
+        Tuple (vertices, triangles, polygon index per triangle, content hash);
+        the arrays are shared with the cache and read-only
+    """
+    key = (obj.name, _geometry_versions.get(obj.name, 0))
+    entry = _mesh_cache.get(key)
+    if entry is not None:
+        _mesh_cache.move_to_end(key)
+        return entry
+
+    vertices, triangles, polygons = read_mesh_triangles(obj, depsgraph)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(vertices.tobytes())
+    digest.update(triangles.tobytes())
+    for array in (vertices, triangles, polygons):
+        array.setflags(write=False)
+
+    entry = (vertices, triangles, polygons, digest.hexdigest())
+    _mesh_cache[key] = entry
+    while len(_mesh_cache) > MESH_CACHE_SIZE:
+        _mesh_cache.popitem(last=False)
+    return entry
+
+def mesh_triangles(obj, depsgraph):
+    """
+    Read an object's evaluated mesh as world-space triangles.
+
+    Returns:
+        Tuple (vertices (V, 3), triangles (T, 3), polygon index per triangle)
+    """
+    vertices, triangles, polygons, _ = local_mesh_triangles(obj, depsgraph)
+    matrix = matrix_to_numpy(obj.matrix_world)
+    vertices = vertices @ matrix[:3, :3].T + matrix[:3, 3]
+    return vertices, triangles, polygons
+
+def object_geometry_key(obj, depsgraph):
+    """Hash of an object's mesh data and world matrix"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(local_mesh_triangles(obj, depsgraph)[3].encode())
+    digest.update(matrix_to_numpy(obj.matrix_world).tobytes())
+    return digest.hexdigest()
+
+def gather_triangles(objects, depsgraph):
+    """
+    Concatenate the world-space triangles of several mesh objects.
+
+    Returns:
+        Tuple (vertices, triangles, triangle_object, triangle_polygon) where
+        triangle_object indexes into `objects`
+    """
+    all_vertices = []
+    all_triangles = []
+    all_objects = []
+    all_polygons = []
+    offset = 0
+    for index, obj in enumerate(objects):
+        vertices, triangles, polygons = mesh_triangles(obj, depsgraph)
+        all_vertices.append(vertices)
+        all_triangles.append(triangles + offset)
+        all_objects.append(np.full(len(triangles), index, dtype=np.int64))
+        all_polygons.append(polygons)
+        offset += len(vertices)
+
+    if not all_vertices:
+        return (np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64),
+                np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    return (np.concatenate(all_vertices), np.concatenate(all_triangles),
+            np.concatenate(all_objects), np.concatenate(all_polygons))
+
+def mesh_triangle_uvs(obj, depsgraph):
+    """
+    UVs of the active UV map at every loop triangle corner.
+
+    Returns:
+        (T, 3, 2) array, zeros when the mesh has no UV map
+    """
+    eval_obj = obj.evaluated_get(depsgraph)
+    mesh = eval_obj.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        uvs = np.zeros((len(mesh.loop_triangles), 3, 2))
+        uv_layer = mesh.uv_layers.active
+        if uv_layer is not None:
+            loops = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("loops", loops)
+            loop_uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            uv_layer.data.foreach_get("uv", loop_uvs)
+            uvs = loop_uvs.reshape(-1, 2)[loops].reshape(-1, 3, 2).astype(np.float64)
+    finally:
+        eval_obj.to_mesh_clear()
+    return uvs
+
+def gather_triangle_uvs(objects, depsgraph):
+    """Concatenated (T, 3, 2) corner UVs in gather_triangles order"""
+    uvs = [mesh_triangle_uvs(obj, depsgraph) for obj in objects]
+    return np.concatenate(uvs) if uvs else np.zeros((0, 3, 2))
+
+# Built BVHs keyed by a hash of the world-space triangles they were built from
+_bvh_cache = OrderedDict()
+BVH_CACHE_SIZE = 4
+
+# Gathered environments by the same key, so unchanged venues skip the gather entirely
+_geometry_cache = OrderedDict()
+GEOMETRY_CACHE_SIZE = 2
+
+# Projector depth maps, keyed by geometry hash, projector pose/lens and resolution
+_shadow_cache = ShadowMapCache()
+
+class EnvironmentGeometry:
+    """World-space triangles of a set of objects; the BVH is built (or reused) on first use"""
+
+    def __init__(self, objects, vertices, triangles, triangle_object, triangle_polygon, key):
+        self.objects = objects
+        self.vertices = vertices
+        self.triangles = triangles
+        self.triangle_object = triangle_object
+        self.triangle_polygon = triangle_polygon
+        self.key = key
+
+    @property
+    def bvh(self):
+        bvh = _bvh_cache.get(self.key)
+        if bvh is None:
+            bvh = TriangleBVH(self.vertices, self.triangles)
+            _bvh_cache[self.key] = bvh
+            while len(_bvh_cache) > BVH_CACHE_SIZE:
+                _bvh_cache.popitem(last=False)
+        else:
+            _bvh_cache.move_to_end(self.key)
+        return bvh
+
+def environment_geometry(context, objects):
+    """
+    Gather the objects' triangles, keyed by a hash of their mesh data and world matrices.
+
+    The key identifies the geometry in the BVH and shadow map caches, so
+    repeated analyses and exports skip rebuilding them; moving projectors
+    leaves it unchanged, editing or moving an environment object changes it.
+    """
+    depsgraph = context.evaluated_depsgraph_get()
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in objects:
+        digest.update(object_geometry_key(obj, depsgraph).encode())
+    key = digest.hexdigest()
+
+    cached = _geometry_cache.get(key)
+    if cached is not None:
+        _geometry_cache.move_to_end(key)
+        cached.objects = objects
+        return cached
+
+    vertices, triangles, triangle_object, triangle_polygon = gather_triangles(objects, depsgraph)
+    geometry = EnvironmentGeometry(objects, vertices, triangles, triangle_object, triangle_polygon, key)
+    _geometry_cache[key] = geometry
+    while len(_geometry_cache) > GEOMETRY_CACHE_SIZE:
+        _geometry_cache.popitem(last=False)
+    return geometry
+
+def environment_shadow_maps(context, projectors, geometry):
+    """Depth maps of the projectors over the geometry, shared through the scene's cache"""
+    return ShadowMaps(projectors, geometry.vertices, geometry.triangles,
+                      context.scene.pj_shadow_map_resolution, _shadow_cache, geometry.key)
+
+def environment_visibility(context, projectors, points, objects, engine=None, clouds=None):
+    """
+    Occlusion callable for the surface analyses (see core.surface_metrics.lit_mask).
+
+    Args:
+        projectors: ProjectorArrays of the analysis
+        points: (M, 3) sample positions of the analysis
+        objects: Occluding mesh objects
+        engine: 'NONE', 'SHADOW_MAP' or 'RAY_CAST'; the scene setting if None
+        clouds: Optional PointCloudSamples of occluding point clouds; rays
+            can't hit points, so clouds are splatted into shadow maps together
+            with the meshes whichever engine is chosen
+
+    Returns:
+        Callable, or None when occlusion is ignored and no throw is folded
+    """
+    engine = engine or context.scene.pj_visibility_engine
+    has_clouds = clouds is not None and len(clouds.samples) > 0
+    folded = isinstance(projectors, FoldedProjectors) and projectors.folded.any()
+    if engine == 'NONE' or not (objects or has_clouds):
+        # Folded throws still only light what they reach through their mirrors
+        return projectors.visibility(points) if folded else None
+
+    geometry = environment_geometry(context, objects)
+    if has_clouds:
+        maps = PointShadowMaps(projectors, geometry.vertices, geometry.triangles, clouds.samples.points,
+                               clouds.spacing, context.scene.pj_shadow_map_resolution, _shadow_cache,
+                               geometry.key + clouds.key)
+        visibility = maps.visibility(points)
+    elif engine == 'RAY_CAST':
+        visibility = ray_visibility(geometry.bvh, projectors.origins, points)
+    else:
+        visibility = environment_shadow_maps(context, projectors, geometry).visibility(points)
+    if folded:
+        return projectors.visibility(points, visibility, geometry.bvh,
+                                     exit_visibility(context, projectors, geometry, engine, clouds))
+    return visibility
+
+def exit_visibility(context, projectors, geometry, engine, clouds=None):
+    """
+    Occlusion test of folded throws past their last mirror (see core.mirrors), or None to ray cast them.
+
+    Each folded projector gets a depth map of the geometry clipped to the far
+    side of its last mirror, seen from its virtual lens.
+    """
+    has_clouds = clouds is not None and len(clouds.samples) > 0
+    if engine == 'RAY_CAST' and not has_clouds:
+        return None
+    resolution = context.scene.pj_shadow_map_resolution
+    if has_clouds:
+        return projectors.exit_visibility(geometry.vertices, geometry.triangles, resolution, _shadow_cache,
+                                          geometry.key + clouds.key, clouds.samples.points, clouds.spacing)
+    return projectors.exit_visibility(geometry.vertices, geometry.triangles, resolution, _shadow_cache,
+                                      geometry.key)
+
+def point_visibility(context, projectors, geometry, engine=None):
+    """
+    Occlusion test for arbitrary points: callable (index, points) -> (M,) mask
+    of the points projector `index` sees, or None when occlusion is ignored
+    and no throw is folded.
+    """
+    engine = engine or context.scene.pj_visibility_engine
+    folded = isinstance(projectors, FoldedProjectors) and projectors.folded.any()
+    if engine == 'NONE' or len(geometry.triangles) == 0:
+        return projectors.visible_points() if folded else None
+    if engine == 'RAY_CAST':
+        bvh = geometry.bvh
+
+        def visible(index, points):
+            return ~bvh.occluded(np.broadcast_to(projectors.origins[index], points.shape), points)
+    else:
+        visible = environment_shadow_maps(context, projectors, geometry).visible
+    if folded:
+        return projectors.visible_points(visible, geometry.bvh,
+                                         exit_visibility(context, projectors, geometry, engine))
+    return visible
+
+def projector_query(projectors, geometry):
+    """ProjectorQuery over the projectors, with every frustum reaching the far side of the geometry"""
+    if len(geometry.vertices) == 0:
+        return ProjectorQuery(projectors, 0.0)
+    lo = geometry.vertices.min(axis=0)
+    hi = geometry.vertices.max(axis=0)
+    corners = np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    far = np.linalg.norm(corners[None] - projectors.origins[:, None], axis=2).max(axis=1)
+    return ProjectorQuery(projectors, far)
+
+# Point attributes of point-cloud objects: unit normal and the surface area each point stands for
+NORMAL_ATTRIBUTE = "pj_normal"
+AREA_ATTRIBUTE = "pj_area"
+
+# Normal estimation cell of clouds without stored normals, in point spacings
+NORMAL_CELL_SPACINGS = 5
+
+def read_point_attribute(mesh, name, data_type, width):
+    """(V, width) values of a point attribute with one bulk read, or None if the mesh has none"""
+    attribute = mesh.attributes.get(name)
+    if attribute is None or attribute.domain != 'POINT' or attribute.data_type != data_type:
+        return None
+    values = np.empty(len(mesh.vertices) * width, dtype=np.float32)
+    attribute.data.foreach_get("vector" if width == 3 else "value", values)
+    return values.reshape(-1, width) if width > 1 else values
+
+def local_point_cloud(obj):
+    """
+    Cached local-space points, normals and areas of a point-cloud object, read once per edit.
+
+    Clouds without the importer's attributes get their normals and areas estimated.
+
+    Returns:
+        Tuple (points, normals, areas, content hash); the arrays are shared
+        with the cache and read-only
+    """
+    key = (obj.name, _geometry_versions.get(obj.name, 0), 'POINTS')
+    entry = _mesh_cache.get(key)
+    if entry is not None:
+        _mesh_cache.move_to_end(key)
+        return entry
+
+    mesh = obj.data
+    points = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", points)
+    points = points.reshape(-1, 3).astype(np.float64)
+    normals = read_point_attribute(mesh, NORMAL_ATTRIBUTE, 'FLOAT_VECTOR', 3)
+    areas = read_point_attribute(mesh, AREA_ATTRIBUTE, 'FLOAT', 1)
+    if normals is None or areas is None:
+        normals, areas = estimate_normals(points, NORMAL_CELL_SPACINGS * obj.pj_point_spacing)
+    normals = np.asarray(normals, dtype=np.float64)
+    areas = np.asarray(areas, dtype=np.float64)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(points.tobytes())
+    digest.update(normals.tobytes())
+    for array in (points, normals, areas):
+        array.setflags(write=False)
+    entry = (points, normals, areas, digest.hexdigest())
+    _mesh_cache[key] = entry
+    while len(_mesh_cache) > MESH_CACHE_SIZE:
+        _mesh_cache.popitem(last=False)
+    return entry
+
+class PointCloudSamples:
+    """
+    World-space samples of point-cloud objects, concatenated in object order.
+
+    Attributes:
+        samples: SurfaceSamples; `triangles` holds the index into all points
+        offsets: (K + 1,) first sample of every object
+        key: Hash of the points and world matrices, for the shadow map cache
+        spacing: Largest point spacing of the clouds, the splat size
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        points = []
+        normals = []
+        areas = []
+        digest = hashlib.blake2b(digest_size=16)
+        for obj in objects:
+            local_points, local_normals, local_areas, content = local_point_cloud(obj)
+            matrix = matrix_to_numpy(obj.matrix_world)
+            linear = matrix[:3, :3]
+            points.append(local_points @ linear.T + matrix[:3, 3])
+            # Normals transform by the inverse transpose; areas by the scale squared
+            world_normals = local_normals @ np.linalg.inv(linear)
+            normals.append(world_normals / np.maximum(np.linalg.norm(world_normals, axis=1, keepdims=True),
+                                                      1e-12))
+            areas.append(local_areas * abs(np.linalg.det(linear)) ** (2.0 / 3.0))
+            digest.update(content.encode())
+            digest.update(matrix.tobytes())
+
+        if objects:
+            self.samples = point_samples(np.concatenate(points), np.concatenate(normals),
+                                         np.concatenate(areas))
+        else:
+            self.samples = point_samples(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0))
+        self.offsets = np.cumsum([0] + [len(part) for part in points])
+        self.key = digest.hexdigest()
+        self.spacing = max((obj.pj_point_spacing for obj in objects), default=0.0)
+
+    def __len__(self):
+        return len(self.samples)
+
+class AnalysisSamples:
+    """
+    Samples of the environment meshes and point clouds, analysed as one set.
+
+    The mesh samples come first, so per-sample results split back into face
+    attributes of the meshes and point attributes of the clouds.
+    """
+
+    def __init__(self, objects, samples, triangle_object, triangle_polygon, clouds=None):
+        self.objects = objects
+        self.mesh_samples = samples
+        self.triangle_object = triangle_object
+        self.triangle_polygon = triangle_polygon
+        self.clouds = clouds
+        if clouds is not None and len(clouds):
+            parts = (samples, clouds.samples)
+            self.samples = SurfaceSamples(np.concatenate([part.points for part in parts]),
+                                          np.concatenate([part.normals for part in parts]),
+                                          np.concatenate([part.weights for part in parts]),
+                                          np.concatenate([part.triangles for part in parts]))
+        else:
+            self.samples = samples
+
+    def object_values(self, value):
+        """(M,) value(obj) of the object (or cloud) every sample lies on"""
+        per_object = np.array([value(obj) for obj in self.objects], dtype=np.float64)
+        values = [per_object[self.triangle_object[self.mesh_samples.triangles]]]
+        if self.clouds is not None:
+            values.append(np.repeat([value(obj) for obj in self.clouds.objects],
+                                    np.diff(self.clouds.offsets)).astype(np.float64))
+        return np.concatenate(values)
+
+    def write(self, name, values):
+        """
+        Store per-sample results: averaged per face on meshes, per point on clouds.
+
+        Returns:
+            Names of the objects whose attribute couldn't be written
+        """
+        skipped = []
+        count = len(self.mesh_samples)
+        for obj, face_values in per_object_face_values(self.objects, self.mesh_samples, self.triangle_object,
+                                                       self.triangle_polygon, values[:count]):
+            if not write_face_attribute(obj, name, face_values):
+                skipped.append(obj.name)
+        if self.clouds is not None:
+            offsets = self.clouds.offsets + count
+            for index, obj in enumerate(self.clouds.objects):
+                write_point_attribute(obj, name, values[offsets[index]:offsets[index + 1]])
+        return skipped
+
+def analysis_samples(context, objects, clouds, mode='FACES', count=100000, seed=0, projectors=None,
+                     tolerance=0.05, cell_size=1.0, blend=None):
+    """
+    Sample the environment meshes (see environment_samples) and add the points of the clouds.
+
+    Returns:
+        AnalysisSamples
+    """
+    if objects:
+        samples, triangle_object, triangle_polygon = environment_samples(
+            context, objects, mode, count, seed, projectors, tolerance, cell_size, blend)
+    else:
+        samples = point_samples(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0))
+        triangle_object = triangle_polygon = np.zeros(0, dtype=np.int64)
+    return AnalysisSamples(objects, samples, triangle_object, triangle_polygon,
+                           PointCloudSamples(clouds) if clouds else None)
+
+def object_world_bounds(obj):
+    """World-space axis aligned bounds (min, max) of an object's bounding box"""
+    matrix = matrix_to_numpy(obj.matrix_world)
+    corners = np.array([tuple(corner) for corner in obj.bound_box], dtype=np.float64)
+    corners = corners @ matrix[:3, :3].T + matrix[:3, 3]
+    return corners.min(axis=0), corners.max(axis=0)
+
+def apply_projector_transform(obj, origin, rotation):
+    """Place a projector empty at a world origin with a world rotation"""
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation
+    matrix[:3, 3] = origin
+    obj.matrix_world = Matrix(matrix.tolist())
+
+def environment_samples(context, objects, mode='FACES', count=100000, seed=0, projectors=None,
+                        tolerance=0.05, cell_size=1.0, blend=None):
+    """
+    Sample the surfaces of environment meshes for an analysis.
+
+    Args:
+        objects: Mesh objects to sample
+        mode: 'FACES' for one sample per triangle centroid, 'RANDOM' for
+            `count` area-uniform random samples, 'ADAPTIVE' for samples
+            refined near the image, blend and shadow edges of `projectors`
+            (at most `count` of them, see core.adaptive.sample_adaptive)
+        projectors: ProjectorArrays driving the adaptive refinement
+        tolerance, cell_size, blend: Adaptive sampling settings
+
+    Returns:
+        Tuple (samples, triangle_object, triangle_polygon)
+    """
+    geometry = environment_geometry(context, objects)
+    if mode == 'ADAPTIVE':
+        samples = sample_adaptive(projectors, geometry.vertices, geometry.triangles, tolerance,
+                                  cell_size, blend, point_visibility(context, projectors, geometry),
+                                  count)
+    elif mode == 'FACES':
+        samples = sample_triangle_centers(geometry.vertices, geometry.triangles)
+    else:
+        samples = sample_surface(geometry.vertices, geometry.triangles, count, seed)
+    return samples, geometry.triangle_object, geometry.triangle_polygon
+
+def write_face_attribute(obj, name, values):
+    """
+    Store per-polygon float values as a FACE attribute on an object's mesh.
+
+    Returns:
+        True if written, False when the evaluated topology doesn't match the
+        original mesh (e.g. a subdivision modifier adds faces)
+    """
+    mesh = obj.data
+    if len(values) != len(mesh.polygons):
+        return False
+
+    attribute = mesh.attributes.get(name)
+    if attribute is not None and (attribute.domain != 'FACE' or attribute.data_type != 'FLOAT'):
+        mesh.attributes.remove(attribute)
+        attribute = None
+    if attribute is None:
+        attribute = mesh.attributes.new(name=name, type='FLOAT', domain='FACE')
+
+    attribute.data.foreach_set("value", np.ascontiguousarray(values, dtype=np.float32))
+    mesh.update()
+    return True
+
+def write_point_attribute(obj, name, values):
+    """Store per-point float values as a POINT attribute on a point-cloud object's mesh"""
+    mesh = obj.data
+    attribute = mesh.attributes.get(name)
+    if attribute is not None and (attribute.domain != 'POINT' or attribute.data_type != 'FLOAT'):
+        mesh.attributes.remove(attribute)
+        attribute = None
+    if attribute is None:
+        attribute = mesh.attributes.new(name=name, type='FLOAT', domain='POINT')
+    attribute.data.foreach_set("value", np.ascontiguousarray(values, dtype=np.float32))
+    mesh.update()
+
+def per_object_face_values(objects, samples, triangle_object, triangle_polygon, values):
+    """
+    Aggregate per-sample values into per-polygon arrays for each object.
+
+    Yields:
+        Tuples (object, per-polygon values)
+    """
+    sample_object = triangle_object[samples.triangles]
+    sample_polygon = triangle_polygon[samples.triangles]
+    for index, obj in enumerate(objects):
+        mask = sample_object == index
+        yield obj, aggregate_to_faces(values[mask], samples.weights[mask],
+                                      sample_polygon[mask], len(obj.data.polygons))
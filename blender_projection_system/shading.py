@@ -0,0 +1,436 @@
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Operator
+import numpy as np
+
+from .core.shading import (
+    LAYERS,
+    SLOT_ROWS,
+    assign_slots,
+    pack_parameters,
+    slot_capacity,
+)
+from .scene_arrays import camera_projector_arrays, matrix_to_numpy, write_face_attribute
+from .visualization import create_projection_test_grid
+
+MATERIAL_NAME = "ProjectionMaterial"
+NODE_GROUP_NAME = "PJ Projector Shading"
+PARAMETER_IMAGE = "PJ Projector Parameters"
+TEST_GRID_IMAGE = "projection_test_grid"
+
+# Face attributes holding slot + 1 of the projectors blended on each face (0 = none)
+SLOT_ATTRIBUTES = tuple(f"pj_projector_slot_{layer}" for layer in range(LAYERS))
+
+# Texels last written to the parameter image, so unchanged scenes skip the upload
+_written = None
+
+# Projector name by slot and the file's object count at the last full update; a new,
+# renamed or deleted projector no longer matches them and triggers another full update
+_slot_names = {}
+_object_count = 0
+
+def all_projectors():
+    """Every projector object in the file; slots are unique across scenes"""
+    return [obj for obj in bpy.data.objects if obj.pj_is_projector]
+
+def ensure_projector_slots(projectors):
+    """
+    Give every projector a unique shading slot.
+
+    Slots are kept once assigned, so mapped faces stay valid; duplicated
+    projectors (which copy the slot) and new ones get the lowest free slot.
+    """
+    used = set()
+    pending = []
+    for obj in sorted(projectors, key=lambda o: o.name):
+        if obj.pj_shading_slot < 0 or obj.pj_shading_slot in used:
+            pending.append(obj)
+        else:
+            used.add(obj.pj_shading_slot)
+    slot = 0
+    for obj in pending:
+        while slot in used:
+            slot += 1
+        obj.pj_shading_slot = slot
+        used.add(slot)
+    return np.array([obj.pj_shading_slot for obj in projectors], dtype=np.int64)
+
+def parameter_image(capacity):
+    """The float lookup texture with one column per slot, resized to `capacity`"""
+    image = bpy.data.images.get(PARAMETER_IMAGE)
+    if image is not None and tuple(image.size) != (capacity, SLOT_ROWS):
+        image.scale(capacity, SLOT_ROWS)
+    if image is None:
+        image = bpy.data.images.new(PARAMETER_IMAGE, width=capacity, height=SLOT_ROWS,
+                                    alpha=True, float_buffer=True)
+    # Raw full-precision values: no color management, no premultiplication
+    image.colorspace_settings.name = 'Non-Color'
+    image.alpha_mode = 'CHANNEL_PACKED'
+    image.use_half_precision = False
+    return image
+
+def update_projector_parameters(force=False):
+    """
+    Write every projector's pose and lens into the parameter image.
+
+    Only texel values change when projectors move, so the shared material is
+    never recompiled; the node group's capacity only changes when the slots
+    outgrow the texture.
+
+    Returns:
+        True if the image was rewritten
+    """
+    global _slot_names, _object_count
+
+    projectors = all_projectors()
+    slots = ensure_projector_slots(projectors)
+    capacity = slot_capacity(slots.max() + 1 if len(slots) else 0)
+    _slot_names = {obj.pj_shading_slot: obj.name for obj in projectors}
+    _object_count = len(bpy.data.objects)
+
+    texels = projector_texels(projectors, slots, capacity)
+    if not force and _written is not None and _written.shape == texels.shape \
+            and np.array_equal(_written, texels):
+        return False
+    write_parameter_image(texels)
+    return True
+
+def refresh_projector_parameters(projectors):
+    """
+    Rewrite only the columns of the given projectors, e.g. the ones a depsgraph update touched.
+
+    Falls back to update_projector_parameters when the slots may have changed:
+    before the first full update, or when projectors were added, renamed or deleted.
+
+    Returns:
+        True if the image was rewritten
+    """
+    if _written is None or len(bpy.data.objects) != _object_count:
+        return update_projector_parameters()
+    capacity = _written.shape[1]
+    if any(not 0 <= obj.pj_shading_slot < capacity or _slot_names.get(obj.pj_shading_slot) != obj.name
+           for obj in projectors):
+        return update_projector_parameters()
+
+    slots = np.array([obj.pj_shading_slot for obj in projectors], dtype=np.int64)
+    texels = _written.copy()
+    texels[:, slots] = projector_texels(projectors, slots, capacity)[:, slots]
+    if np.array_equal(_written, texels):
+        return False
+    write_parameter_image(texels)
+    return True
+
+def projector_texels(projectors, slots, capacity):
+    """Parameter texels of the projectors, with the inactive ones disabled"""
+    texels = pack_parameters(camera_projector_arrays(projectors), slots, capacity,
+                             [obj.pj_edge_blend_amount for obj in projectors])
+    inactive = [obj.pj_shading_slot for obj in projectors if not obj.pj_is_active_projector]
+    texels[4, inactive, 1] = 0.0
+    return texels
+
+def write_parameter_image(texels):
+    """Upload the texels and keep the node group's capacity in step"""
+    global _written
+    capacity = texels.shape[1]
+    image = parameter_image(capacity)
+    image.pixels.foreach_set(texels.reshape(-1))
+    image.update()
+    group = bpy.data.node_groups.get(NODE_GROUP_NAME)
+    if group is not None and group.nodes["Capacity"].outputs[0].default_value != capacity:
+        group.nodes["Capacity"].outputs[0].default_value = capacity
+    _written = texels
+
+class NodeBuilder:
+    """Small helper wiring math nodes of a node tree column by column"""
+
+    def __init__(self, tree):
+        self.nodes = tree.nodes
+        self.links = tree.links
+        self.x = 0
+        self.y = 0
+
+    def node(self, kind, x, **settings):
+        node = self.nodes.new(kind)
+        node.location = (x, self.y)
+        self.y -= 180
+        for name, value in settings.items():
+            setattr(node, name, value)
+        return node
+
+    def connect(self, socket, value):
+        if isinstance(value, bpy.types.NodeSocket):
+            self.links.new(value, socket)
+        else:
+            socket.default_value = value
+
+    def math(self, operation, a, b=0.0, x=None, clamp=False):
+        node = self.node('ShaderNodeMath', self.x if x is None else x, operation=operation, use_clamp=clamp)
+        self.connect(node.inputs[0], a)
+        self.connect(node.inputs[1], b)
+        return node.outputs[0]
+
+def build_layer(build, group_in_position, capacity, parameters, grid, layer, x):
+    """
+    Nodes of one projector layer: slot attribute -> texel lookups -> image
+    coordinates -> content colour and edge blend weight (core.shading.lookup_coordinates).
+
+    Returns:
+        Tuple (colour socket, weight socket)
+    """
+    build.y = -layer * 2400
+    attribute = build.node('ShaderNodeAttribute', x, attribute_type='GEOMETRY',
+                           attribute_name=SLOT_ATTRIBUTES[layer])
+    slot = attribute.outputs['Fac']
+    # Texel column centre of slot (stored + 1, 0 meaning none)
+    column = build.math('DIVIDE', build.math('SUBTRACT', slot, 0.5, x=x + 200), capacity, x=x + 400)
+
+    texels = []
+    for row in range(SLOT_ROWS):
+        coordinate = build.node('ShaderNodeCombineXYZ', x + 600)
+        build.connect(coordinate.inputs[0], column)
+        coordinate.inputs[1].default_value = (row + 0.5) / SLOT_ROWS
+        texture = build.node('ShaderNodeTexImage', x + 800, image=parameters,
+                             interpolation='Closest', extension='EXTEND')
+        build.links.new(coordinate.outputs[0], texture.inputs['Vector'])
+        texels.append(texture)
+
+    # Projector frame coordinates: dot(row, position) + offset
+    local = []
+    for row in range(3):
+        dot = build.node('ShaderNodeVectorMath', x + 1100, operation='DOT_PRODUCT')
+        build.links.new(texels[row].outputs['Color'], dot.inputs[0])
+        build.links.new(group_in_position, dot.inputs[1])
+        local.append(build.math('ADD', dot.outputs['Value'], texels[row].outputs['Alpha'], x=x + 1300))
+    depth = build.math('MULTIPLY', local[1], -1.0, x=x + 1500)
+
+    lens = build.node('ShaderNodeSeparateColor', x + 1100)
+    build.links.new(texels[3].outputs['Color'], lens.inputs[0])
+    throw_ratio, aspect, shift_h = lens.outputs[0], lens.outputs[1], lens.outputs[2]
+    shift_v = texels[3].outputs['Alpha']
+    settings = build.node('ShaderNodeSeparateColor', x + 1100)
+    build.links.new(texels[4].outputs['Color'], settings.inputs[0])
+    blend, enabled = settings.outputs[0], settings.outputs[1]
+
+    x += 1700
+    u = build.math('SUBTRACT', build.math('SUBTRACT', 0.5, build.math(
+        'MULTIPLY', build.math('DIVIDE', local[0], depth, x=x), throw_ratio, x=x + 200), x=x + 400),
+        shift_h, x=x + 600)
+    v = build.math('SUBTRACT', build.math('ADD', 0.5, build.math('MULTIPLY', build.math(
+        'MULTIPLY', build.math('DIVIDE', local[2], depth, x=x), throw_ratio, x=x + 200), aspect,
+        x=x + 300), x=x + 400), shift_v, x=x + 600)
+
+    # Edge blend ramp, 0 outside the image: smoothstep of the distance to the border
+    ramp = build.math('MAXIMUM', blend, 1e-6, x=x + 600)
+    edge_u = build.math('DIVIDE', build.math('MINIMUM', u, build.math('SUBTRACT', 1.0, u, x=x + 700),
+                                             x=x + 800), ramp, x=x + 1000, clamp=True)
+    edge_v = build.math('DIVIDE', build.math('MINIMUM', v, build.math('SUBTRACT', 1.0, v, x=x + 700),
+                                             x=x + 800), ramp, x=x + 1000, clamp=True)
+    t = build.math('MULTIPLY', edge_u, edge_v, x=x + 1200)
+    smooth = build.math('MULTIPLY', build.math('MULTIPLY', t, t, x=x + 1400), build.math(
+        'SUBTRACT', 3.0, build.math('MULTIPLY', t, 2.0, x=x + 1400), x=x + 1500), x=x + 1600)
+    valid = build.math('MULTIPLY', build.math('MULTIPLY', enabled, build.math(
+        'GREATER_THAN', depth, 1e-3, x=x + 1500), x=x + 1600), build.math('GREATER_THAN', slot, 0.5,
+                                                                          x=x + 1500), x=x + 1700)
+    weight = build.math('MULTIPLY', smooth, valid, x=x + 1800)
+
+    # The content: the shared test grid
+    coordinate = build.node('ShaderNodeCombineXYZ', x + 1000)
+    build.links.new(u, coordinate.inputs[0])
+    build.links.new(v, coordinate.inputs[1])
+    content = build.node('ShaderNodeTexImage', x + 1200, image=grid, extension='CLIP')
+    build.links.new(coordinate.outputs[0], content.inputs['Vector'])
+    return content.outputs['Color'], weight
+
+def create_projection_node_group(capacity):
+    """
+    The node group shared by every projection-mapped surface.
+
+    Outputs the blend of the face's projector layers (the test grid seen
+    through each) and a mask of the lit area.
+    """
+    group = bpy.data.node_groups.new(NODE_GROUP_NAME, 'ShaderNodeTree')
+    group.interface.new_socket(name='Color', in_out='OUTPUT', socket_type='NodeSocketColor')
+    group.interface.new_socket(name='Mask', in_out='OUTPUT', socket_type='NodeSocketFloat')
+
+    build = NodeBuilder(group)
+    geometry = build.node('ShaderNodeNewGeometry', -400)
+    capacity_node = build.node('ShaderNodeValue', -400, name="Capacity", label="Capacity")
+    capacity_node.outputs[0].default_value = capacity
+    parameters = parameter_image(capacity)
+    grid = bpy.data.images[TEST_GRID_IMAGE]
+
+    colours = []
+    weights = []
+    for layer in range(LAYERS):
+        colour, weight = build_layer(build, geometry.outputs['Position'], capacity_node.outputs[0],
+                                     parameters, grid, layer, 0)
+        colours.append(colour)
+        weights.append(weight)
+
+    # Weighted average of the layers
+    x = 4000
+    build.y = 0
+    total = weights[0]
+    for weight in weights[1:]:
+        total = build.math('ADD', total, weight, x=x)
+    inverse = build.math('DIVIDE', 1.0, build.math('MAXIMUM', total, 1e-6, x=x + 200), x=x + 400)
+    colour = None
+    for layer_colour, weight in zip(colours, weights):
+        scaled = build.node('ShaderNodeVectorMath', x + 600, operation='SCALE')
+        build.links.new(layer_colour, scaled.inputs[0])
+        build.links.new(build.math('MULTIPLY', weight, inverse, x=x + 500), scaled.inputs['Scale'])
+        if colour is None:
+            colour = scaled.outputs[0]
+        else:
+            add = build.node('ShaderNodeVectorMath', x + 800, operation='ADD')
+            build.links.new(colour, add.inputs[0])
+            build.links.new(scaled.outputs[0], add.inputs[1])
+            colour = add.outputs[0]
+
+    group_out = build.node('NodeGroupOutput', x + 1000)
+    group.links.new(colour, group_out.inputs['Color'])
+    group.links.new(build.math('GREATER_THAN', total, 0.0, x=x + 800), group_out.inputs['Mask'])
+    return group
+
+def create_projection_material():
+    """
+    The single material all projection-mapped surfaces share.
+
+    Older files carry a ProjectionMaterial driven by one camera's texture
+    coordinates; its nodes are rebuilt around the shared node group in place,
+    so the objects using it keep their material.
+    """
+    if TEST_GRID_IMAGE not in bpy.data.images:
+        create_projection_test_grid()
+    capacity = slot_capacity(max((obj.pj_shading_slot for obj in all_projectors()), default=-1) + 1)
+    group = bpy.data.node_groups.get(NODE_GROUP_NAME) or create_projection_node_group(capacity)
+
+    mat = bpy.data.materials.get(MATERIAL_NAME) or bpy.data.materials.new(name=MATERIAL_NAME)
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    if any(node.type == 'GROUP' and node.node_tree == group for node in nodes):
+        return mat
+
+    links = mat.node_tree.links
+    for node in list(nodes):
+        nodes.remove(node)
+
+    output = nodes.new(type='ShaderNodeOutputMaterial')
+    output.location = (600, 0)
+    principled = nodes.new(type='ShaderNodeBsdfPrincipled')
+    principled.location = (300, 0)
+    shading = nodes.new(type='ShaderNodeGroup')
+    shading.node_tree = group
+    shading.location = (-200, 0)
+
+    # Unlit surfaces stay dark grey; the colour sockets of the Mix node are
+    # inputs 6/7 and output 2 (the float and vector variants share the names)
+    mix = nodes.new(type='ShaderNodeMix')
+    mix.data_type = 'RGBA'
+    mix.location = (100, 0)
+    mix.inputs[6].default_value = (0.05, 0.05, 0.05, 1.0)
+    links.new(shading.outputs['Mask'], mix.inputs['Factor'])
+    links.new(shading.outputs['Color'], mix.inputs[7])
+    links.new(mix.outputs[2], principled.inputs['Base Color'])
+    links.new(principled.outputs[0], output.inputs[0])
+    return mat
+
+def face_frames(obj):
+    """World-space polygon centres and normals of an object's mesh"""
+    mesh = obj.data
+    centers = np.empty(len(mesh.polygons) * 3, dtype=np.float32)
+    normals = np.empty(len(mesh.polygons) * 3, dtype=np.float32)
+    mesh.polygons.foreach_get("center", centers)
+    mesh.polygons.foreach_get("normal", normals)
+    matrix = matrix_to_numpy(obj.matrix_world)
+    centers = centers.reshape(-1, 3).astype(np.float64) @ matrix[:3, :3].T + matrix[:3, 3]
+    normals = normals.reshape(-1, 3).astype(np.float64) @ np.linalg.inv(matrix[:3, :3])
+    return centers, normals
+
+class PJ_OT_setup_projection_mapping(Operator):
+    """Map all active projectors onto the selected meshes through one shared material (re-run after large projector moves to re-pick the projectors per face)"""
+    bl_idname = "projection.setup_projection_mapping"
+    bl_label = "Setup Projection Mapping"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return any(obj.type == 'MESH' and not obj.pj_is_projector for obj in context.selected_objects)
+
+    def execute(self, context):
+        projectors = [obj for obj in context.scene.objects
+                      if obj.pj_is_projector and obj.pj_is_active_projector]
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+
+        update_projector_parameters(force=True)
+        mat = create_projection_material()
+
+        arrays = camera_projector_arrays(projectors)
+        slots = np.array([proj.pj_shading_slot for proj in projectors])
+        blend = np.array([proj.pj_edge_blend_amount for proj in projectors])
+
+        mapped_count = 0
+        unlit = 0
+        for obj in context.selected_objects:
+            if obj.type != 'MESH' or obj.pj_is_projector:
+                continue
+            if len(obj.material_slots) == 0:
+                obj.data.materials.append(mat)
+            else:
+                obj.material_slots[0].material = mat
+
+            # Projectors blended on every face, stored as slot + 1
+            centers, normals = face_frames(obj)
+            face_slots = assign_slots(arrays, slots, centers, normals, blend)
+            for name, values in zip(SLOT_ATTRIBUTES, face_slots):
+                write_face_attribute(obj, name, values + 1.0)
+            unlit += int((face_slots[0] < 0).sum())
+            mapped_count += 1
+
+        self.report({'INFO'}, f"Set up projection mapping of {len(projectors)} projectors on "
+                              f"{mapped_count} objects ({unlit} faces unlit)")
+        return {'FINISHED'}
+
+@persistent
+def projection_shading_update(scene, depsgraph):
+    """Keep the parameter texture in step with the projectors while they are edited"""
+    if PARAMETER_IMAGE not in bpy.data.images:
+        return
+    edited = {}
+    for update in depsgraph.updates:
+        if not isinstance(update.id, bpy.types.Object):
+            continue
+        obj = update.id.original
+        # The rays start at the projector's camera child
+        if not obj.pj_is_projector and obj.parent is not None and obj.parent.pj_is_projector:
+            obj = obj.parent
+        if obj.pj_is_projector:
+            edited[obj.name] = obj
+    if edited or len(bpy.data.objects) != _object_count:
+        refresh_projector_parameters(list(edited.values()))
+
+@persistent
+def projection_shading_load(*_):
+    """Generated images are not saved with the file, and undo restores older poses; refill the texture"""
+    global _written
+    _written = None
+    if MATERIAL_NAME in bpy.data.materials and NODE_GROUP_NAME in bpy.data.node_groups:
+        update_projector_parameters(force=True)
+
+def register():
+    bpy.utils.register_class(PJ_OT_setup_projection_mapping)
+    bpy.app.handlers.depsgraph_update_post.append(projection_shading_update)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(projection_shading_load)
+
+def unregister():
+    global _written
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if projection_shading_load in handlers:
+            handlers.remove(projection_shading_load)
+    if projection_shading_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(projection_shading_update)
+    bpy.utils.unregister_class(PJ_OT_setup_projection_mapping)
+    _written = None
@@ -0,0 +1,312 @@
+import math
+import os
+
+import bpy
+from bpy.types import Operator
+import numpy as np
+
+from .analysis import SAMPLING_ITEMS
+from .core.mesh_io import default_workers
+from .core.sightlines import analyze_sightlines, read_seat_list, seat_grid
+from .heatmap import refresh_heatmap
+from .pointcloud import POINTS_MODIFIER, point_display_group
+from .proxy import build_mesh, report_stale_proxies
+from .scene_arrays import (
+    analysis_samples,
+    environment_geometry,
+    environment_objects,
+    matrix_to_numpy,
+    seat_block_objects,
+    surface_object,
+    write_point_attribute,
+)
+
+# Scene ID property holding the per-surface results of the last sightline analysis
+SIGHTLINE_PROPERTY = "pj_sightline_summary"
+
+# Face attribute with the share of the seats that see each face
+SURFACE_ATTRIBUTE = "pj_sightline_seats"
+
+# Point attribute of seat blocks with the share of the surfaces each seat sees
+SEAT_ATTRIBUTE = "pj_seat_view"
+
+# Object ID property with the labels of imported seats
+LABEL_PROPERTY = "pj_seat_labels"
+
+# Radius of the points drawn for the seats
+SEAT_DISPLAY_RADIUS = 0.15
+
+def seat_positions(obj):
+    """World eye positions of a seat block: its vertices raised by the eye height"""
+    mesh = obj.data
+    local = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", local)
+    matrix = matrix_to_numpy(obj.matrix_world)
+    eyes = local.reshape(-1, 3).astype(np.float64) @ matrix[:3, :3].T + matrix[:3, 3]
+    eyes[:, 2] += obj.pj_eye_height
+    return eyes
+
+def create_seat_block(context, name, positions, labels=None):
+    """Vertex-only seat block object, one vertex per seat, drawn as points"""
+    mesh = build_mesh(name, positions, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+    obj = bpy.data.objects.new(name, mesh)
+    context.collection.objects.link(obj)
+    obj.pj_is_seat_block = True
+    obj.hide_render = True
+    if labels and any(labels):
+        obj[LABEL_PROPERTY] = list(labels)
+    modifier = obj.modifiers.new(POINTS_MODIFIER, 'NODES')
+    group = point_display_group()
+    modifier.node_group = group
+    modifier[group.interface.items_tree["Radius"].identifier] = SEAT_DISPLAY_RADIUS
+
+    for selected in context.selected_objects:
+        selected.select_set(False)
+    obj.select_set(True)
+    context.view_layer.objects.active = obj
+    return obj
+
+class PJ_OT_add_seat_block(Operator):
+    """Add a block of seat rows at the 3D cursor, facing the cursor's +Y"""
+    bl_idname = "projection.add_seat_block"
+    bl_label = "Add Seat Block"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    rows: bpy.props.IntProperty(
+        name="Rows",
+        description="Number of seat rows",
+        default=10,
+        min=1
+    )
+
+    seats: bpy.props.IntProperty(
+        name="Seats per Row",
+        description="Number of seats in every row",
+        default=20,
+        min=1
+    )
+
+    seat_width: bpy.props.FloatProperty(
+        name="Seat Width",
+        description="Distance between seat centres along a row",
+        default=0.55,
+        min=0.3,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    row_depth: bpy.props.FloatProperty(
+        name="Row Depth",
+        description="Distance between the rows",
+        default=0.9,
+        min=0.5,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    rake: bpy.props.FloatProperty(
+        name="Rake",
+        description="Rise of every row over the one in front",
+        default=0.0,
+        min=0.0,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    radius: bpy.props.FloatProperty(
+        name="Curve Radius",
+        description="Radius of curved rows about a point ahead of the block (0 = straight rows)",
+        default=0.0,
+        min=0.0,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    def execute(self, context):
+        positions = seat_grid(self.rows, self.seats, self.seat_width, self.row_depth, self.rake, self.radius)
+        obj = create_seat_block(context, "Seat Block", positions)
+        obj.location = context.scene.cursor.location
+        obj.rotation_euler = context.scene.cursor.rotation_euler
+        self.report({'INFO'}, f"Added {len(positions)} seats in {self.rows} rows")
+        return {'FINISHED'}
+
+class PJ_OT_import_seat_list(Operator):
+    """Import seats from a CSV file of x, y, z and optional label columns"""
+    bl_idname = "projection.import_seat_list"
+    bl_label = "Import Seat List"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filepath: bpy.props.StringProperty(
+        name="File Path",
+        description="Path to the file",
+        maxlen=1024,
+        default="",
+        subtype='FILE_PATH'
+    )
+
+    filter_glob: bpy.props.StringProperty(
+        default="*.csv;*.txt",
+        options={'HIDDEN'}
+    )
+
+    scale: bpy.props.FloatProperty(
+        name="Import Scale",
+        description="Scale factor for the seat positions",
+        default=1.0,
+        min=0.001,
+        max=1000.0
+    )
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        try:
+            positions, labels = read_seat_list(self.filepath)
+        except (OSError, UnicodeDecodeError) as e:
+            self.report({'ERROR'}, f"Error importing seat list: {e}")
+            return {'CANCELLED'}
+        if len(positions) == 0:
+            self.report({'ERROR'}, "The file holds no seats")
+            return {'CANCELLED'}
+
+        name = os.path.splitext(os.path.basename(self.filepath))[0]
+        obj = create_seat_block(context, name, positions * self.scale, labels)
+        self.report({'INFO'}, f"Imported {len(positions)} seats as {obj.name}")
+        return {'FINISHED'}
+
+class PJ_OT_analyze_sightlines(Operator):
+    """Find what every seat sees of the projection surfaces, and at what angle and distance"""
+    bl_idname = "projection.analyze_sightlines"
+    bl_label = "Analyze Sightlines"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    sampling: bpy.props.EnumProperty(
+        name="Sampling",
+        description="How the projection surfaces are sampled",
+        items=SAMPLING_ITEMS[:2],
+        default='RANDOM'
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Samples",
+        description="Number of random samples on the projection surfaces",
+        default=50000,
+        min=1000
+    )
+
+    max_angle: bpy.props.FloatProperty(
+        name="Max Viewing Angle",
+        description="Largest angle from the surface normal that still counts as a view",
+        default=math.radians(75.0),
+        min=math.radians(1.0),
+        max=math.radians(89.0),
+        subtype='ANGLE',
+        unit='ROTATION'
+    )
+
+    max_distance: bpy.props.FloatProperty(
+        name="Max Viewing Distance",
+        description="Largest distance that still counts as a view (0 = any distance)",
+        default=0.0,
+        min=0.0,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    clear_fraction: bpy.props.FloatProperty(
+        name="Clear View",
+        description="Share of a surface a seat must see to have a clear view of it",
+        default=0.95,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+
+    use_selected: bpy.props.BoolProperty(
+        name="Selected Surfaces",
+        description="Only analyse the selected environment meshes; every environment mesh still blocks views",
+        default=True
+    )
+
+    seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Random seed of the surface samples",
+        default=0
+    )
+
+    workers: bpy.props.IntProperty(
+        name="Worker Processes",
+        description="Processes tracing the seats (0 = one per CPU core, up to 8, 1 = run inside Blender)",
+        default=0,
+        min=0
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        blocks = seat_block_objects(context)
+        environment = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
+        if not blocks:
+            self.report({'ERROR'}, "No seat blocks; add a seat block or import a seat list first")
+            return {'CANCELLED'}
+        if not environment:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+        surfaces = environment
+        if self.use_selected:
+            surfaces = [obj for obj in environment if surface_object(obj).select_get() or obj.select_get()]
+            if not surfaces:
+                self.report({'ERROR'}, "No environment meshes selected as projection surfaces")
+                return {'CANCELLED'}
+
+        eyes = [seat_positions(obj) for obj in blocks]
+        seats = np.concatenate(eyes)
+        analysis = analysis_samples(context, surfaces, [], self.sampling, self.sample_count, self.seed)
+        samples = analysis.samples
+        index = {obj.name: i for i, obj in enumerate(surfaces)}
+        groups = analysis.object_values(lambda obj: index[obj.name]).astype(np.int64)
+
+        # Every environment mesh blocks views, through the BVH cached for its geometry
+        bvh = environment_geometry(context, environment).bvh
+        result = analyze_sightlines(seats, samples, groups, bvh, math.degrees(self.max_angle),
+                                    self.max_distance or np.inf, self.workers or default_workers())
+
+        skipped = analysis.write(SURFACE_ATTRIBUTE, result.sample_fraction)
+        seen = result.area.sum(axis=1) / max(result.group_area.sum(), 1e-12)
+        start = 0
+        for obj, block in zip(blocks, eyes):
+            write_point_attribute(obj, SEAT_ATTRIBUTE, seen[start:start + len(block)])
+            start += len(block)
+
+        summaries = []
+        for group, obj in enumerate(surfaces):
+            summary = result.summary(group, self.clear_fraction)
+            surface_object(obj)["pj_sightlines"] = summary
+            summaries.append(dict(summary, surface=surface_object(obj).name))
+        scene[SIGHTLINE_PROPERTY] = {"seats": len(seats), "clear_fraction": self.clear_fraction,
+                                     "surfaces": summaries}
+        if scene.pj_heatmap_show:
+            refresh_heatmap(context)
+
+        if skipped:
+            self.report({'WARNING'}, f"Could not store attributes on {', '.join(skipped)} "
+                                     "(modifiers change the face count)")
+        worst = min(summaries, key=lambda summary: summary["clear_view"])
+        self.report({'INFO'}, f"{len(seats)} seats x {len(samples)} samples: worst {worst['surface']}, "
+                              f"clearly seen from {worst['clear_view'] * 100:.0f}% of the seats")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_add_seat_block)
+    bpy.utils.register_class(PJ_OT_import_seat_list)
+    bpy.utils.register_class(PJ_OT_analyze_sightlines)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_analyze_sightlines)
+    bpy.utils.unregister_class(PJ_OT_import_seat_list)
+    bpy.utils.unregister_class(PJ_OT_add_seat_block)
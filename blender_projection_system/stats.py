@@ -0,0 +1,87 @@
+import bpy
+from bpy.app.handlers import persistent
+
+from .core.stats import ProjectorStats
+from .overlaps import overlapping_names
+
+# Statistics of every scene by name; kept out of the scene itself, as writing
+# properties from a depsgraph handler would trigger another update
+_scene_stats = {}
+
+# Number of objects each scene had when its statistics were last complete
+_object_counts = {}
+
+def scene_stats(scene):
+    """Cached projector statistics of a scene, or None before the first update; cheap enough for draw()"""
+    return _scene_stats.get(scene.name)
+
+def record_object(stats, obj):
+    """Add, update or drop the record of one object"""
+    if obj.pj_is_projector:
+        stats.set(obj.as_pointer(), obj.name, obj.pj_collection)
+    else:
+        stats.discard(obj.as_pointer())
+
+def rebuild_stats(scene):
+    """Recount the statistics of a scene from all of its objects"""
+    stats = ProjectorStats()
+    for obj in scene.objects:
+        if obj.pj_is_projector:
+            record_object(stats, obj)
+    stats.update_warnings((collection.name for collection in scene.pj_projector_collections),
+                          overlapping_names(scene))
+    _scene_stats[scene.name] = stats
+    _object_counts[scene.name] = len(bpy.data.objects)
+    return stats
+
+def clear_stats():
+    _scene_stats.clear()
+    _object_counts.clear()
+
+@persistent
+def update_stats(scene, depsgraph):
+    """
+    Update the statistics from the objects a depsgraph update reports.
+
+    Property edits tag their object, so only the changed objects are looked at.
+    Adding or deleting objects changes the object count, which recounts the scene.
+    """
+    stats = _scene_stats.get(scene.name)
+    if stats is None or _object_counts.get(scene.name) != len(bpy.data.objects):
+        rebuild_stats(scene)
+        return
+
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            record_object(stats, update.id.original)
+    stats.update_warnings((collection.name for collection in scene.pj_projector_collections),
+                          overlapping_names(scene))
+
+@persistent
+def reset_stats(*_):
+    """Undo and file loads replace the objects; recount every scene"""
+    clear_stats()
+    for scene in bpy.data.scenes:
+        rebuild_stats(scene)
+
+def _initial_stats():
+    reset_stats()
+    # Run once
+    return None
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(update_stats)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(reset_stats)
+    # bpy.data is restricted while add-ons register
+    bpy.app.timers.register(_initial_stats, first_interval=0.1)
+
+def unregister():
+    if bpy.app.timers.is_registered(_initial_stats):
+        bpy.app.timers.unregister(_initial_stats)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if reset_stats in handlers:
+            handlers.remove(reset_stats)
+    if update_stats in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(update_stats)
+    clear_stats()
@@ -0,0 +1,275 @@
+import time
+
+import bpy
+from bpy.types import Operator
+import numpy as np
+
+from .core.mesh_io import default_workers
+from .core.timeline import FrameCache, FrameRangeAnalysis, FrameResult, FrameSnapshot, timeline_summary
+from .proxy import report_stale_proxies
+from .scene_arrays import (
+    environment_geometry,
+    environment_objects,
+    mark_geometry_edited,
+    projector_arrays,
+    scene_mirrors,
+    scene_projectors,
+    surface_object,
+)
+
+# Scene ID property holding the analysed frames, their cache keys and results
+TIMELINE_PROPERTY = "pj_frame_analysis"
+
+# Animated scene properties the results are keyed onto, so the Graph Editor
+# draws them and scrubbing the playhead evaluates curves instead of analysing
+TIMELINE_CURVES = (
+    ("pj_frame_coverage", lambda result: result.coverage),
+    ("pj_frame_gap", lambda result: result.gap_area),
+    ("pj_frame_overlap", lambda result: result.overlap_area),
+    ("pj_frame_lux_min", lambda result: result.lux_min),
+)
+CURVE_GROUP = "Projection Analysis"
+
+# Seconds of frame stepping per timer tick before the UI gets a turn
+SNAPSHOT_BUDGET = 0.05
+
+# Frame results by snapshot and settings, shared by every run in this session
+_frame_cache = FrameCache()
+
+def clear_frame_cache():
+    _frame_cache.clear()
+
+def seed_frame_cache(scene):
+    """Put the results saved with the scene back into the cache, e.g. after reopening the file"""
+    data = scene.get(TIMELINE_PROPERTY)
+    if not data:
+        return
+    for index, key in enumerate(data["keys"]):
+        if key not in _frame_cache:
+            _frame_cache.put(key, FrameResult.from_dict({name: data[name][index] for name in FrameResult.FIELDS}))
+
+def store_timeline(scene, results, keys):
+    """Save the results with the scene as flat ID property arrays"""
+    frames = sorted(results)
+    data = {"frames": frames, "keys": [keys[frame] for frame in frames],
+            "summary": timeline_summary(results)}
+    for name in FrameResult.FIELDS:
+        data[name] = [getattr(results[frame], name) for frame in frames]
+    scene[TIMELINE_PROPERTY] = data
+
+def write_timeline_curves(scene, results):
+    """Key every result onto its scene property, replacing the curves of an earlier run"""
+    if scene.animation_data is None:
+        scene.animation_data_create()
+    action = scene.animation_data.action
+    if action is None:
+        action = bpy.data.actions.new(f"{scene.name} {CURVE_GROUP}")
+        scene.animation_data.action = action
+
+    frames = sorted(results)
+    for path, value in TIMELINE_CURVES:
+        fcurve = action.fcurves.find(path)
+        if fcurve is not None:
+            action.fcurves.remove(fcurve)
+        fcurve = action.fcurves.new(path, action_group=CURVE_GROUP)
+        fcurve.keyframe_points.add(len(frames))
+        points = np.column_stack([frames, [value(results[frame]) for frame in frames]])
+        fcurve.keyframe_points.foreach_set("co", points.astype(np.float32).ravel())
+        for point in fcurve.keyframe_points:
+            point.interpolation = 'LINEAR'
+        fcurve.update()
+
+def refresh_deforming(objects):
+    """Frame changes report no geometry updates; re-read meshes whose evaluated shape can animate"""
+    for obj in objects:
+        if obj.modifiers or obj.data.shape_keys is not None:
+            mark_geometry_edited(obj.name)
+
+def frame_snapshot(context, environment, targets):
+    """FrameSnapshot of the scene at its current frame"""
+    arrays = projector_arrays(scene_projectors(context), scene_mirrors(context))
+    geometry = environment_geometry(context, environment)
+    gain = np.array([surface_object(obj).pj_screen_gain for obj in environment])[geometry.triangle_object]
+    target = None
+    key = geometry.key
+    if len(targets) < len(environment):
+        chosen = [index for index, obj in enumerate(environment) if obj in targets]
+        target = np.isin(geometry.triangle_object, chosen)
+        key += repr(chosen)
+    return FrameSnapshot(arrays, geometry.vertices, geometry.triangles, target, gain, key)
+
+class PJ_OT_analyze_frame_range(Operator):
+    """Analyse coverage, gaps, overlaps and brightness over a frame range; unchanged frames come from the cache"""
+    bl_idname = "projection.analyze_frame_range"
+    bl_label = "Analyze Frame Range"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    frame_start: bpy.props.IntProperty(
+        name="Start Frame",
+        description="First frame analysed (defaults to the scene's start)",
+        default=1
+    )
+
+    frame_end: bpy.props.IntProperty(
+        name="End Frame",
+        description="Last frame analysed (defaults to the scene's end)",
+        default=250
+    )
+
+    frame_step: bpy.props.IntProperty(
+        name="Frame Step",
+        description="Analyse every n-th frame; the graphs interpolate in between",
+        default=1,
+        min=1
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Samples",
+        description="Random samples on the analysed surfaces, the same points on every frame",
+        default=100000,
+        min=1000
+    )
+
+    gap_cell: bpy.props.FloatProperty(
+        name="Gap Resolution",
+        description="Smallest dark gap width told apart from the lit surface around it",
+        default=0.25,
+        min=0.01,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    use_selected: bpy.props.BoolProperty(
+        name="Selected Surfaces",
+        description="Only analyse the selected environment meshes; every environment mesh still casts shadows",
+        default=False
+    )
+
+    workers: bpy.props.IntProperty(
+        name="Worker Processes",
+        description="Processes analysing frames (0 = one per CPU core, up to 8, 1 = run inside Blender)",
+        default=0,
+        min=0
+    )
+
+    _timer = None
+    _analysis = None
+
+    def invoke(self, context, event):
+        scene = context.scene
+        if not self.properties.is_property_set("frame_start"):
+            self.frame_start = scene.frame_start
+        if not self.properties.is_property_set("frame_end"):
+            self.frame_end = scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        self._environment = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
+        if not scene_projectors(context):
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+        if not self._environment:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+        self._targets = self._environment
+        if self.use_selected:
+            self._targets = [obj for obj in self._environment if obj.select_get()]
+            if not self._targets:
+                self.report({'ERROR'}, "No environment meshes selected")
+                return {'CANCELLED'}
+        if self.frame_end < self.frame_start:
+            self.report({'ERROR'}, "The end frame comes before the start frame")
+            return {'CANCELLED'}
+
+        seed_frame_cache(scene)
+        max_workers = default_workers() if self.workers == 0 else (0 if self.workers == 1 else self.workers)
+        self._analysis = FrameRangeAnalysis(
+            _frame_cache, max_workers, self.sample_count, shadow_resolution=scene.pj_shadow_map_resolution,
+            gap_cell=self.gap_cell, occlusion=scene.pj_visibility_engine != 'NONE')
+        self._frames = list(range(self.frame_start, self.frame_end + 1, self.frame_step))
+        self._next = 0
+        self._keys = {}
+        self._original_frame = scene.frame_current
+
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+        self._timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def step_frames(self, context):
+        """Snapshot frames until the time budget of this tick is spent"""
+        scene = context.scene
+        started = time.perf_counter()
+        while self._next < len(self._frames) and time.perf_counter() - started < SNAPSHOT_BUDGET:
+            frame = self._frames[self._next]
+            scene.frame_set(frame)
+            refresh_deforming(self._environment)
+            snapshot = frame_snapshot(context, self._environment, self._targets)
+            self._keys[frame] = self._analysis.key(snapshot)
+            self._analysis.add(frame, snapshot)
+            self._next += 1
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._analysis.cancel()
+            self.cleanup(context)
+            self.report({'INFO'}, "Frame range analysis cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        try:
+            self.step_frames(context)
+            self._analysis.poll()
+        except Exception as e:
+            # A frame failed to snapshot or analyse, here or in a worker; stop instead of leaving the timer behind
+            self._analysis.cancel()
+            self.cleanup(context)
+            self.report({'ERROR'}, f"Frame range analysis failed: {e}")
+            return {'CANCELLED'}
+        done = len(self._analysis.results)
+        context.window_manager.progress_update(int(100 * done / len(self._frames)))
+        if context.area:
+            context.area.header_text_set(
+                f"Frame range analysis: {done} of {len(self._frames)} frames, "
+                f"{self._analysis.reused} reused (Esc: cancel)")
+
+        if self._next == len(self._frames) and self._analysis.finished:
+            return self.finish(context)
+        return {'RUNNING_MODAL'}
+
+    def cleanup(self, context):
+        wm = context.window_manager
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer)
+            self._timer = None
+        wm.progress_end()
+        if context.area:
+            context.area.header_text_set(None)
+        context.scene.frame_set(self._original_frame)
+
+    def finish(self, context):
+        self._analysis.shutdown()
+        self.cleanup(context)
+        scene = context.scene
+        results = self._analysis.results
+        store_timeline(scene, results, self._keys)
+        write_timeline_curves(scene, results)
+
+        summary = scene[TIMELINE_PROPERTY]["summary"]
+        self.report({'INFO'}, f"Analysed {len(results)} frames ({self._analysis.reused} reused): "
+                              f"min coverage {summary['coverage_min'] * 100:.1f}% at frame "
+                              f"{summary['coverage_min_frame']}, max gap {summary['gap_max']:.2f} m² at frame "
+                              f"{summary['gap_max_frame']}")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_analyze_frame_range)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_analyze_frame_range)
+    clear_frame_cache()
@@ -0,0 +1,183 @@
+import math
+
+import bpy
+from bpy.types import Operator
+
+from .core.mesh_io import default_workers
+from .core.tolerance import ToleranceModel, run_tolerance, tolerance_problem
+from .proxy import report_stale_proxies
+from .scene_arrays import (
+    environment_objects,
+    environment_samples,
+    environment_visibility,
+    projector_arrays,
+    scene_projectors,
+)
+
+# Scene ID property holding the blend edges and their failure probabilities
+TOLERANCE_PROPERTY = "pj_tolerance"
+
+# Riskiest edges listed in the panel
+MAX_LISTED = 5
+
+class PJ_OT_analyze_tolerance(Operator):
+    """Estimate how likely rigging errors open gaps or widen the overlap at every blend edge"""
+    bl_idname = "projection.analyze_tolerance"
+    bl_label = "Analyze Rigging Tolerance"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    trials: bpy.props.IntProperty(
+        name="Trials",
+        description="Number of randomly mis-rigged layouts evaluated",
+        default=2000,
+        min=100
+    )
+
+    distribution: bpy.props.EnumProperty(
+        name="Distribution",
+        description="How the errors below are distributed",
+        items=[
+            ('NORMAL', "Normal", "Errors are normally distributed with these standard deviations"),
+            ('UNIFORM', "Uniform", "Errors are uniformly distributed up to these values either way"),
+        ],
+        default='NORMAL'
+    )
+
+    position: bpy.props.FloatProperty(
+        name="Position",
+        description="Position error of the projectors, along each of their axes",
+        default=0.02,
+        min=0.0,
+        subtype='DISTANCE',
+        unit='LENGTH'
+    )
+
+    rotation: bpy.props.FloatProperty(
+        name="Rotation",
+        description="Yaw, pitch and roll error of the projectors",
+        default=math.radians(0.25),
+        min=0.0,
+        subtype='ANGLE',
+        unit='ROTATION'
+    )
+
+    zoom: bpy.props.FloatProperty(
+        name="Zoom",
+        description="Relative error of the throw ratio",
+        default=0.005,
+        min=0.0,
+        max=0.2,
+        subtype='FACTOR'
+    )
+
+    shift: bpy.props.FloatProperty(
+        name="Lens Shift",
+        description="Lens shift error, as a fraction of the image",
+        default=0.0,
+        min=0.0,
+        max=0.2,
+        subtype='FACTOR'
+    )
+
+    min_gap: bpy.props.FloatProperty(
+        name="Minimum Gap",
+        description="Dark area at a blend edge that counts as a gap",
+        default=0.001,
+        min=0.0,
+        unit='AREA'
+    )
+
+    overlap_tolerance: bpy.props.FloatProperty(
+        name="Overlap Tolerance",
+        description="Overlap growth over the planned area, as a fraction of it, that counts as excessive",
+        default=0.25,
+        min=0.0,
+        max=10.0,
+        subtype='FACTOR'
+    )
+
+    margin: bpy.props.FloatProperty(
+        name="Zone Margin",
+        description="Band around each image, as a fraction of it, where a gap can open",
+        default=0.1,
+        min=0.01,
+        max=0.5,
+        subtype='FACTOR'
+    )
+
+    sample_count: bpy.props.IntProperty(
+        name="Samples",
+        description="Random samples on the environment surfaces",
+        default=200000,
+        min=1000
+    )
+
+    seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Random seed; the same seed gives the same result",
+        default=0
+    )
+
+    workers: bpy.props.IntProperty(
+        name="Worker Processes",
+        description="Processes running the trials (0 = one per CPU core, up to 8, 1 = run inside Blender)",
+        default=0,
+        min=0
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        projectors = scene_projectors(context)
+        environment = environment_objects(context, use_proxies=True)
+        report_stale_proxies(self, context)
+        if len(projectors) < 2:
+            self.report({'ERROR'}, "At least two active projectors are needed for blend edges")
+            return {'CANCELLED'}
+        if not environment:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+
+        arrays = projector_arrays(projectors)
+        samples, _, _ = environment_samples(context, environment, 'RANDOM', self.sample_count, self.seed)
+        visibility = environment_visibility(context, arrays, samples.points, environment)
+        problem = tolerance_problem(arrays, samples, visibility, self.margin)
+        if len(problem.edges) == 0:
+            self.report({'WARNING'}, "No projectors overlap; there are no blend edges to check")
+            return {'CANCELLED'}
+
+        model = ToleranceModel(self.position, math.degrees(self.rotation), self.zoom, self.shift,
+                               self.distribution)
+        result = run_tolerance(problem, model, self.trials, self.seed, self.workers or default_workers(),
+                               self.min_gap, self.overlap_tolerance)
+
+        edges = []
+        for index, (first, second) in enumerate(result.edges):
+            edge = result.summary(index)
+            edge["projectors"] = [projectors[first].name, projectors[second].name]
+            edges.append(edge)
+        scene[TOLERANCE_PROPERTY] = {"trials": result.trials, "seed": self.seed, "edges": edges}
+
+        worst = max(edges, key=lambda edge: edge["failure_probability"])
+        self.report({'INFO'}, f"{result.trials} trials over {len(edges)} blend edges; riskiest "
+                              f"{worst['projectors'][0]} / {worst['projectors'][1]}: "
+                              f"{worst['gap_probability'] * 100:.1f}% gap, "
+                              f"{worst['excess_probability'] * 100:.1f}% excess overlap")
+        return {'FINISHED'}
+
+def riskiest_edges(scene, count=MAX_LISTED):
+    """Stored blend edges, most likely to fail first"""
+    data = scene.get(TOLERANCE_PROPERTY)
+    if not data:
+        return []
+    edges = [edge.to_dict() for edge in data["edges"]]
+    edges.sort(key=lambda edge: edge["failure_probability"], reverse=True)
+    return edges[:count]
+
+def register():
+    bpy.utils.register_class(PJ_OT_analyze_tolerance)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_analyze_tolerance)
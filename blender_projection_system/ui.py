@@ -1,5 +1,12 @@
 import bpy
 
+from .clearance import clearance_issues, issue_text
+from .heatmap import ramp_node as heatmap_ramp_node
+from .overlaps import projector_overlaps
+from .scene_arrays import proxy_is_current
+from .stats import scene_stats
+from .tolerance import riskiest_edges
+
 class PJ_PT_ProjectionPanel(bpy.types.Panel):
     """Creates a Panel in the 3D Viewport N-Panel"""
     bl_label = "Projection Planner"
@@ -27,15 +34,67 @@ class PJ_PT_ProjectionPanel(bpy.types.Panel):
         # Import Model Button
         row = box.row()
         row.operator("projection.import_model", text="Import Model", icon='IMPORT')
+        row.operator("projection.import_point_cloud", text="Import Point Cloud", icon='OUTLINER_OB_POINTCLOUD')
         
         # Create Basic Environment Button
         row = box.row()
         row.operator("projection.create_basic_environment", text="Create Basic Room", icon='HOME')
+
+        # Analysis proxies of heavy scans
+        col = box.column(align=True)
+        col.prop(scene, "pj_proxy_triangles")
+        col.prop(scene, "pj_proxy_weld_distance")
+        row = box.row(align=True)
+        row.operator("projection.generate_proxies", text="Generate Proxies", icon='MOD_DECIM')
+        row.operator("projection.remove_proxies", text="", icon='X')
         
+        # Mounting zones for the placement optimizer
+        if obj and not obj.pj_is_projector:
+            row = box.row()
+            row.prop(obj, "pj_is_mounting_zone", text="Mounting Zone")
+            row.prop(obj, "pj_is_audience", text="Audience Area")
+            row = box.row()
+            row.prop(obj, "pj_is_rigging", text="Rigging")
+            row.prop(obj, "pj_is_mirror", text="Mirror")
+            if obj.pj_is_mirror:
+                box.prop(obj, "pj_mirror_reflectivity")
+            if obj.pj_is_audience:
+                col = box.column(align=True)
+                col.prop(obj, "pj_audience_density")
+                col.prop(obj, "pj_person_height")
+                col.prop(obj, "pj_person_radius")
+
+        row = box.row()
+        row.operator("projection.optimize_placement", text="Optimize Placement", icon='AUTO')
+
+        # Seat block settings
+        if obj and obj.pj_is_seat_block:
+            row = box.row()
+            row.label(text=f"Seat block: {len(obj.data.vertices)} seats", icon='COMMUNITY')
+            row = box.row()
+            row.prop(obj, "pj_eye_height")
+
         # Environment object management options
         if context.object and context.object.pj_is_environment:
             row = box.row()
             row.label(text="Environment Object Selected")
+            row = box.row()
+            row.prop(context.object, "pj_screen_gain")
+
+            if context.object.pj_is_point_cloud:
+                row = box.row()
+                row.label(text=f"Point cloud: {len(context.object.data.vertices)} points", icon='OUTLINER_OB_POINTCLOUD')
+                row = box.row()
+                row.prop(context.object, "pj_point_spacing")
+
+            # Decimated stand-in for heavy scans
+            proxy = context.object.pj_proxy
+            if proxy is not None:
+                row = box.row()
+                row.label(text=f"Proxy: {proxy.name} ({len(proxy.data.polygons)} triangles)", icon='MOD_DECIM')
+                if not proxy_is_current(context.object, context.evaluated_depsgraph_get()):
+                    row = box.row()
+                    row.label(text="Proxy out of date; analyses use the full mesh", icon='ERROR')
             
             # Alignment tools
             if len(context.selected_objects) > 0 and context.active_object and context.active_object.pj_is_projector:
@@ -85,12 +144,70 @@ class PJ_PT_ProjectionPanel(bpy.types.Panel):
             row.prop(obj, "pj_aspect_ratio_w", text="")
             row.label(text=":")
             row.prop(obj, "pj_aspect_ratio_h", text="")
+
+            # Projector model (filled in from the catalog)
+            if obj.pj_catalog_entry:
+                row = box.row()
+                row.label(text=f"Model: {obj.pj_catalog_entry}", icon='PRESET')
+                if obj.pj_throw_ratio_max > 0 and not (
+                        obj.pj_throw_ratio_min - 1e-3 <= obj.pj_throw_ratio <= obj.pj_throw_ratio_max + 1e-3):
+                    row = box.row()
+                    row.label(text=f"Throw ratio outside lens range "
+                                   f"({obj.pj_throw_ratio_min:.2f}-{obj.pj_throw_ratio_max:.2f})", icon='ERROR')
+            row = box.row(align=True)
+            row.prop(obj, "pj_resolution_x", text="X")
+            row.prop(obj, "pj_resolution_y", text="Y")
+            col = box.column(align=True)
+            col.prop(obj, "pj_lumens")
+            col.prop(obj, "pj_vignetting")
+            col.prop(obj, "pj_lens_shift_h")
+            col.prop(obj, "pj_lens_shift_v")
             
+            # Surface analysis summary (written by the analysis operators)
+            metrics = obj.get("pj_surface_metrics")
+            if metrics:
+                box.separator()
+                col = box.column(align=True)
+                col.label(text="Surface Analysis:", icon='TEXTURE')
+                col.label(text=f"Lit area: {metrics['lit_area']:.1f} m²")
+                col.label(text=f"Pixels/m: {metrics['ppm_min']:.0f} min, "
+                               f"{metrics['ppm_mean']:.0f} mean, {metrics['ppm_max']:.0f} max")
+                col.label(text=f"Keystone: {metrics['keystone_max']:.2f}x, "
+                               f"incidence up to {metrics['incidence_max']:.0f}°")
+                if metrics['area_below_spec'] > 0:
+                    col.label(text=f"{metrics['area_below_spec']:.1f} m² below pixel spec", icon='ERROR')
+
+            photometry = obj.get("pj_photometry")
+            if photometry:
+                col = box.column(align=True)
+                efficiency = photometry['flux'] / obj.pj_lumens * 100 if obj.pj_lumens > 0 else 0.0
+                col.label(text=f"Flux on surfaces: {photometry['flux']:.0f} lm ({efficiency:.0f}%)",
+                          icon='LIGHT_SUN')
+
+            audience = obj.get("pj_audience")
+            if audience and audience['people'] > 0:
+                col = box.column(align=True)
+                col.label(text=f"Audience in beam: {audience['people']} people, {audience['heads']} heads",
+                          icon='COMMUNITY')
+                if audience['shadow_area'] > 0:
+                    col.label(text=f"Shadowed: {audience['shadow_area']:.1f} m² "
+                                   f"({audience['shadow_fraction'] * 100:.0f}% of its image)", icon='ERROR')
+
+            issues = clearance_issues(scene, obj.name)
+            if issues:
+                col = box.column(align=True)
+                for issue in issues:
+                    col.label(text=issue_text(issue), icon='ERROR')
+
             # Multi-projector properties
-            if obj.pj_overlaps_with:
+            overlaps = projector_overlaps(scene, obj.name)
+            if overlaps:
                 box.separator()
-                row = box.row()
-                row.label(text=f"Overlaps with: {obj.pj_overlaps_with}", icon='ERROR')
+                box.label(text=f"Overlaps with {len(overlaps)} projectors:", icon='ERROR')
+                col = box.column(align=True)
+                for overlap in overlaps:
+                    col.label(text=f"{overlap['projector']}: {overlap['area']:.2f} m², "
+                                   f"{overlap['blend_width'] * 100:.0f}% of the image")
                 
                 row = box.row()
                 row.prop(obj, "pj_edge_blend_amount", text="Edge Blend")
@@ -148,27 +265,17 @@ class PJ_PT_ProjectorCollectionsPanel(bpy.types.Panel):
         row = box.row()
         op = row.operator("projection.create_projector_collection", text="Create Collection", icon='COLLECTION_NEW')
         
-        # List existing collections if any
-        if hasattr(scene, 'pj_projector_collections') and len(scene.pj_projector_collections) > 0:
+        stats = scene_stats(scene)
+
+        # List existing collections if any; the list only draws its visible rows
+        if len(scene.pj_projector_collections) > 0:
             box.separator()
             box.label(text="Available Collections:")
-            
-            # Display each collection and its controls
-            for i, collection in enumerate(scene.pj_projector_collections):
-                row = box.row(align=True)
-                
-                # Highlight active collection
-                if i == scene.pj_active_collection_index:
-                    row.label(text=collection.name, icon='COLLECTION_COLOR_01')
-                else:
-                    row.label(text=collection.name, icon='COLLECTION_COLOR_02')
-                
-                # Set as active
-                op = row.operator("projection.set_active_collection", text="", icon='RADIOBUT_ON')
-                op.collection_index = i
-                
-                # Delete collection
-                op = row.operator("projection.delete_collection", text="", icon='X')
+            row = box.row()
+            row.template_list("PJ_UL_projector_collections", "", scene, "pj_projector_collections",
+                              scene, "pj_active_collection_index", rows=4)
+            col = row.column(align=True)
+            col.operator("projection.delete_collection", text="", icon='X')
             
             # Show options for the active collection
             if scene.pj_active_collection_index < len(scene.pj_projector_collections):
@@ -183,31 +290,291 @@ class PJ_PT_ProjectorCollectionsPanel(bpy.types.Panel):
                 
                 row = box.row()
                 row.operator("projection.align_group", text="Align Projectors", icon='MOD_ARRAY')
+
+                row = box.row()
+                row.operator("projection.generate_layout", text="Generate Layout", icon='MESH_CIRCLE')
                 
                 row = box.row()
                 row.operator("projection.detect_overlapping", text="Detect Overlapping", icon='MOD_BOOLEAN')
         
-        # Display multi-projector stats
+        # Display multi-projector stats, maintained by a depsgraph handler instead of counted here
         box = layout.box()
         box.label(text="Multi-Projector Stats", icon='INFO')
-        
-        # Count projectors and collections
-        projector_count = len([obj for obj in bpy.data.objects if obj.pj_is_projector])
-        collection_count = len(scene.pj_projector_collections) if hasattr(scene, 'pj_projector_collections') else 0
+        if stats is None:
+            box.label(text="Statistics update with the next scene change")
+            return
         
         # Display counts
         row = box.row()
-        row.label(text=f"Total Projectors: {projector_count}")
+        row.label(text=f"Total Projectors: {stats.projector_count}")
         
         row = box.row()
-        row.label(text=f"Collections: {collection_count}")
-        
-        # Count overlapping projectors
-        overlapping_count = len([obj for obj in bpy.data.objects 
-                              if obj.pj_is_projector and obj.pj_overlaps_with])
+        row.label(text=f"Collections: {len(scene.pj_projector_collections)}")
         
         row = box.row()
-        row.label(text=f"Overlapping Projectors: {overlapping_count}")
+        row.label(text=f"Overlapping Projectors: {stats.overlapping}")
+
+        for warning in stats.warnings:
+            box.label(text=warning, icon='ERROR')
+
+class PJ_PT_AnalysisPanel(bpy.types.Panel):
+    """Panel for the surface analyses"""
+    bl_label = "Projection Analysis"
+    bl_idname = "PJ_PT_analysis_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Projection'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+
+        # Occlusion between the surfaces, shared by the analyses
+        col = layout.column(align=True)
+        col.prop(scene, "pj_visibility_engine")
+        if scene.pj_visibility_engine == 'SHADOW_MAP':
+            col.prop(scene, "pj_shadow_map_resolution")
+
+        layout.operator("projection.inspect_projection", text="Inspect Projection", icon='EYEDROPPER')
+
+        # Pixel density / keystone / incidence maps
+        box = layout.box()
+        box.label(text="Resolution", icon='TEXTURE')
+        box.prop(scene, "pj_min_pixel_density")
+        row = box.row()
+        row.operator("projection.analyze_pixel_density", text="Analyze Pixel Density", icon='MOD_UVPROJECT')
+
+        # Photometric simulation
+        box = layout.box()
+        box.label(text="Brightness", icon='LIGHT_SUN')
+        row = box.row()
+        row.operator("projection.analyze_brightness", text="Analyze Brightness", icon='LIGHT_SUN')
+
+        summary = scene.get("pj_brightness_summary")
+        if summary:
+            col = box.column(align=True)
+            col.label(text=f"Illuminance: {summary['lux_min']:.0f} - {summary['lux_max']:.0f} lx")
+            col.label(text=f"Luminance: {summary['nits_min']:.0f} - {summary['nits_max']:.0f} cd/m²")
+            col.label(text=f"Uniformity: {summary['uniformity']:.2f} (min/mean), "
+                           f"{summary['min_max_ratio']:.2f} (min/max)")
+            if summary['stacked_area'] > 0:
+                col.label(text=f"Overlap/stack area: {summary['stacked_area']:.1f} m²")
+
+        # Coverage over the timeline; the values below follow the playhead from keyed curves
+        box = layout.box()
+        box.label(text="Frame Range", icon='TIME')
+        box.operator("projection.analyze_frame_range", text="Analyze Frame Range", icon='GRAPH')
+        timeline = scene.get("pj_frame_analysis")
+        if timeline and timeline["summary"]:
+            summary = timeline["summary"]
+            col = box.column(align=True)
+            col.label(text=f"Min coverage: {summary['coverage_min'] * 100:.1f}% (frame {summary['coverage_min_frame']})")
+            col.label(text=f"Max gap: {summary['gap_max']:.2f} m² (frame {summary['gap_max_frame']})")
+            col.label(text=f"Min illuminance: {summary['lux_min']:.0f} lx (frame {summary['lux_min_frame']})")
+            col = box.column(align=True)
+            col.label(text=f"Frame {scene.frame_current}:")
+            col.prop(scene, "pj_frame_coverage")
+            col.prop(scene, "pj_frame_gap")
+            col.prop(scene, "pj_frame_overlap")
+            col.prop(scene, "pj_frame_lux_min")
+
+        # Blend edge robustness against rigging errors
+        box = layout.box()
+        box.label(text="Rigging Tolerance", icon='ORIENTATION_GIMBAL')
+        box.operator("projection.analyze_tolerance", text="Analyze Rigging Tolerance", icon='MOD_NOISE')
+        edges = riskiest_edges(scene)
+        if edges:
+            col = box.column(align=True)
+            col.label(text=f"{scene['pj_tolerance']['trials']} trials, riskiest blend edges:")
+            for edge in edges:
+                first, second = edge["projectors"]
+                col.label(text=f"{first} / {second}: {edge['gap_probability'] * 100:.1f}% gap, "
+                               f"{edge['excess_probability'] * 100:.1f}% excess",
+                          icon='ERROR' if edge["failure_probability"] > 0.05 else 'CHECKMARK')
+
+        # Projector bodies and beams against the venue, the rigging and each other
+        box = layout.box()
+        box.label(text="Clearance", icon='MOD_PHYSICS')
+        col = box.column(align=True)
+        col.prop(scene, "pj_min_clearance")
+        col.prop(scene, "pj_live_clearance")
+        box.operator("projection.check_clearance", text="Check Clearance", icon='CHECKMARK')
+        issues = clearance_issues(scene)
+        if issues:
+            col = box.column(align=True)
+            col.label(text=f"{len(issues)} projectors with issues:")
+            # The first few; the projector panel lists all of a selected projector's issues
+            for name, found in list(issues.items())[:8]:
+                for issue in found:
+                    col.label(text=f"{name}: {issue_text(issue)}", icon='ERROR')
+
+        # Shadows of a standing audience
+        box = layout.box()
+        box.label(text="Audience", icon='COMMUNITY')
+        box.operator("projection.analyze_audience_shadows", text="Analyze Audience Shadows", icon='SHADING_SOLID')
+        audience = scene.get("pj_audience_summary")
+        if audience:
+            col = box.column(align=True)
+            col.label(text=f"{audience['people']} people standing")
+            col.label(text=f"Shadowed: {audience['shadowed_area']:.1f} of {audience['lit_area']:.1f} m²")
+            if audience['dark_area'] > 0:
+                col.label(text=f"Left dark: {audience['dark_area']:.1f} m²", icon='ERROR')
+
+        # What the seats see of the projection surfaces
+        box = layout.box()
+        box.label(text="Sightlines", icon='HIDE_OFF')
+        row = box.row(align=True)
+        row.operator("projection.add_seat_block", text="Add Seats", icon='ADD')
+        row.operator("projection.import_seat_list", text="Import Seats", icon='IMPORT')
+        box.operator("projection.analyze_sightlines", text="Analyze Sightlines", icon='VIEWZOOM')
+        sightlines = scene.get("pj_sightline_summary")
+        if sightlines:
+            col = box.column(align=True)
+            col.label(text=f"{sightlines['seats']} seats, clear view = "
+                           f"{sightlines['clear_fraction'] * 100:.0f}% of a surface seen:")
+            for surface in sightlines["surfaces"]:
+                col.label(text=f"{surface['surface']}: {surface['clear_view'] * 100:.0f}% of seats, "
+                               f"up to {surface['distance_max']:.0f} m",
+                          icon='ERROR' if surface["clear_view"] < 0.9 else 'CHECKMARK')
+
+        # Heatmap of the results on the environment, with its legend
+        box = layout.box()
+        box.label(text="Heatmap", icon='COLOR')
+        box.prop(scene, "pj_heatmap_source", text="")
+        row = box.row(align=True)
+        if scene.pj_heatmap_show:
+            row.operator("projection.show_heatmap", text="Refresh", icon='FILE_REFRESH')
+            row.operator("projection.hide_heatmap", text="Hide", icon='HIDE_ON')
+        else:
+            row.operator("projection.show_heatmap", text="Show Heatmap", icon='HIDE_OFF')
+        if scene.pj_heatmap_source != 'OVERLAP':
+            box.prop(scene, "pj_heatmap_auto_range")
+            if not scene.pj_heatmap_auto_range:
+                row = box.row(align=True)
+                row.prop(scene, "pj_heatmap_min")
+                row.prop(scene, "pj_heatmap_max")
+
+        legend = scene.get("pj_heatmap_legend")
+        ramp = heatmap_ramp_node()
+        if scene.pj_heatmap_show and legend and ramp is not None:
+            box.template_color_ramp(ramp, "color_ramp", expand=False)
+            row = box.row()
+            if legend["source"] == 'OVERLAP':
+                row.label(text="Single")
+                row.label(text="Overlap")
+            else:
+                row.label(text=f"{legend['low']:.4g}")
+                row.label(text=f"{0.5 * (legend['low'] + legend['high']):.4g}")
+                row.label(text=f"{legend['high']:.4g} {legend['unit']}")
+
+class PJ_PT_OutputPanel(bpy.types.Panel):
+    """Panel for the per-projector media server exports"""
+    bl_label = "Projection Output"
+    bl_idname = "PJ_PT_output_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Projection'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+
+        layout.prop(scene, "pj_output_directory")
+
+        # Edge blend masks
+        box = layout.box()
+        box.label(text="Edge Blend Masks", icon='IMAGE_ALPHA')
+        col = box.column(align=True)
+        col.prop(scene, "pj_blend_format")
+        col.prop(scene, "pj_blend_gamma")
+        col.prop(scene, "pj_blend_step")
+        obj = context.active_object
+        if obj and obj.pj_is_projector:
+            box.prop(obj, "pj_edge_blend_amount", text="Edge Blend")
+        row = box.row()
+        row.operator("projection.export_blend_masks", text="Export Blend Masks", icon='EXPORT')
+
+        # Warp meshes
+        box = layout.box()
+        box.label(text="Warp Meshes", icon='MOD_LATTICE')
+        row = box.row()
+        row.operator("projection.export_warp_meshes", text="Export Warp Meshes", icon='EXPORT')
+
+        # Corner pins for flat screens
+        box = layout.box()
+        box.label(text="Corner Pins", icon='PIVOT_BOUNDBOX')
+        box.prop(scene, "pj_live_corner_pins")
+        if obj and obj.pj_is_projector:
+            box.prop(obj, "pj_corner_pin_target", text="Screen")
+            pin = obj.get("pj_corner_pin")
+            if pin is not None and not pin.get("valid", False):
+                box.label(text="Image misses the screen plane", icon='ERROR')
+            elif pin is not None and "screen_pixels" in pin:
+                # Where the screen corners fall in the projector raster
+                col = box.column(align=True)
+                pixels = list(pin["screen_pixels"])
+                for i, name in enumerate(("Top Left", "Top Right", "Bottom Right", "Bottom Left")):
+                    col.label(text=f"{name}: {pixels[2 * i]:.1f}, {pixels[2 * i + 1]:.1f} px")
+        row = box.row()
+        row.operator("projection.export_corner_pins", text="Export Corner Pins", icon='EXPORT')
+
+        # CPU preview from the audience
+        box = layout.box()
+        box.label(text="Preview Render", icon='RENDER_STILL')
+        box.prop(scene, "pj_preview_camera")
+        col = box.column(align=True)
+        col.prop(scene, "pj_preview_resolution")
+        col.prop(scene, "pj_preview_white")
+        col.prop(scene, "pj_preview_ambient")
+        box.prop(scene, "pj_preview_blend")
+        if obj and obj.pj_is_projector:
+            box.template_ID(obj, "pj_content_image", open="image.open")
+        row = box.row()
+        row.operator("projection.render_preview", text="Render Preview", icon='RENDER_STILL')
+
+class PJ_PT_ProjectorCatalogPanel(bpy.types.Panel):
+    """Panel for searching the projector/lens catalog"""
+    bl_label = "Projector Catalog"
+    bl_idname = "PJ_PT_projector_catalog_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Projection'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+
+        # Search constraints
+        col = layout.column(align=True)
+        col.prop(scene, "pj_catalog_image_width")
+        col.prop(scene, "pj_catalog_distance_min")
+        col.prop(scene, "pj_catalog_distance_max")
+        col.prop(scene, "pj_catalog_min_lumens")
+
+        row = layout.row()
+        row.operator("projection.search_catalog", text="Search Catalog", icon='VIEWZOOM')
+
+        # Results of the last search
+        if len(scene.pj_catalog_results) > 0:
+            layout.template_list("PJ_UL_catalog_results", "", scene, "pj_catalog_results",
+                                 scene, "pj_catalog_results_index", rows=5)
+
+            row = layout.row()
+            row.operator("projection.assign_catalog_entry", text="Assign to Selected", icon='CHECKMARK')
+
+class PJ_UL_projector_collections(bpy.types.UIList):
+    """Projector collections with their projector counts"""
+
+    def draw_item(self, context, layout, data, item, icon, active_data,
+                  active_propname, index):
+        stats = scene_stats(context.scene)
+        row = layout.row(align=True)
+        row.label(text=item.name, icon='OUTLINER_COLLECTION')
+        if stats is not None:
+            row.label(text=f"{stats.collection_counts.get(item.name, 0)} projectors")
 
 # Operator to set the active collection
 class PJ_OT_set_active_collection(bpy.types.Operator):
@@ -241,14 +608,22 @@ class PJ_OT_set_active_collection(bpy.types.Operator):
         return {'FINISHED'}
 
 def register():
+    bpy.utils.register_class(PJ_UL_projector_collections)
     bpy.utils.register_class(PJ_PT_ProjectionPanel)
     bpy.utils.register_class(PJ_PT_ProjectorCollectionsPanel)
+    bpy.utils.register_class(PJ_PT_ProjectorCatalogPanel)
+    bpy.utils.register_class(PJ_PT_AnalysisPanel)
+    bpy.utils.register_class(PJ_PT_OutputPanel)
     bpy.utils.register_class(PJ_OT_set_active_collection)
 
 def unregister():
     bpy.utils.unregister_class(PJ_OT_set_active_collection)
+    bpy.utils.unregister_class(PJ_PT_OutputPanel)
+    bpy.utils.unregister_class(PJ_PT_AnalysisPanel)
+    bpy.utils.unregister_class(PJ_PT_ProjectorCatalogPanel)
     bpy.utils.unregister_class(PJ_PT_ProjectorCollectionsPanel)
     bpy.utils.unregister_class(PJ_PT_ProjectionPanel)
+    bpy.utils.unregister_class(PJ_UL_projector_collections)
 
 if __name__ == "__main__":
     register() 
\ No newline at end of file
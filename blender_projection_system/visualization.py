@@ -2,6 +2,16 @@ import bpy
 from bpy.types import Operator
 import math
 
+import numpy as np
+
+from .core.cornerpin import CORNER_UV, image_plane_quads
+from .core.frustum import ProjectorArrays
+from .core.preview import GRID_SIZE, grid_pattern
+
+# Test surface corners (bottom-left, bottom-right, top-right, top-left) wound
+# so the front face looks back at the projector
+TEST_SURFACE_FACE = (3, 2, 1, 0)
+
 def setup_projection_cone_nodes(obj):
     """
     Setup Geometry Nodes for projection cone visualization.
@@ -420,25 +430,35 @@ class PJ_OT_create_test_surface(Operator):
             self.report({'ERROR'}, "No projector selected")
             return {'CANCELLED'}
 
-        # Get projection parameters
-        throw_distance = obj.pj_throw_distance
-        image_width = obj.pj_image_width
+        # The image quad at the throw distance, in the projector's local frame
         aspect_ratio = obj.pj_aspect_ratio_w / obj.pj_aspect_ratio_h
-        image_height = image_width / aspect_ratio
-
-        # Create a plane at the projection distance
-        bpy.ops.mesh.primitive_plane_add(size=1.0)
-        surface = context.active_object
-        surface.name = f"Projection_Surface_{obj.name}"
-
-        # Position the plane at the projection distance
-        surface.location = (0, -throw_distance, 0)  # Assuming projector points along -Y axis
-
-        # Scale the plane to match the projection size
-        surface.scale = (image_width/2, 1.0, image_height/2)
+        local = ProjectorArrays((0, 0, 0), np.eye(3), obj.pj_throw_ratio, aspect_ratio,
+                                (obj.pj_lens_shift_h, obj.pj_lens_shift_v))
+        quad = image_plane_quads(local, obj.pj_throw_distance)[0]
+
+        # The surface is turned half way round the projector's Z axis so its X
+        # axis runs along image right, like the content on it
+        mesh = bpy.data.meshes.new(f"Projection_Surface_{obj.name}")
+        mesh.from_pydata((quad * (-1.0, -1.0, 1.0)).tolist(), [], [TEST_SURFACE_FACE])
+        uv_layer = mesh.uv_layers.new(name="UVMap")
+        for loop, corner in zip(mesh.polygons[0].loop_indices, TEST_SURFACE_FACE):
+            uv_layer.data[loop].uv = tuple(CORNER_UV[corner])
+        mesh.update()
+
+        surface = bpy.data.objects.new(mesh.name, mesh)
+        context.collection.objects.link(surface)
 
         # Parent the surface to the projector for easier manipulation
         surface.parent = obj
+        surface.rotation_euler = (0.0, 0.0, math.pi)
+
+        # Corner pins are solved on the test surface unless another screen was picked
+        if obj.pj_corner_pin_target is None:
+            obj.pj_corner_pin_target = surface
+
+        bpy.ops.object.select_all(action='DESELECT')
+        surface.select_set(True)
+        context.view_layer.objects.active = surface
 
         # Create a material for the surface
         if "ProjectionSurfaceMaterial" not in bpy.data.materials:
@@ -488,184 +508,60 @@ def create_surface_material():
 
     return mat
 
-class PJ_OT_setup_projection_mapping(Operator):
-    """Setup projection mapping on selected objects"""
-    bl_idname = "projection.setup_projection_mapping"
-    bl_label = "Setup Projection Mapping"
-    bl_options = {'REGISTER', 'UNDO'}
-
-    @classmethod
-    def poll(cls, context):
-        # Check if there's an active projector and selected objects
-        return (context.active_object and
-                context.active_object.pj_is_projector and
-                len(context.selected_objects) > 1)
+def find_projector_camera(projector):
+    """Return the camera child created with the projector, or None"""
+    for child in projector.children:
+        if child.type == 'CAMERA':
+            return child
+    return None
 
-    def execute(self, context):
-        projector = context.active_object
-
-        if not projector.pj_is_projector:
-            self.report({'ERROR'}, "Active object is not a projector")
-            return {'CANCELLED'}
-
-        # Find the projector's camera
-        projector_camera = None
-        for child in projector.children:
-            if child.type == 'CAMERA':
-                projector_camera = child
-                break
-
-        if not projector_camera:
-            self.report({'ERROR'}, "Projector camera not found")
-            return {'CANCELLED'}
-
-        # Create a default projection image if it doesn't exist
-        if "projection_test_grid" not in bpy.data.images:
-            create_projection_test_grid()
-
-        # Create a projection material if it doesn't exist
-        if "ProjectionMaterial" not in bpy.data.materials:
-            create_projection_material()
-
-        # Set up projection on selected objects
-        mapped_count = 0
-        for obj in context.selected_objects:
-            if obj != projector and obj.type == 'MESH':
-                # Add the projection material to the object
-                if len(obj.material_slots) == 0:
-                    obj.data.materials.append(bpy.data.materials["ProjectionMaterial"])
-                else:
-                    obj.material_slots[0].material = bpy.data.materials["ProjectionMaterial"]
-
-                # Set up the projector as the texture coordinate source
-                set_projector_as_mapping_source(obj, projector_camera)
-
-                mapped_count += 1
-
-        self.report({'INFO'}, f"Set up projection mapping on {mapped_count} objects")
+def sync_projector_camera(projector):
+    """
+    Match the projector's camera child to its throw ratio, aspect and lens shift.
 
-        return {'FINISHED'}
+    The camera looks down the projector's -Y axis with +Z up, so its image is
+    the projector's raster.
+    """
+    camera = find_projector_camera(projector)
+    if camera is None:
+        return None
+
+    camera.rotation_mode = 'XYZ'
+    camera.rotation_euler = (math.pi / 2, 0.0, math.pi)
+
+    cam = camera.data
+    cam.type = 'PERSP'
+    cam.sensor_fit = 'HORIZONTAL'
+    # Focal length / sensor width equals the throw ratio
+    cam.lens = cam.sensor_width * projector.pj_throw_ratio
+    aspect = projector.pj_aspect_ratio_w / projector.pj_aspect_ratio_h
+    # Blender measures both shifts in units of the sensor width
+    cam.shift_x = projector.pj_lens_shift_h
+    cam.shift_y = projector.pj_lens_shift_v / aspect
+    return camera
 
 def create_projection_test_grid():
     """Create a test grid image for projection"""
-    size = 1024
+    size = GRID_SIZE
     image = bpy.data.images.new("projection_test_grid", width=size, height=size)
 
-    # Create a test grid pattern
-    pixels = [None] * size * size * 4
-
-    for y in range(size):
-        for x in range(size):
-            # Create a grid pattern
-            grid_lines = ((x % 128 < 2) or (y % 128 < 2))
-
-            # Colored corners for orientation
-            red_corner = (x < 100 and y < 100)
-            green_corner = (x > size - 100 and y < 100)
-            blue_corner = (x < 100 and y > size - 100)
-            yellow_corner = (x > size - 100 and y > size - 100)
-
-            i = (y * size + x) * 4
-
-            if red_corner:
-                pixels[i] = 1.0
-                pixels[i+1] = 0.0
-                pixels[i+2] = 0.0
-                pixels[i+3] = 1.0
-            elif green_corner:
-                pixels[i] = 0.0
-                pixels[i+1] = 1.0
-                pixels[i+2] = 0.0
-                pixels[i+3] = 1.0
-            elif blue_corner:
-                pixels[i] = 0.0
-                pixels[i+1] = 0.0
-                pixels[i+2] = 1.0
-                pixels[i+3] = 1.0
-            elif yellow_corner:
-                pixels[i] = 1.0
-                pixels[i+1] = 1.0
-                pixels[i+2] = 0.0
-                pixels[i+3] = 1.0
-            elif grid_lines:
-                pixels[i] = 1.0
-                pixels[i+1] = 1.0
-                pixels[i+2] = 1.0
-                pixels[i+3] = 1.0
-            else:
-                pixels[i] = 0.1
-                pixels[i+1] = 0.1
-                pixels[i+2] = 0.1
-                pixels[i+3] = 1.0
-
-    # Flatten the list
-    pixels = [chan for px in pixels for chan in (px if px else (0, 0, 0, 1))]
+    # Grid lines with colored corners for orientation, evaluated at the pixel
+    # centres (the CPU preview renders the same pattern)
+    u, v = np.meshgrid((np.arange(size) + 0.5) / size, (np.arange(size) + 0.5) / size)
+    pixels = np.ones((size, size, 4), dtype=np.float32)
+    pixels[:, :, :3] = grid_pattern(u, v)
 
     # Apply pixels to the image
-    image.pixels = pixels
+    image.pixels.foreach_set(pixels.reshape(-1))
     image.update()
 
     return image
 
-def create_projection_material():
-    """Create a material for projection mapping"""
-    mat = bpy.data.materials.new(name="ProjectionMaterial")
-    mat.use_nodes = True
-    nodes = mat.node_tree.nodes
-    links = mat.node_tree.links
-
-    # Clear default nodes
-    for node in nodes:
-        nodes.remove(node)
-
-    # Create nodes
-    output = nodes.new(type='ShaderNodeOutputMaterial')
-    output.location = (400, 0)
-
-    principled = nodes.new(type='ShaderNodeBsdfPrincipled')
-    principled.location = (200, 0)
-
-    texture = nodes.new(type='ShaderNodeTexImage')
-    texture.location = (0, 0)
-    texture.image = bpy.data.images["projection_test_grid"]
-    texture.projection = 'FLAT'
-
-    texcoord = nodes.new(type='ShaderNodeTexCoord')
-    texcoord.location = (-200, 0)
-
-    # Connect nodes
-    links.new(principled.outputs[0], output.inputs[0])
-    links.new(texture.outputs[0], principled.inputs['Base Color'])
-    links.new(texcoord.outputs['Camera'], texture.inputs['Vector'])
-
-    return mat
-
-def set_projector_as_mapping_source(obj, camera):
-    """Set the projector's camera as the texture coordinate source"""
-    # Ensure object has the projection material
-    mat = bpy.data.materials["ProjectionMaterial"]
-
-    # Get the texcoord node
-    texcoord = None
-    for node in mat.node_tree.nodes:
-        if node.type == 'TEX_COORD':
-            texcoord = node
-            break
-
-    if texcoord:
-        # Set the object and camera references
-        texcoord.object = camera
-
-        # Ensure the camera is enabled for texture projection
-        camera.data.type = 'PERSP'
-
 def register():
     bpy.utils.register_class(PJ_OT_add_projection_cone)
     bpy.utils.register_class(PJ_OT_create_test_surface)
-    bpy.utils.register_class(PJ_OT_setup_projection_mapping)
 
 def unregister():
-    bpy.utils.unregister_class(PJ_OT_setup_projection_mapping)
     bpy.utils.unregister_class(PJ_OT_create_test_surface)
     bpy.utils.unregister_class(PJ_OT_add_projection_cone)
 
@@ -0,0 +1,113 @@
+import os
+
+import bpy
+from bpy.types import Operator
+
+from .core.warp import compute_warps, write_warp_csv, write_warp_obj
+from .scene_arrays import (
+    camera_projector_arrays,
+    environment_geometry,
+    environment_objects,
+    gather_triangle_uvs,
+    scene_projectors,
+)
+from .visualization import sync_projector_camera
+
+class PJ_OT_export_warp_meshes(Operator):
+    """Ray cast every projector's pixel grid onto the environment and export the warp meshes"""
+    bl_idname = "projection.export_warp_meshes"
+    bl_label = "Export Warp Meshes"
+    bl_options = {'REGISTER'}
+
+    columns: bpy.props.IntProperty(
+        name="Columns",
+        description="Warp points across the projector raster",
+        default=64,
+        min=2,
+        max=1024
+    )
+
+    rows: bpy.props.IntProperty(
+        name="Rows",
+        description="Warp points down the projector raster",
+        default=36,
+        min=2,
+        max=1024
+    )
+
+    file_format: bpy.props.EnumProperty(
+        name="Format",
+        description="Interchange format of the warp meshes",
+        items=[
+            ('OBJ', "OBJ", "Wavefront OBJ mesh"),
+            ('CSV', "CSV", "One row per warp point"),
+            ('BOTH', "OBJ + CSV", "Write both"),
+        ],
+        default='BOTH'
+    )
+
+    space: bpy.props.EnumProperty(
+        name="OBJ Space",
+        description="What the OBJ vertices and texture coordinates hold",
+        items=[
+            ('OUTPUT', "Output", "Vertices in projector space, texture coordinates from the surface UVs"),
+            ('SURFACE', "Surface", "Vertices on the surface, texture coordinates in projector space"),
+        ],
+        default='OUTPUT'
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        projectors = scene_projectors(context)
+        environment = environment_objects(context)
+
+        if not projectors:
+            self.report({'ERROR'}, "No active projectors in the scene")
+            return {'CANCELLED'}
+        if not environment:
+            self.report({'ERROR'}, "No environment meshes; import a model or create a basic room first")
+            return {'CANCELLED'}
+
+        directory = bpy.path.abspath(scene.pj_output_directory)
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            self.report({'ERROR'}, f"Cannot create output directory: {e}")
+            return {'CANCELLED'}
+
+        # Rays start at each projector's camera child, kept in sync with its lens
+        for proj in projectors:
+            sync_projector_camera(proj)
+        context.view_layer.update()
+
+        geometry = environment_geometry(context, environment)
+        corner_uvs = gather_triangle_uvs(environment, context.evaluated_depsgraph_get())
+        warps = compute_warps(camera_projector_arrays(projectors), geometry.bvh,
+                              self.columns, self.rows, corner_uvs)
+
+        written = 0
+        partial = []
+        for proj, warp in zip(projectors, warps):
+            base = os.path.join(directory, bpy.path.clean_name(proj.name) + "_warp")
+            if self.file_format in {'OBJ', 'BOTH'}:
+                write_warp_obj(warp, base + ".obj", self.space)
+            if self.file_format in {'CSV', 'BOTH'}:
+                write_warp_csv(warp, base + ".csv")
+            proj["pj_warp_hit_fraction"] = warp.hit_fraction
+            if warp.hit_fraction < 1.0:
+                partial.append(proj.name)
+            written += 1
+
+        if partial:
+            self.report({'WARNING'}, f"Part of the image misses the environment for: {', '.join(partial)}")
+        self.report({'INFO'}, f"Wrote {written} warp meshes ({self.columns}x{self.rows}) to {directory}")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(PJ_OT_export_warp_meshes)
+
+def unregister():
+    bpy.utils.unregister_class(PJ_OT_export_warp_meshes)
@@ -24,7 +24,15 @@ for prop in ['pj_unit_system']:
 # Remove object properties
 for prop in ['pj_is_projector', 'pj_throw_distance', 'pj_image_width', 'pj_throw_ratio', 
              'pj_aspect_ratio_w', 'pj_aspect_ratio_h', 'pj_show_cone', 'pj_is_environment',
-             'pj_collection', 'pj_overlaps_with', 'pj_edge_blend_amount', 'pj_is_active_projector']:
+             'pj_collection', 'pj_overlaps_with', 'pj_edge_blend_amount', 'pj_is_active_projector',
+             'pj_catalog_entry', 'pj_throw_ratio_min', 'pj_throw_ratio_max', 'pj_resolution_x',
+             'pj_resolution_y', 'pj_lumens', 'pj_lens_shift_v', 'pj_lens_shift_h',
+             'pj_lens_shift_v_max', 'pj_lens_shift_h_max', 'pj_weight', 'pj_is_mounting_zone',
+             'pj_vignetting', 'pj_screen_gain', 'pj_corner_pin_target', 'pj_content_image',
+             'pj_shading_slot', 'pj_proxy', 'pj_is_proxy', 'pj_is_point_cloud', 'pj_point_spacing',
+             'pj_is_audience', 'pj_audience_density', 'pj_person_height', 'pj_person_radius',
+             'pj_is_seat_block', 'pj_eye_height', 'pj_is_rigging', 'pj_is_mirror',
+             'pj_mirror_reflectivity']:
     if hasattr(bpy.types.Object, prop):
         try:
             delattr(bpy.types.Object, prop)
@@ -33,7 +41,17 @@ for prop in ['pj_is_projector', 'pj_throw_distance', 'pj_image_width', 'pj_throw
             print(f"Could not remove Object.{prop}: {e}")
 
 # Remove scene collection properties
-for prop in ['pj_projector_collections', 'pj_active_collection_index', 'pj_collection_selector']:
+for prop in ['pj_projector_collections', 'pj_active_collection_index', 'pj_collection_selector',
+             'pj_catalog_image_width', 'pj_catalog_distance_min', 'pj_catalog_distance_max',
+             'pj_catalog_min_lumens', 'pj_catalog_results', 'pj_catalog_results_index',
+             'pj_min_pixel_density', 'pj_output_directory', 'pj_blend_format', 'pj_blend_gamma',
+             'pj_blend_step', 'pj_live_corner_pins', 'pj_visibility_engine',
+             'pj_shadow_map_resolution', 'pj_preview_camera', 'pj_preview_resolution',
+             'pj_preview_blend', 'pj_preview_white', 'pj_preview_ambient', 'pj_heatmap_source',
+             'pj_heatmap_auto_range', 'pj_heatmap_min', 'pj_heatmap_max', 'pj_heatmap_show',
+             'pj_proxy_triangles', 'pj_proxy_weld_distance', 'pj_frame_coverage', 'pj_frame_gap',
+             'pj_frame_overlap', 'pj_frame_lux_min', 'pj_min_clearance',
+             'pj_live_clearance']:
     if hasattr(bpy.types.Scene, prop):
         try:
             delattr(bpy.types.Scene, prop)
@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.adaptive import frustum_outcodes, grid_cells, sample_adaptive, split_cells
+from blender_projection_system.core.frustum import ProjectorArrays, inside_image, look_at_rotations, project_points
+from blender_projection_system.core.photometry import solve_illuminance
+from blender_projection_system.core.sampling import SurfaceSamples
+from blender_projection_system.core.surface_metrics import analyze_surface_metrics
+
+def wall(half_width=10.0, half_height=5.0):
+    """A wall in the plane y = 0, facing -Y"""
+    vertices = np.array([[-half_width, 0.0, -half_height], [half_width, 0.0, -half_height],
+                         [half_width, 0.0, half_height], [-half_width, 0.0, half_height]])
+    return vertices, np.array([[0, 1, 2], [0, 2, 3]])
+
+def wall_projectors():
+    """Three head-on projectors with overlapping images on the wall"""
+    origins = np.array([[-2.0, -4.0, 0.0], [1.5, -5.0, 0.5], [0.0, -3.0, -1.0]])
+    return ProjectorArrays(origins, look_at_rotations(origins, origins * (1, 0, 1)), 1.2, 16 / 9,
+                           shift=[[0.0, 0.1], [0.05, 0.0], [0.0, 0.0]], lumens=5000.0)
+
+def panel_visibility(projectors, half=0.5, y=-2.0):
+    """Occlusion by a 2 * half square panel in the plane y, centred on the Y axis"""
+    def visible(index, points):
+        origin = projectors.origins[index]
+        t = (y - origin[1]) / (points[:, 1] - origin[1])
+        hit = origin + t[:, None] * (points - origin)
+        blocked = (t > 0) & (t < 1) & (np.abs(hit[:, 0]) < half) & (np.abs(hit[:, 2]) < half)
+        return ~blocked
+    return visible
+
+def dense_wall_samples(step, half_width=10.0, half_height=5.0):
+    """A regular grid of samples over the wall"""
+    x, z = np.meshgrid(np.arange(-half_width, half_width, step) + 0.5 * step,
+                       np.arange(-half_height, half_height, step) + 0.5 * step)
+    points = np.column_stack([x.ravel(), np.zeros(x.size), z.ravel()])
+    return SurfaceSamples(points, np.tile([0.0, -1.0, 0.0], (len(points), 1)),
+                          np.full(len(points), step * step), np.zeros(len(points)))
+
+class TestAdaptiveSampling(unittest.TestCase):
+    """Test cases for the adaptive surface sampler."""
+
+    def test_outcodes_match_projection(self):
+        """Outcode 0 is exactly the inside_image test, also behind the projector."""
+        projectors = wall_projectors()
+        points = np.random.default_rng(0).uniform(-12, 12, (20000, 3))
+        u, v, depth = project_points(projectors, points)
+        np.testing.assert_array_equal(frustum_outcodes(projectors, points) == 0, inside_image(u, v, depth))
+        np.testing.assert_array_equal(frustum_outcodes(projectors, points, 0.2) == 0,
+                                      inside_image(u, v, depth, margin=0.2))
+
+    def test_cells_tile_the_triangles(self):
+        """Coarse grids and quadtree splits keep the surface area."""
+        vertices, triangles = wall()
+        cells, source = grid_cells(vertices, triangles, 0.7)
+        self.assertLessEqual(np.linalg.norm(cells - np.roll(cells, 1, axis=1), axis=2).max(), 0.7 + 1e-9)
+
+        def area(c):
+            return 0.5 * np.linalg.norm(np.cross(c[:, 1] - c[:, 0], c[:, 2] - c[:, 0]), axis=1).sum()
+        self.assertAlmostEqual(area(cells), 200.0)
+        self.assertAlmostEqual(area(split_cells(cells)), 200.0)
+        np.testing.assert_array_equal(np.bincount(source), [len(cells) // 2] * 2)
+
+    def test_matches_analytic_coverage(self):
+        """Lit areas and flux come out right with a small fraction of the samples."""
+        vertices, triangles = wall()
+        projectors = wall_projectors()
+        tolerance = 0.02
+        samples = sample_adaptive(projectors, vertices, triangles, tolerance)
+        self.assertAlmostEqual(samples.total_area, 200.0)
+        # A uniform grid at the tolerance would need 500 000 samples
+        self.assertLess(len(samples), 25000)
+
+        metrics = analyze_surface_metrics(projectors, samples)
+        width = -projectors.origins[:, 1] / projectors.throw_ratio
+        height = width / projectors.aspect
+        # Only cells straddling an image border can be misclassified
+        error = 2 * (width + height) * tolerance * 0.5
+        np.testing.assert_array_less(np.abs(metrics.lit_area - width * height), error)
+        np.testing.assert_allclose(solve_illuminance(projectors, samples).flux, 5000.0, rtol=2e-3)
+
+        # Refinement stops at the sample budget
+        self.assertLessEqual(len(sample_adaptive(projectors, vertices, triangles, tolerance,
+                                                 max_samples=5000)), 5000)
+
+    def test_refines_at_shadow_edges(self):
+        """With an occlusion test the shadow border is resolved like dense sampling."""
+        vertices, triangles = wall()
+        projectors = wall_projectors()
+        visible = panel_visibility(projectors)
+
+        def visibility(samples):
+            return lambda index, selector, lit: np.array([visible(i, samples.points[selector]) for i in index])
+
+        samples = sample_adaptive(projectors, vertices, triangles, 0.02, visible=visible, blend=[0.2] * 3)
+        adaptive = analyze_surface_metrics(projectors, samples, visibility=visibility(samples))
+        dense = dense_wall_samples(0.01)
+        reference = analyze_surface_metrics(projectors, dense, visibility=visibility(dense))
+
+        open_area = analyze_surface_metrics(projectors, samples).lit_area
+        self.assertGreater(open_area[1] - reference.lit_area[1], 0.2)
+        np.testing.assert_allclose(adaptive.lit_area, reference.lit_area, atol=0.03)
+        self.assertLess(len(samples), len(dense) // 20)
+
+if __name__ == '__main__':
+    unittest.main()
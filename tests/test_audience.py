@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.audience import (Audience, AudienceShadows, analyze_audience, sample_audience,
+                                                     segment_distances)
+from blender_projection_system.core.frustum import ProjectorArrays, inside_image, look_at_rotations, project_points
+from blender_projection_system.core.query import ProjectorQuery
+from blender_projection_system.core.sampling import sample_surface
+
+def ballroom(height):
+    """A projector at `height` above the floor throwing 10 m onto a wall across a 4 m deep dance floor"""
+    floor = np.array([[-4.0, 2.0, 0.0], [4.0, 2.0, 0.0], [4.0, 6.0, 0.0], [-4.0, 6.0, 0.0]])
+    wall = np.array([[-4.0, 10.0, 0.0], [4.0, 10.0, 0.0], [4.0, 10.0, 4.0], [-4.0, 10.0, 4.0]])
+    origin = np.array([[0.0, 0.0, height]])
+    projectors = ProjectorArrays(origin, look_at_rotations(origin, [[0.0, 10.0, 2.0]]), 1.5, 16 / 9)
+    samples = sample_surface(wall, np.array([[0, 1, 2], [0, 2, 3]]), 20000, seed=1)
+    return projectors, floor, samples
+
+class TestAudience(unittest.TestCase):
+    """Test cases for audience capsules in the projector beams."""
+
+    def test_segment_distances(self):
+        """Closest distances of crossing, parallel and point segments."""
+        p1 = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [2.0, 2.0, 2.0]])
+        q1 = np.array([[1.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 0.0, 0.0], [2.0, 2.0, 2.0]])
+        p2 = np.array([[0.5, -1.0, 1.0], [0.0, 1.0, 0.0], [3.0, 0.0, 0.0], [2.0, 2.0, 0.0]])
+        q2 = np.array([[0.5, 1.0, 1.0], [1.0, 1.0, 0.0], [4.0, 0.0, 0.0], [2.0, 2.0, 1.0]])
+        np.testing.assert_allclose(segment_distances(p1, q1, p2, q2), [1.0, 1.0, 2.0, 1.0])
+
+    def test_tiled_blocking_matches_brute_force(self):
+        """The frustum and tile culling never drops a capsule that blocks a ray."""
+        projectors, floor, samples = ballroom(1.0)
+        feet = sample_audience(floor, np.array([[0, 1, 2], [0, 2, 3]]), 2.0, seed=2)
+        audience = Audience(feet, np.random.default_rng(0).uniform(1.5, 1.9, len(feet)), 0.22)
+        self.assertEqual(len(audience), 64)
+        shadows = AudienceShadows(projectors, audience, ProjectorQuery(projectors, 20.0))
+
+        blocked = shadows.blocked(0, samples.points)
+        count = len(samples)
+        distance = segment_distances(
+            np.broadcast_to(projectors.origins[0], (count * len(audience), 3)), np.repeat(samples.points, len(audience), axis=0),
+            np.tile(audience.bottom, (count, 1)), np.tile(audience.top, (count, 1))).reshape(count, -1)
+        u, v, depth = project_points(projectors, samples.points)
+        expected = (distance < audience.radius).any(axis=1) & inside_image(u, v, depth)[0]
+        np.testing.assert_array_equal(blocked, expected)
+        self.assertTrue(0 < blocked.sum() < count)
+
+    def test_floor_projector_is_shadowed(self):
+        """A dense crowd shadows a floor-level projector but not one rigged overhead."""
+        low, floor, samples = ballroom(1.0)
+        high, _, _ = ballroom(4.5)
+        triangles = np.array([[0, 1, 2], [0, 2, 3]])
+        audience = Audience(sample_audience(floor, triangles, 2.0, seed=4))
+
+        low_result = analyze_audience(low, samples, AudienceShadows(low, audience, ProjectorQuery(low, 20.0)))
+        high_result = analyze_audience(high, samples, AudienceShadows(high, audience, ProjectorQuery(high, 20.0)))
+        self.assertGreater(low_result.heads[0], 0)
+        self.assertGreater(low_result.summary(0)["shadow_fraction"], 0.3)
+        self.assertAlmostEqual(low_result.shadowed_area, low_result.shadow_area[0])
+        self.assertAlmostEqual(low_result.dark_area, low_result.shadowed_area)
+        self.assertEqual(high_result.shadow_area[0], 0.0)
+        self.assertEqual(high_result.heads[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.blending import (
+    blend_alpha,
+    blend_mask,
+    raycast_surface,
+    throw_plane_surface,
+)
+from blender_projection_system.core.frustum import ProjectorArrays, project_points
+from blender_projection_system.core.image_io import (
+    ImageWriter,
+    decode_png16,
+    encode_exr_half,
+    encode_png16,
+)
+from blender_projection_system.core.layout import grid_layout
+from blender_projection_system.core.raycast import TriangleBVH
+
+def wall_grid(columns=3, rows=2, overlap=0.2, resolution=(320, 180)):
+    layout = grid_layout((0, 0, 0), (0, -1, 0), 8.0, 3.0, columns, rows, overlap, 5.0)
+    projectors = ProjectorArrays(layout.origins, layout.rotations, layout.throw_ratio, 16 / 9,
+                                 resolution=resolution)
+    return projectors, throw_plane_surface(projectors, layout.throw_distance)
+
+class TestBlending(unittest.TestCase):
+    """Test cases for the edge-blend masks."""
+
+    def test_weights_sum_to_unity(self):
+        """Every point on the wall receives a total linear alpha of one."""
+        projectors, surface = wall_grid()
+        blend = np.full(len(projectors), 0.2)
+        rng = np.random.default_rng(0)
+        points = np.column_stack([rng.uniform(-4, 4, 2000), np.zeros(2000), rng.uniform(-1.5, 1.5, 2000)])
+
+        u, v, depth = project_points(projectors, points)
+        total = np.zeros(len(points))
+        for index in range(len(projectors)):
+            inside = (u[index] >= 0) & (u[index] <= 1) & (v[index] >= 0) & (v[index] <= 1)
+            total[inside] += blend_alpha(projectors, index, u[index, inside], v[index, inside],
+                                         surface, blend)
+        np.testing.assert_allclose(total, 1.0, atol=1e-9)
+
+    def test_mask_raster(self):
+        """Masks are native resolution, gamma encoded and 1 outside the overlaps."""
+        projectors, surface = wall_grid(columns=2, rows=1)
+        linear = blend_mask(projectors, 0, surface, 0.2, gamma=1.0, step=1)
+        encoded = blend_mask(projectors, 0, surface, 0.2, gamma=2.2, step=1)
+        self.assertEqual(linear.shape, (180, 320))
+        np.testing.assert_allclose(encoded, linear ** (1 / 2.2), atol=1e-6)
+
+        # Left half of the left projector has no neighbour; the right edge fades out
+        self.assertTrue(np.all(linear[:, :100] == 1.0))
+        self.assertLess(linear[90, -1], 0.01)
+        self.assertTrue(np.all(np.diff(linear[90, 200:]) <= 1e-7))
+
+    def test_interpolated_grid(self):
+        """The interpolated mask stays close to the per-pixel evaluation."""
+        projectors, surface = wall_grid(resolution=(640, 360))
+        exact = blend_mask(projectors, 1, surface, 0.2, step=1)
+        coarse = blend_mask(projectors, 1, surface, 0.2, step=8)
+        self.assertLess(np.abs(exact - coarse).max(), 0.01)
+
+    def test_unlit_neighbours(self):
+        """Neighbours shadowed from or behind the surface don't take a share of the blend."""
+        projectors, surface = wall_grid(columns=2, rows=1, resolution=(160, 90))
+        wall = np.array([[-10, 0, -5], [10, 0, -5], [10, 0, 5], [-10, 0, 5]], dtype=np.float64)
+        # A board just in front of the right projector's lens
+        lens = projectors.origins[1]
+        board = np.array([[-1, 0.5, -1], [1, 0.5, -1], [1, 0.5, 1], [-1, 0.5, 1]]) + lens
+        vertices = np.concatenate([wall, board])
+        triangles = np.array([[0, 1, 2], [0, 2, 3], [4, 5, 6], [4, 6, 7]])
+        bvh = TriangleBVH(vertices, triangles)
+        traced = raycast_surface(projectors, bvh)
+
+        def visible(index, points):
+            return ~bvh.occluded(np.broadcast_to(projectors.origins[index], points.shape), points)
+
+        # The board hides the right footprint from the overlap search, so name the neighbour
+        shared = blend_mask(projectors, 0, traced, 0.2, gamma=1.0, step=2, candidates=[1])
+        self.assertLess(shared[45, -1], 0.01)
+        shadowed = blend_mask(projectors, 0, traced, 0.2, gamma=1.0, step=2, candidates=[1], visible=visible)
+        np.testing.assert_allclose(shadowed, 1.0)
+
+        # The right projector turned round behind the wall, lighting its back
+        turn = np.diag([-1.0, -1.0, 1.0])
+        behind = ProjectorArrays(projectors.origins * [[1, 1, 1], [1, -1, 1]],
+                                 [projectors.rotations[0], turn @ projectors.rotations[1]],
+                                 projectors.throw_ratio, 16 / 9, resolution=(160, 90))
+        traced = raycast_surface(behind, TriangleBVH(wall, triangles[:2]))
+        np.testing.assert_allclose(blend_mask(behind, 0, traced, 0.2, gamma=1.0, step=2), 1.0)
+
+    def test_png_roundtrip(self):
+        """16-bit PNG encoding is lossless to one code value."""
+        image = np.random.default_rng(2).random((37, 53))
+        data = encode_png16(image)
+        self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+        np.testing.assert_allclose(decode_png16(data), image, atol=0.5 / 65535)
+
+    def test_exr_layout(self):
+        """The EXR has the magic number and one offset per scanline."""
+        image = np.linspace(0, 1, 24, dtype=np.float32).reshape(4, 6)
+        data = encode_exr_half(image)
+        self.assertEqual(struct.unpack("<i", data[:4])[0], 20000630)
+        pixels = np.frombuffer(data[-6 * 2:], dtype='<f2')
+        np.testing.assert_allclose(pixels, image[-1], atol=1e-3)
+
+    def test_background_writer(self):
+        """Masks given as callables are computed and written on the pool."""
+        projectors, surface = wall_grid()
+        with tempfile.TemporaryDirectory() as directory:
+            writer = ImageWriter(max_workers=2)
+            for index in range(len(projectors)):
+                path = os.path.join(directory, f"mask_{index}.png")
+                writer.submit(path, lambda index=index: blend_mask(projectors, index, surface, 0.2))
+            paths, errors = writer.wait()
+            writer.shutdown()
+            self.assertEqual(errors, [])
+            self.assertEqual(len(paths), len(projectors))
+            self.assertEqual(decode_png16(open(paths[0], "rb").read()).shape, (180, 320))
+
+if __name__ == '__main__':
+    unittest.main()
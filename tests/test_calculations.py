@@ -6,44 +6,40 @@ import os
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(parent_dir)
 
-# This is a placeholder for actual tests
-# In a real test setup, we would mock the Blender API or use a test environment
+from blender_projection_system.core.calculations import (
+    aspect_from_resolution,
+    calculate_image_width,
+    calculate_throw_distance,
+    calculate_throw_ratio,
+)
 
 class TestCalculations(unittest.TestCase):
     """Test cases for the core calculations module."""
     
     def test_throw_ratio_calculation(self):
         """Test the basic throw ratio calculation."""
-        # In a real test, we would import and use the actual calculation function
-        # from blender_projection_system.core.calculations import calculate_throw_ratio
-        
-        # For now, we'll just simulate the calculation
-        def mock_calculate_throw_ratio(distance, image_width):
-            """Mock function for calculating throw ratio."""
-            if image_width < 1e-6:
-                return float('inf')
-            return distance / image_width
-            
         # Test with normal values
-        self.assertAlmostEqual(mock_calculate_throw_ratio(6.0, 3.0), 2.0)
+        self.assertAlmostEqual(calculate_throw_ratio(6.0, 3.0), 2.0)
         
         # Test with zero width (should return inf)
-        self.assertEqual(mock_calculate_throw_ratio(5.0, 0.0), float('inf'))
+        self.assertEqual(calculate_throw_ratio(5.0, 0.0), float('inf'))
         
     def test_image_width_calculation(self):
         """Test the image width calculation."""
-        # Mock function
-        def mock_calculate_image_width(distance, throw_ratio):
-            """Mock function for calculating image width."""
-            if throw_ratio < 1e-6:
-                return float('inf')
-            return distance / throw_ratio
-            
         # Test with normal values
-        self.assertAlmostEqual(mock_calculate_image_width(6.0, 2.0), 3.0)
+        self.assertAlmostEqual(calculate_image_width(6.0, 2.0), 3.0)
         
         # Test with zero throw ratio (should return inf)
-        self.assertEqual(mock_calculate_image_width(5.0, 0.0), float('inf'))
+        self.assertEqual(calculate_image_width(5.0, 0.0), float('inf'))
+
+    def test_throw_distance_calculation(self):
+        """Test the throw distance calculation."""
+        self.assertAlmostEqual(calculate_throw_distance(3.0, 2.0), 6.0)
+
+    def test_aspect_from_resolution(self):
+        """Test reducing native resolutions to aspect ratios."""
+        self.assertEqual(aspect_from_resolution(1920, 1200), (8, 5))
+        self.assertEqual(aspect_from_resolution(3840, 2160), (16, 9))
         
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main() 
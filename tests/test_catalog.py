@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.catalog import ProjectorCatalog, load_catalog
+
+class TestCatalog(unittest.TestCase):
+    """Test cases for the projector/lens catalog."""
+
+    def test_bundled_catalog_query(self):
+        """12 m image from 18-22 m with at least 20k lumens."""
+        catalog = load_catalog()
+        matches = catalog.query(12.0, 18.0, 22.0, min_lumens=20000)
+        self.assertGreater(len(matches), 0)
+
+        for index in matches:
+            entry = catalog.entry(index)
+            self.assertGreaterEqual(entry["lumens"], 20000)
+            # The lens must reach some distance inside the window
+            self.assertLessEqual(12.0 * entry["throw_ratio_min"], 22.0)
+            self.assertGreaterEqual(12.0 * entry["throw_ratio_max"], 18.0)
+
+    def test_query_matches_brute_force(self):
+        """The indexed query returns exactly the brute-force result."""
+        rng = np.random.default_rng(7)
+        n_bodies, n_lenses = 200, 400
+        tr_min = rng.uniform(0.3, 6.0, n_lenses)
+        bodies = {
+            "id": [f"B{i}" for i in range(n_bodies)],
+            "name": [f"Body {i}" for i in range(n_bodies)],
+            "lumens": rng.uniform(3000, 40000, n_bodies).tolist(),
+            "resolution_x": [1920] * n_bodies,
+            "resolution_y": [1200] * n_bodies,
+            "mount": rng.choice(list("ABCD"), n_bodies).tolist(),
+            "weight_kg": [20.0] * n_bodies,
+        }
+        lenses = {
+            "id": [f"L{i}" for i in range(n_lenses)],
+            "name": [f"Lens {i}" for i in range(n_lenses)],
+            "mount": rng.choice(list("ABCD"), n_lenses).tolist(),
+            "throw_ratio_min": tr_min.tolist(),
+            "throw_ratio_max": (tr_min * rng.uniform(1.0, 2.0, n_lenses)).tolist(),
+            "shift_v": [0.5] * n_lenses,
+            "shift_h": [0.2] * n_lenses,
+            "weight_kg": [3.0] * n_lenses,
+        }
+        catalog = ProjectorCatalog(bodies, lenses)
+        self.assertGreater(len(catalog), 10000)
+
+        matches = catalog.query(12.0, 18.0, 22.0, min_lumens=20000)
+
+        expected = np.flatnonzero(
+            (12.0 * catalog.throw_ratio_min <= 22.0) &
+            (12.0 * catalog.throw_ratio_max >= 18.0) &
+            (catalog.lumens >= 20000))
+        np.testing.assert_array_equal(np.sort(matches), expected)
+
+    def test_find_and_throw_ratio(self):
+        """Keys round-trip and the chosen throw ratio stays in the lens range."""
+        catalog = load_catalog()
+        index = catalog.find("LP-20K-WU/C-STD")
+        self.assertIsNotNone(index)
+        self.assertEqual(catalog.key(index), "LP-20K-WU/C-STD")
+        self.assertIsNone(catalog.find("NOPE/NOPE"))
+
+        ratio = catalog.throw_ratio_for(index, 12.0, 18.0, 22.0)
+        self.assertAlmostEqual(ratio, 1.6667, places=3)
+        ratio = catalog.throw_ratio_for(index, 12.0, 30.0, 30.0)
+        self.assertAlmostEqual(ratio, catalog.throw_ratio_max[index])
+
+if __name__ == '__main__':
+    unittest.main()
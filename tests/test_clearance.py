@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.clearance import (BEAM, CLEARANCE, COLLISION, RigClearance,
+                                                      point_triangle_distances, pyramid_triangle_overlap,
+                                                      triangle_pair_distances)
+
+def box_corners(lo, hi, inward=False):
+    """(12, 3, 3) triangles of an axis-aligned box"""
+    lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+    vertices = np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    quads = [[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1], [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]]
+    triangles = np.array([[q[0], q[1], q[2]] for q in quads] + [[q[0], q[2], q[3]] for q in quads])
+    if inward:
+        triangles = triangles[:, ::-1]
+    return vertices[triangles]
+
+def triangle_points(triangles, steps=40):
+    """(K, P, 3) points spread over each triangle"""
+    u, v = np.meshgrid(np.linspace(0, 1, steps + 1), np.linspace(0, 1, steps + 1))
+    keep = u + v <= 1
+    u, v = u[keep], v[keep]
+    a = triangles[:, 0, None]
+    return a + (triangles[:, 1] - triangles[:, 0])[:, None] * u[None, :, None] + \
+        (triangles[:, 2] - triangles[:, 0])[:, None] * v[None, :, None]
+
+def projector(x, y, z, reach=5.0):
+    """Body box and downward-forward beam of a projector at (x, y, z) looking along +Y"""
+    centre = np.array([x, y, z])
+    body = box_corners(centre - [0.1, 0.2, 0.075], centre + [0.1, 0.2, 0.075])
+    lens = centre + [0.0, 0.3, 0.0]
+    far = lens + [0.0, reach, -1.0]
+    beam = np.array([lens, far + [-1.5, 0, -0.8], far + [1.5, 0, -0.8], far + [1.5, 0, 0.8], far + [-1.5, 0, 0.8]])
+    return body, beam
+
+class TestClearance(unittest.TestCase):
+    """Test cases for the rigging clearance checks."""
+
+    def test_distances_match_sampling(self):
+        """Exact distances are never above, and close to, distances between dense samples."""
+        rng = np.random.default_rng(0)
+        triangles = rng.normal(size=(200, 3, 3))
+        points = rng.normal(size=(200, 3)) * 2
+        exact = point_triangle_distances(points, triangles)
+        sampled = np.linalg.norm(triangle_points(triangles) - points[:, None], axis=2).min(axis=1)
+        self.assertTrue(np.all(exact <= sampled + 1e-12))
+        np.testing.assert_allclose(exact, sampled, atol=0.05)
+
+        other = rng.normal(size=(200, 3, 3)) + rng.normal(size=(200, 1, 3)) * 2
+        exact = triangle_pair_distances(triangles, other)
+        first, second = triangle_points(triangles, 15), triangle_points(other, 15)
+        sampled = np.array([np.linalg.norm(a[:, None] - b[None], axis=2).min() for a, b in zip(first, second)])
+        self.assertTrue(np.all(exact <= sampled + 1e-12))
+        np.testing.assert_allclose(exact, sampled, atol=0.15)
+        # Crossing triangles are at distance zero
+        self.assertTrue(np.all(sampled[exact == 0] < 0.15))
+        self.assertTrue(np.any(exact == 0))
+
+    def test_pyramid_overlap(self):
+        """The separating axis test agrees with points sampled on the triangles."""
+        pyramid = np.array([[0, 0, 0], [-1, -1, 3], [1, -1, 3], [1, 1, 3], [-1, 1, 3]], dtype=np.float64)
+        rng = np.random.default_rng(1)
+        triangles = rng.normal(size=(500, 3, 3)) + [0, 0, 1.5]
+        overlap = pyramid_triangle_overlap(np.broadcast_to(pyramid, (500, 5, 3)), triangles)
+        points = triangle_points(triangles)
+        depth = points[..., 2]
+        inside = ((depth >= 0) & (depth <= 3) & (np.abs(points[..., 0]) <= depth / 3)
+                  & (np.abs(points[..., 1]) <= depth / 3)).any(axis=1)
+        self.assertTrue(np.all(overlap[inside]))
+        self.assertTrue(0 < overlap.sum() < 500)
+
+    def test_rig_issues(self):
+        """Collisions, clearance violations and blocked beams, updated incrementally."""
+        room = box_corners([-10, -10, 0], [10, 20, 6], inward=True)
+        truss = box_corners([-5, -1.3, 5.0], [5, -1.0, 5.3])
+        column = box_corners([3.5, 3.0, 0.0], [4.0, 3.5, 6.0])
+        corners = np.concatenate([room, truss, column])
+        vertices = corners.reshape(-1, 3)
+        triangles = np.arange(len(vertices)).reshape(-1, 3)
+        triangle_object = np.repeat([0, 1, 2], 12)
+        rig = RigClearance(vertices, triangles, triangle_object, ["Room", "Truss", "Column"],
+                           rigging=[False, True, False], clearance=0.2)
+
+        # Hanging just under the truss is fine; C hangs too close to the ceiling
+        rig.set_projector("A", *projector(0, -1.15, 4.9))
+        rig.set_projector("B", *projector(-3, -1.15, 4.9))
+        rig.set_projector("C", *projector(-8, 5.0, 5.85))
+        self.assertEqual(rig.check(), 3)
+        self.assertEqual(rig.issues("A"), [])
+        self.assertEqual(rig.issues("B"), [])
+        self.assertEqual([(issue["kind"], issue["other"]) for issue in rig.issues("C")], [(CLEARANCE, "Room")])
+        self.assertAlmostEqual(rig.issues("C")[0]["distance"], 0.075)
+
+        # Moving A into B's body collides both; moved in front of the column, its beam is blocked
+        rig.set_projector("A", *projector(-3.1, -1.15, 4.9))
+        rig.check(["A"])
+        kinds = {(issue["kind"], issue["other"]) for issue in rig.issues("A")}
+        self.assertIn((COLLISION, "B"), kinds)
+        self.assertIn((COLLISION, "A"), {(issue["kind"], issue["other"]) for issue in rig.issues("B")})
+        self.assertNotIn((BEAM, "Column"), kinds)
+        rig.set_projector("A", *projector(3.75, -1.15, 4.9))
+        rig.check(["A"])
+        self.assertEqual([(issue["kind"], issue["other"]) for issue in rig.issues("A")], [(BEAM, "Column")])
+        self.assertEqual(rig.issues("B"), [])
+        self.assertEqual(set(rig.all_issues()), {"A", "C"})
+
+        # Intersecting the truss collides, though coming close to it is fine
+        rig.set_projector("B", *projector(-3, -1.15, 5.0))
+        rig.check(["B"])
+        self.assertEqual([(issue["kind"], issue["other"]) for issue in rig.issues("B")], [(COLLISION, "Truss")])
+        rig.remove_projector("B")
+        self.assertNotIn("B", rig.all_issues())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import sys
+import os
+import csv
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.cornerpin import (
+    CORNER_UV,
+    apply_homography,
+    fit_plane,
+    image_plane_quads,
+    plane_axes,
+    screen_rectangles,
+    solve_corner_pins,
+    solve_homographies,
+    throw_plane_frames,
+    write_corner_pin_csv,
+)
+from blender_projection_system.core.frustum import (
+    ProjectorArrays,
+    look_at_rotations,
+    pixel_rays,
+    project_points,
+)
+
+def random_projectors(n, seed=0):
+    """Projectors in front of the y=0 wall, aimed at it with random lens shifts."""
+    rng = np.random.default_rng(seed)
+    origins = np.column_stack([rng.uniform(-3, 3, n), rng.uniform(-8, -4, n), rng.uniform(-1, 1, n)])
+    targets = np.column_stack([rng.uniform(-2, 2, n), np.zeros(n), rng.uniform(-1, 1, n)])
+    return ProjectorArrays(origins, look_at_rotations(origins, targets), rng.uniform(0.8, 2.0, n), 16 / 9,
+                           shift=rng.uniform(-0.2, 0.2, (n, 2)))
+
+class TestCornerPin(unittest.TestCase):
+    """Test cases for the corner pin / homography solver."""
+
+    def test_homography_maps_corners(self):
+        """Solved homographies take every source corner onto its target."""
+        rng = np.random.default_rng(1)
+        source = np.array([[0, 0], [1920, 0], [1920, 1080], [0, 1080]], dtype=float)
+        target = source[None] * 0.002 + rng.normal(scale=0.3, size=(50, 4, 2))
+        homography, solved = solve_homographies(np.broadcast_to(source, target.shape), target)
+        self.assertTrue(solved.all())
+        np.testing.assert_allclose(apply_homography(homography, source), target, atol=1e-9)
+        np.testing.assert_allclose(homography[:, 2, 2], 1.0)
+
+    def test_degenerate_quad(self):
+        """Quads with collinear corners are flagged instead of solved."""
+        source = np.array([[[0, 0], [1, 0], [1, 1], [0, 1]], [[0, 0], [1, 0], [2, 0], [0, 1]]], dtype=float)
+        homography, solved = solve_homographies(source, source * 2.0)
+        self.assertEqual(solved.tolist(), [True, False])
+        np.testing.assert_allclose(homography[1], np.eye(3))
+
+    def test_tilted_plane_is_exact(self):
+        """On a tilted plane the homography reproduces ray casting for any pixel."""
+        projectors = random_projectors(200)
+        normal = np.array([0.1, -1.0, 0.2])
+        normal /= np.linalg.norm(normal)
+        axis_u, axis_v = plane_axes(normal, (1.0, 0.0, 0.0))
+        pins = solve_corner_pins(projectors, (0.0, 0.0, 0.0), normal, axis_u[0], axis_v[0])
+        self.assertTrue(pins.valid.all())
+
+        rng = np.random.default_rng(2)
+        for i in (0, 57, 199):
+            u, v = rng.random(100), rng.random(100)
+            directions = pixel_rays(projectors, i, u, v)
+            depth = (-projectors.origins[i] @ normal) / (directions @ normal)
+            points = projectors.origins[i] + depth[:, None] * directions
+            plane = np.column_stack([points @ axis_u[0], points @ axis_v[0]])
+            pixels = np.column_stack([u * 1920, (1.0 - v) * 1080])
+            np.testing.assert_allclose(pins.pixel_to_plane(i, pixels), plane, atol=1e-9)
+            np.testing.assert_allclose(pins.plane_to_pixel(i, plane), pixels, atol=1e-6)
+
+    def test_screen_corners_in_pixels(self):
+        """Screen corners map to the pixels that project onto them."""
+        projectors = random_projectors(20, seed=4)
+        vertices = np.array([[-2.0, 0.0, -1.0], [2.0, 0.0, -1.0], [2.0, 0.0, 1.0], [-2.0, 0.0, 1.0]])
+        triangles = np.array([[0, 1, 2], [0, 2, 3]])
+        origin, normal, axis_u, axis_v, size, flatness = fit_plane(vertices, triangles)
+        np.testing.assert_allclose(normal, (0.0, -1.0, 0.0), atol=1e-12)
+        np.testing.assert_allclose(origin, (-2.0, 0.0, -1.0), atol=1e-12)
+        np.testing.assert_allclose(size, (4.0, 2.0))
+        self.assertAlmostEqual(flatness, 0.0)
+
+        pins = solve_corner_pins(projectors, origin, normal, axis_u, axis_v, screen_rectangles(size))
+        screen_world = vertices[[3, 2, 1, 0]]  # top left, top right, bottom right, bottom left
+        u, v, _ = project_points(projectors, screen_world)
+        expected = np.stack([u * 1920, (1.0 - v) * 1080], axis=-1)
+        np.testing.assert_allclose(pins.screen_pixels, expected, atol=1e-6)
+
+    def test_test_surface_quad(self):
+        """The throw-distance plane is the test surface quad; its pins are the raster corners."""
+        projectors = random_projectors(10, seed=5)
+        distance = np.linspace(3.0, 6.0, 10)
+        quads = image_plane_quads(projectors, distance)
+        u, v, depth = project_points(projectors, quads.reshape(-1, 3))
+        for i in range(10):
+            k = slice(4 * i, 4 * i + 4)
+            np.testing.assert_allclose(np.column_stack([u[i, k], v[i, k]]), CORNER_UV, atol=1e-12)
+            np.testing.assert_allclose(depth[i, k], distance[i])
+
+        # Same frame as fitting a plane to the quad wound towards the projector
+        origin, normal, axis_u, axis_v, size = throw_plane_frames(projectors, distance)
+        fitted = fit_plane(quads[0], [[3, 2, 1], [3, 1, 0]], axis_u[0])
+        for expected, actual in zip((origin[0], normal[0], axis_u[0], axis_v[0], size[0]), fitted):
+            np.testing.assert_allclose(actual, expected, atol=1e-9)
+
+        pins = solve_corner_pins(projectors, origin, normal, axis_u, axis_v, screen_rectangles(size))
+        np.testing.assert_allclose(pins.corners, quads, atol=1e-9)
+        np.testing.assert_allclose(pins.screen_pixels, pins.pixels, atol=1e-6)
+
+    def test_missing_plane(self):
+        """Projectors whose image leaves the plane are marked invalid."""
+        projectors = random_projectors(3, seed=6)
+        # Plane behind the first projector only
+        pins = solve_corner_pins(projectors.subset([0]), projectors.origins[0] + (0, -1, 0), (0, 1, 0),
+                                 (1, 0, 0), (0, 0, -1), screen_rectangles((1, 1)))
+        self.assertFalse(pins.valid[0])
+        self.assertTrue(np.isnan(pins.screen_pixels).all())
+
+    def test_batch_and_export(self):
+        """Thousands of projectors solve in one pass and export one row each."""
+        projectors = random_projectors(5000, seed=7)
+        origin, normal, axis_u, axis_v, size = throw_plane_frames(projectors, 5.0)
+        pins = solve_corner_pins(projectors, origin, normal, axis_u, axis_v, screen_rectangles(size))
+        self.assertTrue(pins.valid.all())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_corner_pin_csv(pins, os.path.join(directory, "corner_pins.csv"))
+            with open(path, newline="") as handle:
+                rows = list(csv.reader(handle))
+        self.assertEqual(len(rows), 5001)
+        self.assertEqual(len(rows[0]), 4 + 20 + 8 + 9)
+        self.assertTrue(all(len(row) == len(rows[0]) for row in rows))
+        h = np.array(rows[1][-9:], dtype=float).reshape(3, 3)
+        np.testing.assert_allclose(h, pins.homography[0], rtol=1e-8)
+
+if __name__ == '__main__':
+    unittest.main()
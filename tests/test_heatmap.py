@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.heatmap import (
+    DEFAULT_RAMP,
+    NO_DATA,
+    NO_DATA_COLOR,
+    corner_colors,
+    evaluate_ramp,
+    heatmap_colors,
+    value_range,
+)
+
+POSITIONS = np.array([0.0, 0.5, 1.0])
+COLORS = np.array([[0.0, 0.0, 1.0, 1.0], [0.0, 1.0, 0.0, 1.0], [1.0, 0.0, 0.0, 1.0]])
+
+class TestHeatmap(unittest.TestCase):
+    """Test cases for the heatmap colours."""
+
+    def test_evaluate_ramp(self):
+        """Ramps interpolate like a ColorRamp node and clamp at the ends."""
+        colors = evaluate_ramp([-1.0, 0.25, 0.5, 0.9, 2.0], POSITIONS, COLORS)
+        np.testing.assert_allclose(colors[:, :3], [[0, 0, 1], [0, 0.5, 0.5], [0, 1, 0], [0.8, 0.2, 0], [1, 0, 0]])
+        constant = evaluate_ramp([0.25, 0.5, 0.9], POSITIONS, COLORS, 'CONSTANT')
+        np.testing.assert_allclose(constant, COLORS[[0, 1, 1]])
+
+        positions = [stop[0] for stop in DEFAULT_RAMP]
+        colors = [stop[1] for stop in DEFAULT_RAMP]
+        np.testing.assert_allclose(evaluate_ramp(positions, positions, colors), colors)
+
+    def test_heatmap_colors(self):
+        """Alpha carries the normalized value; faces without results are grey."""
+        values = np.array([0.0, 100.0, 200.0, 400.0, np.nan])
+        valid = values > 0
+        low, high = value_range(values, valid)
+        self.assertEqual((low, high), (100.0, 400.0))
+
+        colors = heatmap_colors(values, low, high, POSITIONS, COLORS, valid)
+        self.assertEqual(colors.dtype, np.float32)
+        np.testing.assert_allclose(colors[1:4, 3], [0.0, 1 / 3, 1.0], atol=1e-6)
+        np.testing.assert_allclose(colors[1, :3], [0, 0, 1])
+        np.testing.assert_allclose(colors[3, :3], [1, 0, 0])
+        for missing in (0, 4):
+            np.testing.assert_allclose(colors[missing, :3], NO_DATA_COLOR, atol=1e-6)
+            self.assertEqual(colors[missing, 3], NO_DATA)
+
+        # A flat range splits at the value instead of dividing by zero
+        flat = heatmap_colors([1.0, 2.0], 1.0, 1.0, POSITIONS, COLORS)
+        np.testing.assert_allclose(flat[:, 3], [0.0, 1.0])
+        self.assertEqual(value_range(np.zeros(3), np.zeros(3, dtype=bool)), (0.0, 1.0))
+
+    def test_corner_colors(self):
+        """Face colours repeat over each face's corners in order."""
+        faces = np.arange(12, dtype=np.float32).reshape(3, 4)
+        corners = corner_colors(faces, [4, 3, 5])
+        self.assertEqual(corners.shape, (12, 4))
+        np.testing.assert_array_equal(corners[:, 0], [0] * 4 + [4] * 3 + [8] * 5)
+
+if __name__ == '__main__':
+    unittest.main()
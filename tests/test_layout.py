@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, project_points
+from blender_projection_system.core.layout import (
+    arc_layout,
+    cylinder_layout,
+    dome_layout,
+    grid_layout,
+    matrices_to_euler_xyz,
+    tile_size,
+)
+
+def euler_to_matrix(x, y, z):
+    """Blender XYZ Euler order: R = Rz @ Ry @ Rx."""
+    cx, sx, cy, sy, cz, sz = np.cos(x), np.sin(x), np.cos(y), np.sin(y), np.cos(z), np.sin(z)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+class TestLayout(unittest.TestCase):
+    """Test cases for the layout generators."""
+
+    def test_grid_tiles_overlap(self):
+        """Neighbouring grid images overlap by the requested fraction."""
+        result = grid_layout((0, 0, 2), (0, -1, 0), 12.0, 4.0, 3, 1, 0.2, 8.0)
+        self.assertEqual(len(result), 3)
+        widths = result.image_width
+        np.testing.assert_allclose(widths, tile_size(12.0, 3, 0.2))
+        spacing = np.diff(result.origins[:, 0])
+        np.testing.assert_allclose(spacing, widths[0] * 0.8)
+        np.testing.assert_allclose(result.origins[:, 1], -8.0)
+
+    def test_grid_rows_overlap(self):
+        """Stacked rows cover the whole screen and overlap vertically too."""
+        result = grid_layout((0, 0, 2), (0, -1, 0), 12.0, 4.0, 4, 2, 0.15, 8.0)
+        projectors = ProjectorArrays(result.origins, result.rotations, result.throw_ratio, 16 / 9)
+        x, z = np.meshgrid(np.linspace(-5.99, 5.99, 121), np.linspace(0.01, 3.99, 41))
+        screen = np.stack([x.ravel(), np.zeros(x.size), z.ravel()], axis=1)
+        u, v, depth = project_points(projectors, screen)
+        inside = (u >= 0) & (u <= 1) & (v >= 0) & (v <= 1) & (depth > 0)
+        self.assertTrue(inside.any(axis=0).all())
+        # The band between the row centers' tile edges is lit by both rows
+        tile_h = tile_size(4.0, 2, 0.15)
+        band = np.abs(screen[:, 2] - 2.0) < 0.5 * 0.15 * tile_h
+        rows = np.arange(len(result)) // 4
+        np.testing.assert_array_equal(inside[rows == 0][:, band].any(axis=0), True)
+        np.testing.assert_array_equal(inside[rows == 1][:, band].any(axis=0), True)
+
+        panorama = cylinder_layout((0, 0, 0), 10.0, 12, 0.15, 4.0, rows=2, projector_z=2.0)
+        projectors = ProjectorArrays(panorama.origins, panorama.rotations, panorama.throw_ratio, 16 / 9)
+        angle, z = np.meshgrid(np.linspace(0, 2 * np.pi, 180, endpoint=False), np.linspace(0.01, 3.99, 21))
+        wall = np.stack([10 * np.cos(angle.ravel()), 10 * np.sin(angle.ravel()), z.ravel()], axis=1)
+        u, v, depth = project_points(projectors, wall)
+        inside = (u >= 0) & (u <= 1) & (v >= 0) & (v <= 1) & (depth > 0)
+        self.assertTrue(inside.any(axis=0).all())
+
+    def test_cylinder_tile_edges(self):
+        """Panorama images end exactly on their tile edges."""
+        radius, count, overlap = 10.0, 40, 0.15
+        result = cylinder_layout((0, 0, 0), radius, count, overlap, 3.0, screen_z=0.5)
+        self.assertEqual(len(result), count)
+
+        projectors = ProjectorArrays(result.origins, result.rotations, result.throw_ratio, 16 / 9)
+        half = 0.5 * tile_size(2 * np.pi, count, overlap, closed=True)
+        edges = np.array([(radius * np.cos(-half), radius * np.sin(-half), 2.0),
+                          (radius * np.cos(half), radius * np.sin(half), 2.0)])
+        u, _, depth = project_points(projectors.subset([0]), edges)
+        # Seen from the axis, increasing angles run to the left
+        np.testing.assert_allclose(u[0], [1.0, 0.0], atol=1e-9)
+        self.assertTrue((depth > 0).all())
+
+    def test_arc_with_offset_rig(self):
+        """Tile edges also line up when the rig is off the axis and tilted."""
+        radius = 10.0
+        result = arc_layout((0, 0, 0), radius, 0.0, np.pi, 5, 0.1, 3.0,
+                            projector_radius=3.0, projector_z=4.0)
+        projectors = ProjectorArrays(result.origins, result.rotations, result.throw_ratio, 16 / 9)
+        tile = tile_size(np.pi, 5, 0.1)
+        edges = np.array([(radius, 0, 1.5), (radius * np.cos(tile), radius * np.sin(tile), 1.5)])
+        u, _, _ = project_points(projectors.subset([0]), edges)
+        np.testing.assert_allclose(u[0], [1.0, 0.0], atol=1e-9)
+
+    def test_dome_and_euler(self):
+        """Dome layouts aim every projector at the dome and convert to Euler."""
+        result = dome_layout((0, 0, 0), 8.0, 3, 10, 0.1, 16 / 9)
+        self.assertGreater(len(result), 10)
+        self.assertTrue((result.throw_ratio > 0).all())
+
+        euler = matrices_to_euler_xyz(result.rotations)
+        for angles, rotation in zip(euler, result.rotations):
+            np.testing.assert_allclose(euler_to_matrix(*angles), rotation, atol=1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
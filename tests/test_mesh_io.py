@@ -0,0 +1,105 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.mesh_io import blender_axes, read_mesh, read_obj
+
+OBJ_TEXT = b"""# scan export
+mtllib scan.mtl
+o wall
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0 0.5 0.5 0.5
+vt 0 0
+vn 0 0 1
+f 1/1/1 2/1/1 3/1/1 4/1/1
+o floor
+v 2 0 0
+v 3 0 0\r
+v 3 1 0
+s off
+f -3 -2 -1
+f 5//1 7//1 6//1
+l 1 2
+"""
+
+def write_file(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def ply_header(file_format, vertices, faces, face_properties="property list uchar int vertex_indices\n"):
+    return (f"ply\nformat {file_format} 1.0\ncomment scan\nelement vertex {vertices}\n"
+            "property float x\nproperty float y\nproperty float z\nproperty uchar red\n"
+            f"element face {faces}\n{face_properties}end_header\n").encode()
+
+class TestMeshIO(unittest.TestCase):
+    """Test cases for the native OBJ and PLY readers."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_obj(self):
+        """Vertices and faces are read; texture, normal and relative references resolve."""
+        mesh = read_mesh(write_file(self.directory, "scan.obj", OBJ_TEXT))
+        self.assertEqual(mesh.vertices.shape, (7, 3))
+        np.testing.assert_array_equal(mesh.vertices[3], [0, 1, 0])
+        np.testing.assert_array_equal(mesh.face_sizes, [4, 3, 3])
+        np.testing.assert_array_equal(mesh.corners, [0, 1, 2, 3, 4, 5, 6, 4, 6, 5])
+        np.testing.assert_array_equal(mesh.loop_starts, [0, 4, 7])
+        np.testing.assert_array_equal(mesh.triangles(), [[0, 1, 2], [0, 2, 3], [4, 5, 6], [4, 6, 5]])
+
+    def test_obj_chunks(self):
+        """Small chunks across worker processes give the same mesh as one chunk."""
+        lines = []
+        for i in range(500):
+            lines.append(f"v {i} {i % 7} {-i}.25")
+            if i >= 2:
+                lines.append(f"f {i - 1} {i} -1" if i % 2 else f"f {i - 1}/{i} {i}/{i} {i + 1}/{i}")
+        path = write_file(self.directory, "strip.obj", "\n".join(lines).encode())
+        whole = read_obj(path, workers=1)
+        split = read_obj(path, workers=3, chunk_bytes=256)
+        self.assertEqual(len(whole.face_sizes), 498)
+        np.testing.assert_array_equal(whole.vertices, split.vertices)
+        np.testing.assert_array_equal(whole.corners, split.corners)
+        np.testing.assert_array_equal(whole.corners.reshape(-1, 3)[:, 2], np.arange(2, 500))
+
+        bad = write_file(self.directory, "bad.obj", b"v 0 0 0\nf 1 2 3\n")
+        with self.assertRaises(ValueError):
+            read_mesh(bad)
+
+    def test_binary_ply(self):
+        """Binary faces of mixed sizes and extra properties are read in runs."""
+        vertices = np.arange(18, dtype=np.float32).reshape(6, 3)
+        vertex_records = np.zeros(6, dtype=[('x', '>f4'), ('y', '>f4'), ('z', '>f4'), ('red', 'u1')])
+        for axis, name in enumerate('xyz'):
+            vertex_records[name] = vertices[:, axis]
+        faces = [[0, 1, 2], [2, 3, 4], [0, 1, 2, 3], [3, 4, 5]]
+        body = b"".join(np.array([len(face)], 'u1').tobytes() + np.array(face, '>i4').tobytes() +
+                        np.array([7], 'u1').tobytes() for face in faces)
+        header = ply_header("binary_big_endian", 6, 4,
+                            "property list uchar int vertex_indices\nproperty uchar flags\n")
+        mesh = read_mesh(write_file(self.directory, "scan.ply", header + vertex_records.tobytes() + body))
+        np.testing.assert_array_equal(mesh.vertices, vertices)
+        np.testing.assert_array_equal(mesh.face_sizes, [3, 3, 4, 3])
+        np.testing.assert_array_equal(mesh.corners, np.concatenate(faces))
+
+    def test_ascii_ply(self):
+        """ASCII PLY matches its binary counterpart; Y-up positions convert to Blender axes."""
+        text = ply_header("ascii", 4, 2) + b"0 0 0 255\n1 0 0 255\n1 1 0 255\n0 1 2 255\n3 0 1 2\n4 0 1 2 3\n"
+        mesh = read_mesh(write_file(self.directory, "scan_ascii.ply", text))
+        np.testing.assert_array_equal(mesh.face_sizes, [3, 4])
+        np.testing.assert_array_equal(mesh.corners, [0, 1, 2, 0, 1, 2, 3])
+        np.testing.assert_array_equal(blender_axes(mesh.vertices, 'Y', 2.0)[3], [0, -4, 2])
+
+if __name__ == '__main__':
+    unittest.main()
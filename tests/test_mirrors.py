@@ -0,0 +1,125 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, look_at_rotations, pixel_rays, project_points
+from blender_projection_system.core.mirrors import Mirrors, fold_projectors, trace_reflections
+from blender_projection_system.core.raycast import TriangleBVH
+
+def mirror_quad(centre, normal, half=1.0):
+    """Vertices and triangles of a square mirror facing along normal"""
+    centre, normal = np.asarray(centre, dtype=np.float64), np.asarray(normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+    side = np.cross(normal, [0.0, 0.0, 1.0])
+    if np.linalg.norm(side) < 1e-6:
+        side = np.cross(normal, [1.0, 0.0, 0.0])
+    side /= np.linalg.norm(side)
+    other = np.cross(normal, side)
+    vertices = np.array([centre + half * (s * side + t * other) for s, t in ((-1, -1), (1, -1), (1, 1), (-1, 1))])
+    triangles = np.array([[0, 1, 2], [0, 2, 3]])
+    if np.dot(np.cross(vertices[1] - vertices[0], vertices[2] - vertices[0]), normal) < 0:
+        triangles = triangles[:, ::-1]
+    return vertices, triangles
+
+def box_mesh(lo, hi):
+    """Triangles of an axis-aligned box"""
+    lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+    vertices = np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    quads = [[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1], [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]]
+    return vertices, np.array([[q[0], q[1], q[2]] for q in quads] + [[q[0], q[2], q[3]] for q in quads])
+
+def down_mirror_rig():
+    """A projector at 3 m aiming along +X into a 45 degree mirror that folds the throw onto the floor"""
+    projectors = ProjectorArrays([[0.0, 0.0, 3.0]], look_at_rotations([[0, 0, 3]], [[5, 0, 3]]), 1.0, 16 / 9)
+    vertices, triangles = mirror_quad([3.0, 0.0, 3.0], [-1.0, 0.0, -1.0])
+    return projectors, Mirrors(vertices, triangles, [0, 0], 0.9)
+
+def floor_hits(projectors, mirrors, steps=21):
+    """Pixel coordinates of rays bounced once, and where they meet the floor"""
+    u, v = np.meshgrid(np.linspace(0, 1, steps), np.linspace(0, 1, steps))
+    u, v = u.ravel(), v.ravel()
+    paths = trace_reflections(mirrors, np.repeat(projectors.origins, len(u), axis=0), pixel_rays(projectors, 0, u, v))
+    folded = paths.bounces == 1
+    end, direction = paths.vertices[folded, -1], paths.directions[folded]
+    floor = end - direction * (end[:, 2] / direction[:, 2])[:, None]
+    return u[folded], v[folded], floor, paths
+
+class TestMirrors(unittest.TestCase):
+    """Test cases for folding projector throws through mirrors."""
+
+    def test_virtual_projector(self):
+        """The virtual projector maps points onto the pixels whose bounced rays reach them."""
+        projectors, mirrors = down_mirror_rig()
+        folded = fold_projectors(projectors, mirrors)
+        np.testing.assert_array_equal(folded.bounces, [1])
+        # The lens mirrored to above the mirror; the image is flipped
+        np.testing.assert_allclose(folded.origins[0], [3.0, 0.0, 6.0], atol=1e-12)
+        self.assertAlmostEqual(np.linalg.det(folded.rotations[0]), -1.0)
+        self.assertAlmostEqual(folded.lumens[0], 0.9 * projectors.lumens[0])
+
+        u, v, floor, paths = floor_hits(projectors, mirrors)
+        self.assertGreater(len(u), 100)
+        pu, pv, _ = project_points(folded, floor)
+        np.testing.assert_allclose(pu[0], u, atol=1e-9)
+        np.testing.assert_allclose(pv[0], v, atol=1e-9)
+
+        # 3 m to the mirror, then 2 m straight down
+        centre = len(paths.bounces) // 2
+        np.testing.assert_allclose(paths.point_at(np.full(len(paths.bounces), 5.0))[centre], [3.0, 0.0, 1.0],
+                                   atol=1e-9)
+
+    def test_gating_and_occlusion(self):
+        """Points are lit only through the mirror outline, and only occluders on the real path block."""
+        projectors, mirrors = down_mirror_rig()
+        folded = fold_projectors(projectors, mirrors)
+        _, _, floor, _ = floor_hits(projectors, mirrors)
+        index = np.zeros(len(floor), dtype=np.int64)
+        self.assertTrue(folded.unfold(index, floor)[0].all())
+        # In the straight throw, and on the floor past the mirror's edge
+        outside = np.array([[10.0, 0.0, 3.0], [3.0, 3.5, 0.0]])
+        np.testing.assert_array_equal(folded.reaches([0, 0], outside), [False, False])
+
+        cases = [(([2.5, -0.2, 1.0], [3.5, 0.2, 1.2]), True),    # Under the mirror
+                 (([4.0, -3.0, 2.0], [6.0, 3.0, 6.0]), False),   # Behind the mirror
+                 (([1.0, -0.3, 2.8], [1.2, 0.3, 3.2]), True)]    # In front of the lens
+        for (lo, hi), blocks in cases:
+            vertices, triangles = box_mesh(lo, hi)
+            lit = folded.reaches(index, floor, TriangleBVH(vertices, triangles))
+            self.assertEqual(not lit.all(), blocks)
+            self.assertTrue(lit.any())
+            if lo[0] > 2:
+                # Depth maps of the geometry past the mirror agree with casting rays
+                exit_visible = folded.exit_visibility(vertices, triangles, resolution=512)
+                mapped = folded.reaches(index, floor, exit_visible=exit_visible)
+                self.assertGreater((mapped == lit).mean(), 0.97)
+
+    def test_periscope(self):
+        """Two mirrors fold the throw twice, keeping the image upright and losing light at each."""
+        projectors = ProjectorArrays([[0.0, 0.0, 1.0]], look_at_rotations([[0, 0, 1]], [[0, 0, 3]],
+                                                                           up=[[0, 1, 0]]), 0.5, 1.0)
+        lower = mirror_quad([0.0, 0.0, 3.0], [0.0, 1.0, -1.0], half=1.5)
+        upper = mirror_quad([0.0, 4.0, 3.0], [0.0, -1.0, 1.0], half=3.0)
+        vertices = np.concatenate([lower[0], upper[0]])
+        triangles = np.concatenate([lower[1], upper[1] + 4])
+        mirrors = Mirrors(vertices, triangles, [0, 0, 1, 1], [0.9, 0.8])
+        folded = fold_projectors(projectors, mirrors)
+        np.testing.assert_array_equal(folded.bounces, [2])
+        np.testing.assert_array_equal(folded.path[0, :2], [0, 1])
+        self.assertAlmostEqual(np.linalg.det(folded.rotations[0]), 1.0)
+        self.assertAlmostEqual(folded.lumens[0], 0.72 * projectors.lumens[0])
+
+        # The throw leaves the upper mirror straight up; rays pass both outlines
+        paths = trace_reflections(mirrors, projectors.origins, [[0.0, 0.0, 1.0]])
+        np.testing.assert_allclose(paths.directions[0], [0.0, 0.0, 1.0], atol=1e-12)
+        np.testing.assert_allclose(paths.point_at([7.0])[0], [0.0, 4.0, 4.0], atol=1e-9)
+        ceiling = np.array([[0.0, 4.0, 6.0], [3.0, 4.0, 6.0], [6.0, 4.0, 6.0], [0.0, -3.0, 6.0]])
+        np.testing.assert_array_equal(folded.reaches(np.zeros(4, dtype=np.int64), ceiling), [True, True, False, False])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays
+from blender_projection_system.core.layout import grid_layout
+from blender_projection_system.core.overlap import OverlapGraph, overlap_graph
+from blender_projection_system.core.sampling import sample_surface_spacing
+
+def wall_samples(width, height, spacing=0.02):
+    """Samples of a wall in the XZ plane facing -Y, split into a left and a right object"""
+    vertices = np.array([[-width / 2, 0, -height / 2], [0, 0, -height / 2], [0, 0, height / 2],
+                         [-width / 2, 0, height / 2], [width / 2, 0, -height / 2], [width / 2, 0, height / 2]])
+    triangles = np.array([[0, 1, 2], [0, 2, 3], [1, 4, 5], [1, 5, 2]])
+    samples = sample_surface_spacing(vertices, triangles, spacing)
+    return samples, samples.triangles // 2
+
+class TestOverlapGraph(unittest.TestCase):
+    """Test cases for the projector overlap graph."""
+
+    def test_wall_row(self):
+        """A row of blended projectors overlaps only its neighbours, by the layout's overlap."""
+        layout = grid_layout((0, 0, 0), (0, -1, 0), 8.0, 3.0, 3, 1, 0.2, 5.0)
+        projectors = ProjectorArrays(layout.origins, layout.rotations, layout.throw_ratio, 16 / 9)
+        samples, sample_object = wall_samples(12.0, 8.0)
+        graph = overlap_graph(projectors, samples, sample_object=sample_object, chunk_size=5000)
+
+        np.testing.assert_array_equal(graph.edges, [[0, 1], [1, 2]])
+        np.testing.assert_array_equal(graph.neighbors(1), [0, 2])
+        np.testing.assert_allclose(graph.blend_width, 0.2, atol=0.01)
+        self.assertAlmostEqual(graph.area[0], graph.area[1], delta=0.05 * graph.area[0])
+        # The left overlap lies on the left half of the wall
+        np.testing.assert_array_equal(graph.surface, [0, 1])
+        self.assertEqual(graph.blend_chain(0), ([0, 1, 2], False))
+        self.assertEqual(graph.blend_chain(1), ([0, 1, 2], False))
+
+        stored = OverlapGraph.from_dict(graph.to_dict())
+        np.testing.assert_array_equal(stored.indices, graph.indices)
+        np.testing.assert_allclose(stored.entry_blend_width, graph.entry_blend_width)
+
+    def test_queries(self):
+        """Components, edge lookups, rings and branching chains."""
+        # A ring 0-1-2-3, a branch point 4 with arms 5-6, 7 and 9, and a lone projector 8
+        edges = [[0, 1], [1, 2], [2, 3], [0, 3], [4, 5], [5, 6], [4, 7], [4, 9]]
+        graph = OverlapGraph(10, edges, area=np.arange(8.0))
+
+        np.testing.assert_array_equal(graph.components(), [0, 0, 0, 0, 1, 1, 1, 1, 2, 1])
+        np.testing.assert_array_equal(graph.component(6), [4, 5, 6, 7, 9])
+        self.assertEqual(graph.edge_between(3, 0), 3)
+        self.assertEqual(graph.edge_between(0, 2), -1)
+        np.testing.assert_array_equal(graph.degree, [2, 2, 2, 2, 3, 2, 1, 1, 0, 1])
+
+        chain, closed = graph.blend_chain(2)
+        self.assertTrue(closed)
+        self.assertEqual(sorted(chain), [0, 1, 2, 3])
+        self.assertEqual(graph.blend_chain(5), ([4, 5, 6], False))
+        self.assertEqual(graph.blend_chain(4), ([4], False))
+        chains = graph.blend_chains()
+        self.assertEqual(sorted(sorted(chain) for chain, _ in chains),
+                         [[0, 1, 2, 3], [4, 5, 6], [4, 7], [4, 9]])
+
+        sub = graph.subgraph([4, 5, 6])
+        np.testing.assert_array_equal(sub.edges, [[0, 1], [1, 2]])
+        np.testing.assert_array_equal(sub.area, [4, 5])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, look_at_rotations
+from blender_projection_system.core.layout import cylinder_layout
+from blender_projection_system.core.photometry import solve_illuminance
+from blender_projection_system.core.sampling import SurfaceSamples, sample_surface, spatial_order
+
+def wall_samples(count, seed=0):
+    """Samples on a 4 x 2.25 m wall at y=0 facing -Y."""
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(-2, 2, count), np.zeros(count), rng.uniform(-1.125, 1.125, count)])
+    normals = np.tile((0.0, -1.0, 0.0), (count, 1))
+    return SurfaceSamples(points, normals, np.full(count, 9.0 / count), np.zeros(count, dtype=int))
+
+def wall_projector(x=0.0, lumens=9000.0, vignetting=0.0):
+    origin = np.array([[x, -8.0, 0.0]])
+    return ProjectorArrays(origin, look_at_rotations(origin, [(x, 0, 0)]), 2.0, 16 / 9,
+                           lumens=lumens, vignetting=vignetting)
+
+def merge(a, b):
+    return ProjectorArrays(np.vstack([a.origins, b.origins]), np.vstack([a.rotations, b.rotations]),
+                           np.append(a.throw_ratio, b.throw_ratio), np.append(a.aspect, b.aspect),
+                           lumens=np.append(a.lumens, b.lumens),
+                           vignetting=np.append(a.vignetting, b.vignetting))
+
+class TestPhotometry(unittest.TestCase):
+    """Test cases for the illuminance solver."""
+
+    def test_flat_field(self):
+        """9000 lm spread evenly over a 9 m² image gives 1000 lx."""
+        samples = wall_samples(5000)
+        result = solve_illuminance(wall_projector(), samples, gain=1.5)
+        np.testing.assert_allclose(result.illuminance, 1000.0, rtol=1e-9)
+        np.testing.assert_allclose(result.luminance, 1500.0 / np.pi, rtol=1e-9)
+        self.assertAlmostEqual(result.flux[0], 9000.0, places=6)
+
+        stats = result.statistics()
+        self.assertAlmostEqual(stats["uniformity"], 1.0)
+        self.assertAlmostEqual(stats["stacked_area"], 0.0)
+
+    def test_vignetting(self):
+        """The corners lose the vignetting fraction, the center nothing."""
+        points = np.array([(0.0, 0.0, 0.0), (1.999, 0.0, 1.124)])
+        samples = SurfaceSamples(points, [(0, -1, 0)] * 2, [1.0, 1.0], [0, 0])
+        result = solve_illuminance(wall_projector(vignetting=0.2), samples)
+        self.assertAlmostEqual(result.illuminance[1] / result.illuminance[0], 0.8, places=2)
+
+    def test_overlap_doubles(self):
+        """Blend zones and stacks add up the light of every projector."""
+        samples = wall_samples(5000)
+        stacked = solve_illuminance(merge(wall_projector(), wall_projector()), samples)
+        np.testing.assert_allclose(stacked.illuminance, 2000.0, rtol=1e-9)
+        self.assertTrue((stacked.contributors == 2).all())
+
+        shifted = solve_illuminance(merge(wall_projector(-1.0), wall_projector(1.0)), samples)
+        overlap = np.abs(samples.points[:, 0]) < 0.99
+        np.testing.assert_allclose(shifted.illuminance[overlap], 2000.0, rtol=1e-9)
+        self.assertAlmostEqual(shifted.statistics()["min_max_ratio"], 0.5)
+
+    def test_culling_matches_brute_force(self):
+        """Spatial chunking and frustum culling don't change the result."""
+        layout = cylinder_layout((0, 0, 0), 10.0, 12, 0.15, 3.0, rows=2)
+        projectors = ProjectorArrays(layout.origins, layout.rotations, layout.throw_ratio, 16 / 9,
+                                     lumens=8000.0, vignetting=0.1)
+        n = 96
+        angle = np.linspace(0, 2 * np.pi, n + 1)[:-1]
+        vertices = np.concatenate([np.column_stack([10 * np.cos(angle), 10 * np.sin(angle), np.zeros(n)]),
+                                   np.column_stack([10 * np.cos(angle), 10 * np.sin(angle), np.full(n, 3.0)])])
+        i = np.arange(n)
+        j = (i + 1) % n
+        triangles = np.concatenate([np.column_stack([i, n + i, j]), np.column_stack([j, n + i, n + j])])
+        samples = sample_surface(vertices, triangles, 20000)
+
+        culled = solve_illuminance(projectors, samples, spatial_chunk=256, chunk_budget=10000)
+        brute = solve_illuminance(projectors, samples, spatial_chunk=len(samples))
+        np.testing.assert_allclose(culled.illuminance, brute.illuminance)
+        np.testing.assert_allclose(culled.flux, brute.flux)
+        self.assertEqual((culled.contributors == 0).sum(), 0)
+
+    def test_spatial_order(self):
+        """The Morton order is a permutation."""
+        points = np.random.default_rng(1).random((1000, 3))
+        order = spatial_order(points)
+        np.testing.assert_array_equal(np.sort(order), np.arange(1000))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import (
+    ProjectorArrays,
+    inside_image,
+    look_at_rotations,
+    project_points,
+)
+from blender_projection_system.core.placement import (
+    PlacementProblem,
+    PlacementSearch,
+    greedy_cover,
+)
+from blender_projection_system.core.sampling import sample_surface
+
+def wall(width=8.0, height=3.0):
+    """A wall in the XZ plane at y=0 facing -Y (towards the projectors)."""
+    w, h = width / 2, height / 2
+    vertices = np.array([(-w, 0, -h), (w, 0, -h), (w, 0, h), (-w, 0, h)], dtype=float)
+    triangles = np.array([(0, 1, 2), (0, 2, 3)])
+    return vertices, triangles
+
+class TestFrustum(unittest.TestCase):
+    """Test cases for the projector frustum math."""
+
+    def test_default_orientation(self):
+        """An unrotated projector looks down -Y with +Z up."""
+        rotation = look_at_rotations([(0, 0, 0)], [(0, -5, 0)])[0]
+        np.testing.assert_allclose(rotation, np.eye(3), atol=1e-12)
+
+    def test_image_edges(self):
+        """Points on the image edge project to u/v of 0 and 1."""
+        projectors = ProjectorArrays([(0, 0, 0)], np.eye(3)[None], 2.0, 16 / 9)
+        # At 4 m a TR 2.0 image is 2 m wide and 1.125 m high
+        points = np.array([(1.0, -4.0, 0.0), (-1.0, -4.0, 0.5625), (0, 4.0, 0)])
+        u, v, depth = project_points(projectors, points)
+        # Looking down -Y with +Z up, image right is world -X
+        np.testing.assert_allclose(u[0, :2], [0.0, 1.0])
+        np.testing.assert_allclose(v[0, :2], [0.5, 1.0])
+        self.assertFalse(inside_image(u, v, depth)[0, 2])
+
+class TestPlacement(unittest.TestCase):
+    """Test cases for the placement search."""
+
+    def make_problem(self, overlap=0.1):
+        vertices, triangles = wall()
+        samples = sample_surface(vertices, triangles, 1500, seed=1)
+        return PlacementProblem(samples, [(-4, -10, -1)], [(4, -8, 1)],
+                                throw_ratio_min=1.5, throw_ratio_max=2.5,
+                                aspect=16 / 9, lumens=10000,
+                                overlap=overlap, target_coverage=0.98)
+
+    def test_greedy_cover(self):
+        """Greedy cover picks the two disjoint sets over the overlapping ones."""
+        coverage = np.array([[1, 1, 0, 0],
+                             [0, 0, 1, 1],
+                             [0, 1, 1, 0],
+                             [1, 0, 0, 0]], dtype=bool)
+        chosen, covered = greedy_cover(coverage, np.ones(4))
+        self.assertEqual(sorted(chosen), [0, 1])
+        self.assertEqual(covered, 4.0)
+
+    def test_serial_search_covers_wall(self):
+        """An 8 m wall from 8-10 m with TR >= 1.5 needs two or more projectors."""
+        problem = self.make_problem()
+        best = PlacementSearch(problem, candidate_count=1024, max_workers=0, seed=3).run()
+        self.assertGreaterEqual(best.covered_fraction, 0.95)
+        self.assertGreaterEqual(best.projector_count, 2)
+        self.assertLessEqual(best.projector_count, 8)
+        self.assertEqual(best.candidates_evaluated, 1024)
+
+        # Every chosen projector covers part of the wall
+        u, v, depth = project_points(best.projectors, problem.samples.points)
+        self.assertTrue(inside_image(u, v, depth).any(axis=1).all())
+
+    def test_pool_matches_serial(self):
+        """The process pool gives the same, reproducible result."""
+        problem = self.make_problem()
+        serial = PlacementSearch(problem, candidate_count=512, batch_size=128,
+                                 max_workers=0, seed=5).run()
+        pooled = PlacementSearch(problem, candidate_count=512, batch_size=128,
+                                 max_workers=2, seed=5).run()
+        self.assertEqual(serial.projector_count, pooled.projector_count)
+        np.testing.assert_allclose(serial.projectors.origins, pooled.projectors.origins)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, look_at_rotations
+from blender_projection_system.core.pointcloud import (PointShadowMaps, VoxelGrid, estimate_normals,
+                                                       read_point_cloud, voxel_downsample)
+
+def box_room(spacing, size=(8.0, 6.0, 4.0), seed=0):
+    """Jittered grid points on the six walls of a box room centred at the origin, with inward normals"""
+    rng = np.random.default_rng(seed)
+    half = np.array(size) / 2
+    points = []
+    normals = []
+    for axis in range(3):
+        a, b = [k for k in range(3) if k != axis]
+        u, v = np.meshgrid(np.arange(-half[a], half[a], spacing), np.arange(-half[b], half[b], spacing))
+        for side in (-1, 1):
+            wall = np.zeros((u.size, 3))
+            wall[:, a] = u.ravel() + rng.uniform(0, spacing, u.size)
+            wall[:, b] = v.ravel() + rng.uniform(0, spacing, u.size)
+            wall[:, axis] = side * half[axis]
+            normal = np.zeros((u.size, 3))
+            normal[:, axis] = -side
+            points.append(wall)
+            normals.append(normal)
+    return np.concatenate(points), np.concatenate(normals)
+
+class TestPointCloud(unittest.TestCase):
+    """Test cases for the point-cloud venue support."""
+
+    def test_read(self):
+        """Binary PLY with normals and PTS text read to the same points."""
+        points = np.random.default_rng(1).uniform(-5, 5, (1000, 3)).astype(np.float32)
+        normals = np.tile(np.array([[0, 0, 1]], dtype=np.float32), (1000, 1))
+        with tempfile.TemporaryDirectory() as directory:
+            ply = os.path.join(directory, "scan.ply")
+            records = np.zeros(1000, dtype=[('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('red', 'u1'),
+                                            ('green', 'u1'), ('blue', 'u1'), ('nx', '<f4'),
+                                            ('ny', '<f4'), ('nz', '<f4')])
+            for k, name in enumerate('xyz'):
+                records[name] = points[:, k]
+                records['n' + name] = normals[:, k]
+            header = ("ply\nformat binary_little_endian 1.0\nelement vertex 1000\n"
+                      "property float x\nproperty float y\nproperty float z\n"
+                      "property uchar red\nproperty uchar green\nproperty uchar blue\n"
+                      "property float nx\nproperty float ny\nproperty float nz\nend_header\n")
+            with open(ply, 'wb') as f:
+                f.write(header.encode() + records.tobytes())
+            read, read_normals = read_point_cloud(ply, workers=2)
+            np.testing.assert_array_equal(read, points)
+            np.testing.assert_array_equal(read_normals, normals)
+
+            pts = os.path.join(directory, "scan.pts")
+            with open(pts, 'w') as f:
+                f.write("1000\n# intensity and colour columns\n")
+                for x, y, z in points:
+                    f.write(f"{x:.9g} {y:.9g} {z:.9g} 12 200 100 50\n")
+            read, read_normals = read_point_cloud(pts, workers=1)
+            np.testing.assert_allclose(read, points)
+            # Colours are no unit vectors
+            self.assertIsNone(read_normals)
+
+    def test_normals_and_area(self):
+        """Normals face into the room and the weights add up to its surface area."""
+        points, normals = box_room(0.05)
+        downsampled, _ = voxel_downsample(points, 0.04)
+        self.assertLess(len(downsampled), len(points))
+
+        estimated, weights = estimate_normals(points, 0.2)
+        # Edges of the box mix two walls; everywhere else the wall normal is found
+        self.assertGreater(np.mean(np.einsum('ij,ij->i', estimated, normals) > 0.99), 0.9)
+        area = 2 * (8 * 6 + 8 * 4 + 6 * 4)
+        self.assertAlmostEqual(weights.sum(), area, delta=0.05 * area)
+
+        grid = VoxelGrid(points, 0.2)
+        self.assertEqual(grid.counts.sum(), len(points))
+        np.testing.assert_array_equal(grid.find(grid.cells[:10]), np.arange(10))
+        self.assertEqual(grid.find([[-1, 0, 0]])[0], -1)
+
+    def test_splat_occlusion(self):
+        """A surveyed pillar shadows the wall behind it but not itself or the rest of the wall."""
+        points, _ = box_room(0.05)
+        # A 1 m square pillar between the projector and the far wall
+        pillar = np.random.default_rng(2).uniform([-0.5, -0.5, -2], [0.5, 0.5, 2], (40000, 3))
+        pillar[:, 0] = np.where(pillar[:, 1] > 0, pillar[:, 0], -0.5)
+        pillar[:, 1] = np.where(pillar[:, 1] > 0, -0.5, pillar[:, 1])
+        points = np.concatenate([points, pillar])
+        origins = np.array([[0.0, -2.9, 0.0]])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, [[0, 3, 0]]), 0.6, 16 / 9)
+        maps = PointShadowMaps(projectors, np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64), points,
+                               0.05, resolution=512)
+
+        behind = np.array([[0.0, 3.0, 0.0], [0.2, 3.0, 0.5]])
+        beside = np.array([[2.5, 3.0, 0.0], [-2.5, 3.0, -1.0]])
+        front = np.array([[0.0, -0.5, 0.0], [0.3, -0.5, 1.0]])
+        self.assertFalse(maps.visible(0, behind).any())
+        self.assertTrue(maps.visible(0, beside).all())
+        self.assertTrue(maps.visible(0, front).all())
+
+if __name__ == '__main__':
+    unittest.main()
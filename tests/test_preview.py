@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, look_at_rotations, project_points
+from blender_projection_system.core.image_io import decode_png16, encode_png16
+from blender_projection_system.core.preview import camera_view, grid_pattern, render_preview
+from blender_projection_system.core.shadowmap import ShadowMaps
+
+def wall(y=0.0, half=10.0):
+    """A 2 * half square wall in the plane y, facing -Y"""
+    vertices = np.array([[-half, y, -half], [half, y, -half], [half, y, half], [-half, y, half]])
+    return vertices, np.array([[0, 1, 2], [0, 2, 3]])
+
+def camera_matrix(origin, target):
+    """World matrix of a camera at origin looking at target with +Z up"""
+    arrays = ProjectorArrays(origin, look_at_rotations([origin], [target]), 1.0, 1.0)
+    matrix = np.eye(4)
+    # Camera X = image right, Y = up, Z = backwards
+    matrix[:3, 0] = arrays.right[0]
+    matrix[:3, 1] = arrays.up[0]
+    matrix[:3, 2] = -arrays.forward[0]
+    matrix[:3, 3] = origin
+    return matrix
+
+WHITE = np.ones((2, 2, 3))
+
+class TestPreview(unittest.TestCase):
+    """Test cases for the CPU preview renderer."""
+
+    def test_camera_view(self):
+        """Points project where a Blender camera with the same settings puts them."""
+        matrix = camera_matrix((0.0, -5.0, 0.0), (0.0, 0.0, 0.0))
+        view = camera_view(matrix, 50.0, 36.0, width=1600, height=900)
+        u, v, depth = project_points(view, [[0.0, 0.0, 0.0], [1.0, 0.0, 0.5]])
+        np.testing.assert_allclose(u[0], [0.5, 0.5 + 1.0 / 5.0 * 50.0 / 36.0])
+        np.testing.assert_allclose(v[0], [0.5, 0.5 + 0.5 / 5.0 * 50.0 / 36.0 * 16 / 9])
+        np.testing.assert_allclose(depth[0], [5.0, 5.0])
+
+        # Portrait images fit the sensor vertically; shifts follow the fitted edge
+        view = camera_view(matrix, 50.0, 36.0, shift_x=0.1, shift_y=0.2, width=900, height=1600)
+        u, v, _ = project_points(view, [[0.0, 0.0, 0.0]])
+        np.testing.assert_allclose(view.throw_ratio, 50.0 / 36.0 * 1600 / 900)
+        np.testing.assert_allclose([u[0, 0], v[0, 0]], [0.5 - 0.1 * 1600 / 900, 0.3])
+
+    def test_grid_pattern(self):
+        """Corner colours match the projection material's test grid."""
+        colour = grid_pattern(np.array([0.01, 0.99, 0.01, 0.99, 0.5, 0.3]),
+                              np.array([0.01, 0.01, 0.99, 0.99, 0.5, 0.3]))
+        np.testing.assert_allclose(colour, [[1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 0],
+                                            [1, 1, 1], [0.1, 0.1, 0.1]])
+
+    def test_luminance_of_single_projector(self):
+        """A white image lights the wall with its photometric luminance."""
+        vertices, triangles = wall()
+        origins = np.array([[0.0, -4.0, 0.0]])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, [[0.0, 0.0, 0.0]]), 1.0, 16 / 9,
+                                     lumens=10000.0)
+        view = camera_view(camera_matrix((0.0, -6.0, 0.0), (0.0, 0.0, 0.0)), 20.0, 36.0, width=320, height=180)
+        render = render_preview(view, projectors, vertices, triangles, 320, content=[WHITE], gain=1.5)
+
+        self.assertTrue((render.triangle >= 0).all())
+        centre = render.luminance[90, 160]
+        expected = 10000.0 * 16 / 9 / 16.0 * 1.5 / np.pi
+        np.testing.assert_allclose(centre, expected, rtol=1e-3)
+        # The image covers 4 x 2.25 m of the 11.6 m wide view
+        lit_width = (render.projectors[90] > 0).sum()
+        self.assertAlmostEqual(lit_width / 320, 4.0 / (6.0 * 36.0 / 20.0), delta=2 / 320)
+
+        image = render.image()
+        self.assertEqual(image.shape, (180, 320, 3))
+        self.assertTrue(((image >= 0) & (image <= 1)).all())
+
+    def test_blend_evens_out_overlap(self):
+        """With blending the overlap is as bright as the single-projector areas."""
+        vertices, triangles = wall()
+        origins = np.array([[-1.5, -4.0, 0.0], [1.5, -4.0, 0.0]])
+        targets = origins + (0.0, 4.0, 0.0)
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, targets), 1.0, 16 / 9)
+        view = camera_view(camera_matrix((0.0, -6.0, 0.0), (0.0, 0.0, 0.0)), 20.0, 36.0, width=320, height=180)
+        # Flat walls lit head-on: both projectors give the same illuminance everywhere
+        row = 90
+
+        unblended = render_preview(view, projectors, vertices, triangles, 320, content=[WHITE, WHITE])
+        lit = unblended.projectors[row] > 0
+        values = unblended.luminance[row, lit, 0]
+        self.assertAlmostEqual(values.max() / values.min(), 2.0, delta=0.05)
+
+        blended = render_preview(view, projectors, vertices, triangles, 320, content=[WHITE, WHITE],
+                                 blend=[0.3, 0.3])
+        self.assertEqual((blended.projectors[row] == 2).sum(), (unblended.projectors[row] == 2).sum())
+        values = blended.luminance[row, lit, 0]
+        self.assertAlmostEqual(values.max() / values.min(), 1.0, delta=0.05)
+
+    def test_shadow(self):
+        """An occluder between projector and wall leaves a dark patch."""
+        wall_vertices, wall_triangles = wall()
+        # A 1 x 1 m panel halfway to the wall
+        panel = np.array([[-0.5, -2.0, -0.5], [0.5, -2.0, -0.5], [0.5, -2.0, 0.5], [-0.5, -2.0, 0.5]])
+        vertices = np.concatenate([wall_vertices, panel])
+        triangles = np.concatenate([wall_triangles, wall_triangles + 4])
+        origins = np.array([[0.0, -4.0, 0.0]])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, [[0.0, 0.0, 0.0]]), 1.0, 16 / 9)
+        # Seen from the side, so the shadow on the wall is not hidden behind the panel
+        view = camera_view(camera_matrix((3.0, -6.0, 0.0), (0.0, 0.0, 0.0)), 20.0, 36.0, width=320, height=180)
+
+        maps = ShadowMaps(projectors, vertices, triangles, 1024)
+        render = render_preview(view, projectors, vertices, triangles, 320, content=[WHITE],
+                                visible=maps.visible)
+        open_render = render_preview(view, projectors, vertices, triangles, 320, content=[WHITE])
+
+        on_wall = np.isin(render.triangle, [0, 1])
+        shadowed = on_wall & (open_render.projectors > 0) & (render.projectors == 0)
+        self.assertGreater(shadowed.sum(), 100)
+        # The panel itself is lit from the front
+        self.assertTrue((render.projectors[np.isin(render.triangle, [2, 3])] > 0).all())
+
+    def test_write_rgb_png(self):
+        """Previews are written as 16-bit RGB PNGs."""
+        rng = np.random.default_rng(0)
+        image = rng.random((31, 17, 3))
+        decoded = decode_png16(encode_png16(image))
+        self.assertEqual(decoded.shape, (31, 17, 3))
+        np.testing.assert_allclose(decoded, image, atol=1 / 65535)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.proxy import compact_triangles, proxy_mesh, weld_vertices
+from blender_projection_system.core.sampling import triangle_areas_normals
+
+def height(x, y):
+    """A gently curved 10 x 10 m scan surface"""
+    return 0.3 * np.sin(x) * np.cos(y)
+
+def scan(n):
+    """An n x n quad grid over the surface, every triangle with its own vertices like an unwelded scan"""
+    x, y = np.meshgrid(np.linspace(0, 10, n + 1), np.linspace(0, 10, n + 1))
+    vertices = np.column_stack([x.ravel(), y.ravel(), height(x, y).ravel()])
+    corner = (np.arange(n)[:, None] * (n + 1) + np.arange(n)[None, :]).ravel()
+    triangles = np.concatenate([np.column_stack([corner, corner + 1, corner + n + 2]),
+                                np.column_stack([corner, corner + n + 2, corner + n + 1])])
+    split = vertices[triangles].reshape(-1, 3)
+    return split, np.arange(len(split)).reshape(-1, 3)
+
+class TestProxy(unittest.TestCase):
+    """Test cases for the analysis proxy decimation."""
+
+    def test_weld(self):
+        """Coincident vertices merge into one connected mesh."""
+        vertices, triangles = scan(40)
+        welded_vertices, welded_triangles = weld_vertices(vertices, triangles, 1e-4)
+        self.assertEqual(len(welded_vertices), 41 * 41)
+        self.assertEqual(len(welded_triangles), len(triangles))
+        np.testing.assert_allclose(welded_vertices[welded_triangles], vertices[triangles], atol=1e-12)
+
+    def test_decimate_to_budget(self):
+        """The proxy fits the triangle budget and stays on the scanned surface."""
+        vertices, triangles = scan(300)
+        proxy_vertices, proxy_triangles, cell = proxy_mesh(vertices, triangles, 5000)
+        self.assertLessEqual(len(proxy_triangles), 5500)
+        self.assertGreater(len(proxy_triangles), 2500)
+        self.assertGreater(cell, 0)
+
+        # Vertices move by less than a cell, and the area is kept up to the trimmed border
+        deviation = np.abs(proxy_vertices[:, 2] - height(proxy_vertices[:, 0], proxy_vertices[:, 1]))
+        self.assertLess(deviation.max(), 0.1 * cell)
+        area = triangle_areas_normals(proxy_vertices, proxy_triangles)[0].sum()
+        self.assertAlmostEqual(area, triangle_areas_normals(vertices, triangles)[0].sum(), delta=4 * 10 * cell)
+
+        # Small meshes pass through unchanged
+        small_vertices, small_triangles = scan(10)
+        _, kept, cell = proxy_mesh(small_vertices, small_triangles, 5000)
+        self.assertEqual((len(kept), cell), (200, 0.0))
+
+    def test_compact(self):
+        """Degenerate and duplicated triangles go; both sides of a thin wall stay."""
+        vertices = np.array([[0.0, 0, 0], [1, 0, 0], [0, 1, 0], [5, 5, 5]])
+        triangles = np.array([[0, 1, 2], [1, 2, 0], [0, 2, 1], [0, 0, 1]])
+        kept_vertices, kept = compact_triangles(vertices, triangles)
+        self.assertEqual(len(kept_vertices), 3)
+        np.testing.assert_array_equal(kept, [[0, 1, 2], [0, 2, 1]])
+
+if __name__ == '__main__':
+    unittest.main()
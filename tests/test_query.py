@@ -0,0 +1,106 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import (ProjectorArrays, inside_image, look_at_rotations,
+                                                    project_points)
+from blender_projection_system.core.query import ProjectorQuery
+from blender_projection_system.core.raycast import BoxHierarchy, TriangleBVH
+
+def random_rig(count, seed=0):
+    """Projectors scattered around a room, aimed at random points near its centre"""
+    rng = np.random.default_rng(seed)
+    origins = rng.uniform(-10, 10, (count, 3))
+    targets = rng.uniform(-3, 3, (count, 3))
+    return ProjectorArrays(origins, look_at_rotations(origins, targets), rng.uniform(0.8, 2.0, count),
+                           16 / 9, shift=rng.uniform(-0.2, 0.2, (count, 2)))
+
+class TestProjectorQuery(unittest.TestCase):
+    """Test cases for the projector frustum queries."""
+
+    def test_box_overlaps(self):
+        """The box hierarchy finds exactly the overlapping pairs."""
+        rng = np.random.default_rng(1)
+        lo = rng.uniform(0, 10, (500, 3))
+        hi = lo + rng.uniform(0, 1, (500, 3))
+        query_lo = rng.uniform(0, 10, (200, 3))
+        query_hi = query_lo + rng.uniform(0, 2, (200, 3))
+        query, item = BoxHierarchy(lo, hi).overlapping(query_lo, query_hi, batch_size=64)
+
+        expected = (np.all(query_lo[:, None] <= hi[None], axis=2) &
+                    np.all(query_hi[:, None] >= lo[None], axis=2))
+        found = np.zeros_like(expected)
+        found[query, item] = True
+        np.testing.assert_array_equal(found, expected)
+        self.assertTrue(np.all(np.diff(query) >= 0))
+
+    def test_points(self):
+        """Projectors at points match projecting every point into every projector."""
+        projectors = random_rig(40)
+        rng = np.random.default_rng(2)
+        points = rng.uniform(-6, 6, (3000, 3))
+        normals = rng.normal(size=(3000, 3))
+        query = ProjectorQuery(projectors, far=30.0)
+
+        u, v, depth = project_points(projectors, points)
+        toward = projectors.origins[:, None] - points[None]
+        expected = (inside_image(u, v, depth) & (depth <= 30.0) &
+                    (np.einsum('nmk,mk->nm', toward, normals) > 0))
+        indptr, indices = query.projectors_at(points, normals)
+        found = np.zeros_like(expected)
+        found[indices, np.repeat(np.arange(len(points)), np.diff(indptr))] = True
+        np.testing.assert_array_equal(found, expected)
+
+        # Occlusion is asked once per projector, for its own candidates only
+        calls = []
+        def hidden_above(index, pts):
+            calls.append(index)
+            return pts[:, 2] < 0
+        point, projector = query.point_pairs(points, visible=hidden_above)
+        self.assertEqual(len(calls), len(set(calls)))
+        self.assertTrue(np.all(points[point, 2] < 0))
+        self.assertGreater(len(point), 0)
+
+        # Nothing is reported beyond the far distance
+        near = ProjectorQuery(projectors, far=2.0)
+        point, projector = near.point_pairs(points)
+        depth_of_pairs = depth[projector, point]
+        self.assertTrue(np.all(depth_of_pairs <= 2.0))
+
+    def test_surfaces(self):
+        """Face sets and surfaces keep every lit triangle and skip distant ones."""
+        projectors = random_rig(12, seed=3)
+        rng = np.random.default_rng(4)
+        centres = rng.uniform(-8, 8, (2000, 3))
+        vertices = (centres[:, None] + rng.uniform(-0.2, 0.2, (2000, 3, 3))).reshape(-1, 3)
+        triangles = np.arange(len(vertices)).reshape(-1, 3)
+        query = ProjectorQuery(projectors, far=40.0)
+
+        # Triangles with a lit corner must be found for that projector
+        u, v, depth = project_points(projectors, vertices)
+        lit_corner = inside_image(u, v, depth).reshape(len(projectors), -1, 3).any(axis=2)
+        triangle, projector = query.triangle_pairs(vertices, triangles, facing=False)
+        found = np.zeros_like(lit_corner)
+        found[projector, triangle] = True
+        self.assertTrue(np.all(found[lit_corner]))
+
+        touching = query.projectors_touching(vertices, triangles[:50], facing=False)
+        np.testing.assert_array_equal(touching, np.flatnonzero(found[:, :50].any(axis=1)))
+
+        bvh = TriangleBVH(vertices, triangles)
+        triangle_object = np.arange(len(triangles)) % 7
+        for index in range(len(projectors)):
+            lit = query.surface_triangles(index, bvh, facing=False)
+            np.testing.assert_array_equal(lit, np.flatnonzero(found[index]))
+            objects, counts = query.surfaces(index, bvh, triangle_object, facing=False)
+            self.assertEqual(counts.sum(), len(lit))
+            self.assertTrue(np.all(np.diff(counts) <= 0))
+
+if __name__ == '__main__':
+    unittest.main()
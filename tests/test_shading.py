@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.blending import edge_weight
+from blender_projection_system.core.frustum import (
+    ProjectorArrays,
+    inside_image,
+    look_at_rotations,
+    project_points,
+)
+from blender_projection_system.core.shading import (
+    SLOT_ROWS,
+    assign_slots,
+    lookup_coordinates,
+    pack_parameters,
+    slot_capacity,
+)
+
+def wall_projectors(n, seed=0):
+    """Projectors in front of the y=0 wall with random aim and lens shift."""
+    rng = np.random.default_rng(seed)
+    origins = np.column_stack([rng.uniform(-8, 8, n), rng.uniform(-9, -5, n), rng.uniform(-1, 2, n)])
+    targets = np.column_stack([origins[:, 0] + rng.uniform(-1, 1, n), np.zeros(n), rng.uniform(-1, 1, n)])
+    return ProjectorArrays(origins, look_at_rotations(origins, targets), rng.uniform(0.8, 1.6, n), 16 / 9,
+                           shift=rng.uniform(-0.2, 0.2, (n, 2)))
+
+class TestShading(unittest.TestCase):
+    """Test cases for the shared projection shader parameters."""
+
+    def test_capacity(self):
+        """The lookup texture grows in powers of two."""
+        self.assertEqual(slot_capacity(0), 64)
+        self.assertEqual(slot_capacity(64), 64)
+        self.assertEqual(slot_capacity(65), 128)
+        self.assertEqual(slot_capacity(300, minimum=1), 512)
+
+    def test_lookup_matches_projection(self):
+        """The shader math on the packed texels reproduces project_points."""
+        projectors = wall_projectors(60)
+        slots = np.random.default_rng(1).permutation(100)[:60]
+        texels = pack_parameters(projectors, slots, slot_capacity(100), blend=0.1)
+        self.assertEqual(texels.shape, (SLOT_ROWS, 128, 4))
+        self.assertEqual(texels.dtype, np.float32)
+
+        rng = np.random.default_rng(2)
+        points = np.column_stack([rng.uniform(-10, 10, 5000), np.zeros(5000), rng.uniform(-4, 4, 5000)])
+        u, v, depth = project_points(projectors, points)
+        for index in (0, 17, 59):
+            lu, lv, weight = lookup_coordinates(texels, np.full(len(points), slots[index]), points)
+            inside = inside_image(u[index], v[index], depth[index])
+            np.testing.assert_allclose(lu[inside], u[index, inside], atol=1e-5)
+            np.testing.assert_allclose(lv[inside], v[index, inside], atol=1e-5)
+            expected = np.where(inside, edge_weight(u[index], v[index], 0.1), 0.0)
+            np.testing.assert_allclose(weight, expected, atol=1e-4)
+
+        # Unused and missing slots never light anything
+        unused = np.setdiff1d(np.arange(128), slots)[0]
+        self.assertFalse(lookup_coordinates(texels, np.full(len(points), unused), points)[2].any())
+        self.assertFalse(lookup_coordinates(texels, np.full(len(points), -1), points)[2].any())
+
+    def test_assign_slots(self):
+        """Faces get the projectors reaching them furthest inside the image."""
+        origins = np.array([[-1.5, -4.0, 0.0], [1.5, -4.0, 0.0], [0.0, -4.0, 0.0]])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, origins + (0, 4, 0)), 1.0, 16 / 9)
+        slots = np.array([5, 2, 9])
+        x = np.linspace(-3.4, 3.4, 69)
+        points = np.column_stack([x, np.zeros_like(x), np.zeros_like(x)])
+        normals = np.tile([0.0, -1.0, 0.0], (len(x), 1))
+        assigned = assign_slots(projectors.subset([0, 1]), slots[:2], points, normals, blend=0.3)
+        self.assertEqual(assigned.shape, (2, len(x)))
+
+        # Left of centre the left projector leads, the right one follows in the overlap
+        self.assertEqual(assigned[0, 20], 5)
+        self.assertEqual(assigned[0, 48], 2)
+        self.assertEqual(assigned[1, 34], 2 if assigned[0, 34] == 5 else 5)
+        self.assertEqual(assigned[1, 0], -1)
+        # Faces turned away stay unlit
+        self.assertTrue((assign_slots(projectors, slots, points, -normals) == -1).all())
+        # The centred projector wins where it overlaps
+        assigned = assign_slots(projectors, slots, points, normals, blend=0.3)
+        self.assertEqual(assigned[0, 34], 9)
+
+if __name__ == '__main__':
+    unittest.main()
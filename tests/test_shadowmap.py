@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import (
+    ProjectorArrays,
+    inside_image,
+    look_at_rotations,
+    project_points,
+)
+from blender_projection_system.core.raycast import TriangleBVH, ray_visibility
+from blender_projection_system.core.sampling import sample_surface
+from blender_projection_system.core.shadowmap import (
+    GUARD,
+    ShadowMapCache,
+    ShadowMaps,
+    clip_near,
+    rasterize_depth,
+)
+from blender_projection_system.core.surface_metrics import analyze_surface_metrics
+
+def floor_with_table(cells=120):
+    """A 20 x 20 m floor at z=0 and a 2 x 2 m table top at z=1 above the centre."""
+    xs = np.linspace(-10, 10, cells + 1)
+    x, y = np.meshgrid(xs, xs)
+    vertices = np.column_stack([x.ravel(), y.ravel(), np.zeros(x.size)])
+    i, j = np.meshgrid(np.arange(cells), np.arange(cells))
+    a = (j * (cells + 1) + i).ravel()
+    n = cells + 1
+    triangles = np.concatenate([np.column_stack([a, a + 1, a + n + 1]),
+                                np.column_stack([a, a + n + 1, a + n])])
+    floor_triangles = len(triangles)
+    table = np.array([[-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]], dtype=float)
+    triangles = np.concatenate([triangles, np.array([[0, 1, 2], [0, 2, 3]]) + len(vertices)])
+    return np.concatenate([vertices, table]), triangles, floor_triangles
+
+def overhead_projectors():
+    origins = np.array([[0.0, 0.0, 6.0], [4.0, -3.0, 5.0], [-5.0, 4.0, 7.0]])
+    return ProjectorArrays(origins, look_at_rotations(origins, np.zeros((3, 3))), 0.6, 16 / 9)
+
+class TestShadowMap(unittest.TestCase):
+    """Test cases for the shadow-map visibility engine."""
+
+    def test_clip_near(self):
+        """Triangles cut by the near plane keep only their front part."""
+        triangles = np.array([
+            [[0, 0, 1], [1, 0, 2], [0, 1, 3]],      # fully in front
+            [[0, 0, -1], [1, 0, -2], [0, 1, -3]],   # fully behind
+            [[0, 0, 2], [1, 0, -1], [0, 1, -1]],    # one corner in front
+            [[0, 0, 2], [1, 0, 2], [0, 1, -2]],     # two corners in front
+        ], dtype=float)
+        clipped = clip_near(triangles, near=0.5)
+        self.assertEqual(len(clipped), 1 + 1 + 2)
+        self.assertTrue((clipped[:, :, 2] >= 0.5 - 1e-12).all())
+
+    def test_depth_of_wall(self):
+        """A wall facing the projector fills the map with its distance."""
+        vertices = np.array([[-20, 5, -20], [20, 5, -20], [20, 5, 20], [-20, 5, 20]], dtype=float)
+        triangles = np.array([[0, 1, 2], [0, 2, 3]])
+        origins = np.array([[1.0, -3.0, 0.5]])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, [[1.0, 0.0, 0.5]]), 1.2, 16 / 9,
+                                     shift=(0.1, -0.2))
+        depth = rasterize_depth(projectors, 0, vertices, triangles, resolution=256)
+        self.assertEqual(depth.shape, (144 + 2 * GUARD, 256 + 2 * GUARD))
+        np.testing.assert_allclose(depth, 8.0, rtol=1e-6)
+
+    def test_matches_ray_casting(self):
+        """Shadow maps agree with ray casting except at shadow edges."""
+        vertices, triangles, floor_triangles = floor_with_table()
+        projectors = overhead_projectors()
+        samples = sample_surface(vertices, triangles[:floor_triangles], 100000, 1)
+        u, v, depth = project_points(projectors, samples.points)
+        candidates = inside_image(u, v, depth)
+        index = np.arange(len(projectors))
+
+        maps = ShadowMaps(projectors, vertices, triangles, resolution=1024)
+        shadow = maps.visibility(samples.points)(index, slice(None), candidates)
+        bvh = TriangleBVH(vertices, triangles)
+        traced = ray_visibility(bvh, projectors.origins, samples.points)(index, slice(None), candidates)
+
+        self.assertFalse(shadow[~candidates].any())
+        self.assertGreater((shadow == traced)[candidates].mean(), 0.995)
+        # Straight under the table the floor is dark for the overhead projector
+        under = np.linalg.norm(samples.points[:, :2], axis=1) < 0.8
+        self.assertFalse(shadow[0, under].any())
+
+    def test_analysis_with_occlusion(self):
+        """The analyses only count the floor the table does not shade."""
+        vertices, triangles, floor_triangles = floor_with_table()
+        origins = np.array([[0.0, 0.0, 6.0]])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, np.zeros((1, 3))), 0.6, 1.0)
+        samples = sample_surface(vertices, triangles[:floor_triangles], 200000, 2)
+        open_floor = analyze_surface_metrics(projectors, samples)
+        # The 2 x 2 m table at z=1 shades a 2.4 x 2.4 m square of the floor,
+        # resolved to about a texel (10 m / resolution) on every side
+        for resolution in (256, 1024):
+            maps = ShadowMaps(projectors, vertices, triangles, resolution)
+            shaded = analyze_surface_metrics(projectors, samples, visibility=maps.visibility(samples.points))
+            shadow = np.sqrt(open_floor.lit_area[0] - shaded.lit_area[0])
+            texel = 10.0 / resolution
+            self.assertGreater(shadow, 2.4 - 4 * texel)
+            self.assertLess(shadow, 2.4 + 0.05)
+
+    def test_cache(self):
+        """Maps are reused until the projector or the geometry changes."""
+        vertices, triangles, _ = floor_with_table(cells=20)
+        projectors = overhead_projectors()
+        cache = ShadowMapCache()
+        first = ShadowMaps(projectors, vertices, triangles, 256, cache, "geometry")
+        depth = first.depth_map(1)
+        self.assertEqual(len(cache), 1)
+        second = ShadowMaps(projectors, vertices, triangles, 256, cache, "geometry")
+        self.assertIs(second.depth_map(1), depth)
+
+        projectors.origins[1] += (0.5, 0.0, 0.0)
+        moved = ShadowMaps(projectors, vertices, triangles, 256, cache, "geometry")
+        self.assertIsNot(moved.depth_map(1), depth)
+        edited = ShadowMaps(projectors, vertices, triangles, 256, cache, "edited geometry")
+        edited.depth_map(1)
+        self.assertEqual(len(cache), 3)
+
+        cache.max_bytes = depth.nbytes
+        cache.put("extra", depth.copy())
+        self.assertEqual(len(cache), 1)
+
+if __name__ == '__main__':
+    unittest.main()
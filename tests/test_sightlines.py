@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.raycast import TriangleBVH
+from blender_projection_system.core.sampling import sample_surface
+from blender_projection_system.core.sightlines import (analyze_sightlines, read_seat_list, seat_grid,
+                                                       sweep_boxes)
+
+def box_mesh(lo, hi, inward=False):
+    """Triangles of an axis-aligned box"""
+    lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+    vertices = np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    quads = [[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1], [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]]
+    triangles = np.array([[q[0], q[1], q[2]] for q in quads] + [[q[0], q[2], q[3]] for q in quads])
+    if inward:
+        triangles = triangles[:, ::-1]
+    return vertices, triangles
+
+def hall():
+    """A 20 x 30 x 8 m hall with a screen on the far wall, a pillar and a balcony slab over the back rows"""
+    parts = [box_mesh([-10, 0, 0], [10, 30, 8], inward=True), box_mesh([2, 14, 0], [3, 15, 8]),
+             box_mesh([-10, 0, 3.0], [10, 6, 3.3])]
+    vertices = np.concatenate([part[0] for part in parts])
+    triangles = np.concatenate([part[1] + 8 * index for index, part in enumerate(parts)])
+    screen = np.array([[-6, 29.99, 1.5], [6, 29.99, 1.5], [6, 29.99, 7.5], [-6, 29.99, 7.5]])
+    samples = sample_surface(screen, np.array([[0, 1, 2], [0, 2, 3]]), 3000, seed=2)
+    return vertices, triangles, samples
+
+class TestSightlines(unittest.TestCase):
+    """Test cases for the seat sightline analysis."""
+
+    def test_seat_grid(self):
+        """Straight and curved rows keep their seat spacing and rake."""
+        straight = seat_grid(3, 4, seat_width=0.5, row_depth=1.0, rake=0.2)
+        self.assertEqual(straight.shape, (12, 3))
+        np.testing.assert_allclose(straight[:4, 0], [-0.75, -0.25, 0.25, 0.75])
+        np.testing.assert_allclose(straight[8], [-0.75, -2.0, 0.4])
+
+        curved = seat_grid(2, 5, seat_width=0.5, row_depth=1.0, radius=10.0)
+        centre = np.array([0.0, 10.0])
+        np.testing.assert_allclose(np.linalg.norm(curved[:5, :2] - centre, axis=1), 10.0)
+        np.testing.assert_allclose(np.linalg.norm(curved[5:, :2] - centre, axis=1), 11.0)
+        self.assertAlmostEqual(np.linalg.norm(curved[1] - curved[2]), 0.5, places=2)
+
+    def test_read_seat_list(self):
+        """Headers are skipped and labels are optional."""
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "seats.csv")
+            with open(path, "w") as handle:
+                handle.write("x,y,z,seat\n1,2,3,A1\n4,5,6\n")
+            positions, labels = read_seat_list(path)
+        np.testing.assert_allclose(positions, [[1, 2, 3], [4, 5, 6]])
+        self.assertEqual(labels, ["A1", ""])
+
+    def test_sweep_covers_segments(self):
+        """Every segment between two boxes stays inside the swept boxes."""
+        rng = np.random.default_rng(0)
+        a_lo, b_lo = rng.uniform(-5, 5, (2, 3))
+        a_hi, b_hi = a_lo + rng.uniform(0, 2, 3), b_lo + rng.uniform(0, 2, 3)
+        lo, hi = sweep_boxes(a_lo[None], a_hi[None], b_lo[None], b_hi[None], 4)
+        a = rng.uniform(a_lo, a_hi, (500, 3))
+        b = rng.uniform(b_lo, b_hi, (500, 3))
+        t = rng.uniform(0, 1, (500, 1))
+        points = a + (b - a) * t
+        inside = np.all((points[:, None] >= lo[0] - 1e-12) & (points[:, None] <= hi[0] + 1e-12), axis=2)
+        self.assertTrue(inside.any(axis=1).all())
+
+    def test_matches_ray_casts(self):
+        """Bundled culling sees exactly what one ray per sight line sees."""
+        vertices, triangles, samples = hall()
+        bvh = TriangleBVH(vertices, triangles)
+        seats = seat_grid(12, 10, rake=0.15) + [0.0, 12.0, 1.15]
+        groups = (samples.points[:, 0] > 0).astype(np.int64)
+        result = analyze_sightlines(seats, samples, groups, bvh, max_angle=60.0, group_size=8, tile_size=64)
+
+        origins = np.repeat(seats, len(samples), axis=0)
+        targets = np.tile(samples.points, (len(seats), 1))
+        offset = origins - targets
+        distance = np.linalg.norm(offset, axis=1)
+        facing = np.einsum('ij,ij->i', offset, np.tile(samples.normals, (len(seats), 1))) / distance
+        seen = (~bvh.occluded(origins, targets) & (facing > np.cos(np.radians(60.0)))).reshape(len(seats), -1)
+
+        np.testing.assert_array_equal(result.sample_seats, seen.sum(axis=0))
+        expected = np.stack([(seen * samples.weights)[:, groups == g].sum(axis=1) for g in (0, 1)], axis=1)
+        np.testing.assert_allclose(result.area, expected)
+        # The pillar and the balcony hide part of the screen from some seats, not from all
+        self.assertTrue(0.0 < result.clear_view(0.99).min() < 1.0)
+        self.assertAlmostEqual(result.group_area.sum(), 72.0)
+        summary = result.summary(0)
+        self.assertTrue(0 < summary["angle_mean"] < 60)
+        self.assertTrue(summary["distance_min"] < summary["distance_max"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.stats import MAX_WARNINGS, ProjectorStats
+
+class TestProjectorStats(unittest.TestCase):
+    """Test cases for the incrementally maintained projector statistics."""
+
+    def test_incremental_totals(self):
+        """Updates move a projector between collections without recounting."""
+        stats = ProjectorStats()
+        stats.set(1, "PJ1", "Front")
+        stats.set(2, "PJ2", "Front")
+        stats.set(3, "PJ3", "")
+        self.assertEqual(stats.projector_count, 3)
+        self.assertEqual(stats.collection_counts["Front"], 2)
+
+        stats.set(2, "PJ2", "Side")
+        stats.discard(3)
+        stats.discard(99)
+        self.assertEqual(stats.projector_count, 2)
+        self.assertEqual(dict(stats.collection_counts), {"Front": 1, "Side": 1})
+
+    def test_warnings(self):
+        """Empty and missing collections and a stale overlap graph are reported."""
+        stats = ProjectorStats()
+        stats.set(1, "PJ1", "Front")
+        stats.set(2, "PJ2", "Gone")
+        stats.update_warnings(["Front", "Empty"], ["PJ1", "PJ2", "PJ9"])
+        self.assertEqual(stats.overlapping, 2)
+        self.assertEqual(stats.warnings, ["Collection 'Empty' has no projectors",
+                                          "1 projectors in missing collection 'Gone'",
+                                          "1 projectors in the overlap graph no longer exist; "
+                                          "detect overlaps again"])
+
+        stats.update_warnings([f"Empty {i}" for i in range(10)] + ["Front", "Gone"], ["PJ9"])
+        self.assertEqual(len(stats.warnings), MAX_WARNINGS)
+        self.assertEqual(stats.warnings[-1], "... and 7 more")
+
+if __name__ == '__main__':
+    unittest.main()
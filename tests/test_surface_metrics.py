@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, look_at_rotations
+from blender_projection_system.core.sampling import SurfaceSamples
+from blender_projection_system.core.surface_metrics import (
+    aggregate_to_faces,
+    analyze_surface_metrics,
+)
+
+def wall_samples(count, seed=0):
+    """Samples on a 4 x 3 m wall at y=0 facing -Y."""
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(-2, 2, count), np.zeros(count), rng.uniform(-1.5, 1.5, count)])
+    normals = np.tile((0.0, -1.0, 0.0), (count, 1))
+    return SurfaceSamples(points, normals, np.full(count, 12.0 / count), np.zeros(count, dtype=int))
+
+class TestSurfaceMetrics(unittest.TestCase):
+    """Test cases for the pixel density analysis."""
+
+    def test_perpendicular_projector(self):
+        """A square-on 1920 px projector filling 4 m gives 480 px/m and no keystone."""
+        origin = np.array([[0.0, -8.0, 0.0]])
+        projectors = ProjectorArrays(origin, look_at_rotations(origin, [(0, 0, 0)]), 2.0, 4 / 3,
+                                     resolution=(1920, 1440))
+        samples = wall_samples(2000)
+        metrics = analyze_surface_metrics(projectors, samples, min_pixel_density=500)
+
+        np.testing.assert_allclose(metrics.pixels_per_meter, 480.0, rtol=1e-9)
+        np.testing.assert_allclose(metrics.keystone, 1.0, rtol=1e-9)
+        self.assertLess(metrics.incidence_deg.max(), 18.0)
+        self.assertAlmostEqual(metrics.summary(0)["area_below_spec"], 12.0)
+
+    def test_oblique_projector_keystones(self):
+        """An off-axis projector produces a keystone gradient and steep incidence."""
+        origin = np.array([[-6.0, -4.0, 0.0]])
+        rotations = look_at_rotations(origin, [(0, 0, 0)])
+        projectors = ProjectorArrays(origin, rotations, 1.0, 16 / 9)
+        metrics = analyze_surface_metrics(projectors, wall_samples(2000))
+
+        lit = metrics.projector == 0
+        self.assertTrue(lit.any())
+        self.assertGreater(metrics.keystone[lit].max(), 1.5)
+        self.assertGreater(metrics.incidence_deg[lit].max(), 45.0)
+
+    def test_chunking_is_exact(self):
+        """Small chunks give the same answer as one big block."""
+        origins = np.array([(-1.5, -6, 0), (1.5, -6, 0)])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, [(-1, 0, 0), (1, 0, 0)]), 1.5, 16 / 9)
+        samples = wall_samples(5000)
+        full = analyze_surface_metrics(projectors, samples)
+        chunked = analyze_surface_metrics(projectors, samples, chunk_size=333)
+        np.testing.assert_allclose(full.pixels_per_meter, chunked.pixels_per_meter)
+        np.testing.assert_allclose(full.ppm_mean, chunked.ppm_mean)
+        self.assertEqual(full.coverage_count.max(), 2)
+
+    def test_million_samples_vectorized(self):
+        """10^6 samples against a handful of projectors are analysed in one call."""
+        origins = np.array([(x, -8, 0) for x in (-1.5, 0.0, 1.5)])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, origins * (1, 0, 1)), 2.0, 16 / 9)
+        samples = wall_samples(1_000_000)
+        metrics = analyze_surface_metrics(projectors, samples)
+        self.assertEqual(len(metrics.coverage_count), 1_000_000)
+        self.assertEqual(metrics.coverage_count.max(), 3)
+
+    def test_aggregate_to_faces(self):
+        """Per-face values are area-weighted means."""
+        values = aggregate_to_faces(np.array([1.0, 3.0, 5.0]), np.array([1.0, 3.0, 1.0]),
+                                    np.array([0, 0, 2]), 3)
+        np.testing.assert_allclose(values, [2.5, 0.0, 5.0])
+
+if __name__ == '__main__':
+    unittest.main()
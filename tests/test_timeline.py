@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, look_at_rotations
+from blender_projection_system.core.timeline import (FrameCache, FrameRangeAnalysis, FrameSnapshot,
+                                                     analyze_frame, largest_dark_patch, timeline_summary)
+
+# A 7 m x 2 m wall at y = 3
+WALL_VERTICES = np.array([[-3.5, 3.0, -1.0], [3.5, 3.0, -1.0], [3.5, 3.0, 1.0], [-3.5, 3.0, 1.0]])
+WALL_TRIANGLES = np.array([[0, 1, 2], [0, 2, 3]])
+
+def wall_snapshot(spread):
+    """Two projectors 6 m from the wall, 4 m wide images centred at x = +-spread"""
+    origins = np.array([[-spread, -3.0, 0.0], [spread, -3.0, 0.0]])
+    targets = origins + [0.0, 6.0, 0.0]
+    projectors = ProjectorArrays(origins, look_at_rotations(origins, targets), 1.5, 16 / 9, lumens=6000.0)
+    return FrameSnapshot(projectors, WALL_VERTICES, WALL_TRIANGLES)
+
+class TestTimeline(unittest.TestCase):
+    """Test cases for the frame-range analysis."""
+
+    def test_dark_patch(self):
+        """The largest of two separate dark squares is measured."""
+        x, y = np.meshgrid(np.arange(0, 10, 0.05), np.arange(0, 10, 0.05))
+        points = np.column_stack([x.ravel(), y.ravel(), np.zeros(x.size)])
+        weights = np.full(len(points), 0.05 ** 2)
+        small = (points[:, 0] < 1) & (points[:, 1] < 1)
+        large = (points[:, 0] > 5) & (points[:, 0] < 7) & (points[:, 1] > 5) & (points[:, 1] < 8)
+        lit = ~(small | large)
+        # Cells on the rim of the patch hold lit samples too; up to one cell is lost on each side
+        area = largest_dark_patch(points, weights, lit, 0.1)
+        self.assertGreaterEqual(area, 1.8 * 2.8)
+        self.assertLessEqual(area, 6.0 + 1e-9)
+        self.assertEqual(largest_dark_patch(points, weights, np.ones(len(points), dtype=bool), 0.1), 0.0)
+
+    def test_moving_rig(self):
+        """Pulling the projectors apart turns their overlap into a dark gap."""
+        together = analyze_frame(wall_snapshot(1.8), 20000, gap_cell=0.1)
+        apart = analyze_frame(wall_snapshot(2.5), 20000, gap_cell=0.1)
+        self.assertAlmostEqual(together.area, 14.0, places=6)
+        self.assertGreater(together.coverage, 0.99)
+        self.assertAlmostEqual(together.overlap_area, 0.4 * 2, delta=0.15)
+        self.assertLess(together.gap_area, 0.1)
+        self.assertAlmostEqual(apart.gap_area, 1.0 * 2, delta=0.3)
+        self.assertEqual(apart.overlap_area, 0.0)
+        self.assertGreater(together.lux_min, 0.0)
+
+    def test_cached_frames(self):
+        """Frames in the same state are analysed once and revisits come from the cache."""
+        cache = FrameCache()
+        states = [1.8, 1.8, 2.5, 2.5, 1.8, 1.8]
+        analysis = FrameRangeAnalysis(cache, max_workers=0, sample_count=5000)
+        for frame, spread in enumerate(states, start=1):
+            analysis.add(frame, wall_snapshot(spread))
+        results = analysis.run()
+        self.assertEqual(sorted(results), list(range(1, 7)))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(analysis.reused, 4)
+        self.assertIs(results[1], results[6])
+
+        summary = timeline_summary(results)
+        self.assertEqual(summary["gap_max_frame"], 3)
+        self.assertEqual(summary["coverage_min_frame"], 3)
+
+        # A second pass, in worker processes, finds every frame cached
+        again = FrameRangeAnalysis(cache, max_workers=2, sample_count=5000)
+        self.assertTrue(all(again.add(frame, wall_snapshot(spread))
+                            for frame, spread in enumerate(states, start=1)))
+        self.assertTrue(again.finished)
+
+        # Changed settings miss the cache; the pool gives the serial answer
+        pooled = FrameRangeAnalysis(cache, max_workers=2, sample_count=4000)
+        pooled.add(1, wall_snapshot(2.5))
+        result = pooled.run()[1]
+        expected = analyze_frame(wall_snapshot(2.5), 4000)
+        self.assertEqual(result.to_dict(), expected.to_dict())
+
+if __name__ == '__main__':
+    unittest.main()
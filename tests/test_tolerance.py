@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.frustum import ProjectorArrays, inside_image, look_at_rotations, project_points
+from blender_projection_system.core.sampling import sample_surface
+from blender_projection_system.core.tolerance import (ToleranceModel, run_tolerance, tolerance_problem,
+                                                      trial_areas)
+
+def blend_wall(overlap):
+    """Two 4 m wide images on a wall 6 m from the projectors, overlapping by `overlap` metres"""
+    vertices = np.array([[-4.0, 3.0, -1.0], [4.0, 3.0, -1.0], [4.0, 3.0, 1.0], [-4.0, 3.0, 1.0]])
+    samples = sample_surface(vertices, np.array([[0, 1, 2], [0, 2, 3]]), 40000, seed=3)
+    spread = 2.0 - overlap / 2
+    origins = np.array([[-spread, -3.0, 0.0], [spread, -3.0, 0.0]])
+    projectors = ProjectorArrays(origins, look_at_rotations(origins, origins + [0.0, 6.0, 0.0]), 1.5, 16 / 9)
+    return projectors, samples
+
+class TestTolerance(unittest.TestCase):
+    """Test cases for the Monte Carlo mounting-tolerance analysis."""
+
+    def test_trials_match_moved_projectors(self):
+        """Vectorized trials give the areas of explicitly moved and re-projected projectors."""
+        projectors, samples = blend_wall(0.4)
+        problem = tolerance_problem(projectors, samples, margin=0.2)
+        self.assertEqual(problem.edges.tolist(), [[0, 1]])
+        self.assertAlmostEqual(problem.nominal_overlap[0], 0.4 * 2, delta=0.1)
+
+        model = ToleranceModel(position=0.05, rotation=0.5, zoom=0.02, shift=0.01)
+        rotation, offset, zoom, shift = model.perturb(np.random.default_rng(7), 3, 2)
+        gap, overlap = trial_areas(problem, rotation, offset, zoom, shift)
+        points = samples.points[problem.sample]
+        for k in range(3):
+            moved = ProjectorArrays(projectors.origins + np.einsum('nij,nj->ni', projectors.rotations, offset[k]),
+                                    projectors.rotations @ rotation[k], projectors.throw_ratio * zoom[k],
+                                    projectors.aspect, projectors.shift + shift[k])
+            u, v, depth = project_points(moved, points)
+            lit = inside_image(u, v, depth)
+            lit_zone = lit & problem.visible.T
+            weights = problem.weights
+            self.assertAlmostEqual(overlap[k, 0], weights[lit_zone.all(axis=0)].sum(), places=9)
+            self.assertAlmostEqual(gap[k, 0], weights[~lit_zone.any(axis=0) & problem.counted].sum(), places=9)
+
+    def test_probabilities(self):
+        """Loose rigging of a narrow overlap opens gaps; exact rigging never does; runs are reproducible."""
+        projectors, samples = blend_wall(0.2)
+        problem = tolerance_problem(projectors, samples)
+
+        exact = run_tolerance(problem, ToleranceModel(position=0.0, rotation=0.0), trials=50)
+        self.assertEqual(exact.gap_probability[0], 0.0)
+        self.assertEqual(exact.excess_probability[0], 0.0)
+        np.testing.assert_allclose(exact.overlap_area[:, 0], problem.nominal_overlap[0])
+
+        loose = ToleranceModel(position=0.1, rotation=1.0)
+        result = run_tolerance(problem, loose, trials=600, seed=5, min_gap=0.01)
+        self.assertGreater(result.gap_probability[0], 0.2)
+        self.assertGreater(result.excess_probability[0], 0.2)
+        self.assertLessEqual(result.failure_probability[0], 1.0)
+        self.assertGreaterEqual(result.failure_probability[0], result.gap_probability[0])
+        tight = run_tolerance(problem, ToleranceModel(position=0.002, rotation=0.01,
+                                                      distribution='UNIFORM'), trials=200, min_gap=0.01)
+        self.assertEqual(tight.gap_probability[0], 0.0)
+
+        again = run_tolerance(problem, loose, trials=600, seed=5, workers=2, min_gap=0.01)
+        np.testing.assert_array_equal(again.gap_area, result.gap_area)
+        np.testing.assert_array_equal(again.overlap_area, result.overlap_area)
+        summary = result.summary(0)
+        self.assertLessEqual(summary["overlap_p05"], summary["overlap_p95"])
+
+if __name__ == '__main__':
+    unittest.main()
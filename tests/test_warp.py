@@ -0,0 +1,137 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import the add-on modules
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from blender_projection_system.core.blending import blend_mask, raycast_surface, throw_plane_surface
+from blender_projection_system.core.frustum import ProjectorArrays, look_at_rotations, project_points
+from blender_projection_system.core.raycast import TriangleBVH
+from blender_projection_system.core.warp import compute_warps, write_warp_csv, write_warp_obj
+
+def wall_mesh(width=8.0, height=4.5, cells=40):
+    """A subdivided wall at y=0 with UVs running 0..1 across it."""
+    xs = np.linspace(-width / 2, width / 2, cells + 1)
+    zs = np.linspace(-height / 2, height / 2, cells + 1)
+    x, z = np.meshgrid(xs, zs)
+    vertices = np.column_stack([x.ravel(), np.zeros(x.size), z.ravel()])
+    i, j = np.meshgrid(np.arange(cells), np.arange(cells))
+    a = (j * (cells + 1) + i).ravel()
+    n = cells + 1
+    triangles = np.concatenate([np.column_stack([a, a + 1, a + n]),
+                                np.column_stack([a + 1, a + n + 1, a + n])])
+    uv = np.column_stack([(vertices[:, 0] + width / 2) / width, (vertices[:, 2] + height / 2) / height])
+    return vertices, triangles, uv[triangles]
+
+def brute_force(vertices, triangles, origins, directions):
+    v0 = vertices[triangles[:, 0]]
+    e1 = vertices[triangles[:, 1]] - v0
+    e2 = vertices[triangles[:, 2]] - v0
+    best = np.full(len(origins), np.inf)
+    for k in range(len(triangles)):
+        p = np.cross(directions, e2[k])
+        det = p @ e1[k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv = 1.0 / det
+            s = origins - v0[k]
+            b1 = np.einsum('ij,ij->i', s, p) * inv
+            q = np.cross(s, e1[k])
+            b2 = np.einsum('ij,ij->i', directions, q) * inv
+            t = (q @ e2[k]) * inv
+        hit = (b1 >= 0) & (b2 >= 0) & (b1 + b2 <= 1) & (t > 1e-6)
+        best = np.where(hit, np.minimum(best, t), best)
+    return best
+
+class TestRayCast(unittest.TestCase):
+    """Test cases for the BVH ray caster."""
+
+    def test_matches_brute_force(self):
+        """Closest hits agree with testing every triangle."""
+        rng = np.random.default_rng(3)
+        vertices = rng.random((900, 3)) * 10
+        triangles = rng.integers(0, 900, (300, 3))
+        origins = rng.random((500, 3)) * 10
+        directions = rng.normal(size=(500, 3))
+
+        hits = TriangleBVH(vertices, triangles).ray_cast(origins, directions)
+        expected = brute_force(vertices, triangles, origins, directions)
+        np.testing.assert_array_equal(hits.hit, np.isfinite(expected))
+        np.testing.assert_allclose(hits.distance[hits.hit], expected[hits.hit])
+
+    def test_occlusion(self):
+        """Segments through the wall are blocked, segments ending on it are not."""
+        vertices, triangles, _ = wall_mesh()
+        bvh = TriangleBVH(vertices, triangles)
+        origins = np.array([(0.0, -5.0, 0.0), (0.0, -5.0, 0.0), (0.0, -5.0, 0.0)])
+        targets = np.array([(0.0, 5.0, 0.0), (1.0, 0.0, 0.5), (0.0, -1.0, 0.0)])
+        np.testing.assert_array_equal(bvh.occluded(origins, targets), [True, False, False])
+
+    def test_empty_mesh(self):
+        """An empty BVH reports no hits."""
+        bvh = TriangleBVH(np.zeros((0, 3)), np.zeros((0, 3), dtype=int))
+        self.assertFalse(bvh.ray_cast([(0, 0, 0)], [(0, 1, 0)]).hit.any())
+
+class TestWarp(unittest.TestCase):
+    """Test cases for warp meshes."""
+
+    def setUp(self):
+        self.vertices, self.triangles, self.corner_uvs = wall_mesh()
+        self.bvh = TriangleBVH(self.vertices, self.triangles)
+        origin = np.array([[0.0, -6.0, 0.0]])
+        self.projectors = ProjectorArrays(origin, look_at_rotations(origin, [(0, 0, 0)]), 1.5, 16 / 9,
+                                          resolution=(1920, 1080))
+
+    def test_grid_lands_on_projection(self):
+        """Warp points project back to their own image coordinates."""
+        warp = compute_warps(self.projectors, self.bvh, 64, 36, self.corner_uvs)[0]
+        self.assertEqual(warp.hit_fraction, 1.0)
+        u, v, _ = project_points(self.projectors, warp.points)
+        np.testing.assert_allclose(u[0], warp.u, atol=1e-9)
+        np.testing.assert_allclose(v[0], warp.v, atol=1e-9)
+
+        # Row 0 is the top of the raster
+        top_left = warp.surface_uv[0]
+        bottom_right = warp.surface_uv[-1]
+        self.assertGreater(top_left[1], bottom_right[1])
+        np.testing.assert_allclose(warp.surface_uv[:, 0], (warp.points[:, 0] + 4.0) / 8.0, atol=1e-9)
+
+    def test_exports(self):
+        """OBJ and CSV files hold every hit point and the grid quads."""
+        warp = compute_warps(self.projectors, self.bvh, 8, 5, self.corner_uvs)[0]
+        with tempfile.TemporaryDirectory() as directory:
+            obj_path = write_warp_obj(warp, os.path.join(directory, "warp.obj"))
+            csv_path = write_warp_csv(warp, os.path.join(directory, "warp.csv"))
+            lines = open(obj_path).read().splitlines()
+            self.assertEqual(sum(line.startswith("v ") for line in lines), 40)
+            self.assertEqual(sum(line.startswith("vt ") for line in lines), 40)
+            self.assertEqual(sum(line.startswith("f ") for line in lines), 7 * 4)
+            self.assertEqual(len(open(csv_path).read().splitlines()), 41)
+
+    def test_many_projectors(self):
+        """100 projectors at 64x36 warp points are traced in one batch."""
+        x = np.linspace(-3.4, 3.4, 10)
+        z = np.linspace(-1.8, 1.8, 10)
+        gx, gz = np.meshgrid(x, z)
+        targets = np.column_stack([gx.ravel(), np.zeros(100), gz.ravel()])
+        origins = targets + (0.0, -6.0, 0.0)
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, targets), 6.0, 16 / 9)
+        warps = compute_warps(projectors, self.bvh, 64, 36, self.corner_uvs)
+        self.assertEqual(len(warps), 100)
+        self.assertTrue(all(warp.hit_fraction == 1.0 for warp in warps))
+
+    def test_blend_on_geometry(self):
+        """On a flat wall the ray-cast surface gives the same masks as the throw plane."""
+        origins = np.array([(-1.5, -6.0, 0.0), (1.5, -6.0, 0.0)])
+        projectors = ProjectorArrays(origins, look_at_rotations(origins, origins * (1, 0, 1)), 1.5, 16 / 9,
+                                     resolution=(160, 90))
+        plane = blend_mask(projectors, 0, throw_plane_surface(projectors, 6.0), 0.2, step=4)
+        traced = blend_mask(projectors, 0, raycast_surface(projectors, self.bvh), 0.2, step=4)
+        np.testing.assert_allclose(traced, plane, atol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()